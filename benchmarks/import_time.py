@@ -0,0 +1,160 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures how long importing the command line module of the trimmer
+takes, which every run pays before doing anything, even --help.
+
+The module is imported in a fresh interpreter started with
+``python -X importtime`` several times and the fastest cumulative
+time is compared against a fixed budget. The exit code is 1 if the
+budget is exceeded or if a module that is meant to be imported only
+when needed, such as ndex2, is imported at startup.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+DEFAULT_MODULE = 'ndexnetworktrim.ndexnetworktrimmer'
+
+# ndex2 pulls in pandas and networkx and takes longer to import than
+# everything else together
+DEFAULT_DEFERRED = ['ndex2', 'pandas', 'networkx', 'requests']
+
+
+def _parse_arguments(desc, args):
+    """
+    Parses command line arguments
+    :param desc:
+    :param args:
+    :return:
+    """
+    help_fm = argparse.RawDescriptionHelpFormatter
+    parser = argparse.ArgumentParser(description=desc,
+                                     formatter_class=help_fm)
+    parser.add_argument('--module', default=DEFAULT_MODULE,
+                        help='Module to import (default ' +
+                             DEFAULT_MODULE + ')')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of imports, fastest is reported '
+                             '(default 5)')
+    parser.add_argument('--max_ms', type=float, default=350,
+                        help='Budget of cumulative import time in '
+                             'milliseconds (default 350)')
+    parser.add_argument('--deferred', nargs='*', default=DEFAULT_DEFERRED,
+                        help='Packages that must not be imported at '
+                             'startup (default ' +
+                             ' '.join(DEFAULT_DEFERRED) + ')')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of slowest imports listed '
+                             '(default 10)')
+    parser.add_argument('--json', help='File to write results to')
+    return parser.parse_args(args)
+
+
+def parse_importtime(output):
+    """
+    Parses stderr of ``python -X importtime``
+
+    :param output: text written to stderr
+    :return: list of (module name, self microseconds, cumulative
+             microseconds, nesting level) in order of output
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            self_us = int(fields[0])
+            cumulative_us = int(fields[1])
+        except ValueError:
+            # header line
+            continue
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), self_us, cumulative_us, level))
+    return imports
+
+
+def measure_import(module):
+    """
+    Imports `module` in a new interpreter
+
+    :return: list of imports, see :py:func:`parse_importtime`
+    :raises subprocess.CalledProcessError: if import fails
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           'import ' + module],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    return parse_importtime(proc.stderr)
+
+
+def get_cumulative_ms(imports, module):
+    """
+    :return: cumulative import time of `module` in milliseconds, the
+             modules it imports included
+    """
+    for name, _, cumulative_us, _ in reversed(imports):
+        if name == module:
+            return cumulative_us / 1000.0
+    raise ValueError(module + ' was not imported')
+
+
+def get_deferred_imports(imports, deferred):
+    """
+    :return: sorted names of `deferred` packages that were imported
+    """
+    imported = set(name.split('.')[0] for name, _, _, _ in imports)
+    return sorted(imported & set(deferred))
+
+
+def main(args):
+    """
+    Main entry point for program
+    :param args:
+    :return: 0 if import is within budget, 1 otherwise
+    """
+    theargs = _parse_arguments(__doc__, args[1:])
+    fastest = None
+    for _ in range(max(theargs.repeat, 1)):
+        imports = measure_import(theargs.module)
+        total_ms = get_cumulative_ms(imports, theargs.module)
+        if fastest is None or total_ms < fastest[0]:
+            fastest = (total_ms, imports)
+    total_ms, imports = fastest
+
+    print('{:50s} {:>10s} {:>10s}'.format('module', 'self ms', 'total ms'))
+    for name, self_us, cumulative_us, _ in sorted(
+            imports, key=lambda i: i[2], reverse=True)[:theargs.top]:
+        print('{:50s} {:10.1f} {:10.1f}'.format(name, self_us / 1000.0,
+                                                cumulative_us / 1000.0))
+
+    deferred = get_deferred_imports(imports, theargs.deferred)
+    results = {'module': theargs.module, 'total_ms': total_ms,
+               'max_ms': theargs.max_ms, 'deferred_imports': deferred}
+    if theargs.json is not None:
+        with open(theargs.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    status = 0
+    if total_ms > theargs.max_ms:
+        print('Import of {} took {:.1f} ms, budget is {:.1f} ms'.format(
+            theargs.module, total_ms, theargs.max_ms))
+        status = 1
+    if deferred:
+        print('Imported at startup: ' + ', '.join(deferred))
+        status = 1
+    if status == 0:
+        print('Import of {} took {:.1f} ms, within budget of {:.1f} '
+              'ms'.format(theargs.module, total_ms, theargs.max_ms))
+    return status
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main(sys.argv))
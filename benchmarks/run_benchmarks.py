@@ -0,0 +1,290 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Times each stage of NDExNetworkTrimmer on a seeded synthetic network
+and reports wall time and peak memory traced by tracemalloc (Python
+and NumPy allocations) of every stage.
+
+Results can be written as JSON and compared against the JSON of an
+earlier run, the exit code is 1 if any stage got slower by more
+than the allowed factor.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from ndexnetworktrim import ndexnetworktrimmer
+from ndexnetworktrim.synthetic import DISTRIBUTIONS
+from ndexnetworktrim.synthetic import SCORE_ATTR
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+
+PIPELINE_STAGES = ['load', 'trim_edges', 'remove_orphan_nodes',
+                   'set_network_attributes', 'write']
+
+# stages faster than this in baseline are too noisy to compare
+MIN_COMPARED_SECONDS = 0.01
+
+
+def _parse_arguments(desc, args):
+    """
+    Parses command line arguments
+    :param desc:
+    :param args:
+    :return:
+    """
+    help_fm = argparse.RawDescriptionHelpFormatter
+    parser = argparse.ArgumentParser(description=desc,
+                                     formatter_class=help_fm)
+    parser.add_argument('--nodes', type=int, default=100000,
+                        help='Number of nodes (default 100000)')
+    parser.add_argument('--edges', type=int, default=500000,
+                        help='Number of edges (default 500000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of synthetic network (default 0)')
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS,
+                        default='uniform',
+                        help='Distribution of edge scores (default uniform)')
+    parser.add_argument('--types', type=int, default=10,
+                        help='Number of distinct edge types (default 10)')
+    parser.add_argument('--value', default='0.5',
+                        help='Score cut-off (default 0.5)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Runs per stage, fastest run is reported '
+                             '(default 1)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Run in-memory pipeline with --compact '
+                             'network representation')
+    parser.add_argument('--skip_memory', action='store_true',
+                        help='Do not run each stage an extra time with '
+                             'tracemalloc on to get its peak memory')
+    parser.add_argument('--json', help='File to write results to')
+    parser.add_argument('--baseline', help='JSON results of an earlier '
+                                           'run to compare against')
+    parser.add_argument('--max_slowdown', type=float, default=1.25,
+                        help='Largest allowed ratio of stage time to '
+                             'baseline time (default 1.25)')
+    return parser.parse_args(args)
+
+
+def _measure(func, trace_memory):
+    """
+    Runs `func` timing it or tracing peak memory it allocates
+
+    :param trace_memory: if True peak memory is traced, which slows
+                         down `func` so its time is not meaningful
+    :return: (seconds, peak bytes or None)
+    """
+    if not trace_memory:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start, None
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        return seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Benchmark(object):
+    """
+    Runs stages of the trimmer one by one on a synthetic network.
+    Every stage is timed `repeat` times without tracing memory and,
+    unless memory is skipped, run once more with tracemalloc on to
+    get its peak memory
+    """
+    def __init__(self, theargs, temp_dir):
+        self._args = theargs
+        self._input = os.path.join(temp_dir, 'synthetic.cx')
+        self._output = os.path.join(temp_dir, 'trimmed.cx')
+        self._trace_runs = [False] * max(theargs.repeat, 1)
+        if not theargs.skip_memory:
+            self._trace_runs.append(True)
+        self._results = []
+
+    def _get_trimmer(self):
+        args = ['--input', self._input, '--output', self._output,
+                '--edge_attr', SCORE_ATTR, '--value', self._args.value]
+        if self._args.compact:
+            args.append('--compact')
+        trimmerargs = ndexnetworktrimmer._parse_arguments('benchmark', args)
+        return ndexnetworktrimmer.NDExNetworkTrimmer(trimmerargs)
+
+    def _add_result(self, stage, measurements, counts=None):
+        """
+        :param measurements: (seconds, peak bytes) of each run of stage
+        """
+        times = [t for t, p in measurements if p is None]
+        peaks = [p for _, p in measurements if p is not None]
+        result = {'stage': stage, 'seconds': min(times),
+                  'peak_bytes': max(peaks) if peaks else None}
+        if counts is not None:
+            result.update(counts)
+        self._results.append(result)
+        return result
+
+    def _generate(self):
+        generator = SyntheticNetworkGenerator(
+            self._args.nodes, self._args.edges, seed=self._args.seed,
+            score_distribution=self._args.distribution,
+            num_types=self._args.types)
+
+        def write():
+            with open(self._input, 'wb') as f:
+                generator.write(f)
+        self._add_result('generate', [_measure(write, trace)
+                                      for trace in self._trace_runs],
+                         {'bytes': os.path.getsize(self._input)})
+
+    def _run_pipeline_once(self, trace_memory):
+        """
+        Runs the in-memory pipeline stage by stage
+        :return: {stage: (seconds, peak bytes)} and counts
+        """
+        trimmer = self._get_trimmer()
+        measured = {}
+        measured['load'] = _measure(trimmer._get_network, trace_memory)
+        network = trimmer._network
+        counts = {'edges_before': trimmer._get_edge_count(network),
+                  'nodes_before': trimmer._get_node_count(network)}
+        for stage, func in [('trim_edges', trimmer._trim_edges),
+                            ('remove_orphan_nodes',
+                             trimmer._remove_orphan_nodes),
+                            ('set_network_attributes',
+                             trimmer._set_network_attributes),
+                            ('write', trimmer._write_network_to_file)]:
+            measured[stage] = _measure(func, trace_memory)
+        counts['edges_after'] = trimmer._get_edge_count(network)
+        counts['nodes_after'] = trimmer._get_node_count(network)
+        return measured, counts
+
+    def _run_streaming_once(self, trace_memory):
+        trimmer = self._get_trimmer()
+
+        def trim():
+            with open(self._output, 'wb') as f:
+                trimmer._trim_cx_stream(self._input, f)
+        return _measure(trim, trace_memory)
+
+    def run(self):
+        """
+        Runs all stages
+        :return: results, one dict per stage
+        :rtype: list
+        """
+        self._generate()
+        runs = [self._run_pipeline_once(trace) for trace in self._trace_runs]
+        for stage in PIPELINE_STAGES:
+            self._add_result(stage, [measured[stage]
+                                     for measured, _ in runs])
+        pipeline = {'stage': 'pipeline_total',
+                    'seconds': sum(r['seconds'] for r in self._results
+                                   if r['stage'] in PIPELINE_STAGES),
+                    'peak_bytes': None}
+        pipeline.update(runs[0][1])
+        self._results.append(pipeline)
+        self._add_result('streaming_trim',
+                         [self._run_streaming_once(trace)
+                          for trace in self._trace_runs])
+        return self._results
+
+
+def _format_bytes(num_bytes):
+    if num_bytes is None:
+        return '-'
+    return '{:.1f} MB'.format(num_bytes / 1048576.0)
+
+
+def _print_results(results):
+    print('{:<24} {:>10} {:>12}'.format('stage', 'seconds', 'peak memory'))
+    for result in results:
+        print('{:<24} {:>10.3f} {:>12}'.format(result['stage'],
+                                               result['seconds'],
+                                               _format_bytes(
+                                                   result['peak_bytes'])))
+    for result in results:
+        if 'edges_before' in result:
+            print('edges {edges_before} -> {edges_after}, '
+                  'nodes {nodes_before} -> {nodes_after}'.format(**result))
+
+
+def compare_to_baseline(results, baseline, max_slowdown):
+    """
+    Compares stage times against baseline
+
+    :param results: results of this run
+    :param baseline: results of an earlier run
+    :param max_slowdown: largest allowed ratio of time to baseline time
+    :return: (stage, seconds, baseline seconds) of stages that got slower
+    :rtype: list
+    """
+    baseline_seconds = {r['stage']: r['seconds'] for r in baseline}
+    regressions = []
+    for result in results:
+        before = baseline_seconds.get(result['stage'])
+        if before is None or before < MIN_COMPARED_SECONDS:
+            continue
+        if result['seconds'] > before * max_slowdown:
+            regressions.append((result['stage'], result['seconds'], before))
+    return regressions
+
+
+def main(args):
+    """
+    Main entry point for program
+    :param args:
+    :return:
+    """
+    desc = """
+    Times stages of NDExNetworkTrimmer (load, trim_edges,
+    remove_orphan_nodes, set_network_attributes, write and the
+    streaming trim) on a seeded synthetic network.
+    """
+    theargs = _parse_arguments(desc, args[1:])
+    temp_dir = tempfile.mkdtemp()
+    try:
+        results = Benchmark(theargs, temp_dir).run()
+    finally:
+        shutil.rmtree(temp_dir)
+
+    report = {'parameters': {'nodes': theargs.nodes, 'edges': theargs.edges,
+                             'seed': theargs.seed,
+                             'distribution': theargs.distribution,
+                             'types': theargs.types, 'value': theargs.value,
+                             'repeat': theargs.repeat,
+                             'compact': theargs.compact},
+              'results': results}
+    _print_results(results)
+    if theargs.json is not None:
+        with open(theargs.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if theargs.baseline is None:
+        return 0
+    with open(theargs.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('parameters') != report['parameters']:
+        print('Baseline was run with different parameters, '
+              'times may not be comparable')
+    regressions = compare_to_baseline(results, baseline['results'],
+                                      theargs.max_slowdown)
+    for stage, seconds, before in regressions:
+        print('REGRESSION {}: {:.3f}s vs {:.3f}s in baseline'.format(
+            stage, seconds, before))
+    if regressions:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main(sys.argv))
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""Trims many networks listed in a manifest with a pool of processes."""
+
+import copy
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+UUID = 'uuid'
+INPUT = 'input'
+OUTPUT = 'output'
+EDGE_ATTR = 'edge_attr'
+VALUE = 'value'
+FILTER = 'filter'
+
+MANIFEST_COLUMNS = [UUID, INPUT, OUTPUT, EDGE_ATTR, VALUE, FILTER]
+
+# state of a worker process set by _init_worker
+_worker = {}
+
+
+def read_manifest(path):
+    """
+    Reads jobs from manifest which is either a JSON file with a list
+    of objects or a CSV file with a header row. Keys/columns are
+    uuid, input, output, edge_attr, value and filter. Either uuid or
+    input must be set along with either filter or edge_attr and value.
+    Value can be a list (or a whitespace separated string) to sweep
+    several cut-offs.
+
+    :param path: path to manifest, JSON if it ends with .json
+    :raises Exception: if a row is missing a required field
+    :return: jobs
+    :rtype: list of dict
+    """
+    with open(path, 'r') as f:
+        if path.lower().endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for row_num, row in enumerate(rows, start=1):
+        job = {}
+        for column in MANIFEST_COLUMNS:
+            value = row.get(column)
+            if isinstance(value, str):
+                value = value.strip()
+            if value == '' or value is None:
+                value = None
+            job[column] = value
+
+        if job[UUID] is None and job[INPUT] is None:
+            raise Exception('Row ' + str(row_num) + ' of manifest ' + path +
+                            ' has neither ' + UUID + ' nor ' + INPUT)
+        if job[FILTER] is None:
+            for column in [EDGE_ATTR, VALUE]:
+                if job[column] is None:
+                    raise Exception('Row ' + str(row_num) + ' of manifest ' +
+                                    path + ' is missing ' + column)
+
+        if job[VALUE] is None:
+            pass
+        elif isinstance(job[VALUE], list):
+            job[VALUE] = [str(v) for v in job[VALUE]]
+        else:
+            job[VALUE] = str(job[VALUE]).split()
+        jobs.append(job)
+    return jobs
+
+
+def _init_worker(trimmer_class, args):
+    """
+    Initializes state of worker process
+
+    :param trimmer_class: class used to trim each network
+    :param args: parsed command line arguments shared by all jobs
+    """
+    _worker['trimmer_class'] = trimmer_class
+    _worker['args'] = args
+    _worker['connection'] = None
+
+
+def _run_job(job):
+    """
+    Trims network of one job in a worker process. The NDEx client and
+    credentials obtained by the first job that needs them are reused
+    by later jobs run in the same process
+
+    :param job: job from manifest
+    :return: result of job which is `job` with status, error,
+             duration, pid of worker and metrics of stages added
+    :rtype: dict
+    """
+    args = copy.copy(_worker['args'])
+    args.manifest = None
+    # metrics of each job go to report instead
+    args.metrics_json = None
+    args.metrics_prom = None
+    for column in MANIFEST_COLUMNS:
+        setattr(args, column, job[column])
+
+    result = dict(job)
+    result['error'] = None
+    result['pid'] = os.getpid()
+    result['metrics'] = None
+    start = time.time()
+    trimmer = None
+    try:
+        trimmer = _worker['trimmer_class'](args)
+        if _worker['connection'] is not None:
+            trimmer.set_ndex_connection(*_worker['connection'])
+        result['status'] = trimmer.run()
+        if _worker['connection'] is None:
+            _worker['connection'] = trimmer.get_ndex_connection()
+    except Exception as e:
+        logger.exception('Job for ' + str(job[UUID] or job[INPUT]) +
+                         ' failed')
+        result['status'] = 2
+        result['error'] = str(e)
+    result['duration'] = time.time() - start
+    if trimmer is not None:
+        result['metrics'] = trimmer.get_metrics().to_dict()
+    return result
+
+
+class BatchTrimmer(object):
+    """
+    Trims networks listed in a manifest with a pool of worker
+    processes. A failing job does not stop the other jobs
+    """
+    def __init__(self, args, trimmer_class):
+        """
+
+        :param args: parsed command line arguments, manifest, pool_size
+                     and report are used here, the rest is passed to
+                     each job
+        :param trimmer_class: class used to trim each network, it is
+                              passed the arguments of the job
+        """
+        self._args = args
+        self._manifest = args.manifest
+        self._pool_size = args.pool_size
+        self._report = args.report
+        self._trimmer_class = trimmer_class
+
+    def _run_jobs(self, jobs):
+        """
+        Runs jobs in-process if pool size is 1 otherwise in pool
+        :return: results of jobs in order of manifest
+        """
+        initargs = (self._trimmer_class, self._args)
+        if self._pool_size <= 1 or len(jobs) <= 1:
+            _init_worker(*initargs)
+            return [_run_job(job) for job in jobs]
+
+        pool = multiprocessing.Pool(processes=min(self._pool_size,
+                                                  len(jobs)),
+                                    initializer=_init_worker,
+                                    initargs=initargs)
+        try:
+            return pool.map(_run_job, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _write_report(self, results, duration):
+        """
+        Writes summary report as JSON to path set via --report
+        """
+        failed = [r for r in results if r['status'] != 0]
+        report = {'manifest': self._manifest,
+                  'pool_size': self._pool_size,
+                  'duration': duration,
+                  'numberOfJobs': len(results),
+                  'numberFailed': len(failed),
+                  'jobs': results}
+        with open(self._report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def run(self):
+        """
+        Runs all jobs in manifest
+
+        :return: 0 if all jobs succeeded otherwise 1
+        """
+        jobs = read_manifest(self._manifest)
+        start = time.time()
+        results = self._run_jobs(jobs)
+        duration = time.time() - start
+
+        if self._report is not None:
+            self._write_report(results, duration)
+
+        failed = [r for r in results if r['status'] != 0]
+        for result in failed:
+            print('FAILED {} ({}): {}'.format(result[UUID] or result[INPUT],
+                                              result[FILTER] or
+                                              ' '.join(result[VALUE]),
+                                              result['error']))
+        print('{} jobs in {:.1f}s: {} succeeded, {} failed'.format(
+            len(results), duration, len(results) - len(failed),
+            len(failed)))
+
+        if failed:
+            return 1
+        return 0
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-disk cache of parent networks keyed by UUID and in-memory cache of
+parsed parent networks for long running processes.
+"""
+
+import collections
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CX_SUFFIX = '.cx'
+META_SUFFIX = '.json'
+
+# keys in network summary returned by NDEx that tell if network changed
+SUMMARY_KEYS = ['modificationTime', 'cxFileSize']
+
+
+def get_summary_fingerprint(summary):
+    """
+    :param summary: network summary from server or None
+    :return: values of :py:const:`SUMMARY_KEYS` in summary
+    :rtype: dict
+    """
+    if summary is None:
+        return {}
+    return {k: summary.get(k) for k in SUMMARY_KEYS if k in summary}
+
+
+def is_summary_unchanged(fingerprint, summary):
+    """
+    :param fingerprint: fingerprint recorded via
+                        :py:func:`get_summary_fingerprint`
+    :param summary: current network summary from server
+    :return: True if network described by `summary` is the same as
+             the one `fingerprint` was recorded for. False if summary
+             has none of the keys compared
+    """
+    if summary is None:
+        return False
+    compared = False
+    for key in SUMMARY_KEYS:
+        if key not in summary:
+            continue
+        if (fingerprint or {}).get(key) != summary[key]:
+            return False
+        compared = True
+    return compared
+
+
+class NetworkCache(object):
+    """
+    Cache of network CX files in a directory. A cached network is
+    reused as long as the modification time and size reported in
+    its network summary on the server match the ones recorded when
+    it was downloaded. Once the total size of the cache goes over
+    the cap the least recently used networks are evicted.
+
+    Downloads and metadata updates are written to a uniquely named
+    temporary file and renamed into place so processes and threads
+    sharing a cache directory never see or mix partial files.
+    """
+    def __init__(self, cache_dir, max_bytes):
+        """
+
+        :param cache_dir: directory to store networks in, created
+                          if it does not exist
+        :param max_bytes: size cap of cache in bytes
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _get_cx_path(self, network_id):
+        return os.path.join(self._cache_dir, network_id + CX_SUFFIX)
+
+    def _get_meta_path(self, network_id):
+        return os.path.join(self._cache_dir, network_id + META_SUFFIX)
+
+    def _get_temp_path(self, path):
+        """
+        :return: path of new empty temporary file in cache directory
+                 named after `path`
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir,
+                                        prefix=os.path.basename(path) + '.',
+                                        suffix='.tmp')
+        os.close(fd)
+        return tmp_path
+
+    def _read_meta(self, network_id):
+        """
+        :return: metadata of cached network or None if not cached
+        """
+        try:
+            with open(self._get_meta_path(network_id), 'r') as f:
+                meta = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if not os.path.isfile(self._get_cx_path(network_id)):
+            return None
+        return meta
+
+    def _write_meta(self, network_id, meta):
+        path = self._get_meta_path(network_id)
+        tmp_path = self._get_temp_path(path)
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def get_network_path(self, network_id, summary, download):
+        """
+        Gets path to CX file of network, downloading it if it is
+        not cached or if it changed on server
+
+        :param network_id: UUID of network
+        :param summary: network summary from server
+        :type summary: dict
+        :param download: function that is passed a path and writes
+                         the CX of the network to it
+        :return: path to CX file of network
+        """
+        meta = self._read_meta(network_id)
+        if meta is not None and is_summary_unchanged(meta.get('summary'),
+                                                     summary):
+            logger.info('Using cached copy of network ' + network_id)
+        else:
+            logger.info('Downloading network ' + network_id + ' to cache')
+            cx_path = self._get_cx_path(network_id)
+            tmp_path = self._get_temp_path(cx_path)
+            try:
+                download(tmp_path)
+                os.replace(tmp_path, cx_path)
+            finally:
+                if os.path.isfile(tmp_path):
+                    os.remove(tmp_path)
+            meta = {'summary': get_summary_fingerprint(summary),
+                    'size': os.path.getsize(cx_path)}
+
+        meta['lastAccess'] = time.time()
+        self._write_meta(network_id, meta)
+        self.evict(keep=network_id)
+        return self._get_cx_path(network_id)
+
+    def get_entries(self):
+        """
+        :return: (last access time, size in bytes, network id) tuples
+                 of cached networks
+        :rtype: list
+        """
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(CX_SUFFIX):
+                continue
+            network_id = name[:-len(CX_SUFFIX)]
+            meta = self._read_meta(network_id)
+            if meta is None:
+                continue
+            entries.append((meta.get('lastAccess', 0),
+                            os.path.getsize(self._get_cx_path(network_id)),
+                            network_id))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used networks until total size
+        of cache is at most the size cap
+
+        :param keep: id of network that is never evicted
+        :return: ids of evicted networks
+        :rtype: list
+        """
+        entries = sorted(self.get_entries())
+        total = sum(e[1] for e in entries)
+        evicted = []
+        for last_access, size, network_id in entries:
+            if total <= self._max_bytes:
+                break
+            if network_id == keep:
+                continue
+            for path in [self._get_cx_path(network_id),
+                         self._get_meta_path(network_id)]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            evicted.append(network_id)
+            logger.info('Evicted network ' + network_id + ' from cache')
+        return evicted
+
+
+class MemoryNetworkCache(object):
+    """
+    Parsed parent networks held in memory by a long running process
+    and shared by its threads. Once the total size of networks goes
+    over the cap the least recently used ones are evicted. The size
+    of a network is the size of the CX it was parsed from, a network
+    larger than the cap is not kept.
+
+    A network being loaded by one thread is waited for by other
+    threads asking for it instead of being loaded again. Networks
+    handed out are shared, callers must not alter them.
+    """
+    def __init__(self, max_bytes):
+        """
+
+        :param max_bytes: size cap of cache in bytes
+        """
+        self._max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _put(self, key, network, size):
+        if size > self._max_bytes:
+            logger.info('Network of {} bytes exceeds in-memory cache size '
+                        'cap, not cached'.format(size))
+            return
+        self._entries[key] = (network, size)
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._evictions += 1
+
+    def get_or_load(self, key, load):
+        """
+        Gets network from cache, loading and caching it if it is not
+        cached
+
+        :param key: hashable key telling apart networks and their
+                    versions
+        :param load: function returning (network, size in bytes)
+        :return: (network, size in bytes, True if it was cached)
+        :rtype: tuple
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry + (True,)
+                event = self._loading.get(key)
+                if event is None:
+                    event = self._loading[key] = threading.Event()
+                    self._misses += 1
+                    break
+            # loaded by another thread, or loaded here if that failed
+            event.wait()
+
+        try:
+            network, size = load()
+            with self._lock:
+                self._put(key, network, size)
+            return network, size, False
+        finally:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+
+    def get_stats(self):
+        """
+        :return: number and total size of cached networks, size cap,
+                 hits, misses and evictions
+        :rtype: dict
+        """
+        with self._lock:
+            return {'networks': len(self._entries),
+                    'bytes': self._bytes,
+                    'max_bytes': self._max_bytes,
+                    'hits': self._hits,
+                    'misses': self._misses,
+                    'evictions': self._evictions}
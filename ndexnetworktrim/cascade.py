@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cascade pruning of aspects whose elements refer to nodes or edges.
+
+Trimming removes nodes, edges and their attributes. Elements of other
+aspects, such as cartesianLayout entries, node and edge citations and
+supports or visual property bypasses, that refer to removed nodes and
+edges are removed here too, along with citations and supports no
+longer referred to by anything left.
+"""
+
+import logging
+import numbers
+
+import numpy as np
+
+from ndexnetworktrim.cxstream import EDGES
+from ndexnetworktrim.cxstream import NODES
+from ndexnetworktrim.cxstream import get_element_ids
+from ndexnetworktrim.cxupload import CITATION_ASPECTS
+from ndexnetworktrim.cxupload import EDGE_SUPPORT_ASPECTS
+from ndexnetworktrim.cxupload import _iter_aspect_elements
+from ndexnetworktrim.graphindex import IdIndex
+
+logger = logging.getLogger(__name__)
+
+CITATIONS = 'citations'
+SUPPORTS = 'supports'
+
+# (aspect, key holding ids, aspect of ids, True if element is removed
+# once none of its ids are left otherwise only ids are removed). If
+# aspect of ids is None the element says so in properties_of
+REFERENCES = [('cartesianLayout', 'node', NODES, True),
+              ('nodeCitations', 'po', NODES, True),
+              ('edgeCitations', 'po', EDGES, True),
+              ('nodeSupports', 'po', NODES, True),
+              ('edgeSupports', 'po', EDGES, True),
+              ('cyVisualProperties', 'applies_to', None, True),
+              ('visualProperties', 'applies_to', None, True),
+              ('cySubNetworks', 'nodes', NODES, False),
+              ('cySubNetworks', 'edges', EDGES, False)]
+
+# (aspect, key holding ids, aspect of ids) of references to citations
+# and supports, which are removed once nothing refers to them. Supports
+# are listed first since removing them can leave citations unreferenced
+SHARED_REFERENCES = [('nodeSupports', 'supports', SUPPORTS),
+                     ('edgeSupports', 'supports', SUPPORTS),
+                     ('nodeCitations', 'citations', CITATIONS),
+                     ('edgeCitations', 'citations', CITATIONS),
+                     (SUPPORTS, 'citation', CITATIONS)]
+
+DEPENDENT_ASPECTS = set([r[0] for r in REFERENCES] +
+                        [r[0] for r in SHARED_REFERENCES] +
+                        [CITATIONS, SUPPORTS])
+
+# aspects NiceCXNetwork holds as dicts keyed by node or edge id
+_KEYED_ASPECTS = {'nodeCitations': CITATIONS, 'edgeCitations': CITATIONS,
+                  'edgeSupports': SUPPORTS}
+
+
+def _get_ids(value):
+    """
+    :return: ids in `value`, which can be one id or a list, ignoring
+             anything that is not an integer such as 'all'
+    """
+    return [i for i in get_element_ids(value)
+            if isinstance(i, numbers.Integral) and not isinstance(i, bool)]
+
+
+def _get_target(aspect_of_ids, element):
+    if aspect_of_ids is not None:
+        return aspect_of_ids
+    target = element.get('properties_of')
+    if target in (NODES, EDGES):
+        return target
+    return None
+
+
+class _ReverseIndex(object):
+    """
+    Finds entries by key via binary search over keys sorted once, so
+    finding the entries of some keys takes time proportional to the
+    number of keys looked up and entries found
+    """
+    def __init__(self, keys):
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+
+    def find(self, keys):
+        """
+        :param keys: keys to look up
+        :return: positions of all entries with any of `keys`
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        starts = np.searchsorted(self._sorted_keys, keys, side='left')
+        ends = np.searchsorted(self._sorted_keys, keys, side='right')
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self._order[offsets + np.arange(total)]
+
+
+class DependentAspectIndex(object):
+    """
+    Reverse indexes from node and edge ids, and from citation and
+    support ids, to the aspect elements that refer to them. Built once
+    per network, :py:func:`prune` then finds elements to remove in
+    time proportional to the number of nodes and edges removed and
+    can be called for any number of trimmed copies of the network
+    """
+    def __init__(self, aspects):
+        """
+
+        :param aspects: elements of aspects keyed by aspect name, see
+                        :py:func:`get_dependent_aspects`
+        :type aspects: dict
+        """
+        self._aspects = {name: elements for name, elements in aspects.items()
+                         if name in DEPENDENT_ASPECTS and elements}
+        self._groups = []
+        self._counts = []
+        self._reverse = {}
+        self._build_references()
+        self._shared = []
+        self._build_shared_references()
+        self._reference_counts = self._get_reference_counts()
+
+    def _build_references(self):
+        ids = {NODES: [], EDGES: []}
+        entries = {NODES: [], EDGES: []}
+        for aspect, key, aspect_of_ids, remove in REFERENCES:
+            elements = self._aspects.get(aspect)
+            if not elements:
+                continue
+            group = len(self._groups)
+            self._groups.append((aspect, key, remove))
+            positions = []
+            for pos, element in enumerate(elements):
+                target = _get_target(aspect_of_ids, element)
+                if target is None:
+                    continue
+                for element_id in _get_ids(element.get(key)):
+                    ids[target].append(element_id)
+                    entries[target].append((group, pos))
+                    positions.append(pos)
+            self._counts.append(np.bincount(np.array(positions,
+                                                     dtype=np.int64),
+                                            minlength=len(elements)))
+        for target in (NODES, EDGES):
+            entry_array = np.array(entries[target],
+                                   dtype=np.int64).reshape(-1, 2)
+            self._reverse[target] = (
+                _ReverseIndex(np.array(ids[target], dtype=np.int64)),
+                entry_array[:, 0], entry_array[:, 1])
+
+    def _build_shared_references(self):
+        for aspect, key, referred in SHARED_REFERENCES:
+            elements = self._aspects.get(aspect)
+            referred_elements = self._aspects.get(referred)
+            if not elements or not referred_elements:
+                continue
+            referred_index = IdIndex(np.array(
+                [e.get('@id', -1) for e in referred_elements],
+                dtype=np.int64))
+            referrers = []
+            referred_ids = []
+            for pos, element in enumerate(elements):
+                for element_id in _get_ids(element.get(key)):
+                    referrers.append(pos)
+                    referred_ids.append(element_id)
+            referred_positions = referred_index.get_positions(referred_ids)
+            found = referred_positions >= 0
+            referrers = np.array(referrers, dtype=np.int64)[found]
+            self._shared.append((aspect, referred, _ReverseIndex(referrers),
+                                 referred_positions[found]))
+
+    def _get_reference_counts(self):
+        """
+        :return: number of references to each citation and support
+        """
+        counts = {}
+        for _, referred, _, referred_positions in self._shared:
+            count = np.bincount(referred_positions,
+                                minlength=len(self._aspects[referred]))
+            if referred in counts:
+                counts[referred] = counts[referred] + count
+            else:
+                counts[referred] = count
+        return counts
+
+    def prune(self, removed_node_ids, removed_edge_ids):
+        """
+        Finds elements of dependent aspects left referring to removed
+        nodes and edges. The index is not altered
+
+        :param removed_node_ids: ids of removed nodes
+        :param removed_edge_ids: ids of removed edges
+        :return: (new elements of aspects that changed keyed by aspect
+                 name, number of elements removed)
+        :rtype: tuple
+        """
+        removed = {NODES: np.unique(np.asarray(removed_node_ids,
+                                               dtype=np.int64)),
+                   EDGES: np.unique(np.asarray(removed_edge_ids,
+                                               dtype=np.int64))}
+        removed_sets = {}
+        dropped = {}
+        rewritten = {}
+        for target in (NODES, EDGES):
+            index, groups, positions = self._reverse[target]
+            hits = index.find(removed[target])
+            if len(hits) == 0:
+                continue
+            removed_sets[target] = set(removed[target].tolist())
+            for group in np.unique(groups[hits]).tolist():
+                aspect, key, remove = self._groups[group]
+                elements = self._aspects[aspect]
+                lost = np.bincount(positions[hits][groups[hits] == group],
+                                   minlength=len(elements))
+                touched = np.flatnonzero(lost)
+                emptied = self._counts[group][touched] == lost[touched]
+                if remove:
+                    dropped.setdefault(aspect, set()).update(
+                        touched[emptied].tolist())
+                    touched = touched[~emptied]
+                aspect_rewritten = rewritten.setdefault(aspect, {})
+                for pos in touched.tolist():
+                    element = aspect_rewritten.get(pos)
+                    if element is None:
+                        element = dict(elements[pos])
+                        aspect_rewritten[pos] = element
+                    element[key] = [i for i in get_element_ids(element[key])
+                                    if i not in removed_sets[target]]
+
+        self._drop_unreferenced(dropped)
+
+        pruned = {}
+        removed_count = 0
+        for aspect in set(dropped) | set(rewritten):
+            aspect_dropped = dropped.get(aspect, set())
+            aspect_rewritten = rewritten.get(aspect, {})
+            pruned[aspect] = [aspect_rewritten.get(pos, element)
+                              for pos, element in
+                              enumerate(self._aspects[aspect])
+                              if pos not in aspect_dropped]
+            removed_count += len(aspect_dropped)
+        logger.debug('Cascade removed {} elements of {}'.format(
+            removed_count, sorted(pruned.keys())))
+        return pruned, removed_count
+
+    def _drop_unreferenced(self, dropped):
+        """
+        Adds to `dropped` citations and supports whose references were
+        all in elements already in `dropped`
+        """
+        if not self._shared:
+            return
+        counts = {name: count.copy()
+                  for name, count in self._reference_counts.items()}
+        for aspect, referred, referrers, referred_positions in self._shared:
+            if not dropped.get(aspect):
+                continue
+            lost = referred_positions[referrers.find(
+                sorted(dropped[aspect]))]
+            if len(lost) == 0:
+                continue
+            np.subtract.at(counts[referred], lost, 1)
+            unreferenced = np.unique(lost)
+            unreferenced = unreferenced[counts[referred][unreferenced] == 0]
+            dropped.setdefault(referred, set()).update(unreferenced.tolist())
+
+
+def get_dependent_aspects(network):
+    """
+    :param network: network, either a
+                    :py:class:`~ndex2.nice_cx_network.NiceCXNetwork` or
+                    a :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :return: elements of aspects of network that can refer to nodes,
+             edges, citations or supports keyed by aspect name
+    :rtype: dict
+    """
+    if hasattr(network, 'get_aspects'):
+        return {name: elements for name, elements in
+                network.get_aspects().items() if name in DEPENDENT_ASPECTS}
+
+    aspects = {}
+    for name, elements in (network.opaqueAspects or {}).items():
+        if name in DEPENDENT_ASPECTS and isinstance(elements, list):
+            aspects[name] = elements
+    for name in CITATION_ASPECTS + EDGE_SUPPORT_ASPECTS:
+        if getattr(network, name, None):
+            aspects[name] = list(_iter_aspect_elements(network, name))
+    for name in (CITATIONS, SUPPORTS):
+        if getattr(network, name, None):
+            aspects[name] = list(getattr(network, name).values())
+    return aspects
+
+
+def set_dependent_aspect(network, name, elements):
+    """
+    Replaces elements of aspect of network. Containers are replaced
+    rather than changed so networks sharing them are not altered
+
+    :param network: network, either a
+                    :py:class:`~ndex2.nice_cx_network.NiceCXNetwork` or
+                    a :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :param name: name of aspect
+    :param elements: new elements of aspect
+    """
+    if hasattr(network, 'set_aspect'):
+        network.set_aspect(name, elements)
+    elif name in _KEYED_ASPECTS:
+        key = _KEYED_ASPECTS[name]
+        setattr(network, name, {po: element.get(key)
+                                for element in elements
+                                for po in get_element_ids(element.get('po'))})
+    elif name in (CITATIONS, SUPPORTS):
+        setattr(network, name, {element.get('@id'): element
+                                for element in elements})
+    else:
+        network.opaqueAspects = dict(network.opaqueAspects)
+        network.opaqueAspects[name] = elements
+
+
+def prune_element(aspect, element, kept_nodes, kept_edges):
+    """
+    Streaming counterpart of :py:class:`DependentAspectIndex` that
+    checks one element against ids of kept nodes and edges. Citations
+    and supports are not removed
+
+    :param aspect: name of aspect of element
+    :param element: element
+    :param kept_nodes: ids of kept nodes or None if all are kept
+    :param kept_edges: ids of kept edges or None if all are kept
+    :return: element, a pruned copy of it or None if it is removed
+    """
+    kept = {NODES: kept_nodes, EDGES: kept_edges}
+    for ref_aspect, key, aspect_of_ids, remove in REFERENCES:
+        if ref_aspect != aspect:
+            continue
+        target = _get_target(aspect_of_ids, element)
+        if target is None or kept[target] is None or key not in element:
+            continue
+        ids = _get_ids(element[key])
+        removed = set(i for i in ids if i not in kept[target])
+        if not removed:
+            continue
+        if remove and len(removed) == len(set(ids)):
+            return None
+        element = dict(element)
+        element[key] = [i for i in get_element_ids(element[key])
+                        if i not in removed]
+    return element
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""
+Collapsing of parallel edges, edges with the same source and target
+and optionally the same interaction, into one edge per group.
+
+Groups are found by one sort of the endpoint arrays, so the cost of
+grouping does not depend on how many groups there are. Attributes are
+then merged only for groups with more than one edge: the filter
+attribute is aggregated and other attributes whose values differ
+become lists of their distinct values.
+"""
+
+import logging
+
+import numpy as np
+
+from ndexnetworktrim.graphindex import _get_endpoint_arrays
+from ndexnetworktrim.profiling import _get_number
+
+logger = logging.getLogger(__name__)
+
+MAX = 'max'
+
+MEAN = 'mean'
+
+COUNT = 'count'
+
+AGGREGATES = [MAX, MEAN, COUNT]
+
+LIST_OF = 'list_of_'
+
+
+def _get_interaction_codes(network):
+    """
+    :return: int array aligned with edges of network that is equal
+             for edges with equal interactions
+    """
+    if hasattr(network, 'get_interaction_codes'):
+        return network.get_interaction_codes()
+    codes = {}
+    return np.fromiter((codes.setdefault(e.get('i'), len(codes))
+                        for e in network.edges.values()),
+                       dtype=np.int64, count=len(network.edges))
+
+
+def group_edges(edge_ids, sources, targets, interactions=None):
+    """
+    Groups edges with equal source, target and, if `interactions` is
+    set, interaction by sorting them on those keys
+
+    :param edge_ids: ids of edges
+    :param sources: source node ids aligned with `edge_ids`
+    :param targets: target node ids aligned with `edge_ids`
+    :param interactions: optional interaction codes aligned with
+                         `edge_ids`
+    :return: list of arrays of edge ids of groups with more than one
+             edge, lowest edge id first
+    :rtype: list
+    """
+    if len(edge_ids) < 2:
+        return []
+    keys = [edge_ids, targets, sources]
+    if interactions is not None:
+        keys.insert(1, interactions)
+    # last key sorts first, ties keep lowest edge id first
+    order = np.lexsort(keys)
+    new_group = np.zeros(len(order), dtype=bool)
+    new_group[0] = True
+    for key in keys[1:]:
+        key = key[order]
+        new_group[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(new_group)
+    sizes = np.diff(np.append(starts, len(order)))
+    sorted_ids = edge_ids[order]
+    return [sorted_ids[start:start + size]
+            for start, size in zip(starts[sizes > 1].tolist(),
+                                   sizes[sizes > 1].tolist())]
+
+
+def get_parallel_edge_groups(network, by_interaction=False):
+    """
+    :param network: network, either a
+                    :py:class:`~ndex2.nice_cx_network.NiceCXNetwork` or
+                    a :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :param by_interaction: if True, edges with different interactions
+                           are not grouped
+    :return: see :py:func:`group_edges`
+    """
+    edge_ids, sources, targets, _ = _get_endpoint_arrays(network)
+    interactions = None
+    if by_interaction:
+        interactions = _get_interaction_codes(network)
+    return group_edges(edge_ids, sources, targets, interactions=interactions)
+
+
+def _get_base_type(element):
+    data_type = element.get('d') or 'string'
+    if data_type.startswith(LIST_OF):
+        return data_type[len(LIST_OF):]
+    return data_type
+
+
+def _aggregate(name, elements, size, aggregate):
+    """
+    :param elements: elements of attribute `name` of edges of group
+    :param size: number of edges in group
+    :return: aggregated element without po or None if no value of
+             attribute is a number
+    """
+    if aggregate == COUNT:
+        return {'n': name, 'v': size, 'd': 'integer'}
+    numbers = [(_get_number(e.get('v')), e) for e in elements]
+    numbers = [n for n in numbers if n[0] is not None]
+    if not numbers:
+        return None
+    if aggregate == MEAN:
+        return {'n': name, 'v': sum(n[0] for n in numbers) / len(numbers),
+                'd': 'double'}
+    # first of equal maxima, value is kept as it was
+    element = max(numbers, key=lambda n: n[0])[1]
+    merged = {'n': name, 'v': element.get('v')}
+    if 'd' in element:
+        merged['d'] = element['d']
+    return merged
+
+
+def _merge(name, elements):
+    """
+    :param elements: elements of attribute `name` of edges of group
+    :return: element without po holding value shared by all elements
+             or a list of their distinct values, as strings if their
+             data types differ
+    """
+    values = []
+    types = set()
+    for element in elements:
+        value = element.get('v')
+        types.add(_get_base_type(element))
+        for item in value if isinstance(value, list) else [value]:
+            if item is not None and item not in values:
+                values.append(item)
+
+    first = elements[0]
+    if all(e.get('v') == first.get('v') and e.get('d') == first.get('d')
+           for e in elements):
+        merged = {'n': name, 'v': first.get('v')}
+        if 'd' in first:
+            merged['d'] = first['d']
+        return merged
+
+    if len(types) == 1:
+        return {'n': name, 'v': values, 'd': LIST_OF + types.pop()}
+    return {'n': name, 'v': [str(v) for v in values],
+            'd': LIST_OF + 'string'}
+
+
+def merge_edge_attributes(edge_id, member_attributes, attribute_name=None,
+                          aggregate=MAX):
+    """
+    Merges attributes of a group of parallel edges into attributes
+    of the edge kept for the group
+
+    :param edge_id: id of edge kept for group
+    :param member_attributes: lists of edgeAttributes elements of
+                              each edge of group
+    :param attribute_name: attribute aggregated via `aggregate`
+                           instead of merged, if None every attribute
+                           is merged
+    :param aggregate: one of :py:const:`AGGREGATES`. Values of
+                      `attribute_name` that are not numbers are left
+                      out of max and mean and merged if there are no
+                      numbers at all
+    :return: edgeAttributes elements of edge `edge_id`
+    :rtype: list
+    """
+    by_name = {}
+    for attributes in member_attributes:
+        for element in attributes or []:
+            by_name.setdefault(element['n'], []).append(element)
+    if attribute_name is not None and aggregate == COUNT:
+        by_name.setdefault(attribute_name, [])
+
+    merged = []
+    for name, elements in by_name.items():
+        element = None
+        if name == attribute_name:
+            element = _aggregate(name, elements, len(member_attributes),
+                                 aggregate)
+        if element is None:
+            element = _merge(name, elements)
+        element['po'] = edge_id
+        merged.append(element)
+    return merged
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+"""Columnar index of edge attributes backed by NumPy arrays."""
+
+import numbers
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AttributeColumn(object):
+    """
+    Values of one attribute for every edge held in a typed NumPy
+    array along with a mask of edges that lack the attribute.
+
+    Numeric columns are stored as float64, anything else as an
+    array of objects. Values that are lists (list_of_* CX types)
+    are treated as missing.
+    """
+    def __init__(self, name, values, missing):
+        """
+
+        :param name: name of attribute
+        :param values: :py:class:`numpy.ndarray` of values, value at a
+                       missing position is undefined
+        :param missing: boolean :py:class:`numpy.ndarray` that is True
+                        where attribute is missing
+        """
+        self.name = name
+        self.values = values
+        self.missing = missing
+        self._numeric_values = None
+
+    def is_numeric(self):
+        """
+        :return: True if column is stored as float64
+        """
+        return self.values.dtype == np.float64
+
+    def get_numeric_values(self, booleans=True):
+        """
+        Gets values of column as float64 converting strings such
+        as '0.5' to numbers. Values that cannot be converted are
+        flagged as missing
+
+        :param booleans: if False, True and False are flagged as
+                         missing instead of being taken as 1 and 0
+        :return: (float64 values, missing mask)
+        :rtype: tuple
+        """
+        if self.is_numeric():
+            return self.values, self.missing
+        if self._numeric_values is None:
+            values = np.zeros(len(self.values), dtype=np.float64)
+            missing = self.missing.copy()
+            is_boolean = np.zeros(len(self.values), dtype=bool)
+            for pos in np.flatnonzero(~missing).tolist():
+                value = self.values[pos]
+                is_boolean[pos] = isinstance(value, (bool, np.bool_))
+                try:
+                    values[pos] = float(value)
+                except (TypeError, ValueError):
+                    missing[pos] = True
+            self._numeric_values = (values, missing, is_boolean)
+        values, missing, is_boolean = self._numeric_values
+        if booleans:
+            return values, missing
+        return values, missing | is_boolean
+
+    def greater_equal(self, value):
+        """
+        :param value: number to compare against
+        :return: boolean mask that is True where value in
+                 column is >= `value`
+        """
+        values, missing = self.get_numeric_values()
+        return (values >= value) & ~missing
+
+    def equal(self, value):
+        """
+        :param value: value to compare against
+        :return: boolean mask that is True where value in
+                 column equals `value`
+        """
+        if self.is_numeric():
+            if not isinstance(value, numbers.Number):
+                return np.zeros(len(self.values), dtype=bool)
+        return (self.values == value) & ~self.missing
+
+
+def _get_column_from_values(name, values, missing):
+    """
+    Builds :py:class:`AttributeColumn` picking float64 storage
+    if every present value is a number
+
+    :param values: list of values with None where missing
+    :param missing: boolean :py:class:`numpy.ndarray`
+    :return: column
+    :rtype: :py:class:`AttributeColumn`
+    """
+    is_numeric = True
+    for pos, value in enumerate(values):
+        if value is None:
+            continue
+        if isinstance(value, list):
+            values[pos] = None
+            missing[pos] = True
+            continue
+        if is_numeric and (isinstance(value, bool) or
+                           not isinstance(value, numbers.Number)):
+            is_numeric = False
+
+    if is_numeric:
+        array = np.array([0.0 if v is None else v for v in values],
+                         dtype=np.float64)
+    else:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+    return AttributeColumn(name, array, missing)
+
+
+class _AttributeIndex(object):
+    """
+    Columnar index over attributes of elements such as edges, with
+    one :py:class:`AttributeColumn` per requested attribute lined up
+    with the ids of the elements
+    """
+    def __init__(self, ids, attributes):
+        """
+
+        :param ids: ids of elements, in order of values in columns
+        :type ids: :py:class:`numpy.ndarray`
+        :param attributes: attribute elements keyed by element id
+        :type attributes: dict
+        """
+        self._ids = ids
+        self._attributes = attributes
+        self._columns = {}
+
+    def get_column(self, name):
+        """
+        Gets column for attribute `name`, extracting it if needed
+
+        :param name: name of attribute
+        :return: column
+        :rtype: :py:class:`AttributeColumn`
+        """
+        return self.get_columns([name])[name]
+
+    def get_columns(self, names):
+        """
+        Gets columns for attributes in `names` extracting those
+        not already extracted in a single pass over the elements
+
+        :param names: names of attributes
+        :return: columns keyed by attribute name
+        :rtype: dict
+        """
+        to_extract = [n for n in names if n not in self._columns]
+        if to_extract:
+            self._extract_columns(to_extract)
+        return {n: self._columns[n] for n in names}
+
+    def _extract_columns(self, names):
+        """
+        Extracts values of attributes in `names` from attribute elements
+        """
+        num_elements = len(self._ids)
+        name_set = set(names)
+        values = {n: [None] * num_elements for n in names}
+        missing = {n: np.ones(num_elements, dtype=bool) for n in names}
+        for pos, element_id in enumerate(self._ids.tolist()):
+            attributes = self._attributes.get(element_id)
+            if not attributes:
+                continue
+            for attribute in attributes:
+                name = attribute['n']
+                if name not in name_set:
+                    continue
+                value = attribute['v']
+                if value is None:
+                    continue
+                values[name][pos] = value
+                missing[name][pos] = False
+
+        for name in names:
+            self._columns[name] = _get_column_from_values(name, values[name],
+                                                          missing[name])
+            logger.debug('Extracted column {} with {} missing values'
+                         .format(name, int(missing[name].sum())))
+
+
+class EdgeAttributeIndex(_AttributeIndex):
+    """
+    Columnar index over edgeAttributes of a
+    :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`. The edges are
+    scanned once per batch of requested attributes and the values
+    pulled into :py:class:`AttributeColumn` objects that line
+    up with :py:func:`get_edge_ids` so filters become vectorized
+    comparisons.
+    """
+    def __init__(self, network):
+        """
+
+        :param network: network to index
+        :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+        """
+        super(EdgeAttributeIndex, self).__init__(
+            np.fromiter(network.edges.keys(), dtype=np.int64,
+                        count=len(network.edges)),
+            network.edgeAttributes)
+
+    def get_edge_ids(self):
+        """
+        :return: ids of edges in the same order as values in columns
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._ids
+
+
+class NodeAttributeIndex(_AttributeIndex):
+    """
+    Columnar index over nodeAttributes of a
+    :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`, the node
+    counterpart of :py:class:`EdgeAttributeIndex`
+    """
+    def __init__(self, network):
+        """
+
+        :param network: network to index
+        :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+        """
+        super(NodeAttributeIndex, self).__init__(
+            np.fromiter(network.nodes.keys(), dtype=np.int64,
+                        count=len(network.nodes)),
+            network.nodeAttributes)
+
+    def get_node_ids(self):
+        """
+        :return: ids of nodes in the same order as values in columns
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._ids
+
+
+def select_top_k(column, edge_ids, k):
+    """
+    Selects the `k` edges with the highest values in `column` with a
+    partial selection in O(E) instead of sorting the column. Edges
+    tied at the cut-off are taken lowest edge id first so selection
+    does not depend on order of edges in network. Values that are
+    missing, not numbers or NaN are never selected
+
+    :param column: column to select edges by
+    :type column: :py:class:`AttributeColumn`
+    :param edge_ids: edge ids aligned with column
+    :type edge_ids: :py:class:`numpy.ndarray`
+    :param k: number of edges to select
+    :return: (boolean mask aligned with `edge_ids` that is True for
+             selected edges, lowest selected value or None if no
+             edge was selected)
+    :rtype: tuple
+    """
+    values, missing = column.get_numeric_values()
+    present = np.flatnonzero(~missing & ~np.isnan(values))
+    keep = np.zeros(len(edge_ids), dtype=bool)
+    if k <= 0 or len(present) == 0:
+        return keep, None
+
+    present_values = values[present]
+    if k >= len(present):
+        keep[present] = True
+        return keep, float(present_values.min())
+
+    # k-th largest value is the effective threshold
+    threshold = -np.partition(-present_values, k - 1)[k - 1]
+    above = present[present_values > threshold]
+    ties = present[present_values == threshold]
+    ties = ties[np.argsort(edge_ids[ties], kind='stable')]
+    keep[above] = True
+    keep[ties[:k - len(above)]] = True
+    return keep, float(threshold)
+
+
+class ThresholdSweep(object):
+    """
+    Sorts edges by value of an attribute column once so the edges
+    passing any number of cut-offs can be looked up without
+    rescanning the column.
+
+    For numeric cut-offs edges are sorted by descending value and
+    the edges with value >= cut-off are a prefix of that order. For
+    string values edges are sorted by value and the edges equal
+    to a value are a contiguous slice of that order.
+    """
+    def __init__(self, column, edge_ids, numeric=True):
+        """
+
+        :param column: column to sort edges by
+        :type column: :py:class:`AttributeColumn`
+        :param edge_ids: edge ids aligned with column
+        :type edge_ids: :py:class:`numpy.ndarray`
+        :param numeric: if True cut-offs are compared with >=
+                        otherwise with ==
+        """
+        self._numeric = numeric
+        if numeric:
+            values, missing = column.get_numeric_values()
+        else:
+            values = column.values
+            # only strings can equal a string cut-off
+            missing = column.missing.copy()
+            if column.is_numeric():
+                missing[:] = True
+            else:
+                for pos in np.flatnonzero(~missing).tolist():
+                    if not isinstance(values[pos], str):
+                        missing[pos] = True
+
+        present = np.flatnonzero(~missing)
+        if numeric:
+            # negate so ascending sort gives descending values, stable
+            # sort keeps ties in edge order
+            keys = -values[present]
+        else:
+            keys = values[present]
+        order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[order]
+        self._sorted_edge_ids = edge_ids[present][order]
+
+    def get_edge_ids(self, value):
+        """
+        Gets ids of edges that pass cut-off `value`
+
+        :param value: number for numeric sweep otherwise string
+        :return: ids of edges to keep
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        if self._numeric:
+            end = np.searchsorted(self._sorted_keys, -value, side='right')
+            return self._sorted_edge_ids[:end]
+
+        start = np.searchsorted(self._sorted_keys, value, side='left')
+        end = np.searchsorted(self._sorted_keys, value, side='right')
+        return self._sorted_edge_ids[start:end]
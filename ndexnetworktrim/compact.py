@@ -0,0 +1,903 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compact array-backed representation of a network for trimming.
+
+:py:class:`~ndex2.nice_cx_network.NiceCXNetwork` holds every edge and
+every attribute as its own dict, which costs hundreds of bytes per
+edge. :py:class:`CompactNetwork` holds edge ids, sources and targets
+as int64 arrays, interactions as codes into a list of distinct
+interactions and attributes as typed columns, and only turns them
+back into CX elements when the network is written.
+"""
+
+import copy
+import logging
+import numbers
+
+import numpy as np
+
+from ndexnetworktrim.columnar import AttributeColumn
+from ndexnetworktrim.columnar import _get_column_from_values
+from ndexnetworktrim.cxstream import EDGES
+from ndexnetworktrim.cxstream import EDGE_ATTRIBUTES
+from ndexnetworktrim.cxstream import META_DATA
+from ndexnetworktrim.cxstream import NETWORK_ATTRIBUTES
+from ndexnetworktrim.cxstream import NODES
+from ndexnetworktrim.cxstream import NODE_ATTRIBUTES
+from ndexnetworktrim.cxstream import get_element_ids
+from ndexnetworktrim.cxstream import iter_cx_elements
+from ndexnetworktrim.cxupload import NUMBER_VERIFICATION
+from ndexnetworktrim.graphindex import IdIndex
+from ndexnetworktrim.snapshot import SnapshotReader
+from ndexnetworktrim.snapshot import SnapshotWriter
+
+logger = logging.getLogger(__name__)
+
+# aspects regenerated on output
+SKIPPED_ASPECTS = ['numberVerification', 'status']
+
+EDGE_KEYS = frozenset(['@id', 's', 't', 'i'])
+
+NODE_KEYS = frozenset(['@id', 'n', 'r'])
+
+ATTRIBUTE_KEYS = frozenset(['po', 'n', 'v', 'd'])
+
+# elements read as dicts before they are converted to arrays
+BLOCK_SIZE = 65536
+
+
+def _get_extra_keys(element, keys):
+    """
+    :return: dict of items of `element` whose key is not in `keys`
+             or None if there are none
+    """
+    if element.keys() <= keys:
+        return None
+    return {k: v for k, v in element.items() if k not in keys}
+
+
+def _to_object_array(values):
+    """
+    :return: array of objects holding `values`, filled one by one so
+             values that are lists are not broadcast
+    """
+    array = np.empty(len(values), dtype=object)
+    for pos, value in enumerate(values):
+        array[pos] = value
+    return array
+
+
+def _to_array(values):
+    """
+    Stores values as int64 or float64 if they are all integers or all
+    floats, otherwise as an array of objects so values written back
+    to CX are the values that were read
+    """
+    kinds = set()
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, numbers.Number):
+            kinds = None
+            break
+        kinds.add(type(value) is float)
+        if len(kinds) > 1:
+            kinds = None
+            break
+    if kinds == {False}:
+        return np.array(values, dtype=np.int64)
+    if kinds == {True}:
+        return np.array(values, dtype=np.float64)
+    return _to_object_array(values)
+
+
+class _AttributeValues(object):
+    """
+    Values of one attribute: id of element each value is a property
+    of, the value and the CX data type of the value, which is one
+    string if all values have the same data type
+    """
+    def __init__(self, ids, values, types):
+        self.ids = ids
+        self.values = values
+        self.types = types
+
+    def select(self, mask):
+        types = self.types
+        if isinstance(types, np.ndarray):
+            types = types[mask]
+        return _AttributeValues(self.ids[mask], self.values[mask], types)
+
+    def _get_types(self):
+        if isinstance(self.types, np.ndarray):
+            return self.types
+        return _to_object_array([self.types] * len(self.ids))
+
+    def concatenate(self, other):
+        """
+        :return: values of this attribute followed by those of `other`,
+                 stored as objects if their dtypes differ
+        """
+        return _concatenate_values([self, other])
+
+    def iter_elements(self, name):
+        types = self.types
+        if not isinstance(types, np.ndarray):
+            types = [types] * len(self.ids)
+        else:
+            types = types.tolist()
+        for po, value, data_type in zip(self.ids.tolist(),
+                                        self.values.tolist(), types):
+            element = {'po': po, 'n': name, 'v': value}
+            if data_type is not None:
+                element['d'] = data_type
+            yield element
+
+
+def _get_attribute_values(ids, values, types):
+    """
+    :return: :py:class:`_AttributeValues` of lists read from elements
+    """
+    distinct_types = set(types)
+    if len(distinct_types) == 1:
+        types = distinct_types.pop()
+    else:
+        types = _to_object_array(types)
+    return _AttributeValues(np.array(ids, dtype=np.int64),
+                            _to_array(values), types)
+
+
+def _concatenate_values(blocks):
+    """
+    :param blocks: list of :py:class:`_AttributeValues` of one attribute
+    :return: values of `blocks` one after the other, stored as objects
+             if their dtypes differ
+    """
+    if len(blocks) == 1:
+        return blocks[0]
+    dtypes = set(b.values.dtype for b in blocks)
+    if len(dtypes) == 1 and np.dtype(object) not in dtypes:
+        values = np.concatenate([b.values for b in blocks])
+    else:
+        values = np.concatenate([_to_object_array(b.values.tolist())
+                                 for b in blocks])
+    types = blocks[0].types
+    if isinstance(types, np.ndarray) or\
+            any(isinstance(b.types, np.ndarray) or b.types != types
+                for b in blocks):
+        types = np.concatenate([b._get_types() for b in blocks])
+    return _AttributeValues(np.concatenate([b.ids for b in blocks]),
+                            values, types)
+
+
+class AttributeStore(object):
+    """
+    Attributes of nodes or edges held as one typed column per
+    attribute name. Elements with keys other than po, n, v and d
+    (such as subnetwork) are kept as they are
+    """
+    def __init__(self):
+        self._columns = {}
+        self._extras = []
+        self._extra_ids = np.zeros(0, dtype=np.int64)
+        self._pending = {}
+        self._pending_extras = []
+
+    def add(self, elements):
+        """
+        Adds attribute elements, :py:func:`finish` must be called
+        once all elements are added. Elements are converted to arrays
+        per call, so they can be added in blocks to bound memory
+        """
+        pending = {}
+        for element in elements:
+            if not element.keys() <= ATTRIBUTE_KEYS:
+                self._pending_extras.append(element)
+                continue
+            column = pending.get(element['n'])
+            if column is None:
+                column = pending.setdefault(element['n'], ([], [], []))
+            po = element.get('po')
+            if isinstance(po, list):
+                for element_id in po:
+                    column[0].append(element_id)
+                    column[1].append(element.get('v'))
+                    column[2].append(element.get('d'))
+            elif po is not None:
+                column[0].append(po)
+                column[1].append(element.get('v'))
+                column[2].append(element.get('d'))
+        for name, column in pending.items():
+            self._pending.setdefault(name, []).append(
+                _get_attribute_values(*column))
+
+    def finish(self):
+        """
+        Converts elements added via :py:func:`add` to columns
+        """
+        for name, blocks in self._pending.items():
+            self._columns[name] = _concatenate_values(blocks)
+        self._pending = {}
+        self._extras = self._pending_extras
+        self._extra_ids = np.array(
+            [(get_element_ids(e.get('po')) or [-1])[0]
+             for e in self._extras], dtype=np.int64)
+        self._pending_extras = []
+
+    def get_element_count(self):
+        """
+        :return: number of attribute elements
+        """
+        return sum(len(c.ids) for c in self._columns.values()) +\
+            len(self._extras)
+
+    def get_names(self):
+        """
+        :return: names of attributes held in columns
+        """
+        return list(self._columns.keys())
+
+    def get_column(self, name, index, count):
+        """
+        Gets values of attribute `name` aligned with ids of `index`
+
+        :param index: index of ids of elements attributes belong to
+        :type index: :py:class:`~ndexnetworktrim.graphindex.IdIndex`
+        :param count: number of ids in index
+        :rtype: :py:class:`~ndexnetworktrim.columnar.AttributeColumn`
+        """
+        missing = np.ones(count, dtype=bool)
+        attribute = self._columns.get(name)
+        if attribute is None:
+            return AttributeColumn(name, np.zeros(count, dtype=np.float64),
+                                   missing)
+        positions = index.get_positions(attribute.ids)
+        found = positions >= 0
+        positions = positions[found]
+        if attribute.values.dtype != object:
+            values = np.zeros(count, dtype=np.float64)
+            values[positions] = attribute.values[found]
+            missing[positions] = False
+            return AttributeColumn(name, values, missing)
+
+        values = [None] * count
+        for pos, value in zip(positions.tolist(),
+                              attribute.values[found].tolist()):
+            if value is None:
+                continue
+            values[pos] = value
+            missing[pos] = False
+        return _get_column_from_values(name, values, missing)
+
+    def select(self, ids):
+        """
+        :param ids: sorted ids of elements whose attributes are kept
+        :type ids: :py:class:`numpy.ndarray`
+        :return: store with attributes of those elements only
+        :rtype: :py:class:`AttributeStore`
+        """
+        store = AttributeStore()
+        for name, attribute in self._columns.items():
+            store._columns[name] = attribute.select(
+                np.isin(attribute.ids, ids))
+        keep = np.isin(self._extra_ids, ids).tolist()
+        store._extras = [e for e, k in zip(self._extras, keep) if k]
+        store._extra_ids = self._extra_ids[np.array(keep, dtype=bool)]
+        return store
+
+    def get_elements(self, ids):
+        """
+        :param ids: ids of elements
+        :type ids: :py:class:`numpy.ndarray`
+        :return: lists of attribute elements held in columns keyed by
+                 id of element they belong to
+        :rtype: dict
+        """
+        elements = {element_id: [] for element_id in ids.tolist()}
+        for name, attribute in self._columns.items():
+            attribute = attribute.select(np.isin(attribute.ids, ids))
+            for element in attribute.iter_elements(name):
+                elements[element['po']].append(element)
+        return elements
+
+    def replace(self, ids, elements):
+        """
+        :param ids: ids of elements whose attributes held in columns
+                    are replaced
+        :type ids: :py:class:`numpy.ndarray`
+        :param elements: new attribute elements of those elements
+        :return: store with replaced attributes, this store is
+                 not altered
+        :rtype: :py:class:`AttributeStore`
+        """
+        added = AttributeStore()
+        added.add(elements)
+        added.finish()
+        store = AttributeStore()
+        for name, attribute in self._columns.items():
+            store._columns[name] = attribute.select(
+                ~np.isin(attribute.ids, ids))
+        for name, attribute in added._columns.items():
+            if name in store._columns:
+                attribute = store._columns[name].concatenate(attribute)
+            store._columns[name] = attribute
+        store._extras = self._extras + added._extras
+        store._extra_ids = np.concatenate([self._extra_ids,
+                                           added._extra_ids])
+        return store
+
+    def get_snapshot_state(self, writer):
+        """
+        :param writer: writer of snapshot arrays
+        :type writer: :py:class:`~ndexnetworktrim.snapshot.SnapshotWriter`
+        :return: JSON serializable state of store
+        """
+        columns = []
+        for name, attribute in self._columns.items():
+            types = attribute.types
+            if isinstance(types, np.ndarray):
+                types = writer.add_array(types)
+            columns.append({'name': name,
+                            'ids': writer.add_array(attribute.ids),
+                            'values': writer.add_array(attribute.values),
+                            'types': types})
+        return {'columns': columns, 'extras': self._extras}
+
+    @classmethod
+    def from_snapshot_state(cls, state, reader):
+        """
+        :param state: state from :py:func:`get_snapshot_state`
+        :param reader: reader of snapshot arrays
+        :type reader: :py:class:`~ndexnetworktrim.snapshot.SnapshotReader`
+        :rtype: :py:class:`AttributeStore`
+        """
+        store = cls()
+        for column in state['columns']:
+            types = column['types']
+            if isinstance(types, dict):
+                types = reader.get_array(types)
+            store._columns[column['name']] = _AttributeValues(
+                reader.get_array(column['ids']),
+                reader.get_array(column['values']), types)
+        store._extras = state['extras']
+        store._extra_ids = np.array(
+            [(get_element_ids(e.get('po')) or [-1])[0]
+             for e in store._extras], dtype=np.int64)
+        return store
+
+    def iter_elements(self):
+        """
+        :return: attribute elements
+        """
+        for name, attribute in self._columns.items():
+            for element in attribute.iter_elements(name):
+                yield element
+        for element in self._extras:
+            yield element
+
+
+class CompactNetwork(object):
+    """
+    Network with nodes, edges and their attributes held in NumPy
+    arrays. Also acts as an edge index with the same interface as
+    :py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex` so
+    filters are evaluated over it directly.
+
+    Other aspects are kept as lists of elements and written back
+    unchanged.
+
+    Example usage:
+
+    .. code-block:: python
+
+        with open('network.cx', 'rb') as f:
+            network = CompactNetwork.from_cx_stream(f)
+        network.keep_edges(network.get_column('score').greater_equal(0.5))
+
+    """
+    def __init__(self):
+        self._metadata = []
+        self._network_attributes = []
+        self._aspects = {}
+
+        self._edge_ids = np.zeros(0, dtype=np.int64)
+        self._sources = np.zeros(0, dtype=np.int64)
+        self._targets = np.zeros(0, dtype=np.int64)
+        self._interactions = np.zeros(0, dtype=np.int32)
+        self._interaction_names = []
+        self._edge_extras = {}
+        self._edge_attributes = AttributeStore()
+
+        self._node_ids = np.zeros(0, dtype=np.int64)
+        self._node_names = np.zeros(0, dtype=object)
+        self._node_represents = np.zeros(0, dtype=object)
+        self._node_extras = {}
+        self._node_attributes = AttributeStore()
+
+        self._edge_index = None
+        self._columns = {}
+
+    @classmethod
+    def from_cx_stream(cls, stream):
+        """
+        Reads network from CX in blocks of at most
+        :py:const:`BLOCK_SIZE` elements, so no more than one block is
+        ever held as dicts however large an aspect fragment is
+
+        :param stream: binary file like object containing CX JSON
+        :rtype: :py:class:`CompactNetwork`
+        """
+        network = cls()
+        builder = _Builder(network)
+        block_aspect = None
+        block = []
+        for _, aspect, element in iter_cx_elements(stream):
+            if aspect != block_aspect or len(block) >= BLOCK_SIZE:
+                if block:
+                    builder.add(block_aspect, block)
+                block_aspect = aspect
+                block = []
+            block.append(element)
+        if block:
+            builder.add(block_aspect, block)
+        builder.finish()
+        logger.debug('Read network with {} nodes and {} edges'.format(
+            network.get_node_count(), network.get_edge_count()))
+        return network
+
+    @classmethod
+    def from_snapshot(cls, path, mmap=True):
+        """
+        Loads network from snapshot written by :py:func:`write_snapshot`.
+        Numeric arrays are memory mapped and never altered in place,
+        strings are looked up in their dictionaries
+
+        :param path: directory of snapshot
+        :param mmap: if False, arrays are read instead of mapped
+        :return: (network, properties passed to :py:func:`write_snapshot`)
+        :rtype: tuple
+        :raises SnapshotError: if there is no readable snapshot
+        """
+        reader = SnapshotReader(path, mmap=mmap)
+        state = reader.get_state()
+        network = cls()
+        network._metadata = state['metaData']
+        network._network_attributes = state['networkAttributes']
+        network._aspects = state['aspects']
+
+        edges = state['edges']
+        network._edge_ids = reader.get_array(edges['ids'])
+        network._sources = reader.get_array(edges['sources'])
+        network._targets = reader.get_array(edges['targets'])
+        network._interactions = reader.get_array(edges['interactions'])
+        network._interaction_names = edges['interactionNames']
+        network._edge_extras = {e[0]: e[1] for e in edges['extras']}
+        network._edge_attributes = AttributeStore.from_snapshot_state(
+            state['edgeAttributes'], reader)
+
+        nodes = state['nodes']
+        network._node_ids = reader.get_array(nodes['ids'])
+        network._node_names = reader.get_array(nodes['names'])
+        network._node_represents = reader.get_array(nodes['represents'])
+        network._node_extras = {e[0]: e[1] for e in nodes['extras']}
+        network._node_attributes = AttributeStore.from_snapshot_state(
+            state['nodeAttributes'], reader)
+
+        logger.debug('Loaded snapshot with {} nodes and {} edges'.format(
+            network.get_node_count(), network.get_edge_count()))
+        return network, state['properties']
+
+    def write_snapshot(self, path, properties=None):
+        """
+        Writes network as a snapshot of array files that
+        :py:func:`from_snapshot` maps back into memory
+
+        :param path: directory to write snapshot to, replaced if it
+                     holds a snapshot
+        :param properties: JSON serializable dict stored with snapshot
+        :raises SnapshotError: if `path` holds something else
+        """
+        writer = SnapshotWriter(path)
+        try:
+            self._write_snapshot_state(writer, properties)
+        except BaseException:
+            writer.abort()
+            raise
+
+    def _write_snapshot_state(self, writer, properties):
+        edges = {'ids': writer.add_array(self._edge_ids),
+                 'sources': writer.add_array(self._sources),
+                 'targets': writer.add_array(self._targets),
+                 'interactions': writer.add_array(self._interactions),
+                 'interactionNames': self._interaction_names,
+                 'extras': list(self._edge_extras.items())}
+        nodes = {'ids': writer.add_array(self._node_ids),
+                 'names': writer.add_array(self._node_names),
+                 'represents': writer.add_array(self._node_represents),
+                 'extras': list(self._node_extras.items())}
+        state = {'properties': properties or {},
+                 'metaData': self._metadata,
+                 'networkAttributes': self._network_attributes,
+                 'aspects': self._aspects,
+                 'edges': edges,
+                 'edgeAttributes':
+                     self._edge_attributes.get_snapshot_state(writer),
+                 'nodes': nodes,
+                 'nodeAttributes':
+                     self._node_attributes.get_snapshot_state(writer)}
+        writer.write(state)
+
+    def get_edge_count(self):
+        """
+        :return: number of edges
+        """
+        return len(self._edge_ids)
+
+    def get_node_count(self):
+        """
+        :return: number of nodes
+        """
+        return len(self._node_ids)
+
+    def get_name(self):
+        """
+        :return: value of name network attribute or None
+        """
+        for attribute in self._network_attributes:
+            if attribute.get('n') == 'name':
+                return attribute.get('v')
+        return None
+
+    def get_network_attributes(self):
+        """
+        :return: networkAttributes elements, changes to the list
+                 are written out
+        :rtype: list
+        """
+        return self._network_attributes
+
+    def get_aspects(self):
+        """
+        :return: elements of aspects other than nodes, edges, their
+                 attributes and networkAttributes keyed by aspect name
+        :rtype: dict
+        """
+        return self._aspects
+
+    def set_aspect(self, name, elements):
+        """
+        Replaces elements of an aspect returned by :py:func:`get_aspects`
+        without altering networks sharing them
+        """
+        self._aspects = dict(self._aspects)
+        self._aspects[name] = elements
+
+    def get_edge_ids(self):
+        """
+        :return: ids of edges in the same order as values in columns
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._edge_ids
+
+    def get_endpoint_arrays(self):
+        """
+        :return: (edge ids, source node ids, target node ids) arrays
+        """
+        return self._edge_ids, self._sources, self._targets
+
+    def get_interaction_codes(self):
+        """
+        :return: codes of interactions of edges aligned with
+                 :py:func:`get_edge_ids`, equal for equal interactions
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._interactions
+
+    def get_edge_attribute_elements(self, edge_ids):
+        """
+        :param edge_ids: ids of edges
+        :type edge_ids: :py:class:`numpy.ndarray`
+        :return: lists of edgeAttributes elements keyed by edge id
+        :rtype: dict
+        """
+        return self._edge_attributes.get_elements(edge_ids)
+
+    def replace_edge_attributes(self, attributes):
+        """
+        Replaces attributes of edges without altering networks
+        sharing them
+
+        :param attributes: lists of new edgeAttributes elements keyed
+                           by edge id
+        :type attributes: dict
+        """
+        edge_ids = np.fromiter(attributes.keys(), dtype=np.int64,
+                               count=len(attributes))
+        self._edge_attributes = self._edge_attributes.replace(
+            edge_ids, [e for elements in attributes.values()
+                       for e in elements])
+        self._columns = {}
+
+    def get_node_ids(self):
+        """
+        :return: ids of nodes
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._node_ids
+
+    def get_node_names(self):
+        """
+        :return: names of nodes aligned with :py:func:`get_node_ids`,
+                 None where not set
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._node_names
+
+    def get_node_represents(self):
+        """
+        :return: represents of nodes aligned with :py:func:`get_node_ids`,
+                 None where not set
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._node_represents
+
+    def _get_edge_index(self):
+        if self._edge_index is None:
+            self._edge_index = IdIndex(self._edge_ids)
+        return self._edge_index
+
+    def get_column(self, name):
+        """
+        :param name: name of edge attribute
+        :return: values of attribute aligned with :py:func:`get_edge_ids`
+        :rtype: :py:class:`~ndexnetworktrim.columnar.AttributeColumn`
+        """
+        if name not in self._columns:
+            self._columns[name] = self._edge_attributes.get_column(
+                name, self._get_edge_index(), self.get_edge_count())
+        return self._columns[name]
+
+    def get_node_column(self, name):
+        """
+        :param name: name of node attribute
+        :return: values of attribute aligned with :py:func:`get_node_ids`
+        :rtype: :py:class:`~ndexnetworktrim.columnar.AttributeColumn`
+        """
+        return self._node_attributes.get_column(name, IdIndex(self._node_ids),
+                                                self.get_node_count())
+
+    def get_columns(self, names):
+        """
+        :param names: names of edge attributes
+        :return: columns keyed by attribute name
+        :rtype: dict
+        """
+        return {n: self.get_column(n) for n in names}
+
+    def _set_edges(self, mask):
+        self._edge_ids = self._edge_ids[mask]
+        self._sources = self._sources[mask]
+        self._targets = self._targets[mask]
+        self._interactions = self._interactions[mask]
+        kept_ids = np.sort(self._edge_ids)
+        self._edge_attributes = self._edge_attributes.select(kept_ids)
+        if self._edge_extras:
+            kept = set(self._edge_ids.tolist())
+            self._edge_extras = {k: v for k, v in self._edge_extras.items()
+                                 if k in kept}
+        self._edge_index = None
+        self._columns = {}
+
+    def keep_edges(self, mask):
+        """
+        Removes edges, and their attributes, where `mask` is False
+
+        :param mask: boolean mask aligned with :py:func:`get_edge_ids`
+        :return: number of edges removed
+        """
+        count = self.get_edge_count()
+        self._set_edges(mask)
+        return count - self.get_edge_count()
+
+    def select_edges(self, edge_ids):
+        """
+        Creates a copy of network with only edges in `edge_ids`.
+        Arrays are never changed in place so unchanged arrays are
+        shared with this network
+
+        :param edge_ids: ids of edges to keep
+        :return: derived network
+        :rtype: :py:class:`CompactNetwork`
+        """
+        network = copy.copy(self)
+        network._network_attributes = copy.deepcopy(self._network_attributes)
+        mask = np.zeros(self.get_edge_count(), dtype=bool)
+        positions = self._get_edge_index().get_positions(edge_ids)
+        mask[positions[positions >= 0]] = True
+        network._set_edges(mask)
+        return network
+
+    def remove_nodes(self, node_ids):
+        """
+        Removes nodes in `node_ids` and their attributes
+
+        :param node_ids: ids of nodes to remove
+        :return: number of nodes removed
+        """
+        mask = ~np.isin(self._node_ids, node_ids)
+        count = self.get_node_count()
+        self._node_ids = self._node_ids[mask]
+        self._node_names = self._node_names[mask]
+        self._node_represents = self._node_represents[mask]
+        self._node_attributes = self._node_attributes.select(
+            np.sort(self._node_ids))
+        if self._node_extras:
+            kept = set(self._node_ids.tolist())
+            self._node_extras = {k: v for k, v in self._node_extras.items()
+                                 if k in kept}
+        return count - self.get_node_count()
+
+    def _iter_nodes(self):
+        for node_id, name, represents in zip(self._node_ids.tolist(),
+                                             self._node_names.tolist(),
+                                             self._node_represents.tolist()):
+            element = {'@id': node_id}
+            if name is not None:
+                element['n'] = name
+            if represents is not None:
+                element['r'] = represents
+            if node_id in self._node_extras:
+                element.update(self._node_extras[node_id])
+            yield element
+
+    def _iter_edges(self):
+        names = self._interaction_names
+        for edge_id, source, target, code in zip(self._edge_ids.tolist(),
+                                                 self._sources.tolist(),
+                                                 self._targets.tolist(),
+                                                 self._interactions.tolist()):
+            element = {'@id': edge_id, 's': source, 't': target}
+            if names[code] is not None:
+                element['i'] = names[code]
+            if edge_id in self._edge_extras:
+                element.update(self._edge_extras[edge_id])
+            yield element
+
+    def _get_element_counts(self):
+        counts = {NODES: self.get_node_count(),
+                  EDGES: self.get_edge_count(),
+                  NETWORK_ATTRIBUTES: len(self._network_attributes),
+                  NODE_ATTRIBUTES: self._node_attributes.get_element_count(),
+                  EDGE_ATTRIBUTES: self._edge_attributes.get_element_count()}
+        for name, elements in self._aspects.items():
+            counts[name] = len(elements)
+        return counts
+
+    def get_metadata(self):
+        """
+        Gets metaData elements of network, those read from input with
+        element counts updated and ones added for aspects that were
+        not described
+
+        :rtype: list
+        """
+        counts = self._get_element_counts()
+        metadata = []
+        described = set()
+        for element in self._metadata:
+            element = dict(element)
+            name = element.get('name')
+            described.add(name)
+            if name in counts:
+                element['elementCount'] = counts[name]
+            metadata.append(element)
+        for name, count in counts.items():
+            if name in described or count == 0:
+                continue
+            metadata.append({'name': name, 'elementCount': count,
+                             'version': '1.0', 'consistencyGroup': 1,
+                             'properties': []})
+        return metadata
+
+    def get_fragments(self):
+        """
+        Generates aspect fragments of network, elements of nodes,
+        edges and attributes are built as they are written
+
+        :return: (aspect name, iterable of elements) tuples
+        """
+        counts = self._get_element_counts()
+        yield 'numberVerification', NUMBER_VERIFICATION
+        yield META_DATA, self.get_metadata()
+        if self._network_attributes:
+            yield NETWORK_ATTRIBUTES, self._network_attributes
+        if counts[NODES]:
+            yield NODES, self._iter_nodes()
+        if counts[EDGES]:
+            yield EDGES, self._iter_edges()
+        if counts[NODE_ATTRIBUTES]:
+            yield NODE_ATTRIBUTES, self._node_attributes.iter_elements()
+        if counts[EDGE_ATTRIBUTES]:
+            yield EDGE_ATTRIBUTES, self._edge_attributes.iter_elements()
+        for name, elements in self._aspects.items():
+            yield name, elements
+        yield 'status', [{'error': '', 'success': True}]
+
+
+class _Builder(object):
+    """
+    Fills a :py:class:`CompactNetwork` from aspect fragments, the
+    elements of each fragment of nodes and edges are converted to
+    arrays as soon as the fragment is read
+    """
+    def __init__(self, network):
+        self._network = network
+        self._interaction_codes = {}
+        self._edge_blocks = []
+        self._node_blocks = []
+
+    def add(self, aspect, elements):
+        network = self._network
+        if aspect in SKIPPED_ASPECTS:
+            return
+        if aspect == META_DATA:
+            network._metadata.extend(elements)
+        elif aspect == NETWORK_ATTRIBUTES:
+            network._network_attributes.extend(elements)
+        elif aspect == EDGES:
+            self._add_edges(elements)
+        elif aspect == NODES:
+            self._add_nodes(elements)
+        elif aspect == EDGE_ATTRIBUTES:
+            network._edge_attributes.add(elements)
+        elif aspect == NODE_ATTRIBUTES:
+            network._node_attributes.add(elements)
+        else:
+            network._aspects.setdefault(aspect, []).extend(elements)
+
+    def _add_edges(self, elements):
+        codes = self._interaction_codes
+        extras = self._network._edge_extras
+        count = len(elements)
+        interactions = np.empty(count, dtype=np.int32)
+        for pos, element in enumerate(elements):
+            interactions[pos] = codes.setdefault(element.get('i'), len(codes))
+            extra = _get_extra_keys(element, EDGE_KEYS)
+            if extra:
+                extras[element['@id']] = extra
+        self._edge_blocks.append((
+            np.fromiter((e['@id'] for e in elements), dtype=np.int64,
+                        count=count),
+            np.fromiter((e['s'] for e in elements), dtype=np.int64,
+                        count=count),
+            np.fromiter((e['t'] for e in elements), dtype=np.int64,
+                        count=count),
+            interactions))
+
+    def _add_nodes(self, elements):
+        extras = self._network._node_extras
+        names = _to_object_array([e.get('n') for e in elements])
+        represents = _to_object_array([e.get('r') for e in elements])
+        for element in elements:
+            extra = _get_extra_keys(element, NODE_KEYS)
+            if extra:
+                extras[element['@id']] = extra
+        self._node_blocks.append((
+            np.fromiter((e['@id'] for e in elements), dtype=np.int64,
+                        count=len(elements)), names, represents))
+
+    def finish(self):
+        network = self._network
+        if self._edge_blocks:
+            (network._edge_ids, network._sources, network._targets,
+             network._interactions) = [np.concatenate(a) for a in
+                                       zip(*self._edge_blocks)]
+        if self._node_blocks:
+            (network._node_ids, network._node_names,
+             network._node_represents) = [np.concatenate(a) for a in
+                                          zip(*self._node_blocks)]
+        codes = self._interaction_codes
+        network._interaction_names = sorted(codes, key=codes.get)
+        network._edge_attributes.finish()
+        network._node_attributes.finish()
+        self._edge_blocks = []
+        self._node_blocks = []
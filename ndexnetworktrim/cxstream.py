@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming reader, writer and trimmer for CX documents."""
+
+import heapq
+import json
+import logging
+
+import ijson
+
+logger = logging.getLogger(__name__)
+
+NODES = 'nodes'
+EDGES = 'edges'
+NODE_ATTRIBUTES = 'nodeAttributes'
+EDGE_ATTRIBUTES = 'edgeAttributes'
+NETWORK_ATTRIBUTES = 'networkAttributes'
+META_DATA = 'metaData'
+
+CORE_ASPECTS = [NODES, EDGES, NODE_ATTRIBUTES, EDGE_ATTRIBUTES,
+                NETWORK_ATTRIBUTES, META_DATA]
+
+
+def _read_value(events, event, value):
+    """
+    :return: value that starts with `event`, reading the rest of a
+             map or array from `events`
+    """
+    if event == 'start_map':
+        return _read_map(events)
+    if event == 'start_array':
+        return _read_array(events)
+    return value
+
+
+def _read_map(events):
+    result = {}
+    for event, value in events:
+        if event == 'end_map':
+            break
+        # event is map_key, next one starts its value
+        event, item = next(events)
+        if event == 'start_map' or event == 'start_array':
+            item = _read_value(events, event, item)
+        result[value] = item
+    return result
+
+
+def _read_array(events):
+    result = []
+    for event, value in events:
+        if event == 'end_array':
+            break
+        result.append(_read_value(events, event, value))
+    return result
+
+
+def iter_cx_elements(stream):
+    """
+    Iterates over a CX document one aspect element at a time without
+    ever loading the whole document into memory
+
+    :param stream: binary file like object containing CX JSON
+    :return: generator of (fragment index, aspect name, element) tuples
+    """
+    depth = 0
+    fragment = -1
+    aspect = None
+    events = ijson.basic_parse(stream, use_float=True)
+    for event, value in events:
+        if depth == 3 and event != 'end_array' and event != 'end_map':
+            # element in aspect array, read whole
+            yield fragment, aspect, _read_value(events, event, value)
+            continue
+
+        if event == 'start_map' or event == 'start_array':
+            depth += 1
+            if depth == 2:
+                fragment += 1
+        elif event == 'end_map' or event == 'end_array':
+            depth -= 1
+        elif event == 'map_key' and depth == 2:
+            aspect = value
+
+
+def get_element_ids(value):
+    """
+    Gets ids from a 'po' style value which can be a single id or a list
+
+    :param value: id or list of ids
+    :return: list of ids
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def count_aspect_elements(stream, aspect_name):
+    """
+    Counts elements of an aspect in CX document
+
+    :param stream: binary stream to read CX from
+    :param aspect_name: name of aspect such as edges
+    :return: number of elements
+    :rtype: int
+    """
+    count = 0
+    for _, aspect, _ in iter_cx_elements(stream):
+        if aspect == aspect_name:
+            count += 1
+    return count
+
+
+def select_top_edges(edge_attributes, attribute_name, k):
+    """
+    Selects the `k` edges with the highest values of an edge
+    attribute keeping a bounded heap of `k` entries, so memory does
+    not depend on the number of edges. Edges tied at the cut-off are
+    taken lowest edge id first. Values that are not numbers or NaN
+    are never selected
+
+    :param edge_attributes: iterable of edgeAttributes elements
+    :param attribute_name: name of edge attribute to select by
+    :param k: number of edges to select
+    :return: (set of selected edge ids, lowest selected value or None
+             if no edge was selected)
+    :rtype: tuple
+    """
+    if k <= 0:
+        return set(), None
+    # min heap of (value, -edge id) so the root is the worst kept edge
+    heap = []
+    for element in edge_attributes:
+        if element.get('n') != attribute_name:
+            continue
+        try:
+            value = float(element.get('v'))
+        except (TypeError, ValueError):
+            continue
+        if value != value:
+            continue
+        for edge_id in get_element_ids(element.get('po')):
+            entry = (value, -edge_id)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    if not heap:
+        return set(), None
+    return set(-entry[1] for entry in heap), heap[0][0]
+
+
+class ChunkReader(object):
+    """
+    Binary file like object reading from an iterable of bytes chunks,
+    such as :py:meth:`requests.Response.iter_content`, so a download
+    can be parsed as it arrives instead of being held whole
+    """
+    def __init__(self, chunks):
+        """
+
+        :param chunks: iterable of bytes
+        """
+        self._chunks = iter(chunks)
+        self._chunk = b''
+        self._pos = 0
+        self._bytes_read = 0
+
+    def get_bytes_read(self):
+        """
+        :return: number of bytes read so far
+        :rtype: int
+        """
+        return self._bytes_read
+
+    def read(self, size=-1):
+        """
+        :param size: maximum number of bytes to read, all if negative
+        :return: bytes, empty once chunks are exhausted
+        """
+        parts = []
+        while size != 0:
+            if self._pos >= len(self._chunk):
+                self._chunk = next(self._chunks, None)
+                self._pos = 0
+                if self._chunk is None:
+                    self._chunk = b''
+                    break
+                continue
+            end = len(self._chunk)
+            if size > 0:
+                end = min(end, self._pos + size)
+                size -= end - self._pos
+            parts.append(self._chunk[self._pos:end])
+            self._pos = end
+        data = b''.join(parts)
+        self._bytes_read += len(data)
+        return data
+
+
+class CXStreamWriter(object):
+    """
+    Writes CX JSON to a binary stream one element at a time
+    """
+    def __init__(self, output):
+        """
+
+        :param output: binary file like object to write CX to
+        """
+        self._output = output
+        self._aspect = None
+        self._first_fragment = True
+        self._first_element = True
+
+    def _write(self, text):
+        self._output.write(text.encode('utf-8'))
+
+    def start(self):
+        """
+        Writes opening of CX document
+        """
+        self._write('[')
+
+    def start_fragment(self, aspect):
+        """
+        Writes opening of aspect fragment named `aspect`
+        """
+        self.end_fragment()
+        if not self._first_fragment:
+            self._write(',')
+        self._first_fragment = False
+        self._first_element = True
+        self._aspect = aspect
+        self._write('{' + json.dumps(aspect) + ':[')
+
+    def write_element(self, element):
+        """
+        Writes `element` to currently open aspect fragment
+        """
+        if not self._first_element:
+            self._write(',')
+        self._first_element = False
+        self._write(json.dumps(element))
+
+    def write_fragment(self, aspect, elements):
+        """
+        Writes a whole aspect fragment
+        """
+        self.start_fragment(aspect)
+        for element in elements:
+            self.write_element(element)
+        self.end_fragment()
+
+    def end_fragment(self):
+        """
+        Closes currently open aspect fragment if any
+        """
+        if self._aspect is None:
+            return
+        self._write(']}')
+        self._aspect = None
+
+    def end(self):
+        """
+        Writes closing of CX document
+        """
+        self.end_fragment()
+        self._write(']')
+
+
+class StreamingCXTrimmer(object):
+    """
+    Trims a CX document by streaming it from input to output.
+    Only ids of kept edges and of nodes connected to them are held
+    in memory so peak memory depends on the size of the trimmed network
+    rather than on the size of the parent network.
+
+    Since aspects can appear in any order in CX, the input is read
+    up to three times: once to find edges to keep, once to find nodes
+    they connect (skipped if orphan nodes are kept) and once to write
+    the output.
+
+    If the filter needs several attributes of an edge at once
+    (`edge_filter_attributes` is set) the values of those attributes
+    are collected for every edge that has them before the filter is
+    applied, so memory then also depends on the number of such edges.
+
+    Edges can instead be picked by an `edge_selector` that sees all
+    edgeAttributes elements at once, for selections such as the top K
+    edges that do not depend on each edge alone.
+    """
+    def __init__(self, edge_attribute_filter,
+                 network_attributes_updater=None,
+                 remove_orphan_nodes=True,
+                 edge_filter_attributes=None,
+                 edge_selector=None,
+                 keep_parent_orphans=False,
+                 element_pruner=None,
+                 component_selector=None,
+                 node_attribute_filter=None):
+        """
+
+        :param edge_attribute_filter: function that is passed an
+                                      edgeAttributes element and returns
+                                      True if edge it belongs to is kept.
+                                      If `edge_filter_attributes` is set,
+                                      it is instead passed a dict of
+                                      values of those attributes for one
+                                      edge. If None (and `edge_selector`
+                                      is not set) all edges are kept
+        :param network_attributes_updater: function that is passed list of
+                                           networkAttributes elements and
+                                           returns updated list
+        :param remove_orphan_nodes: if True nodes without edges are removed
+        :param edge_filter_attributes: names of edge attributes passed
+                                       to `edge_attribute_filter`
+        :param edge_selector: function that is passed an iterator over
+                              edgeAttributes elements and returns ids of
+                              edges to keep. If set, `edge_attribute_filter`
+                              is not used
+        :param keep_parent_orphans: if True nodes that have no edges in
+                                    input are kept when orphan nodes
+                                    are removed. Ids of all nodes are
+                                    then held in memory
+        :param element_pruner: function that is passed aspect name, an
+                               element of an aspect other than nodes,
+                               edges and attributes, ids of kept nodes
+                               (None if all are kept) and ids of kept
+                               edges and returns element to write or
+                               None to drop it
+        :param component_selector: function that is passed ids of kept
+                                   nodes and lists of ids, source and
+                                   target node ids of kept edges and
+                                   returns sets of ids of nodes and of
+                                   edges to keep, for example those in
+                                   large enough connected components.
+                                   Only used if orphan nodes are removed
+        :param node_attribute_filter: function that is passed a
+                                      nodeAttributes element and returns
+                                      True if node it belongs to is kept.
+                                      Other nodes and their edges are
+                                      removed. Only used if orphan nodes
+                                      are removed
+        """
+        self._edge_attribute_filter = edge_attribute_filter
+        self._edge_filter_attributes = edge_filter_attributes
+        self._edge_selector = edge_selector
+        self._keep_parent_orphans = keep_parent_orphans
+        self._element_pruner = element_pruner
+        self._component_selector = component_selector
+        self._node_attribute_filter = node_attribute_filter
+        self._network_attributes_updater = network_attributes_updater
+        self._remove_orphan_nodes = remove_orphan_nodes
+        self._kept_edges = None
+        self._kept_nodes = None
+        self._input_counts = {}
+
+    def get_kept_edge_count(self):
+        """
+        :return: number of edges kept by last call to :py:func:`trim`
+        """
+        return len(self._kept_edges)
+
+    def get_kept_node_count(self):
+        """
+        :return: number of nodes kept by last call to :py:func:`trim`
+                 or None if orphan nodes were not removed
+        """
+        if self._kept_nodes is None:
+            return None
+        return len(self._kept_nodes)
+
+    def get_input_element_count(self, aspect):
+        """
+        :param aspect: name of aspect such as edges
+        :return: number of elements of aspect in input of last call
+                 to :py:func:`trim`
+        """
+        return self._input_counts.get(aspect, 0)
+
+    def _find_kept_edges(self, stream):
+        if self._edge_selector is not None:
+            return set(self._edge_selector(
+                element for _, aspect, element in iter_cx_elements(stream)
+                if aspect == EDGE_ATTRIBUTES))
+        if self._edge_filter_attributes is not None:
+            return self._find_kept_edges_by_attributes(stream)
+        if self._edge_attribute_filter is None:
+            return set(element['@id'] for _, aspect, element in
+                       iter_cx_elements(stream) if aspect == EDGES)
+        kept_edges = set()
+        for _, aspect, element in iter_cx_elements(stream):
+            if aspect != EDGE_ATTRIBUTES:
+                continue
+            if self._edge_attribute_filter(element):
+                kept_edges.update(get_element_ids(element.get('po')))
+        return kept_edges
+
+    def _find_kept_edges_by_attributes(self, stream):
+        names = set(self._edge_filter_attributes)
+        edge_values = {}
+        for _, aspect, element in iter_cx_elements(stream):
+            if aspect != EDGE_ATTRIBUTES or element.get('n') not in names:
+                continue
+            for edge_id in get_element_ids(element.get('po')):
+                edge_values.setdefault(edge_id, {})[element['n']] =\
+                    element.get('v')
+        return set(edge_id for edge_id, values in edge_values.items()
+                   if self._edge_attribute_filter(values))
+
+    def _find_kept_nodes(self, stream):
+        kept_nodes = set()
+        connected_nodes = set()
+        node_ids = set()
+        accepted_nodes = set()
+        collect_edges = self._component_selector is not None or\
+            self._node_attribute_filter is not None
+        edges = ([], [], [])
+        for _, aspect, element in iter_cx_elements(stream):
+            if aspect == NODES and self._keep_parent_orphans:
+                node_ids.add(element['@id'])
+            if aspect == NODE_ATTRIBUTES and\
+                    self._node_attribute_filter is not None:
+                if self._node_attribute_filter(element):
+                    accepted_nodes.update(get_element_ids(element.get('po')))
+                continue
+            if aspect != EDGES:
+                continue
+            if element['@id'] in self._kept_edges:
+                kept_nodes.add(element['s'])
+                kept_nodes.add(element['t'])
+                if collect_edges:
+                    edges[0].append(element['@id'])
+                    edges[1].append(element['s'])
+                    edges[2].append(element['t'])
+            elif self._keep_parent_orphans:
+                connected_nodes.add(element['s'])
+                connected_nodes.add(element['t'])
+        parent_orphans = set()
+        if self._keep_parent_orphans:
+            # nodes without any edge in input
+            parent_orphans = node_ids - connected_nodes - kept_nodes
+        if self._node_attribute_filter is not None:
+            # nodes may be listed after edges, so edges of rejected
+            # nodes are only dropped once all nodes are known
+            kept = [i for i, (s, t) in enumerate(zip(edges[1], edges[2]))
+                    if s in accepted_nodes and t in accepted_nodes]
+            edges = tuple([e[i] for i in kept] for e in edges)
+            self._kept_edges = set(edges[0])
+            kept_nodes = set(edges[1]) | set(edges[2])
+            parent_orphans &= accepted_nodes
+        kept_nodes.update(parent_orphans)
+        if self._component_selector is not None:
+            kept_nodes, self._kept_edges = self._component_selector(
+                kept_nodes, *edges)
+        return kept_nodes
+
+    @staticmethod
+    def _prune_attribute(element, kept_ids):
+        """
+        :return: attribute element, a copy of it with 'po' reduced to
+                 ids in `kept_ids` or None if it refers to none of them
+        """
+        ids = get_element_ids(element.get('po'))
+        kept = [i for i in ids if i in kept_ids]
+        if not kept:
+            return None
+        if len(kept) == len(ids):
+            return element
+        element = dict(element)
+        element['po'] = kept
+        return element
+
+    def _get_kept_element(self, aspect, element):
+        """
+        :return: element, a pruned copy of an attribute element or
+                 None if element is removed
+        """
+        if aspect == EDGES:
+            return element if element['@id'] in self._kept_edges else None
+        if aspect == EDGE_ATTRIBUTES:
+            return self._prune_attribute(element, self._kept_edges)
+        if self._kept_nodes is None:
+            return element
+        if aspect == NODES:
+            return element if element['@id'] in self._kept_nodes else None
+        if aspect == NODE_ATTRIBUTES:
+            return self._prune_attribute(element, self._kept_nodes)
+        return element
+
+    def _update_metadata(self, element):
+        name = element.get('name')
+        if name == EDGES:
+            element['elementCount'] = len(self._kept_edges)
+        elif name == NODES and self._kept_nodes is not None:
+            element['elementCount'] = len(self._kept_nodes)
+        elif name in (EDGE_ATTRIBUTES, NODE_ATTRIBUTES) or\
+                (self._element_pruner is not None and
+                 name not in CORE_ASPECTS):
+            element.pop('elementCount', None)
+        return element
+
+    def _write_trimmed(self, stream, output):
+        writer = CXStreamWriter(output)
+        writer.start()
+        cur_fragment = None
+        net_attribs = None
+        updater = self._network_attributes_updater
+        self._input_counts = {}
+        for fragment, aspect, element in iter_cx_elements(stream):
+            self._input_counts[aspect] = self._input_counts.get(aspect, 0) + 1
+            if fragment != cur_fragment:
+                if net_attribs is not None:
+                    writer.write_fragment(NETWORK_ATTRIBUTES,
+                                          updater(net_attribs))
+                    # updater is applied to first fragment only
+                    net_attribs = None
+                    updater = None
+                cur_fragment = fragment
+                if aspect == NETWORK_ATTRIBUTES and updater is not None:
+                    net_attribs = []
+                else:
+                    writer.start_fragment(aspect)
+
+            if net_attribs is not None:
+                net_attribs.append(element)
+                continue
+
+            if aspect == META_DATA:
+                element = self._update_metadata(element)
+            else:
+                element = self._get_kept_element(aspect, element)
+                if element is not None and\
+                        self._element_pruner is not None and\
+                        aspect not in CORE_ASPECTS:
+                    element = self._element_pruner(aspect, element,
+                                                   self._kept_nodes,
+                                                   self._kept_edges)
+                if element is None:
+                    continue
+            writer.write_element(element)
+
+        if net_attribs is None and updater is not None:
+            # parent had no networkAttributes, provenance is still added
+            net_attribs = []
+        if net_attribs is not None:
+            writer.write_fragment(NETWORK_ATTRIBUTES, updater(net_attribs))
+        writer.end()
+
+    def trim(self, open_input, output):
+        """
+        Trims CX document writing result to `output`
+
+        :param open_input: function with no arguments that returns a new
+                           binary stream of the CX document to trim. It is
+                           called once per pass over the input
+        :param output: binary file like object to write trimmed CX to
+        :return: None
+        """
+        with open_input() as stream:
+            self._kept_edges = self._find_kept_edges(stream)
+
+        self._kept_nodes = None
+        if self._remove_orphan_nodes:
+            with open_input() as stream:
+                self._kept_nodes = self._find_kept_nodes(stream)
+
+        logger.info('Keeping {} edges and {} nodes'.format(
+            len(self._kept_edges), self.get_kept_node_count()))
+
+        with open_input() as stream:
+            self._write_trimmed(stream, output)
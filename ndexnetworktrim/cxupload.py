@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lazy CX serialization of a NiceCXNetwork and streaming upload to NDEx.
+
+:py:func:`~ndex2.nice_cx_network.NiceCXNetwork.upload_to` builds the
+whole CX document as a list and then as one JSON string before sending
+it. Here aspects are generated element by element into chunks of
+bytes. By default they are spooled to a temporary file uploaded via
+the public upload methods of the NDEx client. When asked for, they
+are instead posted as a chunked request body, so serialization
+overlaps with the upload and the document never exists as a whole.
+"""
+
+import io
+import logging
+import tempfile
+import uuid
+import zlib
+
+from ndexnetworktrim.cxstream import CXStreamWriter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1048576
+
+# CX larger than this is spooled to disk before upload
+SPOOL_SIZE = 67108864
+
+# seconds to wait for connecting to server and between bytes of response
+TIMEOUT = (30, 600)
+
+NUMBER_VERIFICATION = [{'longNumber': 281474976710655}]
+
+CX_FIELD_NAME = 'CXNetworkStream'
+
+# aspects of NiceCXNetwork in the order to_cx() writes them
+CORE_ASPECTS = ['nodes', 'edges', 'networkAttributes', 'nodeAttributes',
+                'edgeAttributes', 'citations']
+
+CITATION_ASPECTS = ['nodeCitations', 'edgeCitations']
+
+SUPPORT_ASPECTS = ['supports']
+
+EDGE_SUPPORT_ASPECTS = ['edgeSupports']
+
+
+def _iter_aspect_elements(network, aspect_name):
+    """
+    Generates elements of aspect the way
+    :py:func:`~ndex2.nice_cx_network.NiceCXNetwork.generate_aspect`
+    lists them
+
+    :return: elements of aspect
+    """
+    aspect = network.string_to_aspect_object(aspect_name)
+    if isinstance(aspect, list):
+        for element in aspect:
+            yield element
+        return
+
+    if aspect_name in CITATION_ASPECTS + EDGE_SUPPORT_ASPECTS:
+        key = 'citations'
+        if aspect_name in EDGE_SUPPORT_ASPECTS:
+            key = 'supports'
+        for element_id, value in aspect.items():
+            yield {'po': [element_id],
+                   key: value if isinstance(value, list) else [value]}
+        return
+
+    for value in aspect.values():
+        if isinstance(value, list) and aspect_name not in ('nodes', 'edges'):
+            for element in value:
+                yield element
+        else:
+            yield value
+
+
+def _count_aspect_elements(network, aspect_name):
+    """
+    :return: number of elements :py:func:`_iter_aspect_elements`
+             generates for aspect without generating them
+    """
+    aspect = network.string_to_aspect_object(aspect_name)
+    if isinstance(aspect, list) or aspect_name in ('nodes', 'edges') or\
+            aspect_name in CITATION_ASPECTS + EDGE_SUPPORT_ASPECTS:
+        return len(aspect)
+    return sum(len(v) if isinstance(v, list) else 1 for v in aspect.values())
+
+
+def _get_aspect_names(network):
+    """
+    :return: names of non empty aspects of network in to_cx() order
+    """
+    names = []
+    for name in CORE_ASPECTS + CITATION_ASPECTS + SUPPORT_ASPECTS +\
+            EDGE_SUPPORT_ASPECTS:
+        if getattr(network, name, None):
+            names.append(name)
+    return names
+
+
+def get_nice_cx_metadata(network):
+    """
+    Gets metaData elements
+    :py:func:`~ndex2.nice_cx_network.NiceCXNetwork.to_cx` would write
+    for network, counting elements of each aspect instead
+    of generating them. Unlike to_cx() the network is not altered
+
+    :param network: network
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+    :return: metaData elements
+    :rtype: list
+    """
+    metadata = dict(network.metadata)
+    for name in _get_aspect_names(network):
+        count = _count_aspect_elements(network, name)
+        metadata[name] = {'name': name,
+                          'elementCount': count,
+                          'idCounter': count,
+                          'version': '1.0',
+                          'consistencyGroup': 1,
+                          'properties': []}
+    for name, elements in (network.opaqueAspects or {}).items():
+        if metadata.get(name):
+            metadata[name] = dict(metadata[name])
+            metadata[name]['elementCount'] = len(elements)
+        else:
+            metadata[name] = {'name': name,
+                              'elementCount': len(elements),
+                              'idCounter': len(elements) + 1,
+                              'properties': []}
+    return list(metadata.values())
+
+
+def iter_nice_cx_fragments(network):
+    """
+    Generates aspect fragments of network in the same order and with
+    the same content as :py:func:`~ndex2.nice_cx_network.NiceCXNetwork.to_cx`
+    except that elements are produced lazily
+
+    :param network: network
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+    :return: (aspect name, iterable of elements) tuples
+    """
+    metadata = get_nice_cx_metadata(network)
+    yield 'numberVerification', NUMBER_VERIFICATION
+    if metadata:
+        yield 'metaData', metadata
+    for name in _get_aspect_names(network):
+        yield name, _iter_aspect_elements(network, name)
+    for name, elements in (network.opaqueAspects or {}).items():
+        if isinstance(elements, bytes):
+            elements = [elements.decode('ascii')]
+        yield name, elements
+    if metadata:
+        yield 'status', [{'error': '', 'success': True}]
+
+
+def iter_cx_chunks(fragments, chunk_size=CHUNK_SIZE):
+    """
+    Serializes aspect fragments to CX JSON in chunks of bytes
+
+    :param fragments: (aspect name, iterable of elements) tuples
+    :param chunk_size: chunks are yielded once at least this many
+                       bytes are buffered
+    :return: chunks of CX
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    writer = CXStreamWriter(buffer)
+
+    def take():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.start()
+    for aspect, elements in fragments:
+        writer.start_fragment(aspect)
+        for element in elements:
+            writer.write_element(element)
+            if buffer.tell() >= chunk_size:
+                yield take()
+        writer.end_fragment()
+    writer.end()
+    yield take()
+
+
+def iter_nice_cx_chunks(network, chunk_size=CHUNK_SIZE):
+    """
+    Serializes network to CX JSON in chunks of bytes
+
+    :param network: network
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+    :return: chunks of CX
+    :rtype: bytes
+    """
+    return iter_cx_chunks(iter_nice_cx_fragments(network),
+                          chunk_size=chunk_size)
+
+
+def iter_file_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    :return: chunks of bytes read from file at `path`
+    """
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_gzip(chunks):
+    """
+    Gzip compresses chunks of bytes on the fly
+
+    :return: compressed chunks
+    :rtype: bytes
+    """
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_multipart(chunks, boundary, field_name=CX_FIELD_NAME):
+    """
+    Wraps chunks in a multipart/form-data body with one file field
+
+    :param chunks: chunks of content of field
+    :param boundary: multipart boundary
+    :param field_name: name of form field
+    :return: chunks of body
+    :rtype: bytes
+    """
+    yield ('--' + boundary + '\r\n'
+           'Content-Disposition: form-data; name="' + field_name +
+           '"; filename="filename"\r\n'
+           'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+    yield ('\r\n--' + boundary + '--\r\n').encode('utf-8')
+
+
+class NDExClientUploader(object):
+    """
+    Uploads CX to NDEx via the public upload methods of an
+    :py:class:`~ndex2.client.Ndex2` client. Chunks are first spooled
+    to a temporary file, held in memory up to :py:const:`SPOOL_SIZE`
+    bytes, which the client streams to the server
+    """
+    def __init__(self, client):
+        """
+
+        :param client: NDEx client
+        :type client: :py:class:`~ndex2.client.Ndex2`
+        """
+        self._client = client
+
+    @staticmethod
+    def _spool(chunks):
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        return spool
+
+    def upload(self, chunks):
+        """
+        Creates a new network on server
+
+        :param chunks: chunks of CX
+        :raises requests.HTTPError: if server returns an error
+        :return: URL of new network
+        :rtype: str
+        """
+        with self._spool(chunks) as spool:
+            return self._client.save_cx_stream_as_new_network(spool)
+
+    def update(self, network_id, chunks):
+        """
+        Replaces network on server
+
+        :param network_id: UUID of network to replace
+        :param chunks: chunks of CX
+        :raises requests.HTTPError: if server returns an error
+        """
+        with self._spool(chunks) as spool:
+            self._client.update_cx_network(spool, network_id)
+
+
+class StreamingCXUploader(object):
+    """
+    Uploads CX to NDEx as a chunked multipart request body through
+    the HTTP session of an :py:class:`~ndex2.client.Ndex2` client so
+    the connection and credentials of the client are reused. This
+    relies on attributes of the client that are not part of its
+    public API, so it is only used when asked for
+    """
+    def __init__(self, client, user_agent=None, gzip=False,
+                 timeout=TIMEOUT):
+        """
+
+        :param client: NDEx client
+        :type client: :py:class:`~ndex2.client.Ndex2`
+        :param user_agent: value of User-Agent header
+        :param gzip: if True request body is gzip compressed and sent
+                     with Content-Encoding gzip which the server must
+                     support
+        :param timeout: timeout of request as passed to requests
+        """
+        self._client = client
+        self._user_agent = user_agent
+        self._gzip = gzip
+        self._timeout = timeout
+
+    def _get_url(self, route):
+        return self._client.host + self._client.version_endpoint + route
+
+    def _send(self, method, route, chunks):
+        boundary = uuid.uuid4().hex
+        headers = {'Content-Type': 'multipart/form-data; boundary=' +
+                                   boundary}
+        if self._user_agent is not None:
+            headers['User-Agent'] = self._user_agent
+        body = iter_multipart(chunks, boundary)
+        if self._gzip:
+            headers['Content-Encoding'] = 'gzip'
+            body = iter_gzip(body)
+        url = self._get_url(route)
+        logger.debug(method + ' ' + url)
+        response = self._client.s.request(method, url, data=body,
+                                          headers=headers,
+                                          timeout=self._timeout)
+        response.raise_for_status()
+        return response
+
+    def upload(self, chunks):
+        """
+        Creates a new network on server
+
+        :param chunks: chunks of CX
+        :raises requests.HTTPError: if server returns an error
+        :return: URL of new network
+        :rtype: str
+        """
+        return self._send('POST', '/network', chunks).text
+
+    def update(self, network_id, chunks):
+        """
+        Replaces network on server
+
+        :param network_id: UUID of network to replace
+        :param chunks: chunks of CX
+        :raises requests.HTTPError: if server returns an error
+        """
+        self._send('PUT', '/network/' + network_id, chunks)
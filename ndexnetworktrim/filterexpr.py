@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+
+"""
+Filter expressions over edge attributes.
+
+An expression is parsed once into a tree of nodes that can either be
+evaluated per edge against a dict of attribute values or as a
+vectorized plan over columns of an
+:py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex`.
+
+Grammar (keywords are case insensitive)::
+
+    expr       := term ('or' term)*
+    term       := factor ('and' factor)*
+    factor     := 'not' factor | '(' expr ')' | comparison
+    comparison := name op literal
+                | name ['not'] 'in' '(' literal (',' literal)* ')'
+                | name 'between' number 'and' number
+    op         := '>=' | '>' | '<=' | '<' | '==' | '=' | '!='
+    name       := identifier | `back quoted name`
+    literal    := number | 'string' | "string"
+
+Ordering operators and ``between`` need numbers, ``==``, ``!=`` and
+``in`` work with numbers or strings.
+
+Comparisons against a missing attribute are neither true nor false
+(as NULL in SQL) and ``and``, ``or`` and ``not`` follow three-valued
+logic, an edge is kept only if the whole expression is true. So an
+edge that has none of the attributes in an expression is never kept.
+"""
+
+import abc
+import operator
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?![\w.])
+    | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    | (?P<quoted>`[^`]+`)
+    | (?P<op>>=|<=|==|!=|>|<|=)
+    | (?P<punct>[(),])
+    | (?P<name>[A-Za-z_][\w.:\-]*)
+    )""", re.VERBOSE)
+
+KEYWORDS = ('and', 'or', 'not', 'in', 'between')
+
+OPERATORS = {'>=': operator.ge, '>': operator.gt, '<=': operator.le,
+             '<': operator.lt, '==': operator.eq, '!=': operator.ne}
+
+ORDERING_OPERATORS = ('>=', '>', '<=', '<')
+
+
+class FilterExpressionError(Exception):
+    """
+    Raised if a filter expression cannot be parsed
+    """
+    pass
+
+
+def _get_number(value):
+    """
+    :return: value as float or None if it is not a number
+    """
+    if isinstance(value, (bool, list)) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "\\'") + "'"
+    return '{:g}'.format(value) if isinstance(value, float) else str(value)
+
+
+def _format_name(name):
+    if re.match(r'^[A-Za-z_][\w.:\-]*$', name) and\
+            name.lower() not in KEYWORDS:
+        return name
+    return '`' + name + '`'
+
+
+class _Node(abc.ABC):
+    """
+    Node of a parsed filter expression
+    """
+    @abc.abstractmethod
+    def get_attribute_names(self):
+        """
+        :return: names of attributes referenced by expression
+        :rtype: set
+        """
+
+    @abc.abstractmethod
+    def evaluate(self, attributes):
+        """
+        Evaluates expression for one edge
+
+        :param attributes: attribute values of edge keyed by name
+        :type attributes: dict
+        :return: True, False or None if outcome is unknown
+        """
+
+    @abc.abstractmethod
+    def evaluate_columns(self, columns):
+        """
+        Evaluates expression for all edges at once
+
+        :param columns: :py:class:`~ndexnetworktrim.columnar.AttributeColumn`
+                        objects keyed by attribute name
+        :return: (true mask, false mask), edges in neither are unknown
+        :rtype: tuple
+        """
+
+
+class _Comparison(_Node):
+    def __init__(self, name, op, value):
+        self.name = name
+        self.op = op
+        self.value = value
+
+    def get_attribute_names(self):
+        return {self.name}
+
+    def evaluate(self, attributes):
+        value = attributes.get(self.name)
+        if isinstance(self.value, str):
+            if value is None or isinstance(value, list):
+                return None
+            matches = isinstance(value, str) and value == self.value
+            if self.op == '!=':
+                return not matches
+            return matches
+        number = _get_number(value)
+        if number is None:
+            return None
+        return OPERATORS[self.op](number, self.value)
+
+    def evaluate_columns(self, columns):
+        column = columns[self.name]
+        if isinstance(self.value, str):
+            present = ~column.missing
+            if column.is_numeric():
+                matches = np.zeros(len(present), dtype=bool)
+            else:
+                matches = (column.values == self.value) & present
+            if self.op == '!=':
+                matches = present & ~matches
+        else:
+            # booleans are not numbers here, as in evaluate()
+            values, missing = column.get_numeric_values(booleans=False)
+            present = ~missing
+            matches = OPERATORS[self.op](values, self.value) & present
+        return matches, present & ~matches
+
+    def __str__(self):
+        return _format_name(self.name) + ' ' + self.op + ' ' +\
+               _format_literal(self.value)
+
+
+class _InList(_Node):
+    def __init__(self, name, values, negate=False):
+        self.name = name
+        self.values = values
+        self.negate = negate
+        self._comparisons = [_Comparison(name, '==', v) for v in values]
+
+    def get_attribute_names(self):
+        return {self.name}
+
+    def evaluate(self, attributes):
+        value = attributes.get(self.name)
+        if value is None or isinstance(value, list):
+            return None
+        matches = any(c.evaluate(attributes) for c in self._comparisons)
+        return matches != self.negate
+
+    def evaluate_columns(self, columns):
+        column = columns[self.name]
+        present = ~column.missing
+        matches = np.zeros(len(present), dtype=bool)
+        for comparison in self._comparisons:
+            matches |= comparison.evaluate_columns(columns)[0]
+        if self.negate:
+            return present & ~matches, matches
+        return matches, present & ~matches
+
+    def __str__(self):
+        return _format_name(self.name) + (' not in (' if self.negate
+                                          else ' in (') +\
+               ', '.join(_format_literal(v) for v in self.values) + ')'
+
+
+class _Between(_Node):
+    def __init__(self, name, low, high):
+        self.name = name
+        self.low = low
+        self.high = high
+        self._expr = _And([_Comparison(name, '>=', low),
+                           _Comparison(name, '<=', high)])
+
+    def get_attribute_names(self):
+        return {self.name}
+
+    def evaluate(self, attributes):
+        return self._expr.evaluate(attributes)
+
+    def evaluate_columns(self, columns):
+        return self._expr.evaluate_columns(columns)
+
+    def __str__(self):
+        return _format_name(self.name) + ' between ' +\
+               _format_literal(self.low) + ' and ' +\
+               _format_literal(self.high)
+
+
+class _Not(_Node):
+    def __init__(self, child):
+        self.child = child
+
+    def get_attribute_names(self):
+        return self.child.get_attribute_names()
+
+    def evaluate(self, attributes):
+        res = self.child.evaluate(attributes)
+        if res is None:
+            return None
+        return not res
+
+    def evaluate_columns(self, columns):
+        true_mask, false_mask = self.child.evaluate_columns(columns)
+        return false_mask, true_mask
+
+    def __str__(self):
+        return 'not (' + str(self.child) + ')'
+
+
+class _BooleanNode(_Node):
+    def __init__(self, children):
+        self.children = children
+
+    def get_attribute_names(self):
+        names = set()
+        for child in self.children:
+            names.update(child.get_attribute_names())
+        return names
+
+
+class _And(_BooleanNode):
+    def evaluate(self, attributes):
+        res = True
+        for child in self.children:
+            child_res = child.evaluate(attributes)
+            if child_res is False:
+                return False
+            if child_res is None:
+                res = None
+        return res
+
+    def evaluate_columns(self, columns):
+        true_mask, false_mask = self.children[0].evaluate_columns(columns)
+        for child in self.children[1:]:
+            is_true, is_false = child.evaluate_columns(columns)
+            true_mask = true_mask & is_true
+            false_mask = false_mask | is_false
+        return true_mask, false_mask
+
+    def __str__(self):
+        return ' and '.join(_format_child(c) for c in self.children)
+
+
+class _Or(_BooleanNode):
+    def evaluate(self, attributes):
+        res = False
+        for child in self.children:
+            child_res = child.evaluate(attributes)
+            if child_res is True:
+                return True
+            if child_res is None:
+                res = None
+        return res
+
+    def evaluate_columns(self, columns):
+        true_mask, false_mask = self.children[0].evaluate_columns(columns)
+        for child in self.children[1:]:
+            is_true, is_false = child.evaluate_columns(columns)
+            true_mask = true_mask | is_true
+            false_mask = false_mask & is_false
+        return true_mask, false_mask
+
+    def __str__(self):
+        return ' or '.join(_format_child(c) for c in self.children)
+
+
+def _format_child(child):
+    if isinstance(child, _BooleanNode):
+        return '(' + str(child) + ')'
+    return str(child)
+
+
+class _Parser(object):
+    """
+    Recursive descent parser for filter expressions
+    """
+    def __init__(self, text):
+        self._text = text
+        self._tokens = self._tokenize(text)
+        self._pos = 0
+
+    @staticmethod
+    def _tokenize(text):
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = TOKEN_RE.match(text, pos)
+            if match is None or match.end() == pos:
+                raise FilterExpressionError('Unexpected character at '
+                                            'position ' + str(pos) +
+                                            ' of filter: ' + text)
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == 'number':
+                if re.match(r'^[-+]?\d+$', value):
+                    value = int(value)
+                else:
+                    value = float(value)
+            elif kind == 'string':
+                value = re.sub(r'\\(.)', r'\1', value[1:-1])
+            elif kind == 'quoted':
+                kind = 'name'
+                value = value[1:-1]
+            elif kind == 'op' and value == '=':
+                value = '=='
+            elif kind == 'name' and value.lower() in KEYWORDS:
+                kind = 'keyword'
+                value = value.lower()
+            tokens.append((kind, value))
+            pos = match.end()
+        return tokens
+
+    def _peek(self):
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+        return None, None
+
+    def _next(self, expected_kind=None, expected_value=None):
+        kind, value = self._peek()
+        if kind is None:
+            raise FilterExpressionError('Unexpected end of filter: ' +
+                                        self._text)
+        if (expected_kind is not None and kind != expected_kind) or\
+                (expected_value is not None and value != expected_value):
+            raise FilterExpressionError('Expected ' +
+                                        str(expected_value or expected_kind) +
+                                        ' but found ' + str(value) +
+                                        ' in filter: ' + self._text)
+        self._pos += 1
+        return value
+
+    def _accept(self, kind, value):
+        if self._peek() == (kind, value):
+            self._pos += 1
+            return True
+        return False
+
+    def parse(self):
+        if not self._tokens:
+            raise FilterExpressionError('Filter is empty')
+        node = self._parse_or()
+        if self._pos != len(self._tokens):
+            raise FilterExpressionError('Unexpected ' +
+                                        str(self._peek()[1]) +
+                                        ' in filter: ' + self._text)
+        return node
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._accept('keyword', 'or'):
+            children.append(self._parse_and())
+        if len(children) == 1:
+            return children[0]
+        return _Or(children)
+
+    def _parse_and(self):
+        children = [self._parse_not()]
+        while self._accept('keyword', 'and'):
+            children.append(self._parse_not())
+        if len(children) == 1:
+            return children[0]
+        return _And(children)
+
+    def _parse_not(self):
+        if self._accept('keyword', 'not'):
+            return _Not(self._parse_not())
+        if self._accept('punct', '('):
+            node = self._parse_or()
+            self._next('punct', ')')
+            return node
+        return self._parse_comparison()
+
+    def _parse_literal(self, number_only=False):
+        kind, value = self._peek()
+        if kind == 'number' or (kind == 'string' and not number_only):
+            self._pos += 1
+            return value
+        raise FilterExpressionError('Expected ' +
+                                    ('number' if number_only else 'literal') +
+                                    ' but found ' + str(value) +
+                                    ' in filter: ' + self._text)
+
+    def _parse_comparison(self):
+        name = self._next('name')
+        if self._accept('keyword', 'between'):
+            low = self._parse_literal(number_only=True)
+            self._next('keyword', 'and')
+            high = self._parse_literal(number_only=True)
+            return _Between(name, low, high)
+
+        negate = self._accept('keyword', 'not')
+        if negate or self._accept('keyword', 'in'):
+            if negate:
+                self._next('keyword', 'in')
+            self._next('punct', '(')
+            values = [self._parse_literal()]
+            while self._accept('punct', ','):
+                values.append(self._parse_literal())
+            self._next('punct', ')')
+            return _InList(name, values, negate=negate)
+
+        op = self._next('op')
+        value = self._parse_literal(number_only=op in ORDERING_OPERATORS)
+        return _Comparison(name, op, value)
+
+
+class FilterExpression(object):
+    """
+    Compiled filter expression over edge attributes
+
+    Example usage:
+
+    .. code-block:: python
+
+        expr = FilterExpression("score >= 0.5 and type in ('a', 'b')")
+        expr.evaluate({'score': 0.7, 'type': 'a'})  # True
+        keep_mask = expr.evaluate_index(edge_index)
+
+    """
+    def __init__(self, text):
+        """
+
+        :param text: filter expression
+        :raises FilterExpressionError: if `text` cannot be parsed
+        """
+        self._text = text
+        self._root = _Parser(text).parse()
+
+    def get_attribute_names(self):
+        """
+        :return: names of edge attributes used by expression
+        :rtype: list
+        """
+        return sorted(self._root.get_attribute_names())
+
+    def evaluate(self, attributes):
+        """
+        :param attributes: attribute values of an edge keyed by name
+        :type attributes: dict
+        :return: True if edge passes filter
+        """
+        return self._root.evaluate(attributes) is True
+
+    def evaluate_columns(self, columns):
+        """
+        :param columns: :py:class:`~ndexnetworktrim.columnar.AttributeColumn`
+                        objects keyed by attribute name, must include
+                        every name from :py:func:`get_attribute_names`
+        :return: boolean mask that is True for edges passing filter
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._root.evaluate_columns(columns)[0]
+
+    def evaluate_index(self, edge_index):
+        """
+        :param edge_index: columnar index of edge attributes
+        :type edge_index:
+            :py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex`
+        :return: boolean mask aligned with edge ids of index that is
+                 True for edges passing filter
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        columns = edge_index.get_columns(self.get_attribute_names())
+        return self.evaluate_columns(columns)
+
+    def __str__(self):
+        return str(self._root)
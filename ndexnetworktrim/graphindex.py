@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+
+"""Array-backed indexes over the topology of a network."""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IdIndex(object):
+    """
+    Looks up positions of ids in an array of unique ids by binary
+    search over a sorted copy, so lookups of many ids at once are
+    vectorized instead of going through a dict
+    """
+    def __init__(self, ids):
+        """
+
+        :param ids: unique ids
+        :type ids: :py:class:`numpy.ndarray`
+        """
+        self._order = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[self._order]
+
+    def get_positions(self, ids):
+        """
+        :param ids: ids to look up
+        :return: position of each id in `ids` or -1 if it is not indexed
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.full(len(ids), -1, dtype=np.int64)
+        if len(ids) == 0 or len(self._sorted_ids) == 0:
+            return positions
+        idx = np.searchsorted(self._sorted_ids, ids)
+        idx = np.minimum(idx, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[idx] == ids
+        positions[found] = self._order[idx[found]]
+        return positions
+
+
+def get_dense_positions(*arrays):
+    """
+    Maps node ids, which can be sparse, 64 bit or negative, to dense
+    positions with one sort, so arrays over nodes are sized by the
+    number of distinct ids instead of the largest id
+
+    :param arrays: arrays of node ids
+    :return: (sorted distinct ids of all arrays, list of arrays of
+             positions of ids in distinct ids, one per array)
+    :rtype: tuple
+    """
+    arrays = [np.asarray(a, dtype=np.int64) for a in arrays]
+    if not arrays:
+        return np.zeros(0, dtype=np.int64), []
+    ids, inverse = np.unique(np.concatenate(arrays), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return ids, np.split(inverse, np.cumsum([len(a) for a in arrays])[:-1])
+
+
+def _get_endpoint_arrays(network):
+    """
+    :param network: network, either a
+                    :py:class:`~ndex2.nice_cx_network.NiceCXNetwork` or
+                    a :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :return: (edge ids, source node ids, target node ids, node ids) of
+             network as int64 arrays, edges in order of network.edges
+    """
+    if hasattr(network, 'get_endpoint_arrays'):
+        return network.get_endpoint_arrays() + (network.get_node_ids(),)
+    edges = network.edges
+    count = len(edges)
+    edge_ids = np.fromiter(edges.keys(), dtype=np.int64, count=count)
+    sources = np.fromiter((e['s'] for e in edges.values()), dtype=np.int64,
+                          count=count)
+    targets = np.fromiter((e['t'] for e in edges.values()), dtype=np.int64,
+                          count=count)
+    node_ids = np.fromiter(network.nodes.keys(), dtype=np.int64,
+                           count=len(network.nodes))
+    return edge_ids, sources, targets, node_ids
+
+
+def get_node_strengths(network, weights, missing=None):
+    """
+    Sums the weights (strength) and counts the weighted edges
+    (degree) of each node with one bincount each, the part of the
+    disparity filter that needs every edge
+
+    :param network: network whose edges are weighted
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+                   or :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :param weights: weights aligned with edges of network
+    :type weights: :py:class:`numpy.ndarray`
+    :param missing: mask that is True for edges without a weight.
+                    Those and edges with a NaN or negative weight are
+                    left out of degrees and strengths
+    :return: (edge ids, positions of sources and of targets in
+             strengths and degrees, weights that are NaN for edges
+             left out, strengths and degrees of nodes with edges)
+    :rtype: tuple
+    """
+    edge_ids, sources, targets, _ = _get_endpoint_arrays(network)
+    weights = np.asarray(weights, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        valid = ~np.isnan(weights) & (weights >= 0)
+    if missing is not None:
+        valid &= ~missing
+    node_ids, (sources, targets) = get_dense_positions(sources, targets)
+    size = len(node_ids)
+    valid_weights = np.where(valid, weights, 0.0)
+    strengths = np.bincount(sources, weights=valid_weights,
+                            minlength=size) +\
+        np.bincount(targets, weights=valid_weights, minlength=size)
+    degrees = np.bincount(sources[valid], minlength=size) +\
+        np.bincount(targets[valid], minlength=size)
+    weights = np.where(valid, weights, np.nan)
+    return edge_ids, sources, targets, weights, strengths, degrees
+
+
+def get_edge_alphas(sources, targets, weights, strengths, degrees):
+    """
+    Computes disparity filter alphas of edges from strengths and
+    degrees of their end points, edge by edge so edges can be split
+    in chunks
+
+    :param sources: positions of source nodes of edges in
+                    `strengths` and `degrees`
+    :param targets: positions of target nodes of edges
+    :param weights: weights of edges, NaN for edges without weight
+    :param strengths: strength of each node
+    :param degrees: degree of each node
+    :return: alpha of each edge or NaN if it has no weight
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    valid = ~np.isnan(weights)
+    valid_weights = np.where(valid, weights, 0.0)
+    alphas = np.ones(len(weights), dtype=np.float64)
+    for ends in [sources, targets]:
+        strength = strengths[ends]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(strength > 0, valid_weights / strength, 0.0)
+        end_alphas = np.power(1.0 - share, degrees[ends] - 1.0)
+        # a node with a single edge says nothing about its significance
+        end_alphas[degrees[ends] <= 1] = 1.0
+        alphas = np.minimum(alphas, end_alphas)
+    alphas[~valid] = np.nan
+    return alphas
+
+
+def get_disparity_alphas(network, weights, missing=None):
+    """
+    Computes the significance of each edge under the disparity filter
+    (Serrano, Boguna and Vespignani, PNAS 2009). For an edge of
+    weight w at a node with degree k and strength (sum of weights) s
+    the probability of a share of at least w / s under uniformly
+    random weights is ``(1 - w / s) ** (k - 1)``. An edge is as
+    significant as it is at the end point where it is most so.
+    Strengths and degrees are summed per node with one bincount
+    each.
+
+    :param network: network whose edges are weighted
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+                   or :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :param weights: weights aligned with edges of network
+    :type weights: :py:class:`numpy.ndarray`
+    :param missing: mask that is True for edges without a weight.
+                    Those and edges with a NaN or negative weight are
+                    left out of degrees and strengths
+    :return: (edge ids, alpha of each edge or NaN if it has no weight)
+    :rtype: tuple
+    """
+    edge_ids, sources, targets, weights, strengths, degrees = \
+        get_node_strengths(network, weights, missing=missing)
+    return edge_ids, get_edge_alphas(sources, targets, weights, strengths,
+                                     degrees)
+
+
+def get_component_labels(size, sources, targets):
+    """
+    Labels connected components with an array based union-find.
+    Every round links the root of each edge end point to the smaller
+    root of the other end point, all edges at once, then compresses
+    paths by pointer jumping until every node points at its root
+
+    :param size: number of nodes, positions of nodes are 0 to
+                 size - 1, see :py:func:`get_dense_positions`
+    :param sources: positions of source nodes of edges
+    :type sources: :py:class:`numpy.ndarray`
+    :param targets: positions of target nodes of edges
+    :type targets: :py:class:`numpy.ndarray`
+    :return: smallest position in component of each position
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    parent = np.arange(size, dtype=np.int64)
+    while True:
+        source_roots = parent[sources]
+        target_roots = parent[targets]
+        linked = source_roots != target_roots
+        if not linked.any():
+            return parent
+        source_roots = source_roots[linked]
+        target_roots = target_roots[linked]
+        np.minimum.at(parent, np.maximum(source_roots, target_roots),
+                      np.minimum(source_roots, target_roots))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def select_components(node_ids, sources, targets, min_size=None,
+                      largest_only=False):
+    """
+    Picks connected components to keep by number of nodes
+
+    :param node_ids: ids of nodes, including every edge end point.
+                     Nodes without edges are components of one node
+    :param sources: source node ids of edges
+    :param targets: target node ids of edges
+    :param min_size: if set, components with fewer nodes are rejected
+    :param largest_only: if True only the component with most nodes
+                         is kept, the one with the smallest node id
+                         if several are as large
+    :return: (mask of `node_ids`, mask of edges) that is True for
+             nodes and edges in kept components
+    :rtype: tuple
+    """
+    ids, (nodes, sources, targets) = get_dense_positions(
+        node_ids, sources, targets)
+    size = len(ids)
+    labels = get_component_labels(size, sources, targets)
+    node_labels = labels[nodes]
+    sizes = np.bincount(node_labels, minlength=size)
+    keep = np.ones(size, dtype=bool)
+    if min_size is not None:
+        keep &= sizes >= min_size
+    if largest_only and len(nodes):
+        # positions are in order of ids, so ties go to smallest id
+        keep &= np.arange(size) == np.argmax(sizes)
+    return keep[node_labels], keep[labels[sources]]
+
+
+class NodeDegrees(object):
+    """
+    Degree of every node held in an array indexed by position of
+    node id, built once from the edges of a network. Removing edges
+    decrements the degrees of their end points so nodes left without
+    edges are found in time proportional to the number of edges
+    removed instead of rescanning the network.
+
+    Nodes that had no edges when the index was built are kept apart
+    as orphans of the parent network.
+    """
+    def __init__(self, network):
+        """
+
+        :param network: network to index
+        :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+                       or :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+        """
+        self._edge_ids, self._sources, self._targets, node_ids =\
+            _get_endpoint_arrays(network)
+        self._nodes, (node_positions, self._source_positions,
+                      self._target_positions) =\
+            get_dense_positions(node_ids, self._sources, self._targets)
+        self._node_index = IdIndex(self._nodes)
+        size = len(self._nodes)
+        self._degrees = np.bincount(self._source_positions, minlength=size) +\
+            np.bincount(self._target_positions, minlength=size)
+        self._parent_orphans = node_ids[self._degrees[node_positions] == 0]
+        self._node_ids = node_ids
+
+        self._edge_index = IdIndex(self._edge_ids)
+        self._removed = np.zeros(len(self._edge_ids), dtype=bool)
+        self._new_orphans = []
+
+    def copy(self):
+        """
+        :return: copy that can have edges removed independently, arrays
+                 describing the parent network are shared
+        :rtype: :py:class:`NodeDegrees`
+        """
+        other = NodeDegrees.__new__(NodeDegrees)
+        other.__dict__.update(self.__dict__)
+        other._degrees = self._degrees.copy()
+        other._removed = self._removed.copy()
+        other._new_orphans = list(self._new_orphans)
+        return other
+
+    def get_degree(self, node_id):
+        """
+        :return: number of remaining edge end points at node
+        """
+        position = self._node_index.get_positions([node_id])[0]
+        if position < 0:
+            return 0
+        return int(self._degrees[position])
+
+    def _get_positions(self, edge_ids):
+        """
+        :return: positions of edges in `edge_ids` that are in index
+        """
+        positions = self._edge_index.get_positions(edge_ids)
+        return positions[positions >= 0]
+
+    def _remove_positions(self, positions):
+        positions = positions[~self._removed[positions]]
+        self._removed[positions] = True
+        sources = self._source_positions[positions]
+        targets = self._target_positions[positions]
+        np.subtract.at(self._degrees, sources, 1)
+        np.subtract.at(self._degrees, targets, 1)
+        touched = np.unique(np.concatenate([sources, targets]))
+        orphans = touched[self._degrees[touched] == 0]
+        if len(orphans):
+            self._new_orphans.append(self._nodes[orphans])
+        return len(positions)
+
+    def remove_edges(self, edge_ids):
+        """
+        Decrements degrees of end points of edges in `edge_ids`.
+        Unknown or already removed edges are ignored
+
+        :param edge_ids: ids of removed edges
+        :return: number of edges removed
+        """
+        return self._remove_positions(self._get_positions(edge_ids))
+
+    def keep_only_edges(self, edge_ids):
+        """
+        Removes every edge not in `edge_ids`
+
+        :param edge_ids: ids of edges to keep
+        :return: number of edges removed
+        """
+        remove = np.ones(len(self._edge_ids), dtype=bool)
+        remove[self._get_positions(edge_ids)] = False
+        return self._remove_positions(np.flatnonzero(remove))
+
+    def remove_components(self, min_size=None, largest_only=False,
+                          count_parent_orphans=False):
+        """
+        Removes edges of connected components of remaining edges
+        rejected by :py:func:`select_components`. Their nodes are
+        left without edges and so become orphans
+
+        :param min_size: if set, components with fewer nodes are removed
+        :param largest_only: if True all but the largest component
+                             are removed
+        :param count_parent_orphans: if True nodes that had no edges
+                                     when index was built are counted
+                                     as components of one node, and
+                                     become orphans if rejected
+        :return: ids of edges removed
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        kept = np.flatnonzero(~self._removed)
+        node_ids = self._nodes[self._degrees > 0]
+        if count_parent_orphans:
+            node_ids = np.union1d(node_ids, np.setdiff1d(
+                self._parent_orphans,
+                self.get_orphans(include_parent_orphans=False)))
+        node_mask, edge_mask = select_components(
+            node_ids, self._sources[kept], self._targets[kept],
+            min_size=min_size, largest_only=largest_only)
+        removed = kept[~edge_mask]
+        self._remove_positions(removed)
+        rejected = node_ids[~node_mask]
+        if len(rejected):
+            self._new_orphans.append(rejected)
+        return self._edge_ids[removed]
+
+    def reject_nodes(self, node_ids):
+        """
+        Makes nodes orphans whatever their degree, for nodes removed
+        for reasons other than losing their edges. Their edges must
+        be removed via :py:func:`remove_edges`
+
+        :param node_ids: ids of nodes
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        if len(node_ids):
+            self._new_orphans.append(node_ids)
+
+    def get_removed_edge_ids(self):
+        """
+        :return: ids of edges removed so far
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._edge_ids[self._removed]
+
+    def get_parent_orphans(self):
+        """
+        :return: ids of nodes that had no edges when index was built
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._parent_orphans
+
+    def get_orphans(self, include_parent_orphans=True):
+        """
+        :param include_parent_orphans: if True nodes that had no edges
+                                       when index was built are included
+        :return: ids of nodes without edges
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        arrays = list(self._new_orphans)
+        if include_parent_orphans:
+            arrays.append(self._parent_orphans)
+        if not arrays:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(arrays))
+
+
+def _get_node_labels(network):
+    """
+    :return: (node ids, names, represents) of network as arrays,
+             names and represents are None where not set
+    """
+    if hasattr(network, 'get_node_names'):
+        return (network.get_node_ids(), network.get_node_names(),
+                network.get_node_represents())
+    nodes = list(network.nodes.values())
+    node_ids = np.fromiter((n['@id'] for n in nodes), dtype=np.int64,
+                           count=len(nodes))
+    names = np.empty(len(nodes), dtype=object)
+    represents = np.empty(len(nodes), dtype=object)
+    for i, node in enumerate(nodes):
+        names[i] = node.get('n')
+        represents[i] = node.get('r')
+    return node_ids, names, represents
+
+
+def find_nodes(network, labels):
+    """
+    Finds nodes whose name or represents is in `labels`
+
+    :param network: network to search
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+                   or :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+    :param labels: node names or represents to look for
+    :return: (ids of matching nodes, labels that matched no node)
+    :rtype: tuple
+    """
+    node_ids, names, represents = _get_node_labels(network)
+    wanted = set(labels)
+    name_match = np.array([n in wanted for n in names.tolist()], dtype=bool)
+    represents_match = np.array([r in wanted for r in represents.tolist()],
+                                dtype=bool)
+    found = set(names[name_match].tolist()) |\
+        set(represents[represents_match].tolist())
+    return (np.unique(node_ids[name_match | represents_match]),
+            [label for label in labels if label not in found])
+
+
+class AdjacencyIndex(object):
+    """
+    Undirected adjacency of a network in compressed sparse row form
+    indexed by position of node id, built once with a sort over the
+    edges. Neighbors of the node at position i are
+    ``neighbors[offsets[i]:offsets[i + 1]]``
+    with the positions of the connecting edges alongside, so a
+    breadth first search expands a whole frontier with a few array
+    operations per hop instead of scanning every edge.
+    """
+    def __init__(self, network):
+        """
+
+        :param network: network to index
+        :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+                       or :py:class:`~ndexnetworktrim.compact.CompactNetwork`
+        """
+        self._edge_ids, sources, targets, node_ids =\
+            _get_endpoint_arrays(network)
+        self._nodes, (_, self._sources, self._targets) =\
+            get_dense_positions(node_ids, sources, targets)
+        size = len(self._nodes)
+        self._node_index = IdIndex(self._nodes)
+        self._edge_index = IdIndex(self._edge_ids)
+
+        rows = np.concatenate([self._sources, self._targets])
+        order = np.argsort(rows, kind='stable')
+        self._neighbors = np.concatenate([self._targets,
+                                          self._sources])[order]
+        edge_positions = np.arange(len(self._edge_ids), dtype=np.int64)
+        self._neighbor_edges = np.concatenate([edge_positions,
+                                               edge_positions])[order]
+        self._offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=self._offsets[1:])
+
+    def _get_node_positions(self, node_ids):
+        """
+        :return: positions of unique ids in `node_ids` of nodes in index
+        """
+        positions = self._node_index.get_positions(
+            np.unique(np.asarray(node_ids, dtype=np.int64)))
+        return positions[positions >= 0]
+
+    def _get_slice_positions(self, nodes):
+        """
+        :param nodes: positions of nodes
+        :return: positions in neighbor arrays of all neighbors of
+                 `nodes`
+        """
+        starts = self._offsets[nodes]
+        lengths = self._offsets[nodes + 1] - starts
+        total = int(lengths.sum())
+        # positions of all neighbor slices concatenated
+        slice_starts = np.cumsum(lengths) - lengths
+        return np.repeat(starts - slice_starts, lengths) +\
+            np.arange(total, dtype=np.int64)
+
+    def get_incident_edge_ids(self, node_ids):
+        """
+        Finds edges of nodes from their neighbor slices, in time
+        proportional to the degrees of the nodes
+
+        :param node_ids: ids of nodes, unknown ids are ignored
+        :return: ids of edges with an end point in `node_ids`
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        positions = self._get_slice_positions(
+            self._get_node_positions(node_ids))
+        return self._edge_ids[np.unique(self._neighbor_edges[positions])]
+
+    def _expand(self, frontier, edge_mask):
+        """
+        :param frontier: positions of nodes to expand
+        :param edge_mask: mask of edge positions that can be followed
+                          or None to follow every edge
+        :return: positions of neighbors of nodes in `frontier`
+        """
+        positions = self._get_slice_positions(frontier)
+        neighbors = self._neighbors[positions]
+        if edge_mask is not None:
+            neighbors = neighbors[edge_mask[self._neighbor_edges[positions]]]
+        return neighbors
+
+    def get_neighborhood(self, seed_ids, hops, edge_ids=None):
+        """
+        Finds nodes at most `hops` edges away from a seed and the
+        edges between them
+
+        :param seed_ids: ids of seed nodes, unknown ids are ignored
+        :param hops: number of hops to expand seeds by
+        :param edge_ids: ids of edges that can be followed, such as
+                         edges passing a filter, or None for all edges
+        :return: (ids of nodes in neighborhood, ids of edges with both
+                 end points in neighborhood among `edge_ids`)
+        :rtype: tuple
+        """
+        edge_mask = None
+        if edge_ids is not None:
+            edge_mask = np.zeros(len(self._edge_ids), dtype=bool)
+            positions = self._edge_index.get_positions(edge_ids)
+            edge_mask[positions[positions >= 0]] = True
+
+        frontier = self._get_node_positions(seed_ids)
+
+        visited = np.zeros(len(self._nodes), dtype=bool)
+        visited[frontier] = True
+        for hop in range(hops):
+            if len(frontier) == 0:
+                break
+            neighbors = self._expand(frontier, edge_mask)
+            frontier = np.unique(neighbors[~visited[neighbors]])
+            visited[frontier] = True
+
+        keep = visited[self._sources] & visited[self._targets]
+        if edge_mask is not None:
+            keep &= edge_mask
+        return self._nodes[visited], self._edge_ids[keep]
@@ -0,0 +1,390 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Small local stand-in for the NDEx REST service.
+
+Only the endpoints used by the trimmer are implemented: server status,
+network download, network summary, network creation, network update
+and network deletion. Request bodies can be sent chunked and gzip
+compressed. Networks are stored as CX files in a directory,
+named by UUID, so a directory of CX files can be served as is.
+
+This is meant for timing and regression testing the trimmer apart
+from network latency and for running on hosts without access to a
+real NDEx server. There is no authentication, any credentials are
+accepted.
+"""
+
+import argparse
+import email.parser
+import email.policy
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+import zlib
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+SERVER_VERSION = '2.5.0'
+
+CX_SUFFIX = '.cx'
+
+NETWORK_ROUTE = re.compile(r'^/v2/network/?$')
+
+NETWORK_ID_ROUTE = re.compile(r'^/v2/network/([0-9A-Za-z_.-]+)(/summary)?$')
+
+STATUS_ROUTE = re.compile(r'^/(rest|v2)/admin/status$')
+
+
+class NetworkStore(object):
+    """
+    Stores networks as CX files in a directory
+    """
+    def __init__(self, datadir):
+        """
+
+        :param datadir: directory where CX files are stored
+        """
+        self._datadir = datadir
+        self._lock = threading.Lock()
+
+    def get_path(self, network_id):
+        """
+        :return: path to CX file of network
+        """
+        return os.path.join(self._datadir, network_id + CX_SUFFIX)
+
+    def exists(self, network_id):
+        """
+        :return: True if network exists
+        """
+        return os.path.isfile(self.get_path(network_id))
+
+    def save(self, network_id, stream):
+        """
+        Writes CX from `stream` to store replacing existing network
+
+        :param network_id: UUID of network
+        :param stream: binary stream to read CX from
+        """
+        # unique name so concurrent saves of one network do not mix
+        fd, tmp_path = tempfile.mkstemp(dir=self._datadir,
+                                        prefix=network_id + '.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(stream, f)
+            with self._lock:
+                os.replace(tmp_path, self.get_path(network_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, network_id):
+        """
+        Removes network from store
+        """
+        with self._lock:
+            os.remove(self.get_path(network_id))
+
+    def get_summary(self, network_id):
+        """
+        Gets summary of network similar to the one returned by NDEx
+
+        :return: summary
+        :rtype: dict
+        """
+        path = self.get_path(network_id)
+        summary = {'externalId': network_id,
+                   'cxFileSize': os.path.getsize(path),
+                   'modificationTime': int(os.path.getmtime(path) * 1000)}
+        with open(path, 'rb') as f:
+            try:
+                cx = json.load(f)
+            except ValueError:
+                return summary
+        for fragment in cx:
+            for attrib in fragment.get('networkAttributes', []):
+                if attrib.get('n') in ('name', 'description', 'version'):
+                    summary[attrib['n']] = attrib.get('v')
+            for element in fragment.get('metaData', []):
+                if element.get('name') == 'nodes':
+                    summary['nodeCount'] = element.get('elementCount')
+                elif element.get('name') == 'edges':
+                    summary['edgeCount'] = element.get('elementCount')
+        return summary
+
+
+class LocalNDExRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles requests to :py:class:`LocalNDExServer`
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _get_store(self):
+        return self.server.store
+
+    def _send_response(self, status):
+        """
+        Sends status line and tells client if connection is closed
+        after response, as asked by a Connection close request header
+        """
+        self.send_response(status)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+
+    def _send(self, status, body=b'', content_type='text/plain',
+              headers=None):
+        self._send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if headers is not None:
+            for key, value in headers.items():
+                self.send_header(key, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data).encode('utf-8'),
+                   content_type='application/json')
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'errorCode': 'NDEx_' + str(status),
+                                 'message': message})
+
+    def _get_network_url(self, network_id):
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}/v2/network/{}'.format(host, port, network_id)
+
+    def _read_chunked_body(self):
+        """
+        Reads request body sent with Transfer-Encoding chunked
+        """
+        body = io.BytesIO()
+        while True:
+            size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+            if size == 0:
+                # skip trailer headers up to blank line
+                while self.rfile.readline().strip():
+                    pass
+                break
+            body.write(self.rfile.read(size))
+            self.rfile.readline()
+        return body.getvalue()
+
+    def _read_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            body = self._read_chunked_body()
+        else:
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = zlib.decompress(body, wbits=31)
+        return body
+
+    def _read_cx_from_multipart(self):
+        """
+        Extracts CX from multipart/form-data request body
+
+        :return: CX as bytes or None if not found
+        """
+        body = self._read_body()
+        header = 'Content-Type: ' + self.headers.get('Content-Type', '')
+        parser = email.parser.BytesParser(policy=email.policy.HTTP)
+        message = parser.parsebytes(header.encode('utf-8') +
+                                    b'\r\n\r\n' + body)
+        if not message.is_multipart():
+            return body
+        for part in message.iter_parts():
+            if part.get_param('name', header='content-disposition') ==\
+                    'CXNetworkStream':
+                return part.get_payload(decode=True)
+        return None
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if STATUS_ROUTE.match(path):
+            return self._send_json(200, {'properties':
+                                         {'ServerVersion': SERVER_VERSION}})
+        match = NETWORK_ID_ROUTE.match(path)
+        if match is None:
+            return self._send_error(404, 'Unknown route ' + path)
+
+        network_id = match.group(1)
+        store = self._get_store()
+        if not store.exists(network_id):
+            return self._send_error(404, 'Network ' + network_id +
+                                    ' not found')
+        if match.group(2) is not None:
+            return self._send_json(200, store.get_summary(network_id))
+
+        path = store.get_path(network_id)
+        self._send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if NETWORK_ROUTE.match(path) is None:
+            return self._send_error(404, 'Unknown route ' + path)
+        cx = self._read_cx_from_multipart()
+        if cx is None:
+            return self._send_error(400, 'CXNetworkStream not found')
+        network_id = str(uuid.uuid4())
+        self.server.store.save(network_id, io.BytesIO(cx))
+        url = self._get_network_url(network_id)
+        self._send(201, url.encode('utf-8'),
+                   headers={'Location': url})
+
+    def do_PUT(self):
+        path = self.path.split('?')[0]
+        match = NETWORK_ID_ROUTE.match(path)
+        if match is None or match.group(2) is not None:
+            return self._send_error(404, 'Unknown route ' + path)
+        network_id = match.group(1)
+        if not self._get_store().exists(network_id):
+            return self._send_error(404, 'Network ' + network_id +
+                                    ' not found')
+        cx = self._read_cx_from_multipart()
+        if cx is None:
+            return self._send_error(400, 'CXNetworkStream not found')
+        self._get_store().save(network_id, io.BytesIO(cx))
+        self._send(204)
+
+    def do_DELETE(self):
+        path = self.path.split('?')[0]
+        match = NETWORK_ID_ROUTE.match(path)
+        if match is None or match.group(2) is not None:
+            return self._send_error(404, 'Unknown route ' + path)
+        network_id = match.group(1)
+        if not self._get_store().exists(network_id):
+            return self._send_error(404, 'Network ' + network_id +
+                                    ' not found')
+        self._get_store().delete(network_id)
+        self._send(204)
+
+
+class LocalNDExServer(ThreadingHTTPServer):
+    """
+    Local stand-in for NDEx REST service serving CX files from a directory.
+
+    Example usage:
+
+    .. code-block:: python
+
+        server = LocalNDExServer('/tmp/networks')
+        server.start()
+        # configure trimmer with server = server.get_url()
+        server.stop()
+
+    """
+    daemon_threads = True
+
+    def __init__(self, datadir, host='127.0.0.1', port=0):
+        """
+
+        :param datadir: directory with CX files named <UUID>.cx
+        :param host: host to listen on. Use an IP address since
+                     :py:class:`~ndex2.client.Ndex2` rewrites any
+                     host containing 'localhost'
+        :param port: port to listen on, 0 means pick a free port
+        """
+        ThreadingHTTPServer.__init__(self, (host, port),
+                                     LocalNDExRequestHandler)
+        self.store = NetworkStore(datadir)
+        self._thread = None
+
+    def get_url(self):
+        """
+        :return: URL of server suitable for server in configuration
+        """
+        return 'http://{}:{}'.format(self.server_address[0],
+                                     self.server_address[1])
+
+    def start(self):
+        """
+        Starts serving requests in a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        kwargs={'poll_interval': 0.1})
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops server started with :py:func:`start`
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _parse_arguments(desc, args):
+    """
+    Parses command line arguments
+    :param desc:
+    :param args:
+    :return:
+    """
+    help_fm = argparse.RawDescriptionHelpFormatter
+    parser = argparse.ArgumentParser(description=desc,
+                                     formatter_class=help_fm)
+    parser.add_argument('datadir', help='Directory with CX files named '
+                                        '<UUID>' + CX_SUFFIX + '. Uploaded '
+                                        'networks are written here too')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Host to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port to listen on (default 8765)')
+    return parser.parse_args(args)
+
+
+def main(args):
+    """
+    Main entry point for program
+    :param args:
+    :return:
+    """
+    desc = """
+    Runs a local stand-in for the NDEx REST service serving
+    CX files from a directory. Set server in the configuration
+    used by ndexnetworktrimmer.py to the URL printed at startup.
+    """
+    theargs = _parse_arguments(desc, args[1:])
+    if not os.path.isdir(theargs.datadir):
+        os.makedirs(theargs.datadir)
+    server = LocalNDExServer(theargs.datadir, host=theargs.host,
+                             port=theargs.port)
+    print('Serving {} at {}'.format(theargs.datadir, server.get_url()))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main(sys.argv))
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-stage metrics of a trimmer run written as JSON or as a Prometheus
+textfile for the node exporter textfile collector.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'ndexnetworktrim_'
+
+
+def get_peak_rss_bytes():
+    """
+    :return: peak resident set size of this process so far in bytes
+             or None if it cannot be determined on this platform
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak
+    return peak * 1024
+
+
+class StageMetrics(object):
+    """
+    Metrics of one stage of a run: wall and CPU time, peak RSS of
+    the process at the end of the stage, bytes transferred and
+    element counts such as edges before and after the stage
+    """
+    def __init__(self, name, labels=None):
+        """
+
+        :param name: name of stage
+        :param labels: extra labels of stage such as cut-off value
+        :type labels: dict
+        """
+        self.name = name
+        self.labels = labels or {}
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_bytes = None
+        self.bytes = None
+        self.counts = {}
+
+    def add_bytes(self, num_bytes):
+        """
+        Adds `num_bytes` to bytes transferred by stage
+        """
+        self.bytes = (self.bytes or 0) + num_bytes
+
+    def set_count(self, name, value):
+        """
+        Sets an element count, for example edges_before
+        """
+        self.counts[name] = value
+
+    def count_chunks(self, chunks):
+        """
+        Passes chunks of bytes through adding their size to bytes
+        transferred by stage
+        """
+        for chunk in chunks:
+            self.add_bytes(len(chunk))
+            yield chunk
+
+    def to_dict(self):
+        """
+        :return: metrics of stage
+        :rtype: dict
+        """
+        return {'stage': self.name,
+                'labels': self.labels,
+                'wall_seconds': self.wall_seconds,
+                'cpu_seconds': self.cpu_seconds,
+                'peak_rss_bytes': self.peak_rss_bytes,
+                'bytes': self.bytes,
+                'counts': self.counts}
+
+
+class RunMetrics(object):
+    """
+    Collects :py:class:`StageMetrics` of a run
+
+    Example usage:
+
+    .. code-block:: python
+
+        metrics = RunMetrics(labels={'network': uuid})
+        with metrics.stage('trim') as stage:
+            stage.set_count('edges_before', len(network.edges))
+            ...
+        metrics.write_json('metrics.json')
+
+    """
+    def __init__(self, labels=None):
+        """
+
+        :param labels: labels of run added to every Prometheus metric
+        :type labels: dict
+        """
+        self._labels = labels or {}
+        self._stages = []
+        self._start = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._end = None
+        self._wall_seconds = None
+        self._cpu_seconds = None
+        self._success = None
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        """
+        Measures the code run in the `with` block as a stage. The
+        stage is recorded even if the block raises
+
+        :param name: name of stage
+        :param labels: extra labels of stage
+        :return: metrics of stage to add bytes and counts to
+        :rtype: :py:class:`StageMetrics`
+        """
+        stage = StageMetrics(name, labels=labels)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall_seconds = time.perf_counter() - wall_start
+            stage.cpu_seconds = time.process_time() - cpu_start
+            stage.peak_rss_bytes = get_peak_rss_bytes()
+            self._stages.append(stage)
+            logger.info('Stage {} took {:.3f}s wall {:.3f}s CPU'
+                        .format(name, stage.wall_seconds,
+                                stage.cpu_seconds))
+
+    def get_stages(self):
+        """
+        :return: metrics of stages in order they finished
+        :rtype: list
+        """
+        return list(self._stages)
+
+    def finish(self, success):
+        """
+        Records end of run
+
+        :param success: True if run succeeded
+        """
+        self._end = time.time()
+        self._wall_seconds = time.perf_counter() - self._wall_start
+        self._cpu_seconds = time.process_time() - self._cpu_start
+        self._success = success
+
+    def to_dict(self):
+        """
+        :return: metrics of run and its stages
+        :rtype: dict
+        """
+        return {'labels': self._labels,
+                'start': self._start,
+                'end': self._end,
+                'success': self._success,
+                'wall_seconds': self._wall_seconds,
+                'cpu_seconds': self._cpu_seconds,
+                'peak_rss_bytes': get_peak_rss_bytes(),
+                'stages': [s.to_dict() for s in self._stages]}
+
+    @staticmethod
+    def _write_atomically(path, text):
+        """
+        Writes file via a temporary file so readers such as the
+        textfile collector never see a partial file
+        """
+        tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def write_json(self, path):
+        """
+        Writes metrics as JSON to `path`
+        """
+        self._write_atomically(path, json.dumps(self.to_dict(), indent=2))
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        parts = []
+        for key in sorted(labels.keys()):
+            value = str(labels[key]).replace('\\', '\\\\')\
+                .replace('"', '\\"').replace('\n', '\\n')
+            parts.append(key + '="' + value + '"')
+        return '{' + ','.join(parts) + '}'
+
+    def to_prometheus(self):
+        """
+        :return: metrics in Prometheus text exposition format
+        :rtype: str
+        """
+        samples = {}
+        helps = {}
+
+        def add(metric, help_text, labels, value):
+            if value is None:
+                return
+            name = METRIC_PREFIX + metric
+            helps[name] = help_text
+            all_labels = dict(self._labels)
+            all_labels.update(labels)
+            samples.setdefault(name, []).append(
+                name + self._format_labels(all_labels) + ' ' + repr(value))
+
+        add('run_success', 'Whether last run succeeded', {},
+            None if self._success is None else int(self._success))
+        add('run_end_timestamp_seconds', 'End time of last run', {},
+            self._end)
+        add('run_wall_seconds', 'Wall time of last run', {},
+            self._wall_seconds)
+        add('run_cpu_seconds', 'CPU time of last run', {}, self._cpu_seconds)
+        add('run_peak_rss_bytes', 'Peak resident memory of last run', {},
+            get_peak_rss_bytes())
+        for stage in self._stages:
+            labels = dict(stage.labels)
+            labels['stage'] = stage.name
+            add('stage_wall_seconds', 'Wall time of stage', labels,
+                stage.wall_seconds)
+            add('stage_cpu_seconds', 'CPU time of stage', labels,
+                stage.cpu_seconds)
+            add('stage_peak_rss_bytes', 'Peak resident memory of process '
+                                        'at end of stage', labels,
+                stage.peak_rss_bytes)
+            add('stage_bytes', 'Bytes transferred by stage', labels,
+                stage.bytes)
+            for count_name in sorted(stage.counts.keys()):
+                count_labels = dict(labels)
+                count_labels['count'] = count_name
+                add('stage_elements', 'Element counts of stage',
+                    count_labels, stage.counts[count_name])
+
+        lines = []
+        for name in samples:
+            lines.append('# HELP ' + name + ' ' + helps[name])
+            lines.append('# TYPE ' + name + ' gauge')
+            lines.extend(samples[name])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Writes metrics as Prometheus textfile to `path`
+        """
+        self._write_atomically(path, self.to_prometheus())
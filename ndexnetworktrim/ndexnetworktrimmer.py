@@ -1,7 +1,12 @@
 #! /usr/bin/env python
 
 import argparse
+import copy
+import json
+import os
 import sys
+import shutil
+import tempfile
 import logging
 from logging import config
 from ndexutil.config import NDExUtilConfig
@@ -9,14 +14,61 @@ from ndexutil.config import NDExUtilConfig
 from datetime import datetime
 
 import ndexnetworktrim
-
-#from ndex2.client import Ndex2
-import ndex2
+from ndexnetworktrim.batch import BatchTrimmer
+from ndexnetworktrim.cache import NetworkCache
+from ndexnetworktrim.cache import get_summary_fingerprint
+from ndexnetworktrim.cascade import DependentAspectIndex
+from ndexnetworktrim.cascade import get_dependent_aspects
+from ndexnetworktrim.cascade import prune_element
+from ndexnetworktrim.cascade import set_dependent_aspect
+from ndexnetworktrim.collapse import AGGREGATES
+from ndexnetworktrim.collapse import MAX
+from ndexnetworktrim.collapse import get_parallel_edge_groups
+from ndexnetworktrim.collapse import merge_edge_attributes
+from ndexnetworktrim.cxstream import ChunkReader
+from ndexnetworktrim.cxstream import EDGES
+from ndexnetworktrim.cxstream import NODES
+from ndexnetworktrim.cxstream import StreamingCXTrimmer
+from ndexnetworktrim.cxstream import count_aspect_elements
+from ndexnetworktrim.cxstream import select_top_edges
+from ndexnetworktrim.columnar import EdgeAttributeIndex
+from ndexnetworktrim.columnar import NodeAttributeIndex
+from ndexnetworktrim.columnar import ThresholdSweep
+from ndexnetworktrim.columnar import select_top_k
+from ndexnetworktrim.compact import CompactNetwork
+from ndexnetworktrim.cxupload import NDExClientUploader
+from ndexnetworktrim.cxupload import StreamingCXUploader
+from ndexnetworktrim.cxupload import iter_cx_chunks
+from ndexnetworktrim.cxupload import iter_file_chunks
+from ndexnetworktrim.cxupload import iter_nice_cx_chunks
+from ndexnetworktrim.filterexpr import FilterExpression
+from ndexnetworktrim.graphindex import AdjacencyIndex
+from ndexnetworktrim.graphindex import NodeDegrees
+from ndexnetworktrim.graphindex import find_nodes
+from ndexnetworktrim.graphindex import get_disparity_alphas
+from ndexnetworktrim.graphindex import get_node_strengths
+from ndexnetworktrim.graphindex import select_components
+from ndexnetworktrim.metrics import RunMetrics
+from ndexnetworktrim.parallel import ColumnCutoff
+from ndexnetworktrim.parallel import evaluate_backbone
+from ndexnetworktrim.parallel import evaluate_filter
+from ndexnetworktrim.profiling import StreamingAttributeProfiler
+from ndexnetworktrim.snapshot import get_snapshot_size
+from ndexnetworktrim.service import TrimService
+from ndexnetworktrim.state import TrimState
+from ndexnetworktrim.state import get_network_id_from_url
+
+# ndex2 (which pulls in pandas and networkx) and requests are imported
+# where they are used so --help, --version and jobs that never touch
+# a NiceCXNetwork or the server start without loading them
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 TSV2NICECXMODULE = 'ndexutil.tsv.tsv2nicecx2'
 
+PARENT_URL = 'parentUrl'
+
 LOG_FORMAT = "%(asctime)-15s %(levelname)s %(relativeCreated)dms " \
              "%(filename)s::%(funcName)s():%(lineno)d %(message)s"
 
@@ -61,13 +113,243 @@ def _parse_arguments(desc, args):
                         version=('%(prog)s ' +
                                  ndexnetworktrim.__version__))
 
-
-    parser.add_argument('--uuid', help='UUID of network to be trimmed', required=True)
-
-    parser.add_argument('--edge_attr', help='Edge attribute to filter on', required=True)
-
-    parser.add_argument('--value', help='Value of edge attribute used as cut-off ', required=True)
-
+    parser.add_argument('--uuid', help='UUID of network to be trimmed. '
+                                       'If --input is also set, this is '
+                                       'only used to describe parent network')
+
+    parser.add_argument('--input', help='CX file with network to be '
+                                        'trimmed. If set, network is not '
+                                        'downloaded from NDEx server')
+
+    parser.add_argument('--output', help='File to write trimmed network '
+                                         'to as CX. If set, network is not '
+                                         'uploaded to NDEx server')
+
+    parser.add_argument('--manifest', help='CSV (with header row) or JSON '
+                                           'file listing networks to trim '
+                                           'with columns uuid, edge_attr, '
+                                           'value and optionally input and '
+                                           'output. If set, --uuid, --input, '
+                                           '--output, --edge_attr and '
+                                           '--value are ignored')
+
+    parser.add_argument('--pool_size', type=int, default=1,
+                        help='Number of worker processes trimming networks '
+                             'listed in --manifest or of worker threads '
+                             'running jobs of --serve (default 1)')
+
+    parser.add_argument('--report', help='File to write JSON summary of '
+                                         'jobs run from --manifest to')
+
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='If set, runs as a service trimming networks '
+                             'posted as JSON jobs to an HTTP API on PORT '
+                             'until interrupted, 0 picks a free port. '
+                             'Parsed parent networks and NDEx sessions '
+                             'are kept between jobs. --uuid, --input and '
+                             'other options of a single trim are ignored')
+
+    parser.add_argument('--serve_host', default='127.0.0.1',
+                        help='Host --serve listens on (default 127.0.0.1). '
+                             'There is no authentication, so this should '
+                             'not be reachable from other machines')
+
+    parser.add_argument('--serve_dir', help='Directory files named by jobs '
+                                            'of --serve via input, output '
+                                            'and seeds must be in. If '
+                                            'unset, jobs cannot name files '
+                                            'and trimmed networks are '
+                                            'uploaded to NDEx server')
+
+    parser.add_argument('--queue_size', type=int, default=100,
+                        help='Number of jobs of --serve that can wait for '
+                             'a worker, more are rejected (default 100)')
+
+    parser.add_argument('--network_cache_mb', type=float, default=1024,
+                        help='Size in megabytes of parsed parent networks '
+                             '--serve keeps in memory, least recently used '
+                             'are evicted first (default 1024)')
+
+    parser.add_argument('--edge_attr', help='Edge attribute to filter on')
+
+    parser.add_argument('--filter', help='Filter expression over edge '
+                                         'attributes used instead of '
+                                         '--edge_attr and --value, '
+                                         'for example: "score >= 0.5 and '
+                                         '(type in (\'a\', \'b\') or '
+                                         'pvalue between 0 and 0.05)". '
+                                         'Operators are >=, >, <=, <, ==, '
+                                         '!=, in, not in, between, and, '
+                                         'or, not. Names with spaces go '
+                                         'in back quotes. Edges lacking '
+                                         'an attribute do not satisfy '
+                                         'comparisons on it')
+
+    parser.add_argument('--value', nargs='+',
+                        help='Value of edge attribute used as cut-off. '
+                             'If several values are given, network is '
+                             'downloaded and sorted once and one trimmed '
+                             'network is created per value')
+
+    parser.add_argument('--top_k', type=int,
+                        help='Instead of a cut-off --value, keep the N edges '
+                             'with highest value of --edge_attr. Edges tied '
+                             'at the cut-off are kept lowest edge id first')
+
+    parser.add_argument('--top_fraction', type=float,
+                        help='Instead of a cut-off --value, keep this '
+                             'fraction (0 to 1) of edges of network with '
+                             'highest value of --edge_attr')
+
+    parser.add_argument('--backbone', action='store_true',
+                        help='Instead of a cut-off --value, keep edges '
+                             'significant under the disparity filter with '
+                             'numeric --edge_attr as weight, so weak edges '
+                             'of low degree nodes are kept if they matter '
+                             'locally')
+
+    parser.add_argument('--alpha', type=float, default=0.05,
+                        help='Significance level of --backbone, edges '
+                             'with a lower disparity alpha are kept '
+                             '(default 0.05)')
+
+    parser.add_argument('--node_attr', help='Node attribute to filter on. '
+                                            'Nodes that fail --node_value '
+                                            'are removed with their edges '
+                                            'before edges are trimmed')
+
+    parser.add_argument('--node_value',
+                        help='Value of node attribute used as cut-off. '
+                             'If numeric, nodes with value >= cut-off are '
+                             'kept, otherwise nodes with value equal to it')
+
+    parser.add_argument('--seeds', help='File with one node name or '
+                                        'represents per line. Network is '
+                                        'trimmed to the neighborhood of '
+                                        'matching nodes, after --value, '
+                                        '--filter or --top_k if set')
+
+    parser.add_argument('--hops', type=int, default=1,
+                        help='Number of hops from --seeds nodes kept '
+                             '(default 1)')
+
+    parser.add_argument('--min_component_size', type=int,
+                        help='If set, connected components of trimmed '
+                             'network with fewer nodes are removed')
+
+    parser.add_argument('--largest_component_only', action='store_true',
+                        help='If set, only the connected component of '
+                             'trimmed network with most nodes is kept')
+
+    parser.add_argument('--keep_parent_orphans', action='store_true',
+                        help='If set, nodes that had no edges in parent '
+                             'network are kept. By default they are '
+                             'removed along with nodes whose edges were '
+                             'all trimmed')
+
+    parser.add_argument('--collapse_parallel', action='store_true',
+                        help='If set, edges of trimmed network with the '
+                             'same source and target are collapsed into '
+                             'the one with lowest id. --edge_attr is '
+                             'aggregated per --collapse_aggregate, other '
+                             'edge attributes whose values differ become '
+                             'lists of their distinct values')
+
+    parser.add_argument('--collapse_aggregate', choices=AGGREGATES,
+                        default=MAX,
+                        help='How --edge_attr of parallel edges is '
+                             'aggregated by --collapse_parallel: maximum '
+                             'or mean of numeric values or number of '
+                             'edges collapsed. Edges without parallel '
+                             'edges keep their value (default max)')
+
+    parser.add_argument('--collapse_by_interaction', action='store_true',
+                        help='If set, --collapse_parallel only collapses '
+                             'edges that also have the same interaction')
+
+    parser.add_argument('--cache_dir', help='Directory to cache downloaded '
+                                            'networks in. A cached network '
+                                            'is only downloaded again if '
+                                            'its modification time or size '
+                                            'on server changed')
+
+    parser.add_argument('--cache_max_mb', type=float, default=10240,
+                        help='Size cap of --cache_dir in megabytes. Least '
+                             'recently used networks are evicted once it '
+                             'is exceeded (default 10240)')
+
+    parser.add_argument('--streaming', action='store_true',
+                        help='If set, network is streamed from server to a '
+                             'temporary file and trimmed aspect by aspect '
+                             'without building the whole network in memory. '
+                             'Peak memory then depends on number of edges '
+                             'kept rather than on size of parent network')
+
+    parser.add_argument('--compact', action='store_true',
+                        help='If set, network is held in NumPy arrays '
+                             'and typed attribute columns instead of a '
+                             'NiceCXNetwork and only converted back to CX '
+                             'when saved. Uses several times less memory')
+
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes evaluating --filter, '
+                             '--value or --backbone over chunks of edges '
+                             'held in shared memory. Networks too small '
+                             'to split are evaluated in one process '
+                             '(default 1)')
+
+    parser.add_argument('--profile_attribute',
+                        help='Dry run: instead of trimming, profile this '
+                             'edge attribute in a streaming pass and print '
+                             'a JSON report of its types, missing and '
+                             'distinct values, quantiles and edges and '
+                             'nodes kept at each --value, or at quantiles '
+                             'if --value is unset. Nothing is uploaded')
+
+    parser.add_argument('--export_snapshot',
+                        help='Directory to save the parsed network to as a '
+                             'binary columnar snapshot, instead of trimming '
+                             'it. Load it with --snapshot')
+
+    parser.add_argument('--snapshot',
+                        help='Directory of snapshot written by '
+                             '--export_snapshot to trim instead of --input '
+                             'or a download. Arrays of the snapshot are '
+                             'memory mapped, implies --compact')
+
+    parser.add_argument('--state_file', help='JSON file recording the '
+                                             'network derived by each trim '
+                                             'and the modification time '
+                                             'of its parent. Run is skipped '
+                                             'if parent did not change since '
+                                             'last run, otherwise derived '
+                                             'network is updated in place '
+                                             'instead of creating a new one. '
+                                             'Needs --uuid')
+
+    parser.add_argument('--metrics_json', help='File to write JSON metrics '
+                                               'of run to: wall time, CPU '
+                                               'time, peak RSS, bytes '
+                                               'transferred and element '
+                                               'counts of each stage')
+
+    parser.add_argument('--metrics_prom', help='File to write metrics of '
+                                               'run to in Prometheus text '
+                                               'format, for the node '
+                                               'exporter textfile collector')
+
+    parser.add_argument('--stream_upload', action='store_true',
+                        help='If set, CX is uploaded to server as a '
+                             'chunked request body while it is '
+                             'serialized instead of via the upload '
+                             'methods of the NDEx client')
+
+    parser.add_argument('--gzip_upload', action='store_true',
+                        help='If set, CX uploaded to server is gzip '
+                             'compressed on the fly and sent with '
+                             'Content-Encoding gzip. Server must '
+                             'support compressed request bodies. '
+                             'Implies --stream_upload')
 
     return parser.parse_args(args)
 
@@ -113,23 +395,216 @@ class NDExNetworkTrimmer(object):
 
         self._ndex = None
         self._network = None
+        self._network_cache = None
+        self._node_degrees = None
+        self._dependent_aspect_index = None
 
         self._uuid = args.uuid
+        self._input = args.input
+        self._output = args.output
         self._edge_attr = args.edge_attr
-        self._value = args.value
+        self._values = args.value
+        if self._values is not None and not isinstance(self._values, list):
+            self._values = [self._values]
+
+        self._filter = None
+        if args.filter is not None:
+            self._filter = FilterExpression(args.filter)
+
+        self._top_k = args.top_k
+        self._top_fraction = args.top_fraction
+        self._top_threshold = None
+
+        self._backbone = args.backbone
+        self._alpha = args.alpha
+
+        self._node_attr = args.node_attr
+        self._node_value = args.node_value
+        self._node_numeric_value = None
+        if self._node_value is not None:
+            self._node_numeric_value = self._get_numeric_value(
+                self._node_value)
+
+        self._seeds = args.seeds
+        self._hops = args.hops
+        self._seed_node_ids = None
+        self._adjacency_index = None
+        self._neighborhood_node_ids = None
+
+        self._min_component_size = args.min_component_size
+        self._largest_component_only = args.largest_component_only
+
+        self._keep_parent_orphans = args.keep_parent_orphans
+        self._collapse_parallel = args.collapse_parallel
+        self._collapse_aggregate = args.collapse_aggregate
+        self._collapse_by_interaction = args.collapse_by_interaction
+        self._streaming = args.streaming
+        self._profile_attribute = args.profile_attribute
+        self._workers = args.workers
+        self._snapshot = args.snapshot
+        self._snapshot_properties = {}
+        self._export_snapshot = args.export_snapshot
+        self._compact = args.compact or self._snapshot is not None or\
+            self._export_snapshot is not None
+        self._stream_upload = args.stream_upload or args.gzip_upload
+        self._gzip_upload = args.gzip_upload
+        self._cache_dir = args.cache_dir
+        self._cache_max_mb = args.cache_max_mb
+        self._state_file = args.state_file
+        self._state = None
+        self._parent_summary = None
+
+        self._metrics_json = args.metrics_json
+        self._metrics_prom = args.metrics_prom
+        self._metrics = RunMetrics(
+            labels={'network': self._uuid or self._input})
 
         self._is_value_numeric = False
-
-
+        self._value = None
+        self._numeric_value = None
+        if self._values:
+            self._is_value_numeric = all(self._get_numeric_value(v) is not None
+                                         for v in self._values)
+            self._set_value(self._values[0])
+
+    @staticmethod
+    def _get_numeric_value(value):
+        """
+        :return: value converted to int or float or None if
+                 it is not a number
+        """
         try:
-            int(self._value)
-            self._is_value_numeric = True
+            return int(value)
         except ValueError:
             try:
-                float(self._value)
-                self._is_value_numeric = True
+                return float(value)
             except ValueError:
-                pass
+                return None
+
+    def _set_value(self, value):
+        """
+        Sets cut-off value used by filter
+        :param value: cut-off as passed on command line
+        """
+        self._value = value
+        if self._is_value_numeric:
+            self._numeric_value = self._get_numeric_value(value)
+
+    def _is_sweep(self):
+        """
+        :return: True if more than one cut-off value was given
+        """
+        return self._values is not None and len(self._values) > 1
+
+    def _is_top_selection(self):
+        """
+        :return: True if edges are picked via --top_k or --top_fraction
+        """
+        return self._top_k is not None or self._top_fraction is not None
+
+    def _get_top_k(self, number_of_edges):
+        """
+        :param number_of_edges: number of edges in parent network, only
+                                used with --top_fraction
+        :return: number of edges to keep
+        """
+        if self._top_k is not None:
+            return self._top_k
+        return int(round(self._top_fraction * number_of_edges))
+
+    def _check_top_selection_args(self):
+        """
+        :raises Exception: if --top_k or --top_fraction is set along with
+                           incompatible arguments
+        """
+        if self._top_k is not None and self._top_fraction is not None:
+            raise Exception('--top_k cannot be combined with --top_fraction')
+        if self._edge_attr is None:
+            raise Exception('--top_k and --top_fraction need --edge_attr')
+        if self._values or self._filter is not None:
+            raise Exception('--top_k and --top_fraction cannot be combined '
+                            'with --value or --filter')
+        if self._top_k is not None and self._top_k < 0:
+            raise Exception('--top_k must not be negative')
+        if self._top_fraction is not None and not 0 <= self._top_fraction <= 1:
+            raise Exception('--top_fraction must be between 0 and 1')
+
+    def _check_backbone_args(self):
+        """
+        :raises Exception: if --backbone is set along with incompatible
+                           arguments
+        """
+        if self._edge_attr is None:
+            raise Exception('--backbone needs --edge_attr')
+        if self._values or self._filter is not None or \
+                self._is_top_selection():
+            raise Exception('--backbone cannot be combined with --value, '
+                            '--filter, --top_k or --top_fraction')
+        if not 0 < self._alpha <= 1:
+            raise Exception('--alpha must be greater than 0 and at most 1')
+
+    def get_metrics(self):
+        """
+        :return: metrics of stages run so far
+        :rtype: :py:class:`~ndexnetworktrim.metrics.RunMetrics`
+        """
+        return self._metrics
+
+    def _write_metrics(self, success):
+        """
+        Records end of run and writes metrics to --metrics_json
+        and --metrics_prom files if set
+        :param success: True if run succeeded
+        """
+        self._metrics.finish(success)
+        if self._metrics_json is not None:
+            self._metrics.write_json(self._metrics_json)
+        if self._metrics_prom is not None:
+            self._metrics.write_prometheus(self._metrics_prom)
+
+    def set_ndex_connection(self, server, user, password, client):
+        """
+        Sets NDEx server, credentials and client to use instead of
+        parsing configuration. Lets a caller trimming many networks
+        reuse one client and its HTTP session
+        """
+        self._server = server
+        self._user = user
+        self._pass = password
+        self._ndex = client
+
+    def set_network_cache(self, network_cache):
+        """
+        Sets in-memory cache of parsed parent networks shared with other
+        trimmers in this process. Parent is then parsed once and each
+        trim works on a shallow copy of it
+        :param network_cache: cache of parent networks
+        :type network_cache:
+                   :py:class:`~ndexnetworktrim.cache.MemoryNetworkCache`
+        """
+        self._network_cache = network_cache
+
+    def get_ndex_connection(self):
+        """
+        :return: (server, user, password, client) tuple suitable for
+                 :py:func:`set_ndex_connection` or None if configuration
+                 has not been parsed
+        """
+        if self._server is None:
+            return None
+        return self._server, self._user, self._pass, self._get_ndex_client()
+
+    def _is_config_needed(self):
+        """
+        Configuration with NDEx credentials is only needed
+        if network is downloaded from or uploaded to NDEx server
+        :return: True if configuration needs to be parsed
+        """
+        is_download = self._input is None and self._snapshot is None
+        if self._profile_attribute is not None or \
+                self._export_snapshot is not None:
+            return is_download
+        return is_download or self._output is None
 
 
     def _get_user_agent(self):
@@ -164,13 +639,414 @@ class NDExNetworkTrimmer(object):
 
     def _get_network_from_server(self):
         """
+        Downloads network from server, or from --cache_dir if cached
+        :return: size of CX of network in bytes
+        """
+        if self._cache_dir is not None:
+            return self._read_network_file(self._get_cached_network_path())
+
+        resp = self._get_ndex_client().get_network_as_cx_stream(self._uuid)
+
+        if self._compact:
+            # parsed as it arrives, the CX is never held whole
+            reader = ChunkReader(resp.iter_content(chunk_size=1048576))
+            self._network = CompactNetwork.from_cx_stream(reader)
+            return reader.get_bytes_read()
+
+        import ndex2
+        content = resp.content
+        self._network = ndex2.create_nice_cx_from_raw_cx(json.loads(content))
+        return len(content)
+
+    def _read_network_file(self, path):
+        """
+        Loads network from CX file as a NiceCXNetwork or, if --compact
+        is set, as a CompactNetwork
+        :param path: path to CX file
+        :return: size of CX file in bytes
+        """
+        if self._compact:
+            with open(path, 'rb') as f:
+                self._network = CompactNetwork.from_cx_stream(f)
+        else:
+            import ndex2
+            self._network = ndex2.create_nice_cx_from_file(path)
+
+        return os.path.getsize(path)
+
+    def _get_network_from_file(self):
+        """
+        Loads network from CX file set via --input
+        :return: size of CX file in bytes
+        """
+        return self._read_network_file(self._input)
+
+    def _get_network_from_snapshot(self):
+        """
+        Maps network from snapshot set via --snapshot
+        :return: size of snapshot in bytes
+        """
+        self._network, self._snapshot_properties =\
+            CompactNetwork.from_snapshot(self._snapshot)
+        return get_snapshot_size(self._snapshot)
+
+    def _get_network(self):
+        """
+        Loads network from --snapshot or --input file if set
+        otherwise from server
+        :return: size of CX of network in bytes
+        """
+        if self._snapshot is not None:
+            return self._get_network_from_snapshot()
+        if self._network_cache is not None:
+            return self._get_network_from_memory_cache()
+        if self._input is not None:
+            return self._get_network_from_file()
+        return self._get_network_from_server()
+
+    def _get_network_cache_key(self):
+        """
+        :return: key of parent network in in-memory cache that changes
+                 when parent changes, or None if it cannot be told
+                 if parent changed
+        """
+        if self._input is not None:
+            stat = os.stat(self._input)
+            return (os.path.abspath(self._input), stat.st_mtime_ns,
+                    stat.st_size, self._compact)
+
+        fingerprint = get_summary_fingerprint(self._get_parent_summary())
+        if not fingerprint:
+            return None
+        return (self._server, self._uuid,
+                json.dumps(fingerprint, sort_keys=True), self._compact)
+
+    def _get_network_from_memory_cache(self):
+        """
+        Gets parent network from in-memory cache, loading it from --input
+        file or server if it is not cached, and sets network to a shallow
+        copy of it that can be trimmed without altering parent
+        :return: size of CX of network in bytes, 0 if it was cached
+        """
+        if self._input is not None:
+            load = self._get_network_from_file
+        else:
+            load = self._get_network_from_server
+        key = self._get_network_cache_key()
+        if key is None:
+            return load()
+
+        def load_parent():
+            size = load()
+            return self._network, size
+
+        parent, size, cached = self._network_cache.get_or_load(key,
+                                                               load_parent)
+        if isinstance(parent, CompactNetwork):
+            edge_ids = parent.get_edge_ids()
+        else:
+            edge_ids = list(parent.edges.keys())
+        self._network = self._derive_network(parent, edge_ids)
+        if cached:
+            logger.info('Using parent network parsed by an earlier job')
+            return 0
+        return size
+
+    @staticmethod
+    def _get_edge_count(network):
+        """
+        :return: number of edges of NiceCXNetwork or CompactNetwork
+        """
+        if isinstance(network, CompactNetwork):
+            return network.get_edge_count()
+        return len(network.edges)
+
+    @staticmethod
+    def _get_node_count(network):
+        """
+        :return: number of nodes of NiceCXNetwork or CompactNetwork
+        """
+        if isinstance(network, CompactNetwork):
+            return network.get_node_count()
+        return len(network.nodes)
+
+    def _get_output_path(self):
+        """
+        Gets path to write trimmed network to. When sweeping several
+        cut-off values, the value is appended to name of --output file
+        :return: path or None if --output is not set
+        """
+        if self._output is None or not self._is_sweep():
+            return self._output
+        root, ext = os.path.splitext(self._output)
+        return root + '_' + str(self._value) + ext
+
+    def _get_cx_chunks(self, stage=None):
+        """
+        :param stage: if set, size of chunks is added to bytes of stage
+        :type stage: :py:class:`~ndexnetworktrim.metrics.StageMetrics`
+        :return: chunks of CX of network
+        """
+        if self._compact:
+            chunks = iter_cx_chunks(self._network.get_fragments())
+        else:
+            chunks = iter_nice_cx_chunks(self._network)
+        if stage is None:
+            return chunks
+        return stage.count_chunks(chunks)
+
+    def _write_network_to_file(self, stage=None):
+        """
+        Writes network as CX to file set via --output
+        """
+        with open(self._get_output_path(), 'wb') as f:
+            for chunk in self._get_cx_chunks(stage):
+                f.write(chunk)
+
+        return 0
+
+    def _get_uploader(self):
+        """
+        :return: uploader that streams CX to server if --stream_upload
+                 is set, otherwise one using the NDEx client
+        """
+        if not self._stream_upload:
+            return NDExClientUploader(self._get_ndex_client())
+        return StreamingCXUploader(self._get_ndex_client(),
+                                   user_agent=self._get_user_agent(),
+                                   gzip=self._gzip_upload)
+
+    def _save_network(self, stage=None):
         """
+        Writes network to --output file if set otherwise uploads
+        it to server as a new network
+        :param stage: if set, bytes written are added to it
+        :type stage: :py:class:`~ndexnetworktrim.metrics.StageMetrics`
+        """
+        if self._output is not None:
+            return self._write_network_to_file(stage)
+
+        network_id = self._upload(lambda: self._get_cx_chunks(stage))
 
-        self._network = ndex2.create_nice_cx_from_server(
-            server=self._server, uuid=self._uuid, username=self._user, password=self._pass)
+        logger.info('Saved ' + self._network.get_name() + ' as network ' +
+                    network_id)
 
         return 0
 
+    def _get_state_key(self, value):
+        """
+        :param value: cut-off value of trim or None
+        :return: key of trim in --state_file made of parent network
+                 and trim parameters
+        """
+        return json.dumps({'server': self._server,
+                           'uuid': self._uuid,
+                           'edge_attr': self._edge_attr,
+                           'value': value,
+                           'filter': None if self._filter is None
+                           else str(self._filter),
+                           'top_k': self._top_k,
+                           'top_fraction': self._top_fraction,
+                           'backbone': self._backbone,
+                           'alpha': self._alpha if self._backbone else None,
+                           'node_attr': self._node_attr,
+                           'node_value': self._node_value,
+                           'seeds': self._seeds,
+                           'hops': self._hops,
+                           'min_component_size': self._min_component_size,
+                           'largest_component_only':
+                               self._largest_component_only,
+                           'keep_parent_orphans': self._keep_parent_orphans,
+                           'collapse_parallel': self._collapse_parallel,
+                           'collapse_aggregate':
+                               self._collapse_aggregate
+                               if self._collapse_parallel else None,
+                           'collapse_by_interaction':
+                               self._collapse_by_interaction
+                               if self._collapse_parallel else None},
+                          sort_keys=True)
+
+    def _get_parent_summary(self):
+        """
+        Gets network summary of parent from server, fetching it on
+        first call so it describes the parent as it was downloaded
+        :return: network summary
+        :rtype: dict
+        """
+        if self._parent_summary is None:
+            self._parent_summary =\
+                self._get_ndex_client().get_network_summary(self._uuid)
+        return self._parent_summary
+
+    def _is_parent_unchanged(self):
+        """
+        :return: True if --state_file records a derived network for every
+                 cut-off value and parent did not change since they were
+                 derived
+        """
+        self._state = TrimState(self._state_file)
+        summary = self._get_parent_summary()
+        return all(self._state.is_current(self._get_state_key(value), summary)
+                   for value in self._values or [None])
+
+    def _upload(self, get_chunks):
+        """
+        Uploads network as a new network or, if --state_file records a
+        network derived by an earlier run of the same trim, replaces
+        that network
+        :param get_chunks: function returning chunks of CX, called again
+                           if recorded network no longer exists
+        :return: UUID of network on server
+        """
+        uploader = self._get_uploader()
+        network_id = None
+        if self._state is not None:
+            key = self._get_state_key(self._value)
+            network_id = self._state.get_derived_network_id(key)
+
+        if network_id is not None:
+            import requests
+            try:
+                uploader.update(network_id, get_chunks())
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                logger.warning('Network ' + network_id + ' derived by '
+                               'last run no longer exists, creating a '
+                               'new one')
+                network_id = None
+
+        if network_id is None:
+            network_id = get_network_id_from_url(uploader.upload(get_chunks()))
+
+        if self._state is not None:
+            self._state.record(key, self._get_parent_summary(), network_id)
+        return network_id
+
+    def _check_if_node_attribute_complies(self, attribute):
+        """
+        :param attribute: nodeAttributes element
+        :return: True if attribute is --node_attr and passes --node_value
+        """
+        if attribute.get('n') != self._node_attr:
+            return False
+        if self._node_numeric_value is None:
+            return attribute.get('v') == self._node_value
+        try:
+            return float(attribute.get('v')) >= self._node_numeric_value
+        except (TypeError, ValueError):
+            return False
+
+    def _get_node_attribute_filter(self):
+        """
+        :return: node attribute filter for
+                 :py:class:`~ndexnetworktrim.cxstream.StreamingCXTrimmer`
+                 or None if nodes are not filtered
+        """
+        if self._node_attr is None:
+            return None
+        return self._check_if_node_attribute_complies
+
+    def _get_rejected_node_ids(self):
+        """
+        Evaluates --node_attr and --node_value against a column of the
+        node attribute
+        :return: ids of nodes that fail node filter
+        """
+        if self._compact:
+            node_ids = self._network.get_node_ids()
+            column = self._network.get_node_column(self._node_attr)
+        else:
+            node_index = NodeAttributeIndex(self._network)
+            node_ids = node_index.get_node_ids()
+            column = node_index.get_column(self._node_attr)
+
+        if self._node_numeric_value is None:
+            keep_mask = column.equal(self._node_value)
+        else:
+            keep_mask = column.greater_equal(self._node_numeric_value)
+
+        return node_ids[~keep_mask]
+
+    def _remove_nodes_by_attribute(self):
+        """
+        Removes edges of nodes that fail --node_attr and --node_value,
+        found from the adjacency index in time proportional to their
+        degrees. The nodes are then removed as orphans
+        :return: (number of nodes rejected, number of edges removed)
+        """
+        node_ids = self._get_rejected_node_ids()
+        edge_ids = self._get_adjacency_index().get_incident_edge_ids(node_ids)
+
+        node_degrees = self._get_node_degrees()
+        node_degrees.remove_edges(edge_ids)
+        node_degrees.reject_nodes(node_ids)
+        self._delete_edges(edge_ids)
+
+        logger.info('{} nodes fail node filter, removed their {} '
+                    'edges'.format(len(node_ids), len(edge_ids)))
+
+        return len(node_ids), len(edge_ids)
+
+    def _delete_edges(self, edge_ids):
+        """
+        Deletes edges and their attributes from network
+        :param edge_ids: ids of edges to delete
+        :type edge_ids: :py:class:`numpy.ndarray`
+        """
+        if self._compact:
+            self._network.keep_edges(
+                ~np.isin(self._network.get_edge_ids(), edge_ids))
+            return
+
+        for key in edge_ids.tolist():
+            del self._network.edges[key]
+            self._network.edgeAttributes.pop(key, None)
+
+    def _collapse_parallel_edges(self):
+        """
+        Collapses each group of parallel edges into the edge with
+        lowest id, merging attributes of the group into it. Other
+        edges of group are removed like trimmed edges
+        :return: number of groups collapsed
+        """
+        groups = get_parallel_edge_groups(
+            self._network, by_interaction=self._collapse_by_interaction)
+        if not groups:
+            return 0
+
+        if self._compact:
+            attributes = self._network.get_edge_attribute_elements(
+                np.concatenate(groups))
+        else:
+            attributes = self._network.edgeAttributes
+
+        merged = {}
+        for group in groups:
+            edge_ids = group.tolist()
+            merged[edge_ids[0]] = merge_edge_attributes(
+                edge_ids[0], [attributes.get(e) for e in edge_ids],
+                attribute_name=self._edge_attr,
+                aggregate=self._collapse_aggregate)
+
+        if self._compact:
+            self._network.replace_edge_attributes(merged)
+        else:
+            # new lists so networks derived from same parent are unaltered
+            for edge_id, elements in merged.items():
+                if elements:
+                    self._network.edgeAttributes[edge_id] = elements
+
+        collapsed = np.concatenate([group[1:] for group in groups])
+        self._get_node_degrees().remove_edges(collapsed)
+        self._delete_edges(collapsed)
+
+        logger.info('collapsed {} edges into {} groups of parallel '
+                    'edges'.format(len(collapsed) + len(groups),
+                                   len(groups)))
+
+        return len(groups)
+
 
     def _check_if_edge_attribute_complies(self, edge_attributes):
 
@@ -179,8 +1055,13 @@ class NDExNetworkTrimmer(object):
 
         if self._is_value_numeric:
             for attribute in edge_attributes:
-                if attribute['n'] == self._edge_attr and attribute['v'] >= self._value:
-                    return True
+                if attribute['n'] != self._edge_attr:
+                    continue
+                try:
+                    if float(attribute['v']) >= self._numeric_value:
+                        return True
+                except (TypeError, ValueError):
+                    pass
         else:
             for attribute in edge_attributes:
                 if attribute['n'] == self._edge_attr and attribute['v'] == self._value:
@@ -188,26 +1069,327 @@ class NDExNetworkTrimmer(object):
 
         return False
 
+    def _get_edge_keep_mask(self, edge_index):
+        """
+        Evaluates cut-off against filter attribute column
+        :param edge_index: columnar index of edge attributes
+        :type edge_index:
+            :py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex`
+        :return: boolean mask aligned with edge ids of index that
+                 is True for edges to keep
+        """
+        if self._workers > 1 and not self._is_top_selection():
+            return self._get_parallel_edge_keep_mask(edge_index)
+
+        if self._filter is not None:
+            return self._filter.evaluate_index(edge_index)
+
+        if self._backbone:
+            return self._get_backbone_mask(edge_index)
+
+        column = edge_index.get_column(self._edge_attr)
+
+        if self._is_top_selection():
+            edge_ids = edge_index.get_edge_ids()
+            keep_mask, self._top_threshold = select_top_k(
+                column, edge_ids, self._get_top_k(len(edge_ids)))
+            return keep_mask
+
+        if self._is_value_numeric:
+            return column.greater_equal(self._numeric_value)
+
+        return column.equal(self._value)
+
+    def _get_parallel_edge_keep_mask(self, edge_index):
+        """
+        Evaluates --filter, cut-off or --backbone in --workers processes
+        over chunks of edges
+        :param edge_index: columnar index of edge attributes
+        :type edge_index:
+            :py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex`
+        :return: boolean mask aligned with edge ids of index that
+                 is True for edges to keep
+        """
+        if self._backbone:
+            weights, missing = edge_index.get_column(
+                self._edge_attr).get_numeric_values()
+            edge_ids, sources, targets, weights, strengths, degrees = \
+                get_node_strengths(self._network, weights, missing=missing)
+            return evaluate_backbone(sources, targets, weights, strengths,
+                                     degrees, self._alpha, self._workers)
+
+        expression = self._filter
+        if expression is None:
+            value = self._value
+            if self._is_value_numeric:
+                value = self._numeric_value
+            expression = ColumnCutoff(self._edge_attr, value,
+                                      self._is_value_numeric)
+        columns = edge_index.get_columns(expression.get_attribute_names())
+        return evaluate_filter(expression, columns,
+                               len(edge_index.get_edge_ids()), self._workers)
+
+    def _get_backbone_mask(self, edge_index):
+        """
+        Evaluates disparity filter over --edge_attr as weight
+        :param edge_index: columnar index of edge attributes
+        :type edge_index:
+            :py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex`
+        :return: boolean mask aligned with edge ids of index that
+                 is True for edges with alpha below --alpha
+        """
+        # columns of index are in order of edges of network
+        weights, missing = edge_index.get_column(
+            self._edge_attr).get_numeric_values()
+        edge_ids, alphas = get_disparity_alphas(self._network, weights,
+                                                missing=missing)
+        with np.errstate(invalid='ignore'):
+            return alphas < self._alpha
+
+    def _get_node_degrees(self):
+        """
+        Gets degrees of nodes of network, building them on first call.
+        Edges removed from network must be removed from it too
+        :rtype: :py:class:`~ndexnetworktrim.graphindex.NodeDegrees`
+        """
+        if self._node_degrees is None:
+            self._node_degrees = NodeDegrees(self._network)
+        return self._node_degrees
+
+    def _get_orphan_node_ids(self):
+        """
+        :return: ids of nodes without edges that are to be removed.
+                 Nodes outside neighborhood of --seeds are removed
+                 even if --keep_parent_orphans is set
+        """
+        node_degrees = self._get_node_degrees()
+        orphans = node_degrees.get_orphans(
+            include_parent_orphans=not self._keep_parent_orphans)
+        if self._keep_parent_orphans and \
+                self._neighborhood_node_ids is not None:
+            outside = np.setdiff1d(node_degrees.get_parent_orphans(),
+                                   self._neighborhood_node_ids)
+            orphans = np.union1d(orphans, outside)
+        return orphans
+
+    def _has_component_filter(self):
+        """
+        :return: True if --min_component_size or --largest_component_only
+                 is set
+        """
+        return self._min_component_size is not None or \
+            self._largest_component_only
+
+    def _remove_small_components(self):
+        """
+        Removes edges, and their attributes, of connected components
+        rejected by --min_component_size or --largest_component_only.
+        Their nodes are left as orphans for :py:func:`_remove_orphan_nodes`
+        :return: number of edges removed
+        """
+        edge_ids = self._get_node_degrees().remove_components(
+            min_size=self._min_component_size,
+            largest_only=self._largest_component_only,
+            count_parent_orphans=self._keep_parent_orphans)
+
+        self._delete_edges(edge_ids)
+
+        logger.info('removed {} edges of rejected connected '
+                    'components'.format(len(edge_ids)))
+
+        return len(edge_ids)
+
+    def _select_components(self, node_ids, edge_ids, sources, targets):
+        """
+        Streaming counterpart of :py:func:`_remove_small_components`
+        :param node_ids: ids of kept nodes
+        :param edge_ids: ids of kept edges
+        :param sources: source node ids of kept edges
+        :param targets: target node ids of kept edges
+        :return: sets of ids of nodes and of edges in kept components
+        """
+        node_ids = np.fromiter(node_ids, dtype=np.int64, count=len(node_ids))
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        node_mask, edge_mask = select_components(
+            node_ids, sources, targets, min_size=self._min_component_size,
+            largest_only=self._largest_component_only)
+        return (set(node_ids[node_mask].tolist()),
+                set(edge_ids[edge_mask].tolist()))
+
+    def _has_edge_filter(self):
+        """
+        :return: True if edges are filtered via --value, --filter, --top_k
+                 or --top_fraction as opposed to only via --seeds
+        """
+        return self._filter is not None or bool(self._values) or \
+            self._is_top_selection() or self._backbone
+
+    def _read_seeds(self):
+        """
+        :return: node names or represents listed in --seeds file,
+                 skipping blank lines and lines starting with #
+        """
+        with open(self._seeds, 'r') as f:
+            return [line.strip() for line in f
+                    if line.strip() and not line.startswith('#')]
+
+    def _get_seed_node_ids(self):
+        """
+        Gets ids of nodes matching --seeds, looking them up on first call
+        :raises Exception: if no node matches
+        :return: ids of seed nodes
+        """
+        if self._seed_node_ids is None:
+            seeds = self._read_seeds()
+            self._seed_node_ids, missing = find_nodes(self._network, seeds)
+            if len(self._seed_node_ids) == 0:
+                raise Exception('None of the ' + str(len(seeds)) +
+                                ' seeds in ' + self._seeds +
+                                ' match a node name or represents')
+            if missing:
+                logger.warning('{} of {} seeds match no node: {}'.format(
+                    len(missing), len(seeds), ', '.join(missing[:10])))
+        return self._seed_node_ids
+
+    def _get_adjacency_index(self):
+        """
+        Gets adjacency of network, building it on first call. When
+        sweeping it is built once for parent network
+        :rtype: :py:class:`~ndexnetworktrim.graphindex.AdjacencyIndex`
+        """
+        if self._adjacency_index is None:
+            self._adjacency_index = AdjacencyIndex(self._network)
+        return self._adjacency_index
+
+    def _get_neighborhood_edge_ids(self, edge_ids):
+        """
+        Restricts edges to neighborhood of --seeds, recording nodes
+        of neighborhood
+        :param edge_ids: ids of edges passing edge filter
+        :return: ids of edges in `edge_ids` with both end points
+                 at most --hops edges away from a seed
+        """
+        self._neighborhood_node_ids, edge_ids =\
+            self._get_adjacency_index().get_neighborhood(
+                self._get_seed_node_ids(), self._hops, edge_ids=edge_ids)
+        logger.info('{} nodes within {} hops of {} seeds'.format(
+            len(self._neighborhood_node_ids), self._hops,
+            len(self._get_seed_node_ids())))
+        return edge_ids
+
+    def _get_dependent_aspect_index(self):
+        """
+        Gets reverse indexes from nodes and edges to elements of other
+        aspects, building them on first call. When sweeping they are
+        built once for parent network
+        :rtype: :py:class:`~ndexnetworktrim.cascade.DependentAspectIndex`
+        """
+        if self._dependent_aspect_index is None:
+            self._dependent_aspect_index = DependentAspectIndex(
+                get_dependent_aspects(self._network))
+        return self._dependent_aspect_index
+
+    def _prune_dependent_aspects(self):
+        """
+        Removes elements of aspects such as cartesianLayout, citations
+        and supports that refer to edges and nodes removed by
+        :py:func:`_trim_edges` and :py:func:`_remove_orphan_nodes`
+        :return: number of elements removed
+        """
+        pruned, removed = self._get_dependent_aspect_index().prune(
+            self._get_orphan_node_ids(),
+            self._get_node_degrees().get_removed_edge_ids())
+
+        for name, elements in pruned.items():
+            set_dependent_aspect(self._network, name, elements)
+
+        logger.info('removed {} elements of aspects referring to removed '
+                    'nodes and edges'.format(removed))
+
+        return removed
+
+    def _get_edge_index(self):
+        """
+        :return: columnar index of edge attributes of network, a
+                 CompactNetwork is its own index
+        :rtype: :py:class:`~ndexnetworktrim.columnar.EdgeAttributeIndex`
+        """
+        if self._compact:
+            return self._network
+        return EdgeAttributeIndex(self._network)
 
 
     def _trim_edges(self):
 
-        edges_to_del = []
+        edge_index = self._get_edge_index()
+
+        node_degrees = self._get_node_degrees()
+
+        if self._has_edge_filter():
+            keep_mask = self._get_edge_keep_mask(edge_index)
+        else:
+            keep_mask = np.ones(len(edge_index.get_edge_ids()), dtype=bool)
+
+        if self._seeds is not None:
+            edge_ids = edge_index.get_edge_ids()
+            keep_mask = np.isin(edge_ids, self._get_neighborhood_edge_ids(
+                edge_ids[keep_mask]))
 
-        for key in self._network.edges.keys():
-            edge_attribute_id = self._network.edges[key]['@id']
-            edge_attributes = self._network.edgeAttributes[edge_attribute_id]
+        edges_to_del = edge_index.get_edge_ids()[~keep_mask]
 
-            if not self._check_if_edge_attribute_complies(edge_attributes):
-                edges_to_del.append(key)
+        node_degrees.remove_edges(edges_to_del)
 
-        for key in edges_to_del:
-            edge_attribute_id = self._network.edges[key]['@id']
+        if self._compact:
+            self._network.keep_edges(keep_mask)
+            return
+
+        for key in edges_to_del.tolist():
             del self._network.edges[key]
-            del self._network.edgeAttributes[edge_attribute_id]
+            self._network.edgeAttributes.pop(key, None)
 
 
     def _get_filter_expression_as_string(self):
+        filters = []
+        if self._has_edge_filter():
+            filters.append(self._get_edge_filter_as_string())
+        if self._node_attr is not None:
+            filters.append(self._get_node_filter_as_string())
+        filter_as_str = ' and '.join(filters)
+
+        if self._seeds is None:
+            return filter_as_str
+
+        neighborhood = str(self._hops) + '-hop neighborhood of ' +\
+            os.path.basename(self._seeds)
+        if not filters:
+            return neighborhood
+        return filter_as_str + ' in ' + neighborhood
+
+    def _get_node_filter_as_string(self):
+        if self._node_numeric_value is None:
+            return 'node ' + self._node_attr + ' = ' + self._node_value
+        return 'node ' + self._node_attr + ' >= ' + self._node_value
+
+    def _get_edge_filter_as_string(self):
+        if self._filter is not None:
+            return str(self._filter)
+
+        if self._backbone:
+            return 'disparity backbone of ' + self._edge_attr +\
+                ' at alpha ' + '{:g}'.format(self._alpha)
+
+        if self._is_top_selection():
+            if self._top_k is not None:
+                selection = 'top ' + str(self._top_k) + ' edges by ' +\
+                    self._edge_attr
+            else:
+                selection = 'top ' + '{:g}'.format(self._top_fraction * 100) +\
+                    '% of edges by ' + self._edge_attr
+            if self._top_threshold is None:
+                return selection
+            return self._edge_attr + ' >= ' + repr(self._top_threshold) +\
+                ' (' + selection + ')'
+
         if self._is_value_numeric:
              filter_as_str = self._edge_attr + ' >= ' + self._value
         else:
@@ -224,25 +1406,53 @@ class NDExNetworkTrimmer(object):
         #else:
         #    ratio = 'n/a'
 
-        network_name = self._network.get_name() + ' ( ' + self._get_filter_expression_as_string() + ' )'
+        network_name = self._get_derived_network_name(self._network.get_name())
 
         self._network.set_name(network_name)
 
+    def _get_derived_network_name(self, parent_network_name):
+
+        return parent_network_name + ' ( ' +\
+            self._get_filter_expression_as_string() + ' )'
+
 
     def _get_URL_of_parent_network(self):
 
+        if self._uuid is None and self._input is None:
+            return self._snapshot_properties.get(PARENT_URL) or\
+                'file://' + os.path.abspath(self._snapshot)
+
+        if self._uuid is None:
+            return 'file://' + os.path.abspath(self._input)
+
+        if self._server is None:
+            return self._uuid
+
         url = self._server if self._server.startswith('http') else 'http://' + self._server
 
         url = url + '/#/network/' +  self._uuid
 
         return url
 
+    def _get_derived_description(self, parent_network_name, description):
+
+        return '<p><b>This network is a filtered version of the <a href="' \
+            + self._get_URL_of_parent_network() + '" target="_blank">' + parent_network_name + '</a></b>' \
+            + ' database in which all edges correspond to associations with a ' + self._get_filter_expression_as_string() + '.</p>' \
+            + description
+
 
     def _set_network_attributes(self):
 
+        if self._compact:
+            self._update_network_attribute_elements(
+                self._network.get_network_attributes())
+            return
+
         parent_network_name =  self._network.get_network_attribute('name')['v']
 
-        #self._set_new_network_name()
+        if self._is_sweep():
+            self._set_new_network_name()
 
         self._network.set_network_attribute(name='prov:wasGeneratedBy', values=self._get_user_agent())
 
@@ -250,60 +1460,523 @@ class NDExNetworkTrimmer(object):
 
         description = self._network.get_network_attribute('description')['v']
 
-        description = '<p><b>This network is a filtered version of the <a href="' \
-            + self._get_URL_of_parent_network() + '" target="_blank">' + parent_network_name + '</a></b>' \
-            + ' database in which all edges correspond to associations with a ' + self._get_filter_expression_as_string() + '.</p>' \
-            + description
+        description = self._get_derived_description(parent_network_name,
+                                                    description)
 
         self._network.set_network_attribute(name='description', values=description)
 
+    def _update_network_attribute_elements(self, network_attributes):
+        """
+        Streaming counterpart of :py:func:`_set_network_attributes` that
+        works on raw networkAttributes elements
+        :param network_attributes: list of networkAttributes elements
+        :return: updated list of networkAttributes elements
+        """
+        by_name = {}
+        for attribute in network_attributes:
+            by_name[attribute['n']] = attribute
 
+        parent_network_name = by_name.get('name', {}).get('v', '')
+        description = by_name.get('description', {}).get('v', '')
 
+        description = self._get_derived_description(parent_network_name,
+                                                    description)
+        new_values = [('prov:wasGeneratedBy', self._get_user_agent()),
+                      ('prov:wasDerivedFrom',
+                       self._get_URL_of_parent_network()),
+                      ('description', description)]
 
-    def _remove_orphan_nodes(self):
+        if self._is_sweep():
+            new_values.append(('name', self._get_derived_network_name(
+                parent_network_name)))
+
+        for name, value in new_values:
+            if name in by_name:
+                by_name[name]['v'] = value
+                by_name[name].pop('d', None)
+            else:
+                network_attributes.append({'n': name, 'v': value})
+
+        return network_attributes
 
-        nodes_with_edges = set()
-        orphan_node_ids = set()
 
-        # get all nodes that are connected to edgesre
-        for key, value in self._network.edges.items():
-            nodes_with_edges.add(value['s'])
-            nodes_with_edges.add(value['t'])
 
-        # get all nodes that are not connected to edges (get all orphan nodes)
-        for key, value in self._network.nodes.items():
-            if value['@id'] not in nodes_with_edges:
-                orphan_node_ids.add(value['@id'])
 
-        print ('edges: {}  nodes with edges: {}  orphan nodes: {}'.format(len(self._network.edges), len(nodes_with_edges), len(orphan_node_ids)) )
+    def _remove_orphan_nodes(self):
+        """
+        Removes nodes left without edges by trimming, found from node
+        degrees decremented by :py:func:`_trim_edges`, and unless
+        --keep_parent_orphans is set nodes without edges in parent
+        """
+        orphan_node_ids = self._get_orphan_node_ids().tolist()
 
         # remove all orphan nodes and their attributes
-        for orphan_node_id in orphan_node_ids:
-            node_attribute_id = self._network.nodes[orphan_node_id]['@id']
-            del self._network.nodes[node_attribute_id]
-            del self._network.nodeAttributes[node_attribute_id]
+        removed = 0
+        if self._compact:
+            removed = self._network.remove_nodes(orphan_node_ids)
+        else:
+            for orphan_node_id in orphan_node_ids:
+                if self._network.nodes.pop(orphan_node_id, None) is not None:
+                    self._network.nodeAttributes.pop(orphan_node_id, None)
+                    removed += 1
+
+        logger.info('edges: {}  nodes with edges: {}  orphan nodes: '
+                    '{}'.format(self._get_edge_count(self._network),
+                                self._get_node_count(self._network),
+                                removed))
+
+    def _get_ndex_client(self):
+        """
+        Gets NDEx client, creating it on first call
+        :return: NDEx client
+        :rtype: :py:class:`~ndex2.client.Ndex2`
+        """
+        if self._ndex is None:
+            from ndex2.client import Ndex2
+            self._ndex = Ndex2(host=self._server,
+                               username=self._user,
+                               password=self._pass,
+                               user_agent=self._get_user_agent(),
+                               skip_version_check=True)
+        return self._ndex
+
+    def _download_network_to_file(self, path):
+        """
+        Streams CX of network from server to file without parsing it
+        :param path: path to write CX to
+        :return: number of bytes written
+        """
+        resp = self._get_ndex_client().get_network_as_cx_stream(self._uuid)
+        num_bytes = 0
+        with open(path, 'wb') as f:
+            for chunk in resp.iter_content(chunk_size=1048576):
+                f.write(chunk)
+                num_bytes += len(chunk)
+        return num_bytes
+
+    def _get_cached_network_path(self):
+        """
+        Gets path to CX of network in --cache_dir, downloading it only
+        if it is not cached or changed on server since it was cached
+        :return: path to CX file
+        """
+        cache = NetworkCache(self._cache_dir,
+                             int(self._cache_max_mb * 1024 * 1024))
 
+        return cache.get_network_path(self._uuid, self._get_parent_summary(),
+                                      self._download_network_to_file)
 
+    def _trim_cx_stream(self, input_path, output):
+        """
+        Trims CX in file `input_path` writing result to `output`
+        stream without building a NiceCXNetwork
+        :param input_path: path to CX file
+        :param output: binary stream to write trimmed CX to
+        :return: trimmer used
+        :rtype: :py:class:`~ndexnetworktrim.cxstream.StreamingCXTrimmer`
+        """
+        updater = self._update_network_attribute_elements
+        kwargs = {'network_attributes_updater': updater,
+                  'keep_parent_orphans': self._keep_parent_orphans,
+                  'element_pruner': prune_element,
+                  'component_selector': self._get_component_selector(),
+                  'node_attribute_filter': self._get_node_attribute_filter()}
+        if self._is_top_selection():
+            number_of_edges = None
+            if self._top_k is None:
+                with open(input_path, 'rb') as f:
+                    number_of_edges = count_aspect_elements(f, EDGES)
+            trimmer = StreamingCXTrimmer(
+                None,
+                edge_selector=lambda edge_attributes: self._select_top_edges(
+                    edge_attributes, number_of_edges),
+                **kwargs)
+        elif self._filter is not None:
+            trimmer = StreamingCXTrimmer(
+                self._filter.evaluate,
+                edge_filter_attributes=self._filter.get_attribute_names(),
+                **kwargs)
+        elif self._has_edge_filter():
+            trimmer = StreamingCXTrimmer(
+                lambda attribute: self._check_if_edge_attribute_complies(
+                    [attribute]),
+                **kwargs)
+        else:
+            trimmer = StreamingCXTrimmer(None, **kwargs)
+        trimmer.trim(lambda: open(input_path, 'rb'), output)
+        return trimmer
 
-    def run(self):
+    def _get_component_selector(self):
         """
-        Runs content loading for NDEx Network Trimmer
-        :param theargs:
-        :return:
+        :return: component selector for
+                 :py:class:`~ndexnetworktrim.cxstream.StreamingCXTrimmer`
+                 or None if components are not filtered
         """
-        self._parse_config()
+        if not self._has_component_filter():
+            return None
+        return self._select_components
 
-        self._get_network_from_server()
+    def _select_top_edges(self, edge_attributes, number_of_edges):
+        """
+        Streaming counterpart of top K selection in
+        :py:func:`_get_edge_keep_mask` that keeps a bounded heap
+        :param edge_attributes: iterable of edgeAttributes elements
+        :param number_of_edges: number of edges in parent network
+        :return: ids of edges to keep
+        """
+        edge_ids, self._top_threshold = select_top_edges(
+            edge_attributes, self._edge_attr, self._get_top_k(number_of_edges))
+        return edge_ids
 
-        self._trim_edges()
+    def _run_post_trim_stages(self, **labels):
+        """
+        Removes orphan nodes, updates network attributes and saves
+        network, recording each as a stage
+        :param labels: extra labels of stages
+        """
+        if self._collapse_parallel:
+            with self._metrics.stage('collapse', **labels) as stage:
+                stage.set_count('edges_before',
+                                self._get_edge_count(self._network))
+                stage.set_count('groups', self._collapse_parallel_edges())
+                stage.set_count('edges_after',
+                                self._get_edge_count(self._network))
+
+        with self._metrics.stage('orphan_removal', **labels) as stage:
+            stage.set_count('nodes_before',
+                            self._get_node_count(self._network))
+            if self._has_component_filter():
+                stage.set_count('component_edges_removed',
+                                self._remove_small_components())
+            self._remove_orphan_nodes()
+            stage.set_count('nodes_after', self._get_node_count(self._network))
+
+        with self._metrics.stage('cascade', **labels) as stage:
+            stage.set_count('elements_removed',
+                            self._prune_dependent_aspects())
+
+        with self._metrics.stage('attribute_update', **labels):
+            self._set_network_attributes()
+
+        with self._metrics.stage('upload', **labels) as stage:
+            self._save_network(stage)
+
+    def _get_edge_sweep(self):
+        """
+        Sorts edges of network by filter attribute
+        :return: sweep to look up edges passing each cut-off value
+        :rtype: :py:class:`~ndexnetworktrim.columnar.ThresholdSweep`
+        """
+        edge_index = self._get_edge_index()
+
+        return ThresholdSweep(edge_index.get_column(self._edge_attr),
+                              edge_index.get_edge_ids(),
+                              numeric=self._is_value_numeric)
 
-        self._remove_orphan_nodes()
+    @staticmethod
+    def _derive_network(parent, edge_ids):
+        """
+        Creates a shallow copy of `parent` network with only edges in
+        `edge_ids`. Edge and node elements are shared with parent, the
+        containers and network level aspects are copied so the derived
+        network can be trimmed and renamed without altering parent
+        :param parent: network to copy
+        :param edge_ids: ids of edges to keep
+        :return: derived network
+        """
+        if isinstance(parent, CompactNetwork):
+            return parent.select_edges(edge_ids)
 
-        self._set_network_attributes()
+        network = copy.copy(parent)
 
+        network.edges = {}
+        network.edgeAttributes = {}
+        for edge_id in edge_ids:
+            network.edges[edge_id] = parent.edges[edge_id]
+            if edge_id in parent.edgeAttributes:
+                network.edgeAttributes[edge_id] =\
+                    parent.edgeAttributes[edge_id]
 
-        self._network.upload_to(self._server, self._user, self._pass)
+        network.nodes = dict(parent.nodes)
+        network.nodeAttributes = dict(parent.nodeAttributes)
+        network.networkAttributes = copy.deepcopy(parent.networkAttributes)
+        network.metadata = copy.deepcopy(parent.metadata)
 
+        return network
+
+    def _run_sweep(self):
+        """
+        Creates one trimmed network per cut-off value from network
+        that has been downloaded once and sorted once by filter attribute
+        :return: 0
+        """
+        sweep = self._get_edge_sweep()
+        parent = self._network
+        parent_degrees = self._get_node_degrees()
+        self._get_dependent_aspect_index()
+        if self._seeds is not None:
+            self._get_adjacency_index()
+
+        try:
+            for value in self._values:
+                self._set_value(value)
+
+                with self._metrics.stage('trim', value=value) as stage:
+                    stage.set_count('edges_before',
+                                    self._get_edge_count(parent))
+                    kept_edge_ids = sweep.get_edge_ids(
+                        self._numeric_value if self._is_value_numeric
+                        else value)
+                    if self._seeds is not None:
+                        kept_edge_ids = self._get_neighborhood_edge_ids(
+                            kept_edge_ids)
+                    self._network = self._derive_network(
+                        parent, kept_edge_ids.tolist())
+                    self._node_degrees = parent_degrees.copy()
+                    self._node_degrees.keep_only_edges(kept_edge_ids)
+                    stage.set_count('edges_after',
+                                    self._get_edge_count(self._network))
+
+                self._run_post_trim_stages(value=value)
+        finally:
+            self._network = parent
+            self._node_degrees = parent_degrees
+
+        return 0
+
+    def _get_cx_file(self, temp_dir):
+        """
+        Gets path to CX of network, downloading it to `temp_dir`
+        or --cache_dir unless --input is set
+        :param temp_dir: directory to download network to
+        :return: path to CX file
+        """
+        with self._metrics.stage('download') as stage:
+            input_path = self._input
+            if input_path is None and self._cache_dir is not None:
+                input_path = self._get_cached_network_path()
+            elif input_path is None:
+                input_path = os.path.join(temp_dir, 'parent.cx')
+                self._download_network_to_file(input_path)
+            stage.add_bytes(os.path.getsize(input_path))
+        return input_path
+
+    def _run_profile(self):
+        """
+        Profiles --profile_attribute and prints report as JSON
+        without trimming or uploading anything
+        :return: 0
+        """
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = self._get_cx_file(temp_dir)
+            with self._metrics.stage('profile') as stage:
+                profiler = StreamingAttributeProfiler(
+                    self._profile_attribute, cutoffs=self._values,
+                    keep_parent_orphans=self._keep_parent_orphans)
+                report = profiler.profile(lambda: open(input_path, 'rb'))
+                stage.set_count('edges', report['edges'])
+                stage.set_count('nodes', report['nodes'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+        print(json.dumps(report, indent=2))
+        return 0
+
+    def _run_export_snapshot(self):
+        """
+        Saves parsed network to --export_snapshot without trimming it
+        :return: 0
+        """
+        with self._metrics.stage('download') as stage:
+            stage.add_bytes(self._get_network())
+            stage.set_count('edges', self._get_edge_count(self._network))
+            stage.set_count('nodes', self._get_node_count(self._network))
+
+        with self._metrics.stage('snapshot') as stage:
+            properties = {PARENT_URL: self._get_URL_of_parent_network()}
+            self._network.write_snapshot(self._export_snapshot,
+                                         properties=properties)
+            stage.add_bytes(get_snapshot_size(self._export_snapshot))
+
+        logger.info('Wrote snapshot ' + self._export_snapshot)
+        return 0
+
+    def _run_streaming(self):
+        """
+        Downloads, trims and uploads network streaming CX through
+        temporary files
+        :return: 0
+        """
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = self._get_cx_file(temp_dir)
+
+            # --filter and --top_k have no values to loop over
+            for value in self._values or [None]:
+                labels = {}
+                if value is not None:
+                    self._set_value(value)
+                    if self._is_sweep():
+                        labels['value'] = value
+
+                output_path = self._get_output_path()
+                if output_path is None:
+                    output_path = os.path.join(temp_dir, 'trimmed.cx')
+
+                # orphan removal and attribute update happen in same pass
+                with self._metrics.stage('trim', **labels) as stage:
+                    with open(output_path, 'wb') as output:
+                        trimmer = self._trim_cx_stream(input_path, output)
+                    stage.set_count('edges_before',
+                                    trimmer.get_input_element_count(EDGES))
+                    stage.set_count('edges_after',
+                                    trimmer.get_kept_edge_count())
+                    stage.set_count('nodes_before',
+                                    trimmer.get_input_element_count(NODES))
+                    stage.set_count('nodes_after',
+                                    trimmer.get_kept_node_count())
+
+                if self._output is None:
+                    with self._metrics.stage('upload', **labels) as stage:
+                        network_id = self._upload(
+                            lambda: stage.count_chunks(
+                                iter_file_chunks(output_path)))
+                    logger.info('Saved ' + output_path + ' as network ' +
+                                network_id)
+                else:
+                    logger.info('Wrote ' + output_path)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        return 0
+
+
+    def run(self):
+        """
+        Runs content loading for NDEx Network Trimmer, writing metrics
+        of run to --metrics_json and --metrics_prom if set even if
+        run fails
+        :param theargs:
+        :return:
+        """
+        success = False
+        try:
+            status = self._run()
+            success = status == 0
+            return status
+        finally:
+            self._write_metrics(success)
+
+    def _run(self):
+        """
+        Runs stages of NDEx Network Trimmer
+        :return: 0 upon success
+        """
+        if self._uuid is None and self._input is None and \
+                self._snapshot is None:
+            raise Exception('Either --uuid, --input or --snapshot must be set')
+
+        if self._snapshot is not None and \
+                (self._streaming or self._profile_attribute is not None):
+            raise Exception('--snapshot cannot be combined with --streaming '
+                            'or --profile_attribute')
+
+        if self._profile_attribute is not None:
+            if self._is_config_needed() and self._server is None:
+                with self._metrics.stage('config_parse'):
+                    self._parse_config()
+            return self._run_profile()
+
+        if self._export_snapshot is not None:
+            if self._is_config_needed() and self._server is None:
+                with self._metrics.stage('config_parse'):
+                    self._parse_config()
+            return self._run_export_snapshot()
+
+        if self._backbone:
+            self._check_backbone_args()
+        elif self._is_top_selection():
+            self._check_top_selection_args()
+        elif self._filter is not None and self._values:
+            raise Exception('--filter cannot be combined with --value')
+        elif self._filter is None and self._seeds is None and \
+                self._node_attr is None and \
+                (self._edge_attr is None or not self._values):
+            raise Exception('Either --filter, --edge_attr and --value, '
+                            '--node_attr and --node_value or --seeds must '
+                            'be set')
+        elif self._filter is None and self._values and self._edge_attr is None:
+            raise Exception('--value needs --edge_attr')
+
+        if self._seeds is not None and self._hops < 0:
+            raise Exception('--hops must not be negative')
+
+        if (self._node_attr is None) != (self._node_value is None):
+            raise Exception('--node_attr and --node_value must be set '
+                            'together')
+
+        if self._workers < 1:
+            raise Exception('--workers must be at least 1')
+
+        if self._min_component_size is not None and \
+                self._min_component_size < 1:
+            raise Exception('--min_component_size must be at least 1')
+
+        if self._is_config_needed() and self._server is None:
+            with self._metrics.stage('config_parse'):
+                self._parse_config()
+
+        if self._streaming and self._compact:
+            raise Exception('--compact cannot be combined with --streaming')
+
+        if self._streaming and self._seeds is not None:
+            raise Exception('--seeds cannot be combined with --streaming')
+
+        if self._streaming and self._backbone:
+            raise Exception('--backbone cannot be combined with --streaming')
+
+        if self._streaming and self._collapse_parallel:
+            raise Exception('--collapse_parallel cannot be combined with '
+                            '--streaming')
+
+        if self._state_file is not None:
+            if self._uuid is None or self._output is not None:
+                raise Exception('--state_file needs --uuid and cannot be '
+                                'combined with --output')
+            with self._metrics.stage('change_check') as stage:
+                unchanged = self._is_parent_unchanged()
+                stage.set_count('unchanged', int(unchanged))
+            if unchanged:
+                logger.info('Network ' + self._uuid + ' unchanged since '
+                            'last run, skipping')
+                return 0
+
+        if self._streaming:
+            return self._run_streaming()
+
+        with self._metrics.stage('download') as stage:
+            stage.add_bytes(self._get_network())
+            stage.set_count('edges', self._get_edge_count(self._network))
+            stage.set_count('nodes', self._get_node_count(self._network))
+
+        if self._node_attr is not None:
+            with self._metrics.stage('node_filter') as stage:
+                nodes_rejected, edges_removed =\
+                    self._remove_nodes_by_attribute()
+                stage.set_count('nodes_rejected', nodes_rejected)
+                stage.set_count('edges_removed', edges_removed)
+
+        if self._is_sweep():
+            return self._run_sweep()
+
+        with self._metrics.stage('trim') as stage:
+            stage.set_count('edges_before',
+                            self._get_edge_count(self._network))
+            self._trim_edges()
+            stage.set_count('edges_after', self._get_edge_count(self._network))
+
+        self._run_post_trim_stages()
 
         return 0
 
@@ -342,6 +2015,12 @@ def main(args):
 
     try:
         _setup_logging(theargs)
+        if theargs.serve is not None:
+            return TrimService(theargs, NDExNetworkTrimmer,
+                               lambda job_args: _parse_arguments(
+                                   desc, job_args)).run()
+        if theargs.manifest is not None:
+            return BatchTrimmer(theargs, NDExNetworkTrimmer).run()
         loader = NDExNetworkTrimmer(theargs)
         return loader.run()
     except Exception as e:
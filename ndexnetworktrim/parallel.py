@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+"""
+Evaluation of edge filters over chunks of edges in worker processes.
+
+Numeric arrays the filter reads are copied once into a shared memory
+block that every worker attaches to, so no per-edge data is pickled
+per chunk. Each worker evaluates a range of edges and writes the keep
+mask of that range into a mask in the same block, which is read back
+once all chunks are done.
+"""
+
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ndexnetworktrim.columnar import AttributeColumn
+from ndexnetworktrim.graphindex import get_edge_alphas
+
+logger = logging.getLogger(__name__)
+
+# fewer edges per chunk do not pay for starting workers
+MIN_CHUNK_SIZE = 250000
+
+CHUNKS_PER_WORKER = 4
+
+KEEP_MASK = 'keep_mask'
+
+_worker_state = {}
+
+
+class SharedArrays(object):
+    """
+    NumPy arrays copied into one block of shared memory, each one
+    described by its offset, dtype and length so other processes
+    can map them via :py:func:`attach_arrays`. The block is removed
+    on :py:func:`close`
+    """
+    def __init__(self, arrays):
+        """
+
+        :param arrays: one dimensional :py:class:`numpy.ndarray`
+                       objects keyed by name
+        :type arrays: dict
+        """
+        self._layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            # keep every array 8 byte aligned
+            offset += -offset % 8
+            self._layout[name] = (offset, array.dtype.str, len(array))
+            offset += array.nbytes
+        self._shm = shared_memory.SharedMemory(create=True,
+                                               size=max(offset, 1))
+        self._arrays = self._map(self._shm, self._layout)
+        for name, array in arrays.items():
+            self._arrays[name][:] = array
+
+    @staticmethod
+    def _map(shm, layout):
+        return {name: np.ndarray((length,), dtype=np.dtype(dtype),
+                                 buffer=shm.buf, offset=offset)
+                for name, (offset, dtype, length) in layout.items()}
+
+    def get_spec(self):
+        """
+        :return: (name of shared memory block, layout of arrays) to
+                 pass to :py:func:`attach_arrays`
+        :rtype: tuple
+        """
+        return self._shm.name, self._layout
+
+    def get_array(self, name):
+        """
+        :return: array `name` mapped onto shared memory
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self._arrays[name]
+
+    def close(self):
+        """
+        Unmaps and removes shared memory block. Arrays from
+        :py:func:`get_array` must no longer be referenced
+        """
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def attach_arrays(spec):
+    """
+    :param spec: spec from :py:func:`SharedArrays.get_spec`
+    :return: (shared memory block, arrays keyed by name), block must
+             be closed once arrays are no longer referenced
+    :rtype: tuple
+    """
+    name, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, SharedArrays._map(shm, layout)
+
+
+def get_chunks(size, workers, min_chunk_size=None):
+    """
+    :param size: number of edges
+    :param workers: number of worker processes
+    :param min_chunk_size: fewest edges in a chunk, defaults to
+                           :py:const:`MIN_CHUNK_SIZE`
+    :return: list of (start, stop) ranges covering 0 to `size`
+    """
+    if min_chunk_size is None:
+        min_chunk_size = MIN_CHUNK_SIZE
+    count = min(workers * CHUNKS_PER_WORKER,
+                size // max(min_chunk_size, 1))
+    count = max(count, 1)
+    bounds = np.linspace(0, size, count + 1).astype(np.int64).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _init_worker(spec, evaluate, args):
+    _worker_state['spec'] = spec
+    _worker_state['evaluate'] = evaluate
+    _worker_state['args'] = args
+
+
+def _run_chunk(chunk):
+    """
+    Evaluates chunk in worker writing its mask into shared keep mask
+    """
+    start, stop = chunk
+    shm, arrays = attach_arrays(_worker_state['spec'])
+    try:
+        mask = _worker_state['evaluate'](arrays, start, stop,
+                                         *_worker_state['args'])
+        arrays[KEEP_MASK][start:stop] = mask
+    finally:
+        # views must be gone before block can be unmapped
+        mask = None
+        arrays = None
+        shm.close()
+
+
+def evaluate_chunks(evaluate, arrays, size, workers, args=(),
+                    min_chunk_size=None):
+    """
+    Evaluates a filter over edges 0 to `size` split in chunks, each
+    evaluated by one of `workers` processes. If there is a single
+    chunk it is evaluated in this process
+
+    :param evaluate: module level function called as
+                     ``evaluate(arrays, start, stop, *args)`` returning
+                     the keep mask of edges `start` to `stop`
+    :param arrays: one dimensional arrays `evaluate` reads, keyed by
+                   name, copied to shared memory
+    :type arrays: dict
+    :param size: number of edges
+    :param workers: number of worker processes
+    :param args: extra arguments to `evaluate`, passed once per worker
+    :param min_chunk_size: see :py:func:`get_chunks`
+    :return: keep mask of all edges
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    chunks = get_chunks(size, workers, min_chunk_size=min_chunk_size)
+    if len(chunks) == 1:
+        return np.asarray(evaluate(arrays, 0, size, *args), dtype=bool)
+
+    arrays = dict(arrays)
+    arrays[KEEP_MASK] = np.zeros(size, dtype=bool)
+    with SharedArrays(arrays) as shared:
+        logger.debug('Evaluating {} edges in {} chunks with {} '
+                     'workers'.format(size, len(chunks), workers))
+        pool = multiprocessing.Pool(processes=min(workers, len(chunks)),
+                                    initializer=_init_worker,
+                                    initargs=(shared.get_spec(), evaluate,
+                                              args))
+        try:
+            pool.map(_run_chunk, chunks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        return shared.get_array(KEEP_MASK).copy()
+
+
+class ColumnCutoff(object):
+    """
+    Cut-off on one attribute with the interface of
+    :py:class:`~ndexnetworktrim.filterexpr.FilterExpression` used for
+    columns: keeps values >= a numeric cut-off or equal to another
+    """
+    def __init__(self, name, value, numeric):
+        """
+
+        :param name: name of edge attribute
+        :param value: cut-off
+        :param numeric: if True, keep values >= `value` otherwise
+                        values equal to it
+        """
+        self._name = name
+        self._value = value
+        self._numeric = numeric
+
+    def get_attribute_names(self):
+        """
+        :return: list with name of attribute
+        """
+        return [self._name]
+
+    def evaluate_columns(self, columns):
+        """
+        :param columns: columns keyed by attribute name
+        :return: keep mask
+        """
+        column = columns[self._name]
+        if self._numeric:
+            return column.greater_equal(self._value)
+        return column.equal(self._value)
+
+
+def _evaluate_filter_chunk(arrays, start, stop, expression, objects):
+    columns = {}
+    for name in expression.get_attribute_names():
+        if name in objects:
+            values = objects[name][start:stop]
+        else:
+            values = arrays[name + '/values'][start:stop]
+        columns[name] = AttributeColumn(name, values,
+                                        arrays[name + '/missing'][start:stop])
+    return expression.evaluate_columns(columns)
+
+
+def evaluate_filter(expression, columns, size, workers, min_chunk_size=None):
+    """
+    Evaluates filter over columns of edge attributes in chunks in
+    `workers` processes. Numeric columns and masks of missing values
+    are shared. Arrays of objects, such as strings, cannot be placed
+    in shared memory and are handed to workers when they start: with
+    the fork start method (default on Linux) workers read the pages
+    of this process, elsewhere they are pickled once per worker
+
+    :param expression: filter with ``get_attribute_names()`` and
+                       ``evaluate_columns(columns)`` such as
+                       :py:class:`~ndexnetworktrim.filterexpr.FilterExpression`
+                       or :py:class:`ColumnCutoff`
+    :param columns: :py:class:`~ndexnetworktrim.columnar.AttributeColumn`
+                    objects keyed by attribute name
+    :param size: number of edges
+    :param workers: number of worker processes
+    :param min_chunk_size: see :py:func:`get_chunks`
+    :return: keep mask aligned with columns
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    arrays = {}
+    objects = {}
+    for name in expression.get_attribute_names():
+        column = columns[name]
+        if column.is_numeric():
+            arrays[name + '/values'] = column.values
+        else:
+            objects[name] = column.values
+        arrays[name + '/missing'] = column.missing
+    return evaluate_chunks(_evaluate_filter_chunk, arrays, size, workers,
+                           args=(expression, objects),
+                           min_chunk_size=min_chunk_size)
+
+
+def _evaluate_backbone_chunk(arrays, start, stop, alpha):
+    alphas = get_edge_alphas(arrays['sources'][start:stop],
+                             arrays['targets'][start:stop],
+                             arrays['weights'][start:stop],
+                             arrays['strengths'], arrays['degrees'])
+    with np.errstate(invalid='ignore'):
+        return alphas < alpha
+
+
+def evaluate_backbone(sources, targets, weights, strengths, degrees, alpha,
+                      workers, min_chunk_size=None):
+    """
+    Evaluates disparity filter from node strengths and degrees
+    computed by :py:func:`~ndexnetworktrim.graphindex.get_node_strengths`
+    in chunks of edges in `workers` processes
+
+    :param alpha: edges with an alpha below it are kept
+    :param workers: number of worker processes
+    :param min_chunk_size: see :py:func:`get_chunks`
+    :return: keep mask aligned with edges
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    arrays = {'sources': sources, 'targets': targets, 'weights': weights,
+              'strengths': strengths, 'degrees': degrees}
+    return evaluate_chunks(_evaluate_backbone_chunk, arrays, len(weights),
+                           workers, args=(alpha,),
+                           min_chunk_size=min_chunk_size)
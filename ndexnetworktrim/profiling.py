@@ -0,0 +1,641 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming profile of one edge attribute of a CX document used to
+pick cut-offs before trimming. Memory is bounded by sketch sizes
+rather than by the number of edges.
+"""
+
+import array
+import bisect
+import hashlib
+import logging
+import math
+import random
+
+import numpy as np
+
+from ndexnetworktrim.cxstream import EDGE_ATTRIBUTES
+from ndexnetworktrim.cxstream import EDGES
+from ndexnetworktrim.cxstream import NODES
+from ndexnetworktrim.cxstream import get_element_ids
+from ndexnetworktrim.cxstream import iter_cx_elements
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUANTILES = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+
+DEFAULT_CUTOFF_QUANTILES = [0.5, 0.75, 0.9, 0.95, 0.99]
+
+EDGE_CHUNK_SIZE = 65536
+
+MAX_CUTOFF_EDGES = 4194304
+
+_HASH_RANGE = 2.0 ** 64
+
+
+def _mix_ids(ids):
+    """
+    Hashes integer ids to uniformly spread 64 bit values with the
+    splitmix64 finalizer
+
+    :param ids: :py:class:`numpy.ndarray` of integers
+    :return: :py:class:`numpy.ndarray` of uint64 hashes
+    """
+    x = np.asarray(ids, dtype=np.int64).astype(np.uint64)
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _hash_value(value):
+    """
+    :param value: attribute value
+    :return: 64 bit hash of value, equal for equal values across runs
+    :rtype: int
+    """
+    digest = hashlib.blake2b(repr(value).encode('utf-8'), digest_size=8)
+    return int.from_bytes(digest.digest(), 'little')
+
+
+def _get_number(value):
+    """
+    :param value: attribute value
+    :return: value as float or None if it is not a number the
+             trimmer would compare against a numeric cut-off
+    """
+    if isinstance(value, (bool, list)):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number:
+        return None
+    return number
+
+
+class KLLSketch(object):
+    """
+    Quantile sketch of a stream of numbers after Karnin, Lang and
+    Liberty. Values are kept in a stack of compactors, each holding
+    at most about `k` values of weight 2 ** level. A full compactor is
+    sorted and every other value promoted to the next level, so the
+    sketch holds O(k log(n / k)) values and ranks are off by about
+    n / k. Streams shorter than `k` are kept exactly.
+    """
+    def __init__(self, k=200, seed=None):
+        """
+
+        :param k: size of top compactor, larger is more accurate
+        :param seed: seed of random offsets used when compacting
+        """
+        self._k = k
+        self._random = random.Random(seed)
+        self._compactors = [[]]
+        self._size = 0
+        self._max_size = 0
+        self._count = 0
+        self._update_max_size()
+
+    def _get_capacity(self, level):
+        height = len(self._compactors)
+        return int(math.ceil(
+            self._k * (2.0 / 3.0) ** (height - level - 1))) + 1
+
+    def _update_max_size(self):
+        self._max_size = sum(self._get_capacity(level)
+                             for level in range(len(self._compactors)))
+
+    def _compress(self):
+        for level, compactor in enumerate(self._compactors):
+            if len(compactor) < self._get_capacity(level):
+                continue
+            if level + 1 == len(self._compactors):
+                self._compactors.append([])
+                self._update_max_size()
+            compactor.sort()
+            offset = self._random.randint(0, 1)
+            self._compactors[level + 1].extend(compactor[offset::2])
+            del compactor[:]
+            self._size = sum(len(c) for c in self._compactors)
+            if self._size < self._max_size:
+                break
+
+    def update(self, value):
+        """
+        :param value: number to add
+        """
+        self._compactors[0].append(value)
+        self._size += 1
+        self._count += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def get_count(self):
+        """
+        :return: number of values added
+        """
+        return self._count
+
+    def get_quantiles(self, fractions):
+        """
+        :param fractions: list of fractions between 0 and 1
+        :return: list of approximate quantiles of values added or
+                 empty list if no value was added
+        """
+        if self._count == 0:
+            return []
+        values = []
+        weights = []
+        for level, compactor in enumerate(self._compactors):
+            values.extend(compactor)
+            weights.extend([2 ** level] * len(compactor))
+        order = np.argsort(values, kind='stable')
+        values = np.asarray(values, dtype=np.float64)[order]
+        ranks = np.cumsum(np.asarray(weights, dtype=np.float64)[order])
+        ranks /= ranks[-1]
+        positions = np.searchsorted(ranks, fractions, side='left')
+        return values[np.minimum(positions, len(values) - 1)].tolist()
+
+
+class DistinctCounter(object):
+    """
+    K minimum values sketch counting distinct items: only the `k`
+    smallest 64 bit hashes are kept, so the count is exact below `k`
+    distinct items and has a relative error of about 1 / sqrt(k)
+    above. Counters can be merged to count items of a union.
+    """
+    def __init__(self, k=1024):
+        """
+
+        :param k: number of hashes kept
+        """
+        self._k = k
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._pending = []
+
+    def add(self, value):
+        """
+        :param value: hashable attribute value
+        """
+        self._pending.append(_hash_value(value))
+        if len(self._pending) >= 4 * self._k:
+            self._flush()
+
+    def add_ids(self, ids):
+        """
+        :param ids: :py:class:`numpy.ndarray` of integer ids
+        """
+        self._add_hashes(_mix_ids(ids))
+
+    def merge(self, other):
+        """
+        :param other: counter whose items are added to this one
+        :type other: :py:class:`DistinctCounter`
+        """
+        other._flush()
+        self._add_hashes(other._hashes)
+
+    def _flush(self):
+        if self._pending:
+            pending = np.array(self._pending, dtype=np.uint64)
+            self._pending = []
+            self._add_hashes(pending)
+
+    def _add_hashes(self, hashes):
+        hashes = np.unique(np.concatenate([self._hashes, hashes]))
+        self._hashes = hashes[:self._k]
+
+    def is_exact(self):
+        """
+        :return: True if fewer than `k` distinct items were added so
+                 :py:func:`get_count` is exact
+        """
+        self._flush()
+        return len(self._hashes) < self._k
+
+    def get_count(self):
+        """
+        :return: number of distinct items added, estimated from the
+                 largest kept hash once `k` hashes are kept
+        :rtype: int
+        """
+        if self.is_exact():
+            return len(self._hashes)
+        return int(round((self._k - 1) * _HASH_RANGE /
+                         (float(self._hashes[-1]) + 1.0)))
+
+
+class AttributeProfile(object):
+    """
+    Summary of the values of one edge attribute built from its
+    edgeAttributes elements in a single pass: data types, number of
+    edges having it, distinct values and quantiles of numeric values.
+    """
+    def __init__(self, name, quantile_k=200, distinct_k=1024):
+        """
+
+        :param name: name of edge attribute
+        :param quantile_k: size of :py:class:`KLLSketch`
+        :param distinct_k: size of :py:class:`DistinctCounter`
+        """
+        self._name = name
+        self._types = {}
+        self._edge_count = 0
+        self._non_numeric_count = 0
+        self._min = None
+        self._max = None
+        self._quantiles = KLLSketch(k=quantile_k)
+        self._distinct = DistinctCounter(k=distinct_k)
+
+    def update(self, element):
+        """
+        :param element: edgeAttributes element, ignored if it is not
+                        for attribute of profile
+        """
+        if element.get('n') != self._name:
+            return
+        data_type = element.get('d', 'string')
+        self._types[data_type] = self._types.get(data_type, 0) + 1
+        self._edge_count += len(get_element_ids(element.get('po')))
+
+        value = element.get('v')
+        if isinstance(value, list):
+            self._distinct.add(tuple(value))
+            self._non_numeric_count += 1
+            return
+        self._distinct.add(value)
+
+        number = _get_number(value)
+        if number is None:
+            self._non_numeric_count += 1
+            return
+        self._quantiles.update(number)
+        if self._min is None or number < self._min:
+            self._min = number
+        if self._max is None or number > self._max:
+            self._max = number
+
+    def is_numeric(self):
+        """
+        :return: True if attribute has numeric values and no others
+        """
+        return self._quantiles.get_count() > 0 and \
+            self._non_numeric_count == 0
+
+    def get_quantiles(self, fractions):
+        """
+        :param fractions: list of fractions between 0 and 1
+        :return: list of approximate quantiles of numeric values
+        """
+        return self._quantiles.get_quantiles(fractions)
+
+    def get_report(self, number_of_edges, fractions=DEFAULT_QUANTILES):
+        """
+        :param number_of_edges: number of edges of network
+        :param fractions: fractions to report quantiles at
+        :return: profile as JSON serializable dict
+        :rtype: dict
+        """
+        report = {'attribute': self._name,
+                  'types': dict(self._types),
+                  'edges_with_attribute': self._edge_count,
+                  'missing': max(0, number_of_edges - self._edge_count),
+                  'distinct_values': self._distinct.get_count(),
+                  'distinct_values_exact': self._distinct.is_exact(),
+                  'numeric_values': self._quantiles.get_count(),
+                  'non_numeric_values': self._non_numeric_count}
+        if self._quantiles.get_count():
+            report['min'] = self._min
+            report['max'] = self._max
+            report['quantiles'] = dict(zip(
+                [str(f) for f in fractions], self.get_quantiles(fractions)))
+        return report
+
+
+class CutoffPredictor(object):
+    """
+    Predicts number of edges and nodes a trim keeps at each of a set
+    of cut-offs, following the rules of the trimmer: numeric cut-offs
+    keep edges with a value >= cut-off, others edges with an equal
+    value.
+
+    Edge attributes are reduced to the highest cut-off level passed
+    per edge, so only edges passing a cut-off are held, as two
+    compact arrays. Edges are then read in chunks and their end
+    points added to a :py:class:`DistinctCounter` per level.
+
+    At most `max_edges` edge ids are held. Past that, edge ids are
+    split by hash into partitions and only the current one is kept,
+    so edgeAttributes and edges are read once more for each further
+    partition, see :py:meth:`next_partition`. Results stay exact.
+    """
+    def __init__(self, name, cutoffs, distinct_k=1024,
+                 max_edges=MAX_CUTOFF_EDGES):
+        """
+
+        :param name: name of edge attribute
+        :param cutoffs: list of cut-offs as strings or numbers
+        :param distinct_k: size of node counters
+        :param max_edges: number of edge ids held before they are
+                          split into partitions
+        """
+        self._name = name
+        self._labels = [str(c) for c in cutoffs]
+        numeric_cutoffs = [_get_number(c) for c in cutoffs]
+        self._numeric = all(c is not None for c in numeric_cutoffs)
+        if self._numeric:
+            # level of a value is the number of cut-offs it passes
+            self._cutoffs = sorted(numeric_cutoffs)
+            self._ranks = np.array([bisect.bisect_left(self._cutoffs, c)
+                                    for c in numeric_cutoffs])
+        else:
+            self._cutoffs = list(cutoffs)
+        self._distinct_k = distinct_k
+        self._edge_ids = array.array('q')
+        self._levels = array.array('h')
+        self._level_index = None
+        self._node_counters = [DistinctCounter(k=distinct_k)
+                               for _ in range(len(cutoffs) + 1)]
+        self._edge_buffer = []
+        self._max_edges = max(2, max_edges)
+        self._partition = 0
+        self._partitions = 1
+        self._level_counts = np.zeros(len(cutoffs) + 1, dtype=np.int64)
+
+    def get_partitions(self):
+        """
+        :return: number of partitions edge ids are split into
+        :rtype: int
+        """
+        return self._partitions
+
+    def _get_level(self, value):
+        """
+        :return: number of cut-offs passed by numeric value, otherwise
+                 1 + index of cut-off equal to value or 0 if none is
+        """
+        if self._numeric:
+            number = _get_number(value)
+            if number is None:
+                return 0
+            return bisect.bisect_right(self._cutoffs, number)
+        for pos, cutoff in enumerate(self._cutoffs):
+            if value == cutoff:
+                return pos + 1
+        return 0
+
+    def update(self, element):
+        """
+        :param element: edgeAttributes element, ignored if it is not
+                        for attribute of predictor
+        """
+        if element.get('n') != self._name:
+            return
+        level = self._get_level(element.get('v'))
+        if level == 0:
+            return
+        for edge_id in get_element_ids(element.get('po')):
+            self._edge_ids.append(edge_id)
+            self._levels.append(level)
+        if len(self._edge_ids) >= self._max_edges:
+            self._compact()
+
+    def _get_partition_mask(self, edge_ids):
+        """
+        :return: mask of `edge_ids` in current partition
+        """
+        return _mix_ids(edge_ids) % np.uint64(self._partitions) ==\
+            np.uint64(self._partition)
+
+    def _compact(self):
+        """
+        Reduces held edge ids to the current partition keeping the
+        highest level of each. While partition 0 is read for the first
+        time, partitions are doubled until at most half of
+        `max_edges` ids are left
+        """
+        edge_ids, levels = self._get_levels()
+        while self._partition == 0 and self._level_index is None and \
+                len(edge_ids) > self._max_edges // 2:
+            self._partitions *= 2
+            mask = self._get_partition_mask(edge_ids)
+            edge_ids = edge_ids[mask]
+            levels = levels[mask]
+            logger.debug('Split edge ids of ' + self._name + ' into ' +
+                         str(self._partitions) + ' partitions')
+        self._edge_ids = array.array('q')
+        self._edge_ids.frombytes(edge_ids.tobytes())
+        self._levels = array.array('h')
+        self._levels.frombytes(levels.tobytes())
+
+    def _get_levels(self):
+        """
+        :return: (sorted edge ids of current partition, level of each)
+                 keeping the highest level of an edge listed more
+                 than once
+        """
+        edge_ids = np.frombuffer(self._edge_ids, dtype=np.int64)
+        levels = np.frombuffer(self._levels, dtype=np.int16)
+        if self._partitions > 1:
+            mask = self._get_partition_mask(edge_ids)
+            edge_ids = edge_ids[mask]
+            levels = levels[mask]
+        order = np.lexsort((levels, edge_ids))
+        edge_ids = edge_ids[order]
+        levels = levels[order]
+        last = np.ones(len(edge_ids), dtype=bool)
+        last[:-1] = edge_ids[1:] != edge_ids[:-1]
+        return edge_ids[last], levels[last]
+
+    def _get_level_index(self):
+        """
+        :return: :py:meth:`_get_levels`, computed once edges are read
+        """
+        if self._level_index is None:
+            self._level_index = self._get_levels()
+        return self._level_index
+
+    def next_partition(self):
+        """
+        Ends reading edges for the current partition of edge ids and
+        moves to the next one, if any. For it edgeAttributes have to be
+        passed to :py:meth:`update` and then edges to
+        :py:meth:`update_edge` again
+
+        :return: True if there is another partition to read
+        :rtype: bool
+        """
+        if self._partition >= self._partitions:
+            return False
+        self._flush_edges()
+        _, levels = self._get_level_index()
+        self._level_counts += np.bincount(
+            levels, minlength=len(self._level_counts))
+        self._edge_ids = array.array('q')
+        self._levels = array.array('h')
+        self._level_index = None
+        self._partition += 1
+        return self._partition < self._partitions
+
+    def update_edge(self, element):
+        """
+        :param element: edges element
+        """
+        self._edge_buffer.append((element['@id'], element['s'],
+                                  element['t']))
+        if len(self._edge_buffer) >= EDGE_CHUNK_SIZE:
+            self._flush_edges()
+
+    def _flush_edges(self):
+        if not self._edge_buffer:
+            return
+        chunk = np.array(self._edge_buffer, dtype=np.int64)
+        self._edge_buffer = []
+        if self._partition == 0:
+            self._node_counters[0].add_ids(chunk[:, 1:].ravel())
+
+        edge_ids, levels = self._get_level_index()
+        if len(edge_ids) == 0:
+            return
+        positions = np.minimum(np.searchsorted(edge_ids, chunk[:, 0]),
+                               len(edge_ids) - 1)
+        found = edge_ids[positions] == chunk[:, 0]
+        chunk_levels = np.where(found, levels[positions], 0)
+        for level in np.unique(chunk_levels[chunk_levels > 0]).tolist():
+            self._node_counters[level].add_ids(
+                chunk[chunk_levels == level, 1:].ravel())
+
+    def _passes(self, levels, pos):
+        """
+        :param levels: array of highest levels passed
+        :param pos: index of cut-off
+        :return: mask of levels that pass cut-off at `pos`
+        """
+        if self._numeric:
+            return levels > self._ranks[pos]
+        return levels == pos + 1
+
+    def get_report(self, number_of_nodes, keep_parent_orphans=False):
+        """
+        :param number_of_nodes: number of nodes of network
+        :param keep_parent_orphans: if True, nodes without edges in
+                                    parent are counted as kept
+        :return: list of dicts with predicted edges and nodes per
+                 cut-off in order cut-offs were given
+        """
+        level_counts = self._level_counts
+        if self._partition < self._partitions:
+            self._flush_edges()
+            _, levels = self._get_level_index()
+            level_counts = level_counts + np.bincount(
+                levels, minlength=len(level_counts))
+        level_values = np.arange(1, len(self._labels) + 1)
+        parent_orphans = 0
+        if keep_parent_orphans:
+            parent_orphans = max(0, number_of_nodes -
+                                 self._node_counters[0].get_count())
+
+        report = []
+        for pos, label in enumerate(self._labels):
+            nodes = DistinctCounter(k=self._distinct_k)
+            passed = level_values[self._passes(level_values, pos)]
+            for level in passed.tolist():
+                nodes.merge(self._node_counters[level])
+            report.append({'value': label,
+                           'edges': int(level_counts[passed].sum()),
+                           'nodes': nodes.get_count() + parent_orphans,
+                           'nodes_exact': nodes.is_exact() and
+                           (not keep_parent_orphans or
+                            self._node_counters[0].is_exact())})
+        return report
+
+
+class StreamingAttributeProfiler(object):
+    """
+    Profiles an edge attribute of a CX document without building a
+    network. One pass over the document profiles the attribute and,
+    if cut-offs are given, reduces it to cut-off levels; without
+    cut-offs they are taken from quantiles of the profile in a
+    second pass over edgeAttributes. A last pass over edges counts
+    end points of edges kept at each cut-off. If more edges pass a
+    cut-off than :py:class:`CutoffPredictor` holds, edgeAttributes
+    and edges are read again for each further partition of edges.
+    """
+    def __init__(self, attribute_name, cutoffs=None,
+                 keep_parent_orphans=False,
+                 cutoff_quantiles=DEFAULT_CUTOFF_QUANTILES,
+                 max_edges=MAX_CUTOFF_EDGES):
+        """
+
+        :param attribute_name: name of edge attribute to profile
+        :param cutoffs: list of cut-offs to predict trims at or None
+                        to use `cutoff_quantiles` of numeric values
+        :param keep_parent_orphans: if True, nodes without edges in
+                                    parent are counted as kept
+        :param cutoff_quantiles: fractions of default cut-offs
+        :param max_edges: see :py:class:`CutoffPredictor`
+        """
+        self._attribute_name = attribute_name
+        self._cutoffs = cutoffs
+        self._keep_parent_orphans = keep_parent_orphans
+        self._cutoff_quantiles = cutoff_quantiles
+        self._max_edges = max_edges
+
+    def _read_aspect(self, get_stream, aspect, update):
+        """
+        Passes every element of `aspect` to `update`
+        """
+        with get_stream() as stream:
+            for _, element_aspect, element in iter_cx_elements(stream):
+                if element_aspect == aspect:
+                    update(element)
+
+    def profile(self, get_stream):
+        """
+        :param get_stream: function returning a new binary stream of
+                           CX document, called once per pass
+        :return: profile of attribute with predicted trims under
+                 'cutoffs' as JSON serializable dict
+        :rtype: dict
+        """
+        attribute_profile = AttributeProfile(self._attribute_name)
+        predictor = None
+        if self._cutoffs:
+            predictor = CutoffPredictor(self._attribute_name, self._cutoffs,
+                                        max_edges=self._max_edges)
+
+        counts = {NODES: 0, EDGES: 0}
+        with get_stream() as stream:
+            for _, aspect, element in iter_cx_elements(stream):
+                if aspect == EDGE_ATTRIBUTES:
+                    attribute_profile.update(element)
+                    if predictor is not None:
+                        predictor.update(element)
+                elif aspect in counts:
+                    counts[aspect] += 1
+
+        if predictor is None and attribute_profile.is_numeric():
+            cutoffs = sorted(set(attribute_profile.get_quantiles(
+                self._cutoff_quantiles)))
+            predictor = CutoffPredictor(self._attribute_name, cutoffs,
+                                        max_edges=self._max_edges)
+            self._read_aspect(get_stream, EDGE_ATTRIBUTES, predictor.update)
+
+        report = attribute_profile.get_report(counts[EDGES])
+        report['nodes'] = counts[NODES]
+        report['edges'] = counts[EDGES]
+        report['cutoffs'] = []
+        if predictor is None:
+            return report
+
+        self._read_aspect(get_stream, EDGES, predictor.update_edge)
+        while predictor.next_partition():
+            self._read_aspect(get_stream, EDGE_ATTRIBUTES, predictor.update)
+            self._read_aspect(get_stream, EDGES, predictor.update_edge)
+        report['cutoffs'] = predictor.get_report(
+            counts[NODES], keep_parent_orphans=self._keep_parent_orphans)
+        report['cutoff_partitions'] = predictor.get_partitions()
+        return report
@@ -0,0 +1,554 @@
+# -*- coding: utf-8 -*-
+
+"""
+Long running local service trimming networks on request.
+
+Trim jobs are posted as JSON to a small HTTP API and queued for a
+bounded pool of worker threads. Workers run in the service process so
+what the command line tool sets up again for every network is set up
+once: the interpreter and its imports, the configuration, an NDEx
+client per worker whose HTTP session keeps its connections open, and
+recently parsed parent networks, held in a
+:py:class:`~ndexnetworktrim.cache.MemoryNetworkCache` so several trims
+of one parent parse it once.
+
+API, all bodies are JSON:
+
+* ``POST /jobs`` with options of the trimmer without leading dashes,
+  for example ``{"uuid": "...", "edge_attr": "score", "value": 0.5}``,
+  queues a job. Answers 202 with the job, 400 if options are invalid
+  or 503 if the queue is full
+* ``GET /jobs`` lists jobs, ``GET /jobs/<id>`` gets one job with
+  metrics of its stages
+* ``GET /stats`` gets job counts, queue and run time percentiles and
+  hits and size of the network cache
+
+There is no authentication, the service is meant to listen on
+localhost only. Jobs can only name files, such as ``input`` and
+``output``, inside the directory the service was given via
+``--serve_dir`` and cannot name any if it was not given one.
+"""
+
+import collections
+import ipaddress
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from ndexnetworktrim.cache import MemoryNetworkCache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# options a job can set, value options take a value or list of values
+VALUE_OPTIONS = ['uuid', 'input', 'output', 'edge_attr', 'value', 'filter',
+                 'top_k', 'top_fraction', 'alpha', 'node_attr', 'node_value',
+                 'seeds', 'hops', 'min_component_size',
+                 'collapse_aggregate']
+
+FLAG_OPTIONS = ['backbone', 'largest_component_only', 'keep_parent_orphans',
+                'compact', 'collapse_parallel', 'collapse_by_interaction',
+                'stream_upload', 'gzip_upload']
+
+# options naming files, only allowed inside directory of service
+PATH_OPTIONS = ['input', 'output', 'seeds']
+
+# options of service passed on to every job
+SERVICE_OPTIONS = ['conf', 'profile', 'cache_dir', 'cache_max_mb']
+
+# finished jobs kept for GET /jobs
+MAX_FINISHED_JOBS = 1000
+
+# finished jobs latency percentiles are computed over
+LATENCY_WINDOW = 1000
+
+PERCENTILES = [50, 90, 99]
+
+JOB_ROUTE = re.compile(r'^/jobs/([0-9a-f]+)$')
+
+
+class JobError(Exception):
+    """
+    Raised if options of a job are invalid
+    """
+    pass
+
+
+class TrimJob(object):
+    """
+    Job trimming one network and its status
+    """
+    def __init__(self, options, args):
+        """
+
+        :param options: options as posted
+        :type options: dict
+        :param args: parsed arguments trimmer is created with
+        """
+        self.id = uuid.uuid4().hex
+        self.options = options
+        self.args = args
+        self.status = QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.exit_status = None
+        self.error = None
+        self.metrics = None
+
+    def get_queue_seconds(self):
+        """
+        :return: seconds job waited in queue or None if not started
+        """
+        if self.started is None:
+            return None
+        return self.started - self.submitted
+
+    def get_run_seconds(self):
+        """
+        :return: seconds job ran for or None if not finished
+        """
+        if self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def to_dict(self, include_metrics=False):
+        """
+        :param include_metrics: if True, metrics of stages of job
+                                are included
+        :rtype: dict
+        """
+        job = {'id': self.id,
+               'status': self.status,
+               'options': self.options,
+               'submitted': self.submitted,
+               'started': self.started,
+               'finished': self.finished,
+               'queue_seconds': self.get_queue_seconds(),
+               'run_seconds': self.get_run_seconds(),
+               'exit_status': self.exit_status,
+               'error': self.error}
+        if include_metrics:
+            job['metrics'] = self.metrics
+        return job
+
+
+def _get_job_path(name, path, path_dir):
+    """
+    :param path: path relative to `path_dir` or absolute
+    :param path_dir: directory files of jobs must be in or None if
+                     jobs cannot name files
+    :raises JobError: if `path` is not inside `path_dir`
+    :return: absolute path with symbolic links resolved
+    """
+    if path_dir is None:
+        raise JobError(name + ' is not allowed, service was started '
+                              'without --serve_dir')
+    root = os.path.realpath(path_dir)
+    path = os.path.realpath(os.path.join(root, str(path)))
+    if os.path.commonpath([root, path]) != root:
+        raise JobError(name + ' must be inside --serve_dir')
+    return path
+
+
+def get_job_arguments(options, path_dir=None):
+    """
+    Converts options of a job to command line arguments of trimmer
+
+    :param options: options without leading dashes
+    :type options: dict
+    :param path_dir: directory files named by
+                     :py:const:`PATH_OPTIONS` must be in, if None
+                     those options are rejected
+    :raises JobError: if an option is unknown or cannot be set by jobs
+                      or if it names a file outside `path_dir`
+    :return: command line arguments
+    :rtype: list
+    """
+    if not isinstance(options, dict):
+        raise JobError('Job must be a JSON object')
+    args = []
+    for name, value in options.items():
+        if name in FLAG_OPTIONS:
+            if not isinstance(value, bool):
+                raise JobError(name + ' must be true or false')
+            if value:
+                args.append('--' + name)
+        elif name in VALUE_OPTIONS:
+            if value is None:
+                continue
+            if name in PATH_OPTIONS:
+                values = [_get_job_path(name, value, path_dir)]
+            elif isinstance(value, list):
+                values = [str(v) for v in value]
+            elif name == 'value':
+                values = str(value).split()
+            else:
+                values = [str(value)]
+            args.extend(['--' + name] + values)
+        else:
+            raise JobError('Unknown option ' + name)
+    return args
+
+
+def _get_percentiles(values):
+    """
+    :return: nearest rank percentiles and max of values or None
+             if there are none
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    percentiles = {}
+    for percentile in PERCENTILES:
+        rank = max(0, -(-percentile * len(values) // 100) - 1)
+        percentiles['p' + str(percentile)] = values[rank]
+    percentiles['max'] = values[-1]
+    return percentiles
+
+
+def _is_loopback(host):
+    """
+    :return: True if `host` is only reachable from this machine
+    """
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class TrimService(object):
+    """
+    Queues trim jobs posted to a local HTTP API and runs them in a
+    bounded pool of worker threads sharing configuration, NDEx
+    credentials and parsed parent networks.
+
+    Example usage:
+
+    .. code-block:: python
+
+        service = TrimService(args, NDExNetworkTrimmer, parse_args)
+        service.start()
+        # POST jobs to service.get_url() + '/jobs'
+        service.stop()
+
+    """
+    def __init__(self, args, trimmer_class, parse_args):
+        """
+
+        :param args: parsed command line arguments, serve,
+                     serve_host, serve_dir, pool_size, queue_size and
+                     network_cache_mb are used here, conf, profile,
+                     cache_dir and cache_max_mb are passed to each job
+        :param trimmer_class: class used to trim each network, it is
+                              passed the arguments of the job
+        :param parse_args: function parsing command line arguments of
+                           a job, raising SystemExit if they are invalid
+        """
+        self._host = args.serve_host
+        self._port = args.serve
+        self._path_dir = args.serve_dir
+        self._pool_size = max(args.pool_size, 1)
+        self._trimmer_class = trimmer_class
+        self._parse_args = parse_args
+        self._service_args = []
+        for name in SERVICE_OPTIONS:
+            value = getattr(args, name, None)
+            if value is not None:
+                self._service_args.extend(['--' + name, str(value)])
+
+        self._queue = queue.Queue(maxsize=args.queue_size)
+        self._network_cache = MemoryNetworkCache(
+            int(args.network_cache_mb * 1024 * 1024))
+
+        self._lock = threading.Lock()
+        self._jobs = collections.OrderedDict()
+        self._finished = collections.deque()
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._counts = collections.Counter()
+        self._credentials = None
+        self._local = threading.local()
+        self._started = time.time()
+
+        self._httpd = None
+        self._threads = []
+
+    def submit(self, options):
+        """
+        Queues job
+
+        :param options: options of job, see :py:func:`get_job_arguments`
+        :raises JobError: if options are invalid
+        :raises queue.Full: if queue is full
+        :return: queued job
+        :rtype: :py:class:`TrimJob`
+        """
+        job_args = get_job_arguments(options, path_dir=self._path_dir)
+        try:
+            args = self._parse_args(job_args + self._service_args)
+        except SystemExit:
+            raise JobError('Invalid options: ' + ' '.join(job_args))
+        if args.uuid is None and args.input is None:
+            raise JobError('Either uuid or input must be set')
+
+        job = TrimJob(options, args)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._counts['rejected'] += 1
+                raise
+            self._jobs[job.id] = job
+            self._counts['submitted'] += 1
+        logger.info('Queued job ' + job.id)
+        return job
+
+    def get_job(self, job_id):
+        """
+        :return: job or None if there is no job `job_id`
+        :rtype: :py:class:`TrimJob`
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self):
+        """
+        :return: jobs in order of submission
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get_stats(self):
+        """
+        :return: job counts, queue length, percentiles of seconds jobs
+                 waited in queue and ran for over the last
+                 :py:const:`LATENCY_WINDOW` finished jobs and stats of
+                 network cache
+        :rtype: dict
+        """
+        with self._lock:
+            statuses = collections.Counter(job.status for job in
+                                           self._jobs.values())
+            queue_seconds = [q for q, _ in self._latencies]
+            run_seconds = [r for _, r in self._latencies]
+            counts = dict(self._counts)
+        return {'uptime_seconds': time.time() - self._started,
+                'workers': self._pool_size,
+                'queue_size': self._queue.maxsize,
+                'queued': statuses[QUEUED],
+                'running': statuses[RUNNING],
+                'submitted': counts.get('submitted', 0),
+                'rejected': counts.get('rejected', 0),
+                'succeeded': counts.get(SUCCEEDED, 0),
+                'failed': counts.get(FAILED, 0),
+                'queue_seconds': _get_percentiles(queue_seconds),
+                'run_seconds': _get_percentiles(run_seconds),
+                'network_cache': self._network_cache.get_stats()}
+
+    def _get_connection(self):
+        """
+        :return: NDEx server and credentials found by an earlier job
+                 with client of this worker thread, or None
+        """
+        with self._lock:
+            credentials = self._credentials
+        if credentials is None:
+            return None
+        return credentials + (getattr(self._local, 'client', None),)
+
+    def _set_connection(self, connection):
+        if connection is None:
+            return
+        self._local.client = connection[3]
+        with self._lock:
+            self._credentials = connection[:3]
+
+    def _run_job(self, job):
+        """
+        Trims network of job, a failing job does not stop the worker
+        """
+        with self._lock:
+            job.status = RUNNING
+            job.started = time.time()
+
+        trimmer = None
+        error = None
+        try:
+            trimmer = self._trimmer_class(job.args)
+            trimmer.set_network_cache(self._network_cache)
+            connection = self._get_connection()
+            if connection is not None:
+                trimmer.set_ndex_connection(*connection)
+            exit_status = trimmer.run()
+            self._set_connection(trimmer.get_ndex_connection())
+        except Exception as e:
+            logger.exception('Job ' + job.id + ' failed')
+            exit_status = 2
+            error = str(e)
+
+        with self._lock:
+            job.finished = time.time()
+            job.exit_status = exit_status
+            job.error = error
+            job.status = SUCCEEDED if exit_status == 0 else FAILED
+            if trimmer is not None:
+                job.metrics = trimmer.get_metrics().to_dict()
+            self._counts[job.status] += 1
+            self._latencies.append((job.get_queue_seconds(),
+                                    job.get_run_seconds()))
+            self._finished.append(job.id)
+            while len(self._finished) > MAX_FINISHED_JOBS:
+                del self._jobs[self._finished.popleft()]
+        logger.info('Job {} {} in {:.2f}s'.format(
+            job.id, job.status, job.get_run_seconds()))
+
+    def _run_worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run_job(job)
+
+    def get_url(self):
+        """
+        :return: URL of API once started
+        """
+        return 'http://{}:{}'.format(self._httpd.server_address[0],
+                                     self._httpd.server_address[1])
+
+    def start(self):
+        """
+        Starts workers and serves API in a background thread
+        """
+        if not _is_loopback(self._host):
+            logger.warning('Serving on ' + self._host + ' without '
+                           'authentication, any client reaching it can '
+                           'run jobs')
+        self._httpd = TrimServiceHTTPServer(self, self._host, self._port)
+        for _ in range(self._pool_size):
+            thread = threading.Thread(target=self._run_worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._httpd.serve_forever,
+                                  kwargs={'poll_interval': 0.1})
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        """
+        Stops serving API and stops workers once queued jobs are done
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        for _ in range(self._pool_size):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def run(self):
+        """
+        Serves API until interrupted
+
+        :return: 0
+        """
+        self.start()
+        print('Serving trim jobs at ' + self.get_url())
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        return 0
+
+
+class TrimServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles requests to API of :py:class:`TrimService`
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/jobs':
+            return self._send_json(200, [j.to_dict() for j in
+                                         service.get_jobs()])
+        if path == '/stats':
+            return self._send_json(200, service.get_stats())
+        match = JOB_ROUTE.match(path)
+        if match is None:
+            return self._send_error(404, 'Unknown route ' + path)
+        job = service.get_job(match.group(1))
+        if job is None:
+            return self._send_error(404, 'Job ' + match.group(1) +
+                                    ' not found')
+        self._send_json(200, job.to_dict(include_metrics=True))
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path != '/jobs':
+            return self._send_error(404, 'Unknown route ' + path)
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            options = json.loads(self.rfile.read(length).decode('utf-8'))
+            job = self.server.service.submit(options)
+        except ValueError as e:
+            return self._send_error(400, 'Invalid JSON: ' + str(e))
+        except JobError as e:
+            return self._send_error(400, str(e))
+        except queue.Full:
+            return self._send_error(503, 'Queue is full, retry later')
+        self._send_json(202, job.to_dict())
+
+
+class TrimServiceHTTPServer(ThreadingHTTPServer):
+    """
+    HTTP server of API of :py:class:`TrimService`
+    """
+    daemon_threads = True
+
+    def __init__(self, service, host='127.0.0.1', port=0):
+        """
+
+        :param service: service handling requests
+        :type service: :py:class:`TrimService`
+        :param host: host to listen on
+        :param port: port to listen on, 0 means pick a free port
+        """
+        ThreadingHTTPServer.__init__(self, (host, port),
+                                     TrimServiceRequestHandler)
+        self.service = service
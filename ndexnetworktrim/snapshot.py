@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+"""
+Binary columnar snapshot files of parsed networks.
+
+A snapshot is a directory of ``.npy`` array files and a JSON manifest
+describing how they make up a network. Numeric arrays are stored as
+they are and mapped into memory on load, so reloading costs next to
+nothing and only pages that are read are loaded. Arrays of other
+values, such as strings, are stored as int32 codes into a dictionary
+of their distinct values kept in a JSON file.
+
+A snapshot is written to a new directory that replaces the snapshot
+directory once the manifest is written, so a snapshot is only
+readable once all its arrays are complete and an interrupted write
+leaves the previous snapshot as it was. File names are unique to each
+write, so a reader never takes arrays of one snapshot for another.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+MANIFEST = 'snapshot.json'
+
+
+class SnapshotError(Exception):
+    """
+    Raised if a snapshot cannot be read
+    """
+    pass
+
+
+def _get_dictionary_key(value):
+    """
+    :return: hashable key of value that tells 1, 1.0 and True apart
+    """
+    if isinstance(value, (list, dict)):
+        return 'json', json.dumps(value, sort_keys=True)
+    return type(value).__name__, value
+
+
+def encode_objects(values):
+    """
+    Encodes values as codes into a dictionary of distinct values
+
+    :param values: :py:class:`numpy.ndarray` of objects
+    :return: (int32 codes that are -1 for None, list of distinct
+             values)
+    :rtype: tuple
+    """
+    codes = np.empty(len(values), dtype=np.int32)
+    lookup = {}
+    dictionary = []
+    for pos, value in enumerate(values.tolist()):
+        if value is None:
+            codes[pos] = -1
+            continue
+        key = _get_dictionary_key(value)
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(dictionary)
+            dictionary.append(value)
+        codes[pos] = code
+    return codes, dictionary
+
+
+def decode_objects(codes, dictionary):
+    """
+    :param codes: codes from :py:func:`encode_objects`
+    :param dictionary: distinct values from :py:func:`encode_objects`
+    :return: :py:class:`numpy.ndarray` of objects
+    """
+    # code -1 picks the trailing None
+    lookup = np.empty(len(dictionary) + 1, dtype=object)
+    for pos, value in enumerate(dictionary):
+        lookup[pos] = value
+    return lookup[codes]
+
+
+def get_snapshot_size(path):
+    """
+    :param path: directory of snapshot
+    :return: total size of files in directory in bytes
+    """
+    return sum(os.path.getsize(os.path.join(path, name))
+               for name in os.listdir(path))
+
+
+class SnapshotWriter(object):
+    """
+    Writes arrays of a snapshot to a new directory followed by the
+    manifest that refers to them, then moves the new directory in
+    place of the snapshot directory
+    """
+    def __init__(self, path):
+        """
+
+        :param path: directory to write snapshot to, replaced if it
+                     holds a snapshot
+        :raises SnapshotError: if `path` is a directory that is neither
+                               empty nor holds a snapshot
+        """
+        self._path = os.path.abspath(path)
+        if os.path.isdir(self._path) and os.listdir(self._path) and\
+                not os.path.isfile(os.path.join(self._path, MANIFEST)):
+            raise SnapshotError('Not replacing ' + path + ', it is not '
+                                'empty and holds no snapshot')
+        parent = os.path.dirname(self._path)
+        os.makedirs(parent, exist_ok=True)
+        self._tmp_path = tempfile.mkdtemp(
+            dir=parent, prefix='.' + os.path.basename(self._path) + '.')
+        self._prefix = uuid.uuid4().hex[:12]
+        self._count = 0
+
+    def _get_path(self, suffix):
+        self._count += 1
+        name = '{}-a{}{}'.format(self._prefix, self._count, suffix)
+        return name, os.path.join(self._tmp_path, name)
+
+    def _save(self, array):
+        name, path = self._get_path('.npy')
+        with open(path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        return name
+
+    def _save_dictionary(self, dictionary):
+        name, path = self._get_path('.json')
+        with open(path, 'w') as f:
+            json.dump(dictionary, f)
+        return name
+
+    def add_array(self, array):
+        """
+        Writes array to its own file
+
+        :param array: one dimensional :py:class:`numpy.ndarray`
+        :return: JSON serializable reference to array to put in state
+                 passed to :py:func:`write`
+        :rtype: dict
+        """
+        if array.dtype != object:
+            return {'file': self._save(array)}
+        codes, dictionary = encode_objects(array)
+        return {'codes': self._save(codes),
+                'dictionary': self._save_dictionary(dictionary)}
+
+    def write(self, state):
+        """
+        Writes manifest holding `state`
+
+        :param state: JSON serializable description of network with
+                      references from :py:func:`add_array`
+        :type state: dict
+        """
+        with open(os.path.join(self._tmp_path, MANIFEST), 'w') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'state': state}, f)
+
+        old_path = None
+        if os.path.exists(self._path):
+            old_path = self._tmp_path + '.old'
+            os.rename(self._path, old_path)
+        os.rename(self._tmp_path, self._path)
+        if old_path is not None:
+            # arrays of old snapshot stay mapped by readers that have them
+            shutil.rmtree(old_path)
+
+    def abort(self):
+        """
+        Removes arrays written so far, leaving the snapshot directory
+        as it was
+        """
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+
+class SnapshotReader(object):
+    """
+    Reads manifest of snapshot and the arrays it refers to
+    """
+    def __init__(self, path, mmap=True):
+        """
+
+        :param path: directory snapshot was written to
+        :param mmap: if True, numeric arrays are mapped read only
+                     into memory instead of being read
+        :raises SnapshotError: if there is no readable snapshot
+        """
+        self._path = path
+        self._mmap_mode = 'r' if mmap else None
+        try:
+            with open(os.path.join(path, MANIFEST), 'r') as f:
+                manifest = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            raise SnapshotError('Cannot read snapshot ' + path + ': ' +
+                                str(e))
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            raise SnapshotError('Snapshot ' + path + ' has version ' +
+                                str(manifest.get('version')) +
+                                ', expected ' + str(SNAPSHOT_VERSION))
+        self._state = manifest['state']
+
+    def get_state(self):
+        """
+        :return: state passed to :py:func:`SnapshotWriter.write`
+        :rtype: dict
+        """
+        return self._state
+
+    def _load(self, name):
+        try:
+            return np.load(os.path.join(self._path, name),
+                           mmap_mode=self._mmap_mode, allow_pickle=False)
+        except (IOError, OSError) as e:
+            raise SnapshotError('Cannot read array of snapshot ' +
+                                self._path + ', it may have been '
+                                'replaced: ' + str(e))
+
+    def get_array(self, ref):
+        """
+        :param ref: reference from :py:func:`SnapshotWriter.add_array`
+        :return: array, read only if memory mapped
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        if 'file' in ref:
+            return self._load(ref['file'])
+        try:
+            with open(os.path.join(self._path, ref['dictionary']),
+                      'r') as f:
+                dictionary = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            raise SnapshotError('Cannot read dictionary of snapshot ' +
+                                self._path + ': ' + str(e))
+        return decode_objects(self._load(ref['codes']), dictionary)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local record of derived networks so scheduled runs can skip parents
+that did not change and update derived networks in place.
+"""
+
+import json
+import logging
+import os
+import time
+
+from ndexnetworktrim.cache import get_summary_fingerprint
+from ndexnetworktrim.cache import is_summary_unchanged
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+DERIVED_NETWORK_ID = 'derivedNetworkId'
+PARENT_SUMMARY = 'parentSummary'
+LAST_RUN = 'lastRun'
+
+
+def get_network_id_from_url(url):
+    """
+    :param url: URL of network as returned by NDEx on creation
+    :return: UUID of network, the last path segment of `url`
+    """
+    return url.strip().rstrip('/').rsplit('/', 1)[-1]
+
+
+class TrimState(object):
+    """
+    JSON file mapping a trim, identified by a key made of the parent
+    network and the trim parameters, to the UUID of the network it
+    derived and the modification time and size of the parent when
+    it was derived.
+
+    Each update re-reads the file and replaces it via a temporary
+    file so runs sharing a state file, such as jobs of a batch, only
+    overwrite their own entries.
+    """
+    def __init__(self, path):
+        """
+
+        :param path: path to state file, created on first update
+        """
+        self._path = path
+        self._entries = self._read()
+
+    def _read(self):
+        """
+        :return: entries of state file or empty dict if it does
+                 not exist or cannot be parsed
+        """
+        if not os.path.isfile(self._path):
+            return {}
+        try:
+            with open(self._path, 'r') as f:
+                state = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            logger.warning('Ignoring unreadable state file ' + self._path +
+                           ': ' + str(e))
+            return {}
+        return state.get('networks', {})
+
+    def _write(self):
+        tmp_path = self._path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': STATE_VERSION,
+                       'networks': self._entries}, f, indent=2,
+                      sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+    def get_derived_network_id(self, key):
+        """
+        :param key: key of trim
+        :return: UUID of network derived by last run of trim or None
+        """
+        return self._entries.get(key, {}).get(DERIVED_NETWORK_ID)
+
+    def is_current(self, key, summary):
+        """
+        :param key: key of trim
+        :param summary: current network summary of parent from server
+        :type summary: dict
+        :return: True if trim derived a network from a parent with the
+                 same modification time and size as `summary`
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.get(DERIVED_NETWORK_ID) is None:
+            return False
+        return is_summary_unchanged(entry.get(PARENT_SUMMARY), summary)
+
+    def record(self, key, summary, network_id):
+        """
+        Records that trim derived network `network_id` from parent
+        described by `summary` and writes state file
+
+        :param key: key of trim
+        :param summary: network summary of parent from server
+        :type summary: dict
+        :param network_id: UUID of derived network
+        """
+        self._entries = self._read()
+        self._entries[key] = {DERIVED_NETWORK_ID: network_id,
+                              PARENT_SUMMARY: get_summary_fingerprint(summary),
+                              LAST_RUN: time.time()}
+        self._write()
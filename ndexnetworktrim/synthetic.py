@@ -0,0 +1,241 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Seeded generator of synthetic CX networks for benchmarks and tests.
+
+Networks have a configurable number of nodes and edges, a numeric
+edge score drawn from a chosen distribution and a string edge type
+with a chosen number of distinct values. Elements are generated in
+blocks and written as they are produced so networks with millions of
+edges can be written without holding them in memory. The same seed
+and parameters always give the same network.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from ndexnetworktrim.cxupload import iter_cx_chunks
+
+SCORE_ATTR = 'score'
+TYPE_ATTR = 'type'
+INTERACTION = 'interacts-with'
+
+DISTRIBUTIONS = ['uniform', 'normal', 'exponential']
+
+BLOCK_SIZE = 100000
+
+
+class SyntheticNetworkGenerator(object):
+    """
+    Generates a random network as CX aspect fragments
+
+    Example usage:
+
+    .. code-block:: python
+
+        generator = SyntheticNetworkGenerator(1000, 5000, seed=1)
+        with open('synthetic.cx', 'wb') as f:
+            generator.write(f)
+
+    """
+    def __init__(self, num_nodes, num_edges, seed=0,
+                 score_distribution='uniform', num_types=10,
+                 missing_fraction=0.0, block_size=BLOCK_SIZE):
+        """
+
+        :param num_nodes: number of nodes
+        :param num_edges: number of edges, source and target of each
+                          edge are picked uniformly at random so some
+                          nodes may end up without edges
+        :param seed: seed of random number generator
+        :param score_distribution: one of :py:const:`DISTRIBUTIONS`, scores
+                                   are in [0, 1) for uniform, centered on
+                                   0.5 with standard deviation 0.15 for
+                                   normal and have mean 0.2 for exponential
+        :param num_types: number of distinct values of type edge attribute
+        :param missing_fraction: fraction of edges without score attribute
+        :param block_size: number of elements generated at a time
+        :raises ValueError: if a parameter is out of range
+        """
+        if num_nodes < 1 and num_edges > 0:
+            raise ValueError('Edges need at least one node')
+        if score_distribution not in DISTRIBUTIONS:
+            raise ValueError('Unknown score distribution ' +
+                             str(score_distribution) + ' expected one of ' +
+                             ', '.join(DISTRIBUTIONS))
+        if num_types < 1:
+            raise ValueError('num_types must be at least 1')
+        if not 0 <= missing_fraction <= 1:
+            raise ValueError('missing_fraction must be between 0 and 1')
+        self._num_nodes = num_nodes
+        self._num_edges = num_edges
+        self._seed = seed
+        self._score_distribution = score_distribution
+        self._num_types = num_types
+        self._missing_fraction = missing_fraction
+        self._block_size = block_size
+
+    def _get_blocks(self, count):
+        """
+        :return: (start, end) of blocks covering `count` elements
+        """
+        for start in range(0, count, self._block_size):
+            yield start, min(start + self._block_size, count)
+
+    def _get_random_state(self, stream):
+        """
+        :return: random generator for one aspect so aspects can be
+                 generated independently and in any order
+        """
+        return np.random.default_rng([self._seed, stream])
+
+    def _get_scores(self, rng, size):
+        if self._score_distribution == 'normal':
+            return rng.normal(0.5, 0.15, size)
+        if self._score_distribution == 'exponential':
+            return rng.exponential(0.2, size)
+        return rng.random(size)
+
+    def _iter_nodes(self):
+        for start, end in self._get_blocks(self._num_nodes):
+            for node_id in range(start, end):
+                yield {'@id': node_id, 'n': 'node' + str(node_id),
+                       'r': 'synthetic:' + str(node_id)}
+
+    def _iter_edges(self):
+        rng = self._get_random_state(0)
+        for start, end in self._get_blocks(self._num_edges):
+            sources = rng.integers(0, self._num_nodes, end - start).tolist()
+            targets = rng.integers(0, self._num_nodes, end - start).tolist()
+            for offset, edge_id in enumerate(range(start, end)):
+                yield {'@id': edge_id, 's': sources[offset],
+                       't': targets[offset], 'i': INTERACTION}
+
+    def _iter_edge_attributes(self):
+        rng = self._get_random_state(1)
+        for start, end in self._get_blocks(self._num_edges):
+            size = end - start
+            scores = self._get_scores(rng, size).tolist()
+            missing = (rng.random(size) < self._missing_fraction).tolist()
+            types = rng.integers(0, self._num_types, size).tolist()
+            for offset, edge_id in enumerate(range(start, end)):
+                if not missing[offset]:
+                    yield {'po': edge_id, 'n': SCORE_ATTR,
+                           'v': scores[offset], 'd': 'double'}
+                yield {'po': edge_id, 'n': TYPE_ATTR,
+                       'v': 'type' + str(types[offset])}
+
+    def _get_network_attributes(self):
+        return [{'n': 'name', 'v': 'synthetic {} nodes {} edges seed {}'
+                 .format(self._num_nodes, self._num_edges, self._seed)},
+                {'n': 'description',
+                 'v': 'Synthetic network with {} edge scores'
+                      .format(self._score_distribution)}]
+
+    def _get_metadata(self):
+        metadata = []
+        for name, count in [('nodes', self._num_nodes),
+                            ('edges', self._num_edges),
+                            ('networkAttributes', 2),
+                            ('edgeAttributes', None)]:
+            element = {'name': name, 'version': '1.0',
+                       'consistencyGroup': 1, 'properties': []}
+            if count is not None:
+                element['elementCount'] = count
+            if name in ('nodes', 'edges'):
+                element['idCounter'] = max(count - 1, 0)
+            metadata.append(element)
+        return metadata
+
+    def get_fragments(self):
+        """
+        Generates aspect fragments of network
+
+        :return: (aspect name, iterable of elements) tuples
+        """
+        yield 'numberVerification', [{'longNumber': 281474976710655}]
+        yield 'metaData', self._get_metadata()
+        yield 'networkAttributes', self._get_network_attributes()
+        yield 'nodes', self._iter_nodes()
+        yield 'edges', self._iter_edges()
+        yield 'edgeAttributes', self._iter_edge_attributes()
+        yield 'status', [{'error': '', 'success': True}]
+
+    def write(self, output):
+        """
+        Writes network as CX
+
+        :param output: binary file like object
+        :return: number of bytes written
+        """
+        num_bytes = 0
+        for chunk in iter_cx_chunks(self.get_fragments()):
+            output.write(chunk)
+            num_bytes += len(chunk)
+        return num_bytes
+
+    def get_cx(self):
+        """
+        :return: network as CX, only suitable for small networks
+        :rtype: list
+        """
+        return json.loads(b''.join(iter_cx_chunks(self.get_fragments())))
+
+
+def _parse_arguments(desc, args):
+    """
+    Parses command line arguments
+    :param desc:
+    :param args:
+    :return:
+    """
+    help_fm = argparse.RawDescriptionHelpFormatter
+    parser = argparse.ArgumentParser(description=desc,
+                                     formatter_class=help_fm)
+    parser.add_argument('output', help='CX file to write network to')
+    parser.add_argument('--nodes', type=int, default=10000,
+                        help='Number of nodes (default 10000)')
+    parser.add_argument('--edges', type=int, default=50000,
+                        help='Number of edges (default 50000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of random number generator (default 0)')
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS,
+                        default='uniform',
+                        help='Distribution of ' + SCORE_ATTR + ' edge '
+                             'attribute (default uniform)')
+    parser.add_argument('--types', type=int, default=10,
+                        help='Number of distinct values of ' + TYPE_ATTR +
+                             ' edge attribute (default 10)')
+    parser.add_argument('--missing', type=float, default=0.0,
+                        help='Fraction of edges without ' + SCORE_ATTR +
+                             ' (default 0)')
+    return parser.parse_args(args)
+
+
+def main(args):
+    """
+    Main entry point for program
+    :param args:
+    :return:
+    """
+    desc = """
+    Writes a seeded synthetic network as CX with a numeric {score}
+    and a string {type} edge attribute.
+    """.format(score=SCORE_ATTR, type=TYPE_ATTR)
+    theargs = _parse_arguments(desc, args[1:])
+    generator = SyntheticNetworkGenerator(
+        theargs.nodes, theargs.edges, seed=theargs.seed,
+        score_distribution=theargs.distribution, num_types=theargs.types,
+        missing_fraction=theargs.missing)
+    with open(theargs.output, 'wb') as f:
+        num_bytes = generator.write(f)
+    print('Wrote {} bytes to {}'.format(num_bytes, theargs.output))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main(sys.argv))
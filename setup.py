@@ -19,7 +19,9 @@ with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
 requirements = ['ndex2',
-                'ndexutil']
+                'ndexutil',
+                'ijson',
+                'numpy']
 
 setup_requirements = [ ]
 
@@ -33,13 +35,14 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
         'Natural Language :: English',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
     description="Python Boilerplate contains all the boilerplate you need to create a Python NDEx Content Loader package.",
     install_requires=requirements,
+    python_requires='>=3.8',
     license="BSD license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
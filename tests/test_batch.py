@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `batch` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ndexutil.config import NDExUtilConfig
+
+from ndexnetworktrim import batch
+from ndexnetworktrim import ndexnetworktrimmer
+from ndexnetworktrim.localserver import LocalNDExServer
+from tests.test_cxstream import get_test_cx, get_aspect
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for `batch` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+        self._input = os.path.join(self._temp_dir, 'input.cx')
+        with open(self._input, 'w') as f:
+            json.dump(get_test_cx(), f)
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def _get_args(self, manifest, extra_args=None):
+        args = ['--manifest', manifest]
+        if extra_args is not None:
+            args.extend(extra_args)
+        return ndexnetworktrimmer._parse_arguments('hi', args)
+
+    def test_read_manifest_csv(self):
+        manifest = os.path.join(self._temp_dir, 'manifest.csv')
+        with open(manifest, 'w') as f:
+            f.write('uuid,edge_attr,value\n'
+                    'abc,score,0.5\n'
+                    'def, score ,0.5 0.7\n')
+        res = batch.read_manifest(manifest)
+        self.assertEqual([{'uuid': 'abc', 'input': None, 'output': None,
+                           'edge_attr': 'score', 'value': ['0.5'],
+                           'filter': None},
+                          {'uuid': 'def', 'input': None, 'output': None,
+                           'edge_attr': 'score', 'value': ['0.5', '0.7'],
+                           'filter': None}],
+                         res)
+
+    def test_read_manifest_with_filter(self):
+        manifest = os.path.join(self._temp_dir, 'manifest.json')
+        with open(manifest, 'w') as f:
+            json.dump([{'uuid': 'abc', 'filter': 'score >= 0.5'}], f)
+        res = batch.read_manifest(manifest)
+        self.assertEqual('score >= 0.5', res[0]['filter'])
+        self.assertIsNone(res[0]['value'])
+
+    def test_read_manifest_json(self):
+        manifest = os.path.join(self._temp_dir, 'manifest.json')
+        with open(manifest, 'w') as f:
+            json.dump([{'input': 'a.cx', 'edge_attr': 'score',
+                        'value': [0.5, 0.7]},
+                       {'uuid': 'abc', 'edge_attr': 'type', 'value': 'x'}],
+                      f)
+        res = batch.read_manifest(manifest)
+        self.assertEqual(['0.5', '0.7'], res[0]['value'])
+        self.assertEqual('a.cx', res[0]['input'])
+        self.assertEqual(['x'], res[1]['value'])
+
+    def test_read_manifest_invalid_rows(self):
+        manifest = os.path.join(self._temp_dir, 'manifest.json')
+        for row, msg in [({'edge_attr': 'x', 'value': 1}, 'neither'),
+                         ({'uuid': 'a', 'value': 1}, 'edge_attr'),
+                         ({'uuid': 'a', 'edge_attr': 'x'}, 'value')]:
+            with open(manifest, 'w') as f:
+                json.dump([row], f)
+            try:
+                batch.read_manifest(manifest)
+                self.fail('Expected Exception')
+            except Exception as e:
+                self.assertTrue('Row 1' in str(e))
+                self.assertTrue(msg in str(e))
+
+    def test_run_with_pool_and_failing_job(self):
+        manifest = os.path.join(self._temp_dir, 'manifest.json')
+        jobs = [{'input': self._input, 'edge_attr': 'score', 'value': 0.6,
+                 'output': os.path.join(self._temp_dir, 'one.cx')},
+                {'input': os.path.join(self._temp_dir, 'nope.cx'),
+                 'edge_attr': 'score', 'value': 0.6,
+                 'output': os.path.join(self._temp_dir, 'two.cx')},
+                {'input': self._input, 'edge_attr': 'score', 'value': 0.5,
+                 'output': os.path.join(self._temp_dir, 'three.cx')}]
+        with open(manifest, 'w') as f:
+            json.dump(jobs, f)
+        report = os.path.join(self._temp_dir, 'report.json')
+        args = self._get_args(manifest, ['--pool_size', '2',
+                                         '--report', report])
+        trimmer = batch.BatchTrimmer(args, ndexnetworktrimmer.NDExNetworkTrimmer)
+        self.assertEqual(1, trimmer.run())
+
+        with open(report, 'r') as f:
+            res = json.load(f)
+        self.assertEqual(3, res['numberOfJobs'])
+        self.assertEqual(1, res['numberFailed'])
+        self.assertEqual([0, 2, 0], [j['status'] for j in res['jobs']])
+        self.assertTrue(res['jobs'][1]['error'] is not None)
+
+        with open(os.path.join(self._temp_dir, 'three.cx'), 'r') as f:
+            cx = json.load(f)
+        self.assertEqual([10, 12], sorted([e['@id'] for e in
+                                           get_aspect(cx, 'edges')]))
+
+    def test_main_reuses_connection_against_local_server(self):
+        datadir = os.path.join(self._temp_dir, 'data')
+        os.makedirs(datadir)
+        for network_id in ['abc', 'def']:
+            shutil.copy(self._input, os.path.join(datadir,
+                                                  network_id + '.cx'))
+        server = LocalNDExServer(datadir)
+        server.start()
+        try:
+            confile = os.path.join(self._temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+            manifest = os.path.join(self._temp_dir, 'manifest.csv')
+            with open(manifest, 'w') as f:
+                f.write('uuid,edge_attr,value\nabc,score,0.5\n'
+                        'def,score,0.6\n')
+            res = ndexnetworktrimmer.main(['myprog.py', '--conf', confile,
+                                           '--profile', 'hi', '--manifest',
+                                           manifest])
+            self.assertEqual(0, res)
+            self.assertEqual(4, len(os.listdir(datadir)))
+            connection = batch._worker['connection']
+            self.assertEqual(server.get_url(), connection[0])
+            self.assertEqual('bob', connection[1])
+        finally:
+            server.stop()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `cache` module."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from ndexnetworktrim import cache
+
+
+class TestCache(unittest.TestCase):
+    """Tests for `cache` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+        self._cache_dir = os.path.join(self._temp_dir, 'cache')
+        self._downloads = []
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def _get_download(self, data):
+        def download(path):
+            self._downloads.append(data)
+            with open(path, 'w') as f:
+                f.write(data)
+        return download
+
+    def test_reuses_unchanged_network(self):
+        net_cache = cache.NetworkCache(self._cache_dir, 1000)
+        summary = {'modificationTime': 1, 'cxFileSize': 3}
+        path = net_cache.get_network_path('abc', summary,
+                                          self._get_download('one'))
+        self.assertEqual(os.path.join(self._cache_dir, 'abc.cx'), path)
+        path = net_cache.get_network_path('abc', dict(summary),
+                                          self._get_download('two'))
+        with open(path, 'r') as f:
+            self.assertEqual('one', f.read())
+        self.assertEqual(['one'], self._downloads)
+
+    def test_downloads_changed_network(self):
+        net_cache = cache.NetworkCache(self._cache_dir, 1000)
+        net_cache.get_network_path('abc', {'modificationTime': 1},
+                                   self._get_download('one'))
+        path = net_cache.get_network_path('abc', {'modificationTime': 2},
+                                          self._get_download('two'))
+        with open(path, 'r') as f:
+            self.assertEqual('two', f.read())
+
+        # summary without known keys is never trusted
+        net_cache.get_network_path('abc', {}, self._get_download('three'))
+        net_cache.get_network_path('abc', None, self._get_download('four'))
+        self.assertEqual(['one', 'two', 'three', 'four'], self._downloads)
+
+    def test_failed_download_leaves_no_entry(self):
+        net_cache = cache.NetworkCache(self._cache_dir, 1000)
+
+        def download(path):
+            with open(path, 'w') as f:
+                f.write('partial')
+            raise IOError('connection reset')
+        try:
+            net_cache.get_network_path('abc', {'modificationTime': 1},
+                                       download)
+            self.fail('Expected IOError')
+        except IOError:
+            pass
+        self.assertEqual([], os.listdir(self._cache_dir))
+
+    def test_concurrent_downloads_of_network_do_not_mix(self):
+        net_cache = cache.NetworkCache(self._cache_dir, 100000)
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def download(data):
+            def write(path):
+                with open(path, 'w') as f:
+                    for _ in range(100):
+                        f.write(data)
+                        f.flush()
+                        barrier.wait()
+            return write
+
+        def run(data):
+            try:
+                net_cache.get_network_path('abc', {}, download(data))
+            except Exception as e:
+                errors.append(e)
+                barrier.abort()
+
+        threads = [threading.Thread(target=run, args=(d,))
+                   for d in ['a', 'b']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        with open(os.path.join(self._cache_dir, 'abc.cx'), 'r') as f:
+            self.assertTrue(f.read() in ['a' * 100, 'b' * 100])
+        self.assertEqual(['abc.cx', 'abc.json'],
+                         sorted(os.listdir(self._cache_dir)))
+
+    def test_evicts_least_recently_used(self):
+        net_cache = cache.NetworkCache(self._cache_dir, 10)
+        for network_id in ['a', 'b', 'c']:
+            net_cache.get_network_path(network_id, {'modificationTime': 1},
+                                       self._get_download('1234'))
+        # c pushed size to 12 so a, the least recently used, is gone
+        self.assertEqual(['b', 'c'],
+                         sorted(e[2] for e in net_cache.get_entries()))
+
+        # touching b makes c the least recently used
+        net_cache.get_network_path('b', {'modificationTime': 1},
+                                   self._get_download('1234'))
+        net_cache.get_network_path('d', {'modificationTime': 1},
+                                   self._get_download('1234'))
+        self.assertEqual(['b', 'd'],
+                         sorted(e[2] for e in net_cache.get_entries()))
+
+    def test_never_evicts_network_just_fetched(self):
+        net_cache = cache.NetworkCache(self._cache_dir, 2)
+        path = net_cache.get_network_path('a', {'modificationTime': 1},
+                                          self._get_download('1234'))
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual([], net_cache.evict(keep='a'))
+        self.assertEqual(['a'], net_cache.evict())
+
+    def test_memory_cache_evicts_least_recently_used(self):
+        net_cache = cache.MemoryNetworkCache(10)
+        for key in ['a', 'b', 'a']:
+            net_cache.get_or_load(key, lambda: (key.upper(), 4))
+        res = net_cache.get_or_load('c', lambda: ('C', 4))
+        self.assertEqual(('C', 4, False), res)
+        # b is least recently used since a was read again
+        self.assertEqual(('A', 4, True),
+                         net_cache.get_or_load('a', lambda: ('x', 4)))
+        self.assertEqual(('x', 4, False),
+                         net_cache.get_or_load('b', lambda: ('x', 4)))
+        stats = net_cache.get_stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(4, stats['misses'])
+        self.assertEqual(2, stats['evictions'])
+        self.assertEqual(2, stats['networks'])
+        self.assertEqual(8, stats['bytes'])
+
+    def test_memory_cache_skips_network_over_cap(self):
+        net_cache = cache.MemoryNetworkCache(10)
+        self.assertEqual(('A', 11, False),
+                         net_cache.get_or_load('a', lambda: ('A', 11)))
+        self.assertEqual(0, net_cache.get_stats()['networks'])
+
+    def test_memory_cache_failed_load_is_not_cached(self):
+        net_cache = cache.MemoryNetworkCache(10)
+
+        def load():
+            raise IOError('nope')
+        self.assertRaises(IOError, net_cache.get_or_load, 'a', load)
+        self.assertEqual(('A', 1, False),
+                         net_cache.get_or_load('a', lambda: ('A', 1)))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `cascade` module."""
+
+import unittest
+
+import ndex2
+
+from ndexnetworktrim import cascade
+from ndexnetworktrim.cascade import DependentAspectIndex
+from tests.test_cxstream import get_test_cx
+
+
+def get_dependent_cx():
+    """
+    Gets aspects referring to nodes and edges of :py:func:`get_test_cx`
+    """
+    return [{'cartesianLayout': [{'node': 0, 'x': 1.0, 'y': 2.0},
+                                 {'node': 3, 'x': 3.0, 'y': 4.0}]},
+            {'citations': [{'@id': 1, 'dc:title': 'one'},
+                           {'@id': 2, 'dc:title': 'two'},
+                           {'@id': 3, 'dc:title': 'three'}]},
+            {'edgeCitations': [{'po': [10, 12], 'citations': [1]},
+                               {'po': [11], 'citations': [2]}]},
+            {'nodeCitations': [{'po': [0], 'citations': [1]}]},
+            {'supports': [{'@id': 5, 'text': 'a', 'citation': 3}]},
+            {'edgeSupports': [{'po': [10], 'supports': [5]}]},
+            {'cyVisualProperties': [{'properties_of': 'network',
+                                     'applies_to': 52},
+                                    {'properties_of': 'nodes',
+                                     'applies_to': 0},
+                                    {'properties_of': 'edges',
+                                     'applies_to': 12}]},
+            {'cySubNetworks': [{'@id': 52, 'nodes': [0, 1, 2, 3],
+                                'edges': 'all'}]}]
+
+
+def get_dependent_aspects():
+    aspects = {}
+    for fragment in get_dependent_cx():
+        for name, elements in fragment.items():
+            aspects[name] = elements
+    return aspects
+
+
+class TestCascade(unittest.TestCase):
+    """Tests for `cascade` module."""
+
+    def test_prune(self):
+        aspects = get_dependent_aspects()
+        index = DependentAspectIndex(aspects)
+        pruned, removed = index.prune([0, 1], [10, 11])
+        self.assertEqual(8, removed)
+        self.assertEqual([{'node': 3, 'x': 3.0, 'y': 4.0}],
+                         pruned['cartesianLayout'])
+        self.assertEqual([{'po': [12], 'citations': [1]}],
+                         pruned['edgeCitations'])
+        self.assertEqual([], pruned['nodeCitations'])
+        self.assertEqual([], pruned['edgeSupports'])
+        self.assertEqual([], pruned['supports'])
+        # citation 1 is still referred to by edge 12
+        self.assertEqual([1], [c['@id'] for c in pruned['citations']])
+        self.assertEqual(['network', 'edges'],
+                         [v['properties_of'] for v in
+                          pruned['cyVisualProperties']])
+        self.assertEqual([{'@id': 52, 'nodes': [2, 3], 'edges': 'all'}],
+                         pruned['cySubNetworks'])
+
+        # index and aspects are not altered
+        self.assertEqual(get_dependent_aspects(), aspects)
+        pruned, removed = index.prune([], [12])
+        self.assertEqual(1, removed)
+        self.assertEqual([{'po': [10], 'citations': [1]},
+                          {'po': [11], 'citations': [2]}],
+                         pruned['edgeCitations'])
+        self.assertEqual(['network', 'nodes'],
+                         [v['properties_of'] for v in
+                          pruned['cyVisualProperties']])
+        self.assertFalse('citations' in pruned)
+
+        self.assertEqual(({}, 0), index.prune([], []))
+        self.assertEqual(({}, 0), DependentAspectIndex({}).prune([1], [2]))
+
+    def test_nice_cx(self):
+        cx = get_test_cx()
+        cx[1]['metaData'].extend({'name': name} for name in
+                                 get_dependent_aspects())
+        cx[-1:-1] = get_dependent_cx()
+        network = ndex2.create_nice_cx_from_raw_cx(cx)
+        aspects = cascade.get_dependent_aspects(network)
+        self.assertEqual(get_dependent_aspects()['cartesianLayout'],
+                         aspects['cartesianLayout'])
+        self.assertEqual([{'po': [10], 'citations': [1]},
+                          {'po': [12], 'citations': [1]},
+                          {'po': [11], 'citations': [2]}],
+                         aspects['edgeCitations'])
+        pruned, _ = DependentAspectIndex(aspects).prune([0, 1], [10, 11])
+        for name, elements in pruned.items():
+            cascade.set_dependent_aspect(network, name, elements)
+        self.assertEqual({12: [1]}, network.edgeCitations)
+        self.assertEqual({}, network.nodeCitations)
+        self.assertEqual([1], list(network.citations.keys()))
+        self.assertEqual({}, network.supports)
+        self.assertEqual(1, len(network.opaqueAspects['cartesianLayout']))
+
+    def test_prune_element(self):
+        element = {'po': [10, 12], 'citations': [1]}
+        self.assertTrue(element is cascade.prune_element(
+            'edgeCitations', element, None, set([10, 12])))
+        self.assertEqual({'po': [12], 'citations': [1]},
+                         cascade.prune_element('edgeCitations', element,
+                                               None, set([12])))
+        self.assertEqual(None, cascade.prune_element(
+            'edgeCitations', element, None, set()))
+        element = {'node': 3, 'x': 1}
+        self.assertEqual(None, cascade.prune_element(
+            'cartesianLayout', element, set([1]), set()))
+        self.assertTrue(element is cascade.prune_element(
+            'cartesianLayout', element, None, set()))
+        element = {'@id': 52, 'nodes': [0, 1], 'edges': 'all'}
+        self.assertEqual({'@id': 52, 'nodes': [1], 'edges': 'all'},
+                         cascade.prune_element('cySubNetworks', element,
+                                               set([1]), set()))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `collapse` module."""
+
+import unittest
+
+import ndex2
+import numpy as np
+
+from ndexnetworktrim import collapse
+from tests.test_compact import get_compact_network
+from tests.test_cxstream import get_test_cx
+
+
+def get_parallel_cx():
+    """
+    Gets CX of :py:func:`~tests.test_cxstream.get_test_cx` with edges
+    parallel to edge 10, one of them with another interaction
+    """
+    cx = get_test_cx()
+    cx.insert(-1, {'edges': [{'@id': 14, 's': 0, 't': 1, 'i': 'binds'},
+                             {'@id': 13, 's': 0, 't': 1, 'i': 'binds'},
+                             {'@id': 15, 's': 0, 't': 1, 'i': 'inhibits'},
+                             {'@id': 16, 's': 1, 't': 0, 'i': 'binds'}]})
+    cx.insert(-1, {'edgeAttributes': [
+        {'po': 10, 'n': 'type', 'v': 'x'},
+        {'po': 13, 'n': 'score', 'v': 0.3, 'd': 'double'},
+        {'po': 13, 'n': 'type', 'v': 'y'},
+        {'po': 14, 'n': 'score', 'v': 'n/a'},
+        {'po': 14, 'n': 'type', 'v': 'x'},
+        {'po': 15, 'n': 'score', 'v': 2.0, 'd': 'double'},
+        {'po': 15, 'n': 'pmid', 'v': [1, 2], 'd': 'list_of_integer'}]})
+    return cx
+
+
+class TestCollapse(unittest.TestCase):
+    """Tests for `collapse` module."""
+
+    def test_group_edges(self):
+        edge_ids = np.array([5, 3, 4, 1, 2, 0])
+        sources = np.array([0, 0, 1, 0, 1, 2])
+        targets = np.array([1, 1, 0, 1, 0, 2])
+        self.assertEqual([[1, 3, 5], [2, 4]],
+                         [g.tolist() for g in collapse.group_edges(
+                             edge_ids, sources, targets)])
+        interactions = np.array([0, 1, 0, 0, 1, 0])
+        self.assertEqual([[1, 5]],
+                         [g.tolist() for g in collapse.group_edges(
+                             edge_ids, sources, targets,
+                             interactions=interactions)])
+        self.assertEqual([], collapse.group_edges(
+            edge_ids[:1], sources[:1], targets[:1]))
+
+    def test_get_parallel_edge_groups(self):
+        cx = get_parallel_cx()
+        for network in [ndex2.create_nice_cx_from_raw_cx(cx),
+                        get_compact_network(cx)]:
+            self.assertEqual([[10, 13, 14, 15]],
+                             [g.tolist() for g in
+                              collapse.get_parallel_edge_groups(network)])
+            self.assertEqual([[10, 13, 14]],
+                             [g.tolist() for g in
+                              collapse.get_parallel_edge_groups(
+                                  network, by_interaction=True)])
+
+    def test_merge_edge_attributes(self):
+        members = [[{'po': 10, 'n': 'score', 'v': 1, 'd': 'integer'},
+                    {'po': 10, 'n': 'type', 'v': 'x'},
+                    {'po': 10, 'n': 'same', 'v': [1], 'd': 'list_of_long'}],
+                   [{'po': 13, 'n': 'score', 'v': 3, 'd': 'integer'},
+                    {'po': 13, 'n': 'type', 'v': ['y', 'x'],
+                     'd': 'list_of_string'},
+                    {'po': 13, 'n': 'same', 'v': [1], 'd': 'list_of_long'}],
+                   [{'po': 14, 'n': 'score', 'v': 'high'},
+                    {'po': 14, 'n': 'mixed', 'v': 2, 'd': 'integer'}],
+                   [{'po': 15, 'n': 'mixed', 'v': 'two'}],
+                   None]
+        res = collapse.merge_edge_attributes(10, members,
+                                             attribute_name='score')
+        self.assertEqual([{'po': 10, 'n': 'score', 'v': 3, 'd': 'integer'},
+                          {'po': 10, 'n': 'type', 'v': ['x', 'y'],
+                           'd': 'list_of_string'},
+                          {'po': 10, 'n': 'same', 'v': [1],
+                           'd': 'list_of_long'},
+                          {'po': 10, 'n': 'mixed', 'v': ['2', 'two'],
+                           'd': 'list_of_string'}], res)
+
+        res = collapse.merge_edge_attributes(10, members,
+                                             attribute_name='score',
+                                             aggregate=collapse.MEAN)
+        self.assertEqual({'po': 10, 'n': 'score', 'v': 2.0, 'd': 'double'},
+                         res[0])
+
+        res = collapse.merge_edge_attributes(10, members[3:],
+                                             attribute_name='score',
+                                             aggregate=collapse.COUNT)
+        self.assertEqual([{'po': 10, 'n': 'mixed', 'v': 'two'},
+                          {'po': 10, 'n': 'score', 'v': 2,
+                           'd': 'integer'}], res)
+
+        # no numbers to aggregate so values are merged
+        res = collapse.merge_edge_attributes(10, members[2:4],
+                                             attribute_name='score')
+        self.assertEqual({'po': 10, 'n': 'score', 'v': 'high'}, res[0])
+        res = collapse.merge_edge_attributes(10, members, attribute_name=None)
+        self.assertEqual({'po': 10, 'n': 'score', 'v': ['1', '3', 'high'],
+                          'd': 'list_of_string'}, res[0])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `columnar` module."""
+
+import unittest
+
+import ndex2
+import numpy as np
+
+from ndexnetworktrim import columnar
+from tests.test_cxstream import get_test_cx
+
+
+class TestColumnar(unittest.TestCase):
+    """Tests for `columnar` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+
+    def test_numeric_column(self):
+        index = columnar.EdgeAttributeIndex(self._network)
+        self.assertEqual([10, 11, 12], index.get_edge_ids().tolist())
+        column = index.get_column('score')
+        self.assertTrue(column.is_numeric())
+        self.assertEqual([0.9, 0.1, 0.5], column.values.tolist())
+        self.assertEqual([False, False, False], column.missing.tolist())
+        self.assertEqual([True, False, True],
+                         column.greater_equal(0.5).tolist())
+        self.assertEqual([False, False, True], column.equal(0.5).tolist())
+        self.assertEqual([False, False, False],
+                         column.equal('0.5').tolist())
+
+    def test_string_column_with_missing_values(self):
+        index = columnar.EdgeAttributeIndex(self._network)
+        column = index.get_column('type')
+        self.assertFalse(column.is_numeric())
+        self.assertEqual([True, True, False], column.missing.tolist())
+        self.assertEqual([False, False, True], column.equal('x').tolist())
+        self.assertEqual([False, False, False],
+                         column.greater_equal(0.0).tolist())
+
+    def test_unknown_column_is_all_missing(self):
+        index = columnar.EdgeAttributeIndex(self._network)
+        column = index.get_column('nope')
+        self.assertEqual([True, True, True], column.missing.tolist())
+        self.assertEqual([False, False, False],
+                         column.greater_equal(0.0).tolist())
+
+    def test_get_columns_extracts_once(self):
+        index = columnar.EdgeAttributeIndex(self._network)
+        res = index.get_columns(['score', 'type'])
+        self.assertEqual(['score', 'type'], sorted(res.keys()))
+        self.assertTrue(index.get_column('score') is res['score'])
+
+    def test_node_attribute_index(self):
+        index = columnar.NodeAttributeIndex(self._network)
+        self.assertEqual([0, 1, 2, 3], index.get_node_ids().tolist())
+        column = index.get_column('type')
+        self.assertEqual([True, False, False, True],
+                         column.equal('gene').tolist())
+        self.assertEqual([False, True, True, False],
+                         column.missing.tolist())
+
+    def test_numeric_strings_and_lists(self):
+        column = columnar._get_column_from_values('x', ['0.5', None, 'a',
+                                                        [1, 2]],
+                                                  np.array([False, True,
+                                                            False, False]))
+        self.assertFalse(column.is_numeric())
+        self.assertEqual([False, True, False, True],
+                         column.missing.tolist())
+        values, missing = column.get_numeric_values()
+        self.assertEqual(0.5, values[0])
+        self.assertEqual([False, True, True, True], missing.tolist())
+        self.assertEqual([True, False, False, False],
+                         column.greater_equal(0.1).tolist())
+
+    def test_threshold_sweep_numeric(self):
+        index = columnar.EdgeAttributeIndex(self._network)
+        sweep = columnar.ThresholdSweep(index.get_column('score'),
+                                        index.get_edge_ids())
+        self.assertEqual([10], sweep.get_edge_ids(0.6).tolist())
+        self.assertEqual([10, 12], sweep.get_edge_ids(0.5).tolist())
+        self.assertEqual([10, 12, 11], sweep.get_edge_ids(0).tolist())
+        self.assertEqual([], sweep.get_edge_ids(1).tolist())
+
+    def test_threshold_sweep_strings(self):
+        column = columnar._get_column_from_values('x', ['b', 'a', None, 'b',
+                                                        5],
+                                                  np.array([False, False,
+                                                            True, False,
+                                                            False]))
+        sweep = columnar.ThresholdSweep(column, np.array([1, 2, 3, 4, 5]),
+                                        numeric=False)
+        self.assertEqual([1, 4], sweep.get_edge_ids('b').tolist())
+        self.assertEqual([2], sweep.get_edge_ids('a').tolist())
+        self.assertEqual([], sweep.get_edge_ids('5').tolist())
+        self.assertEqual([], sweep.get_edge_ids('c').tolist())
+
+    def test_select_top_k(self):
+        values = [0.5, 0.9, None, 0.5, float('nan'), 0.5, 0.1]
+        missing = np.array([v is None for v in values])
+        column = columnar._get_column_from_values('x', values, missing)
+        # edge ids out of order to check ties go lowest id first
+        edge_ids = np.array([7, 1, 2, 5, 4, 3, 6])
+        keep, threshold = columnar.select_top_k(column, edge_ids, 3)
+        self.assertEqual([1, 3, 5], sorted(edge_ids[keep].tolist()))
+        self.assertEqual(0.5, threshold)
+        keep, threshold = columnar.select_top_k(column, edge_ids, 1)
+        self.assertEqual([1], edge_ids[keep].tolist())
+        self.assertEqual(0.9, threshold)
+        keep, threshold = columnar.select_top_k(column, edge_ids, 100)
+        self.assertEqual([1, 3, 5, 6, 7], sorted(edge_ids[keep].tolist()))
+        self.assertEqual(0.1, threshold)
+        keep, threshold = columnar.select_top_k(column, edge_ids, 0)
+        self.assertFalse(keep.any())
+        self.assertIsNone(threshold)
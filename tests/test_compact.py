@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `compact` module."""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from ndexnetworktrim import compact
+from ndexnetworktrim.compact import CompactNetwork
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+from ndexnetworktrim.cxupload import iter_cx_chunks
+from tests.test_cxstream import get_test_cx, get_aspect
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PEAK_RSS_SCRIPT = """
+import resource, sys
+from ndexnetworktrim.compact import CompactNetwork
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(sys.argv[1], 'rb') as f:
+    CompactNetwork.from_cx_stream(f)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base)
+"""
+
+
+def get_compact_network(cx=None):
+    if cx is None:
+        cx = get_test_cx()
+    return CompactNetwork.from_cx_stream(
+        io.BytesIO(json.dumps(cx).encode('utf-8')))
+
+
+def get_cx(network):
+    return json.loads(b''.join(iter_cx_chunks(network.get_fragments())))
+
+
+def get_sorted_aspect(cx, aspect):
+    return sorted(get_aspect(cx, aspect), key=lambda e: json.dumps(
+        e, sort_keys=True))
+
+
+def get_round_trip_cx():
+    """
+    Gets CX of :py:func:`get_test_cx` with attributes of several
+    types, elements with extra keys and an opaque aspect
+    """
+    cx = get_test_cx()
+    cx.insert(-1, {'edgeAttributes': [
+        {'po': 10, 'n': 'count', 'v': 3, 'd': 'integer'},
+        {'po': 11, 'n': 'count', 'v': 4, 'd': 'long'},
+        {'po': 10, 'n': 'tags', 'v': ['a', 'b'], 'd': 'list_of_string'},
+        {'po': 11, 'n': 'tags', 'v': ['c', 'd'], 'd': 'list_of_string'},
+        {'po': 12, 'n': 'mixed', 'v': 1},
+        {'po': 11, 'n': 'mixed', 'v': 'one'},
+        {'po': 12, 'n': 'sub', 'v': 'y', 's': 5}]})
+    cx.insert(-1, {'edges': [{'@id': 13, 's': 0, 't': 3}]})
+    cx.insert(-1, {'nodes': [{'@id': 4, 'n': 'E', 'r': 'hgnc:E',
+                              'x': 1}]})
+    cx.insert(-1, {'cartesianLayout': [{'node': 0, 'x': 1.0,
+                                        'y': 2.0}]})
+    return cx
+
+
+class TestCompact(unittest.TestCase):
+    """Tests for `compact` module."""
+
+    def test_from_cx_stream(self):
+        network = get_compact_network()
+        self.assertEqual(3, network.get_edge_count())
+        self.assertEqual(4, network.get_node_count())
+        self.assertEqual([10, 11, 12], network.get_edge_ids().tolist())
+        self.assertEqual('parent', network.get_name())
+        column = network.get_column('score')
+        self.assertTrue(column.is_numeric())
+        self.assertEqual([0.9, 0.1, 0.5], column.values.tolist())
+        column = network.get_column('type')
+        self.assertEqual([True, True, False], column.missing.tolist())
+        self.assertEqual('x', column.values[2])
+        self.assertEqual([True, True, True],
+                         network.get_column('foo').missing.tolist())
+
+    def test_from_cx_stream_in_blocks(self):
+        cx = get_round_trip_cx()
+        cx.insert(-1, {'edgeAttributes': [
+            {'po': 10, 'n': 'weight', 'v': 1, 'd': 'integer'},
+            {'po': 11, 'n': 'weight', 'v': 2, 'd': 'integer'},
+            {'po': 12, 'n': 'weight', 'v': 0.5, 'd': 'double'}]})
+        expected = get_compact_network(cx)
+        block_size = compact.BLOCK_SIZE
+        compact.BLOCK_SIZE = 2
+        try:
+            network = get_compact_network(cx)
+        finally:
+            compact.BLOCK_SIZE = block_size
+        self.assertEqual(expected.get_edge_ids().tolist(),
+                         network.get_edge_ids().tolist())
+        for name in ['score', 'type', 'mixed', 'weight']:
+            self.assertEqual(expected.get_column(name).values.tolist(),
+                             network.get_column(name).values.tolist())
+            self.assertEqual(expected.get_column(name).missing.tolist(),
+                             network.get_column(name).missing.tolist())
+        self.assertEqual([1, 2, 0.5],
+                         network.get_column('weight').values[:3].tolist())
+        self.assertEqual(get_cx(expected), get_cx(network))
+
+    @unittest.skipUnless(sys.platform.startswith('linux'),
+                         'ru_maxrss is in kilobytes on linux only')
+    def test_from_cx_stream_peak_memory(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'network.cx')
+            with open(path, 'wb') as f:
+                SyntheticNetworkGenerator(20000, 200000, seed=1).write(f)
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.pathsep.join(
+                [ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+            output = subprocess.check_output(
+                [sys.executable, '-c', PEAK_RSS_SCRIPT, path], env=env,
+                universal_newlines=True)
+            peak = int(output.splitlines()[-1]) * 1024
+
+            # whole fragments as dicts took about 7 times the file size
+            self.assertLess(peak, 3 * os.path.getsize(path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_round_trip(self):
+        cx = get_round_trip_cx()
+        res = get_cx(get_compact_network(cx))
+        for aspect in ['nodes', 'edges', 'edgeAttributes', 'nodeAttributes',
+                       'networkAttributes', 'cartesianLayout']:
+            self.assertEqual(get_sorted_aspect(cx, aspect),
+                             get_sorted_aspect(res, aspect))
+        metadata = {m['name']: m for m in get_aspect(res, 'metaData')}
+        self.assertEqual(5, metadata['nodes']['elementCount'])
+        self.assertEqual(4, metadata['edges']['elementCount'])
+        self.assertEqual(11, metadata['edgeAttributes']['elementCount'])
+        self.assertEqual(1, metadata['cartesianLayout']['elementCount'])
+
+    def test_keep_edges_and_remove_nodes(self):
+        network = get_compact_network()
+        self.assertEqual(2, network.keep_edges(
+            network.get_column('type').equal('x')))
+        self.assertEqual([12], network.get_edge_ids().tolist())
+        self.assertEqual(2, network.remove_nodes(np.array([0, 1])))
+        res = get_cx(network)
+        self.assertEqual([2, 3], [n['@id'] for n in get_aspect(res, 'nodes')])
+        self.assertEqual([3], [a['po'] for a in
+                               get_aspect(res, 'nodeAttributes')])
+        self.assertEqual([12, 12], [a['po'] for a in
+                                    get_aspect(res, 'edgeAttributes')])
+        self.assertEqual([0.5], network.get_column('score').values.tolist())
+
+    def test_select_edges_does_not_alter_parent(self):
+        parent = get_compact_network()
+        network = parent.select_edges([12, 99])
+        network.get_network_attributes()[0]['v'] = 'child'
+        network.remove_nodes([0])
+        self.assertEqual([12], network.get_edge_ids().tolist())
+        self.assertEqual(3, parent.get_edge_count())
+        self.assertEqual(4, parent.get_node_count())
+        self.assertEqual('parent', parent.get_name())
+        self.assertEqual(4, len(get_aspect(get_cx(parent),
+                                           'edgeAttributes')))
+
+    def test_snapshot_round_trip(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            network = get_compact_network(get_round_trip_cx())
+            network.write_snapshot(temp_dir, properties={'a': 1})
+            for mmap in [True, False]:
+                loaded, properties = CompactNetwork.from_snapshot(
+                    temp_dir, mmap=mmap)
+                self.assertEqual({'a': 1}, properties)
+                self.assertEqual(get_cx(network), get_cx(loaded))
+                self.assertEqual(mmap, isinstance(loaded.get_edge_ids(),
+                                                  np.memmap))
+
+            # mapped arrays are read only and never altered in place
+            loaded, _ = CompactNetwork.from_snapshot(temp_dir)
+            self.assertFalse(loaded.get_edge_ids().flags.writeable)
+            loaded.keep_edges(loaded.get_column('score').greater_equal(0.5))
+            loaded.remove_nodes([1])
+            self.assertEqual([10, 12], loaded.get_edge_ids().tolist())
+            reloaded, _ = CompactNetwork.from_snapshot(temp_dir)
+            self.assertEqual(get_cx(network), get_cx(reloaded))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_replace_edge_attributes_does_not_alter_parent(self):
+        parent = get_compact_network(get_round_trip_cx())
+        network = parent.select_edges([10, 11, 12, 13])
+        self.assertEqual({10: [{'po': 10, 'n': 'score', 'v': 0.9,
+                                'd': 'double'},
+                               {'po': 10, 'n': 'count', 'v': 3,
+                                'd': 'integer'},
+                               {'po': 10, 'n': 'tags', 'v': ['a', 'b'],
+                                'd': 'list_of_string'}],
+                          13: []},
+                         network.get_edge_attribute_elements(
+                             np.array([10, 13])))
+        self.assertEqual(0.9, network.get_column('score').values[0])
+        network.replace_edge_attributes(
+            {10: [{'po': 10, 'n': 'score', 'v': 2, 'd': 'integer'},
+                  {'po': 10, 'n': 'new', 'v': 'z'}],
+             13: [{'po': 13, 'n': 'score', 'v': 0.7, 'd': 'double'}]})
+        self.assertEqual([2, 0.1, 0.5, 0.7],
+                         network.get_column('score').values.tolist())
+        elements = get_sorted_aspect(get_cx(network), 'edgeAttributes')
+        self.assertEqual([('new', 'z'), ('score', 2)],
+                         sorted((e['n'], e['v']) for e in elements
+                                if e['po'] == 10))
+        self.assertEqual(11, len(elements))
+        self.assertEqual(get_sorted_aspect(get_round_trip_cx(),
+                                           'edgeAttributes'),
+                         get_sorted_aspect(get_cx(parent), 'edgeAttributes'))
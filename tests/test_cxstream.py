@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `cxstream` module."""
+
+import io
+import json
+import unittest
+
+from ndexnetworktrim import cxstream
+
+
+def get_test_cx():
+    """
+    Gets small CX network with 4 nodes and 3 edges with
+    'score' edge attribute
+    """
+    return [{'numberVerification': [{'longNumber': 281474976710655}]},
+            {'metaData': [{'name': 'nodes', 'elementCount': 4},
+                          {'name': 'edges', 'elementCount': 3},
+                          {'name': 'edgeAttributes', 'elementCount': 4},
+                          {'name': 'nodeAttributes', 'elementCount': 2},
+                          {'name': 'networkAttributes', 'elementCount': 2}]},
+            {'networkAttributes': [{'n': 'name', 'v': 'parent'},
+                                   {'n': 'description', 'v': 'desc'}]},
+            {'edges': [{'@id': 10, 's': 0, 't': 1, 'i': 'binds'},
+                       {'@id': 11, 's': 1, 't': 2, 'i': 'binds'}]},
+            {'edges': [{'@id': 12, 's': 2, 't': 3, 'i': 'binds'}]},
+            {'edgeAttributes': [{'po': 10, 'n': 'score', 'v': 0.9,
+                                 'd': 'double'},
+                                {'po': 11, 'n': 'score', 'v': 0.1,
+                                 'd': 'double'},
+                                {'po': 12, 'n': 'score', 'v': 0.5,
+                                 'd': 'double'},
+                                {'po': 12, 'n': 'type', 'v': 'x'}]},
+            {'nodes': [{'@id': 0, 'n': 'A'}, {'@id': 1, 'n': 'B'},
+                       {'@id': 2, 'n': 'C'}, {'@id': 3, 'n': 'D'}]},
+            {'nodeAttributes': [{'po': 3, 'n': 'type', 'v': 'gene'},
+                                {'po': 0, 'n': 'type', 'v': 'gene'}]},
+            {'status': [{'error': '', 'success': True}]}]
+
+
+def get_aspect(cx, aspect):
+    elements = []
+    for fragment in cx:
+        elements.extend(fragment.get(aspect, []))
+    return elements
+
+
+class TestCXStream(unittest.TestCase):
+    """Tests for `cxstream` module."""
+
+    def _get_stream(self):
+        return io.BytesIO(json.dumps(get_test_cx()).encode('utf-8'))
+
+    def test_iter_cx_elements(self):
+        res = list(cxstream.iter_cx_elements(self._get_stream()))
+        self.assertEqual((0, 'numberVerification',
+                          {'longNumber': 281474976710655}), res[0])
+        edges = [r for r in res if r[1] == 'edges']
+        self.assertEqual([3, 3, 4], [r[0] for r in edges])
+        self.assertEqual({'@id': 12, 's': 2, 't': 3, 'i': 'binds'},
+                         edges[2][2])
+        self.assertEqual(0.9, res[11][2]['v'])
+        self.assertTrue(isinstance(res[11][2]['v'], float))
+
+    def test_iter_cx_elements_scalar_and_nested(self):
+        cx = [{'opaque': ['a', 1, {'x': [1, {'y': 2}]}]}]
+        stream = io.BytesIO(json.dumps(cx).encode('utf-8'))
+        res = [r[2] for r in cxstream.iter_cx_elements(stream)]
+        self.assertEqual(['a', 1, {'x': [1, {'y': 2}]}], res)
+
+    def test_get_element_ids(self):
+        self.assertEqual([], cxstream.get_element_ids(None))
+        self.assertEqual([1], cxstream.get_element_ids(1))
+        self.assertEqual([1, 2], cxstream.get_element_ids([1, 2]))
+
+    def test_count_aspect_elements(self):
+        stream = io.BytesIO(json.dumps(get_test_cx()).encode('utf-8'))
+        self.assertEqual(3, cxstream.count_aspect_elements(stream, 'edges'))
+
+    def test_select_top_edges(self):
+        elements = [{'po': 7, 'n': 'x', 'v': 0.5},
+                    {'po': [1], 'n': 'x', 'v': '0.9'},
+                    {'po': 2, 'n': 'y', 'v': 5},
+                    {'po': 5, 'n': 'x', 'v': 0.5},
+                    {'po': 4, 'n': 'x', 'v': 'nan'},
+                    {'po': 3, 'n': 'x', 'v': 0.5},
+                    {'po': 6, 'n': 'x', 'v': [1.0]}]
+        self.assertEqual(({1, 3, 5}, 0.5),
+                         cxstream.select_top_edges(elements, 'x', 3))
+        self.assertEqual(({1, 3, 5, 7}, 0.5),
+                         cxstream.select_top_edges(elements, 'x', 10))
+        self.assertEqual((set(), None),
+                         cxstream.select_top_edges(elements, 'x', 0))
+
+    def test_writer(self):
+        output = io.BytesIO()
+        writer = cxstream.CXStreamWriter(output)
+        writer.start()
+        writer.write_fragment('nodes', [{'@id': 1}, {'@id': 2}])
+        writer.start_fragment('edges')
+        writer.end()
+        self.assertEqual([{'nodes': [{'@id': 1}, {'@id': 2}]},
+                          {'edges': []}],
+                         json.loads(output.getvalue().decode('utf-8')))
+
+    def test_trim(self):
+        def updater(net_attribs):
+            net_attribs.append({'n': 'prov:wasGeneratedBy', 'v': 'me'})
+            return net_attribs
+
+        trimmer = cxstream.StreamingCXTrimmer(
+            lambda e: e['n'] == 'score' and e['v'] >= 0.6,
+            network_attributes_updater=updater)
+        output = io.BytesIO()
+        trimmer.trim(self._get_stream, output)
+        self.assertEqual(1, trimmer.get_kept_edge_count())
+        self.assertEqual(2, trimmer.get_kept_node_count())
+
+        res = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual([10], [e['@id'] for e in get_aspect(res, 'edges')])
+        self.assertEqual([0, 1], [n['@id'] for n in get_aspect(res,
+                                                               'nodes')])
+        self.assertEqual(1, len(get_aspect(res, 'edgeAttributes')))
+        self.assertEqual([0], [n['po'] for n in
+                               get_aspect(res, 'nodeAttributes')])
+        self.assertEqual('me', get_aspect(res, 'networkAttributes')[2]['v'])
+        metadata = get_aspect(res, 'metaData')
+        self.assertEqual(2, metadata[0]['elementCount'])
+        self.assertEqual(1, metadata[1]['elementCount'])
+        self.assertTrue('elementCount' not in metadata[2])
+        self.assertEqual([{'error': '', 'success': True}],
+                         get_aspect(res, 'status'))
+
+    def test_trim_adds_network_attributes_missing_in_parent(self):
+        cx = [f for f in get_test_cx() if 'networkAttributes' not in f]
+        trimmer = cxstream.StreamingCXTrimmer(
+            lambda e: e['n'] == 'score' and e['v'] >= 0.6,
+            network_attributes_updater=lambda attrs: attrs + [
+                {'n': 'prov:wasGeneratedBy', 'v': 'me'}])
+        output = io.BytesIO()
+        trimmer.trim(lambda: io.BytesIO(json.dumps(cx).encode('utf-8')),
+                     output)
+        res = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual([{'n': 'prov:wasGeneratedBy', 'v': 'me'}],
+                         get_aspect(res, 'networkAttributes'))
+
+    def test_trim_reduces_list_po_to_kept_ids(self):
+        cx = get_test_cx()
+        cx[5]['edgeAttributes'].append({'po': [10, 11], 'n': 'kind',
+                                        'v': 'x'})
+        cx[7]['nodeAttributes'].append({'po': [2, 0, 1], 'n': 'kind',
+                                        'v': 'y'})
+        trimmer = cxstream.StreamingCXTrimmer(
+            lambda e: e['n'] == 'score' and e['v'] >= 0.6)
+        output = io.BytesIO()
+        trimmer.trim(lambda: io.BytesIO(json.dumps(cx).encode('utf-8')),
+                     output)
+        res = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual([10, [10]], [e['po'] for e in
+                                      get_aspect(res, 'edgeAttributes')])
+        self.assertEqual([0, [0, 1]], [n['po'] for n in
+                                       get_aspect(res, 'nodeAttributes')])
+
+    def test_trim_remove_orphans_false_keeps_all_nodes(self):
+        trimmer = cxstream.StreamingCXTrimmer(lambda e: False,
+                                              remove_orphan_nodes=False)
+        output = io.BytesIO()
+        trimmer.trim(self._get_stream, output)
+        self.assertEqual(0, trimmer.get_kept_edge_count())
+        self.assertEqual(None, trimmer.get_kept_node_count())
+        res = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual(4, len(get_aspect(res, 'nodes')))
+        self.assertEqual([], get_aspect(res, 'edges'))
+        self.assertEqual('parent',
+                         get_aspect(res, 'networkAttributes')[0]['v'])
+
+    def test_trim_with_component_selector(self):
+        calls = []
+
+        def selector(node_ids, edge_ids, sources, targets):
+            calls.append((sorted(node_ids), edge_ids, sources, targets))
+            return {0, 1}, {10}
+
+        trimmer = cxstream.StreamingCXTrimmer(
+            lambda e: e['n'] == 'score' and e['v'] >= 0.5,
+            component_selector=selector)
+        output = io.BytesIO()
+        trimmer.trim(self._get_stream, output)
+        self.assertEqual([([0, 1, 2, 3], [10, 12], [0, 2], [1, 3])], calls)
+        self.assertEqual(1, trimmer.get_kept_edge_count())
+        self.assertEqual(2, trimmer.get_kept_node_count())
+        res = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual([10], [e['@id'] for e in get_aspect(res, 'edges')])
+        self.assertEqual([0, 1], [n['@id'] for n in get_aspect(res,
+                                                               'nodes')])
+
+    def test_trim_with_node_attribute_filter(self):
+        trimmer = cxstream.StreamingCXTrimmer(
+            None, node_attribute_filter=lambda e: e['v'] == 'gene')
+        output = io.BytesIO()
+        trimmer.trim(self._get_stream, output)
+        self.assertEqual(0, trimmer.get_kept_edge_count())
+        self.assertEqual(0, trimmer.get_kept_node_count())
+
+        # node 2 is a gene too, so edge 12 between nodes 2 and 3 stays
+        cx = get_test_cx()
+        cx[7]['nodeAttributes'].append({'po': 2, 'n': 'type', 'v': 'gene'})
+        output = io.BytesIO()
+        trimmer.trim(lambda: io.BytesIO(json.dumps(cx).encode('utf-8')),
+                     output)
+        self.assertEqual(1, trimmer.get_kept_edge_count())
+        self.assertEqual(2, trimmer.get_kept_node_count())
+
+    def test_chunk_reader(self):
+        reader = cxstream.ChunkReader(iter([b'ab', b'', b'cde', b'f']))
+        self.assertEqual(b'a', reader.read(1))
+        self.assertEqual(b'bcd', reader.read(3))
+        self.assertEqual(4, reader.get_bytes_read())
+        self.assertEqual(b'ef', reader.read())
+        self.assertEqual(b'', reader.read(5))
+        self.assertEqual(6, reader.get_bytes_read())
+
+        reader = cxstream.ChunkReader(iter([b'[{"nodes": [{"@', b'id": 1',
+                                            b'}, {"@id": 2}]}]']))
+        self.assertEqual([(0, 'nodes', {'@id': 1}), (0, 'nodes', {'@id': 2})],
+                         list(cxstream.iter_cx_elements(reader)))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `cxupload` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import ndex2
+from ndex2.client import Ndex2
+
+from ndexnetworktrim import cxupload
+from ndexnetworktrim.localserver import LocalNDExServer
+from tests.test_cxstream import get_test_cx
+
+
+def get_test_cx_with_extra_aspects():
+    """
+    :return: test CX with citations, list attributes and an opaque aspect
+    """
+    cx = get_test_cx()
+    cx.insert(2, {'cartesianLayout': [{'node': 0, 'x': 1.0, 'y': 2.0}]})
+    cx.insert(2, {'citations': [{'@id': 5, 'dc:title': 't'}]})
+    cx.insert(2, {'edgeCitations': [{'po': [10, 11], 'citations': [5]}]})
+    cx.insert(2, {'nodeAttributes': [{'po': 1, 'n': 'l', 'v': [1, 2],
+                                      'd': 'list_of_integer'}]})
+    cx[1]['metaData'].extend([{'name': n, 'elementCount': 1}
+                              for n in ['cartesianLayout', 'citations',
+                                        'edgeCitations']])
+    return cx
+
+
+class TestCXUpload(unittest.TestCase):
+    """Tests for `cxupload` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def test_iter_nice_cx_chunks_matches_to_cx(self):
+        network = ndex2.create_nice_cx_from_raw_cx(
+            get_test_cx_with_extra_aspects())
+        chunks = list(cxupload.iter_nice_cx_chunks(network, chunk_size=64))
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(network.to_cx(log_to_stdout=False),
+                         json.loads(b''.join(chunks)))
+
+    def test_get_nice_cx_metadata_does_not_alter_network(self):
+        network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+        network.to_cx(log_to_stdout=False)
+        del network.edges[11]
+        metadata = {m['name']: m for m in
+                    cxupload.get_nice_cx_metadata(network)}
+        self.assertEqual(2, metadata['edges']['elementCount'])
+        self.assertEqual(3, network.metadata['edges']['elementCount'])
+
+    def test_iter_gzip(self):
+        chunks = [b'abc', b'', b'def' * 1000]
+        self.assertEqual(b''.join(chunks),
+                         zlib.decompress(b''.join(cxupload.iter_gzip(chunks)),
+                                         wbits=31))
+
+    def test_upload_and_update(self):
+        server = LocalNDExServer(self._temp_dir)
+        server.start()
+        try:
+            client = Ndex2(server.get_url(), 'bob', 'smith',
+                           skip_version_check=True)
+            network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+            for uploader in [cxupload.NDExClientUploader(client),
+                             cxupload.StreamingCXUploader(client),
+                             cxupload.StreamingCXUploader(client,
+                                                          gzip=True)]:
+                url = uploader.upload(
+                    cxupload.iter_nice_cx_chunks(network, chunk_size=16))
+                network_id = url.split('/')[-1]
+                with open(os.path.join(self._temp_dir,
+                                       network_id + '.cx'), 'r') as f:
+                    self.assertEqual(network.to_cx(log_to_stdout=False),
+                                     json.load(f))
+
+                network.set_name('updated')
+                uploader.update(network_id,
+                                cxupload.iter_nice_cx_chunks(network))
+                summary = client.get_network_summary(network_id)
+                self.assertEqual('updated', summary['name'])
+                network.set_name('parent')
+        finally:
+            server.stop()
+
+    def test_streaming_upload_passes_timeout(self):
+        class Session(object):
+            def request(self, method, url, data=None, headers=None,
+                        timeout=None):
+                self.timeout = timeout
+                list(data)
+                return mock.Mock(text='http://x/v2/network/abc')
+
+        client = mock.Mock(host='http://x', version_endpoint='/v2',
+                           s=Session())
+        uploader = cxupload.StreamingCXUploader(client, timeout=5)
+        self.assertEqual('http://x/v2/network/abc',
+                         uploader.upload([b'[]']))
+        self.assertEqual(5, client.s.timeout)
+        cxupload.StreamingCXUploader(client).upload([b'[]'])
+        self.assertEqual(cxupload.TIMEOUT, client.s.timeout)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `filterexpr` module."""
+
+import unittest
+
+import ndex2
+import numpy as np
+
+from ndexnetworktrim import columnar
+from ndexnetworktrim.filterexpr import FilterExpression
+from ndexnetworktrim.filterexpr import FilterExpressionError
+from tests.test_cxstream import get_test_cx
+
+
+class TestFilterExpression(unittest.TestCase):
+    """Tests for `filterexpr` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+        self._index = columnar.EdgeAttributeIndex(network)
+        # attributes of edges 10, 11 and 12 in test network
+        self._edges = [{'score': 0.9}, {'score': 0.1},
+                       {'score': 0.5, 'type': 'x'}]
+
+    def _check(self, text, expected):
+        expr = FilterExpression(text)
+        self.assertEqual(expected, [expr.evaluate(e) for e in self._edges])
+        self.assertEqual(expected, expr.evaluate_index(self._index).tolist())
+
+    def test_comparisons(self):
+        self._check('score >= 0.5', [True, False, True])
+        self._check('score > 0.5', [True, False, False])
+        self._check('score < 0.5', [False, True, False])
+        self._check('score <= 0.5', [False, True, True])
+        self._check('score = 0.5', [False, False, True])
+        self._check('score != 0.5', [True, True, False])
+        self._check("type == 'x'", [False, False, True])
+        self._check("type != 'x'", [False, False, False])
+
+    def test_in_and_between(self):
+        self._check('score in (0.1, 0.9)', [True, True, False])
+        self._check('score not in (0.1, 0.9)', [False, False, True])
+        self._check("type in ('x', 'y')", [False, False, True])
+        self._check('score between 0.1 and 0.5', [False, True, True])
+
+    def test_boolean_operators(self):
+        self._check("score >= 0.5 and type == 'x'", [False, False, True])
+        self._check("score > 0.8 OR type == 'x'", [True, False, True])
+        self._check('not score >= 0.5', [False, True, False])
+        self._check("not (score > 0.8 or type == 'x')", [False, False, False])
+
+    def test_missing_attributes_are_unknown(self):
+        # not of an unknown comparison is still unknown
+        self._check("not type == 'x'", [False, False, False])
+        self._check("type == 'y' or score < 0.5", [False, True, False])
+        self._check('missing >= 0', [False, False, False])
+
+    def test_string_numbers_compared_as_numbers(self):
+        expr = FilterExpression('score >= 0.5')
+        self.assertTrue(expr.evaluate({'score': '0.7'}))
+        self.assertFalse(expr.evaluate({'score': 'abc'}))
+        self.assertFalse(expr.evaluate({'score': [0.7]}))
+
+    def test_booleans_are_not_numbers(self):
+        values = [True, 1, '1', False, 0.5]
+        missing = np.zeros(len(values), dtype=bool)
+        columns = {'x': columnar._get_column_from_values('x', list(values),
+                                                         missing)}
+        for text, expected in [('x >= 1', [False, True, True, False, False]),
+                               ('not x >= 1',
+                                [False, False, False, False, True]),
+                               ('x in (0, 1)',
+                                [False, True, True, False, False])]:
+            expr = FilterExpression(text)
+            self.assertEqual(expected,
+                             [expr.evaluate({'x': v}) is True
+                              for v in values])
+            self.assertEqual(expected,
+                             expr.evaluate_columns(columns).tolist())
+
+    def test_get_attribute_names(self):
+        expr = FilterExpression("`my score` >= 1 and (type == 'a' or "
+                                "score between 1 and 2)")
+        self.assertEqual(['my score', 'score', 'type'],
+                         expr.get_attribute_names())
+        self.assertTrue(expr.evaluate({'my score': 2, 'score': 1.5}))
+
+    def test_str(self):
+        expr = FilterExpression("score>=.5 AND (type='x' OR NOT a in (1,'b'))")
+        self.assertEqual("score >= 0.5 and (type == 'x' or not (a in (1, 'b')))",
+                         str(expr))
+        self.assertEqual(str(expr), str(FilterExpression(str(expr))))
+
+    def test_invalid_expressions(self):
+        for text in ['', 'score', 'score >= ', 'score >= 1 and',
+                     "score > 'a'", '(score > 1', 'score > 1)',
+                     'score between 1', 'score in ()', 'score ~ 1']:
+            try:
+                FilterExpression(text)
+                self.fail('Expected FilterExpressionError for ' + text)
+            except FilterExpressionError:
+                pass
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `graphindex` module."""
+
+import io
+import json
+import unittest
+
+import ndex2
+import numpy as np
+
+from ndexnetworktrim.compact import CompactNetwork
+from ndexnetworktrim.graphindex import AdjacencyIndex
+from ndexnetworktrim.graphindex import NodeDegrees
+from ndexnetworktrim.graphindex import find_nodes
+from ndexnetworktrim.graphindex import get_component_labels
+from ndexnetworktrim.graphindex import get_disparity_alphas
+from ndexnetworktrim.graphindex import select_components
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+from tests.test_cxstream import get_test_cx
+
+
+def get_network_with_parent_orphan():
+    """
+    Gets network of :py:func:`get_test_cx` with extra node 4
+    that has no edges
+    """
+    network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+    network.nodes[4] = {'@id': 4, 'n': 'E'}
+    return network
+
+
+class TestGraphIndex(unittest.TestCase):
+    """Tests for `graphindex` module."""
+
+    def test_degrees(self):
+        degrees = NodeDegrees(get_network_with_parent_orphan())
+        self.assertEqual([1, 2, 2, 1, 0],
+                         [degrees.get_degree(n) for n in range(5)])
+        self.assertEqual(0, degrees.get_degree(100))
+        self.assertEqual([4], degrees.get_parent_orphans().tolist())
+        self.assertEqual([4], degrees.get_orphans().tolist())
+        self.assertEqual([], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+
+    def test_remove_edges(self):
+        degrees = NodeDegrees(get_network_with_parent_orphan())
+        self.assertEqual(1, degrees.remove_edges([10]))
+        self.assertEqual([0, 4], degrees.get_orphans().tolist())
+
+        # removing again or unknown edges changes nothing
+        self.assertEqual(0, degrees.remove_edges([10, 99]))
+        self.assertEqual(0, degrees.get_degree(0))
+        self.assertEqual(1, degrees.get_degree(1))
+
+        self.assertEqual(1, degrees.remove_edges([12]))
+        self.assertEqual([0, 3], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+        self.assertEqual(0, degrees.remove_edges([]))
+
+    def test_keep_only_edges_and_copy(self):
+        parent = NodeDegrees(get_network_with_parent_orphan())
+        degrees = parent.copy()
+        self.assertEqual(2, degrees.keep_only_edges([12]))
+        self.assertEqual([0, 1, 4], degrees.get_orphans().tolist())
+
+        # parent is not altered by copy
+        self.assertEqual([4], parent.get_orphans().tolist())
+        self.assertEqual(1, parent.get_degree(0))
+
+    def test_empty_network(self):
+        degrees = NodeDegrees(ndex2.nice_cx_network.NiceCXNetwork())
+        self.assertEqual(0, degrees.remove_edges([1]))
+        self.assertEqual([], degrees.get_orphans().tolist())
+
+    def test_neighborhood(self):
+        index = AdjacencyIndex(get_network_with_parent_orphan())
+
+        def get(seeds, hops, edge_ids=None):
+            nodes, edges = index.get_neighborhood(seeds, hops,
+                                                  edge_ids=edge_ids)
+            return nodes.tolist(), sorted(edges.tolist())
+
+        self.assertEqual(([0], []), get([0], 0))
+        self.assertEqual(([0, 1], [10]), get([0], 1))
+        self.assertEqual(([0, 1, 2], [10, 11]), get([0], 2))
+        self.assertEqual(([0, 1, 2, 3], [10, 11, 12]), get([0, 3], 1))
+        self.assertEqual(([0, 1], [10]), get([0], 3, edge_ids=[10, 12]))
+        self.assertEqual(([4], []), get([4], 2))
+        self.assertEqual(([], []), get([99], 2))
+        self.assertEqual(([1, 2, 3], [11, 12]), get([99, 2], 1))
+
+    def test_incident_edge_ids(self):
+        index = AdjacencyIndex(get_network_with_parent_orphan())
+        self.assertEqual([10, 11], sorted(
+            index.get_incident_edge_ids([1]).tolist()))
+        self.assertEqual([10, 11, 12], sorted(
+            index.get_incident_edge_ids([1, 3, 99]).tolist()))
+        self.assertEqual([], index.get_incident_edge_ids([4]).tolist())
+        self.assertEqual([], index.get_incident_edge_ids([]).tolist())
+
+    def test_reject_nodes(self):
+        degrees = NodeDegrees(get_network_with_parent_orphan())
+        degrees.remove_edges([10, 11])
+        degrees.reject_nodes([1, 2])
+        self.assertEqual([0, 1, 2], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+        self.assertEqual(1, degrees.get_degree(2))
+
+    def test_neighborhood_matches_scan(self):
+        network = ndex2.create_nice_cx_from_raw_cx(
+            SyntheticNetworkGenerator(200, 400, seed=5).get_cx())
+        index = AdjacencyIndex(network)
+        allowed = set(e for e in network.edges if e % 3)
+        for seeds, hops in [([0], 1), ([0, 7], 2), ([5], 4)]:
+            visited = set(seeds)
+            frontier = set(seeds)
+            for hop in range(hops):
+                reached = set()
+                for edge_id, edge in network.edges.items():
+                    if edge_id not in allowed:
+                        continue
+                    if edge['s'] in frontier:
+                        reached.add(edge['t'])
+                    if edge['t'] in frontier:
+                        reached.add(edge['s'])
+                frontier = reached - visited
+                visited |= frontier
+            edges = [e for e, edge in network.edges.items()
+                     if e in allowed and edge['s'] in visited and
+                     edge['t'] in visited]
+            nodes, kept = index.get_neighborhood(seeds, hops,
+                                                 edge_ids=sorted(allowed))
+            self.assertEqual(sorted(visited), nodes.tolist())
+            self.assertEqual(sorted(edges), sorted(kept.tolist()))
+
+    def test_find_nodes(self):
+        cx = get_test_cx()
+        cx[6]['nodes'][2]['r'] = 'hgnc:X'
+        for network in [ndex2.create_nice_cx_from_raw_cx(cx),
+                        CompactNetwork.from_cx_stream(
+                            io.BytesIO(json.dumps(cx).encode('utf-8')))]:
+            node_ids, missing = find_nodes(network, ['B', 'hgnc:X', 'Z'])
+            self.assertEqual([1, 2], node_ids.tolist())
+            self.assertEqual(['Z'], missing)
+
+    def test_component_labels(self):
+        labels = get_component_labels(8, np.array([5, 1, 2, 7, 4]),
+                                      np.array([1, 2, 0, 3, 4]))
+        self.assertEqual([0, 0, 0, 3, 4, 0, 6, 3], labels.tolist())
+        self.assertEqual([0, 1], get_component_labels(
+            2, np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64)).tolist())
+
+    def test_component_labels_match_search(self):
+        rng = np.random.default_rng(3)
+        size = 300
+        sources = rng.integers(0, size, 250)
+        targets = rng.integers(0, size, 250)
+        labels = get_component_labels(size, sources, targets)
+        neighbors = {n: set() for n in range(size)}
+        for source, target in zip(sources.tolist(), targets.tolist()):
+            neighbors[source].add(target)
+            neighbors[target].add(source)
+        for node in range(size):
+            component = {node}
+            stack = [node]
+            while stack:
+                for other in neighbors[stack.pop()] - component:
+                    component.add(other)
+                    stack.append(other)
+            self.assertEqual(min(component), labels[node])
+
+    def test_select_components(self):
+        # components {0, 1, 2}, {3, 4} and {5}
+        node_ids = [0, 1, 2, 3, 4, 5]
+        sources = [0, 1, 3]
+        targets = [1, 2, 4]
+        node_mask, edge_mask = select_components(node_ids, sources, targets,
+                                                 min_size=2)
+        self.assertEqual([True] * 5 + [False], node_mask.tolist())
+        self.assertEqual([True, True, True], edge_mask.tolist())
+        node_mask, edge_mask = select_components(node_ids, sources, targets,
+                                                 largest_only=True)
+        self.assertEqual([True] * 3 + [False] * 3, node_mask.tolist())
+        self.assertEqual([True, True, False], edge_mask.tolist())
+        node_mask, edge_mask = select_components([], [], [],
+                                                 largest_only=True)
+        self.assertEqual([], node_mask.tolist())
+
+    def test_remove_components(self):
+        parent = NodeDegrees(get_network_with_parent_orphan())
+        degrees = parent.copy()
+        degrees.remove_edges([11])
+        self.assertEqual([], degrees.remove_components(min_size=2).tolist())
+        self.assertEqual([4], degrees.get_orphans().tolist())
+        self.assertEqual([12], degrees.remove_components(
+            largest_only=True).tolist())
+        self.assertEqual([2, 3], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+        self.assertEqual([11, 12], degrees.get_removed_edge_ids().tolist())
+
+        # parent orphan only counts if it is kept otherwise
+        degrees = parent.copy()
+        self.assertEqual([], degrees.remove_components(
+            min_size=1, count_parent_orphans=True).tolist())
+        self.assertEqual([], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+        self.assertEqual([], degrees.remove_components(
+            min_size=2, count_parent_orphans=True).tolist())
+        self.assertEqual([4], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+
+    def test_disparity_alphas(self):
+        # star around node 0 plus edge between leaves 1 and 2
+        network = ndex2.nice_cx_network.NiceCXNetwork()
+        for node_id in range(4):
+            network.nodes[node_id] = {'@id': node_id}
+        for edge_id, (source, target) in enumerate([(0, 1), (0, 2), (0, 3),
+                                                    (1, 2), (2, 3)]):
+            network.edges[edge_id] = {'@id': edge_id, 's': source,
+                                      't': target}
+        weights = np.array([10, 1, 1, 1, 7], dtype=np.float64)
+        missing = np.array([False] * 4 + [True])
+        edge_ids, alphas = get_disparity_alphas(network, weights,
+                                                missing=missing)
+        self.assertEqual([0, 1, 2, 3, 4], edge_ids.tolist())
+        expected = [(1 / 6.0) ** 2, 0.5, (11 / 12.0) ** 2, 0.5]
+        for alpha, value in zip(alphas.tolist(), expected):
+            self.assertAlmostEqual(value, alpha)
+        self.assertTrue(np.isnan(alphas[4]))
+
+        # NaN and negative weights are left out like missing ones
+        weights[4] = np.nan
+        self.assertTrue(np.allclose(
+            alphas[:4], get_disparity_alphas(network, weights)[1][:4]))
+        weights[4] = -1
+        self.assertTrue(np.allclose(
+            alphas[:4], get_disparity_alphas(network, weights)[1][:4]))
+
+    def test_sparse_and_negative_node_ids(self):
+        # same graph as get_network_with_parent_orphan with node ids
+        # that can not index an array sized by the largest id
+        ids = [-5, 2 ** 40, 7, 2 ** 62, 123]
+        network = ndex2.nice_cx_network.NiceCXNetwork()
+        for node_id in ids:
+            network.nodes[node_id] = {'@id': node_id}
+        for edge_id, (source, target) in [(10, (0, 1)), (11, (1, 2)),
+                                          (12, (2, 3))]:
+            network.edges[edge_id] = {'@id': edge_id, 's': ids[source],
+                                      't': ids[target]}
+
+        degrees = NodeDegrees(network)
+        self.assertEqual([1, 2, 2, 1, 0],
+                         [degrees.get_degree(n) for n in ids])
+        self.assertEqual(0, degrees.get_degree(2 ** 41))
+        self.assertEqual([123], degrees.get_parent_orphans().tolist())
+        degrees.remove_edges([11])
+        self.assertEqual([12], degrees.remove_components(
+            largest_only=True).tolist())
+        self.assertEqual([7, 2 ** 62], degrees.get_orphans(
+            include_parent_orphans=False).tolist())
+
+        index = AdjacencyIndex(network)
+        nodes, edges = index.get_neighborhood([-5], 2)
+        self.assertEqual([-5, 7, 2 ** 40], nodes.tolist())
+        self.assertEqual([10, 11], sorted(edges.tolist()))
+        self.assertEqual([11, 12], sorted(
+            index.get_incident_edge_ids([7, -1]).tolist()))
+
+        node_mask, edge_mask = select_components(
+            [-5, 2 ** 40, 7, 2 ** 62], [-5, 7], [2 ** 40, 2 ** 62],
+            largest_only=True)
+        self.assertEqual([True, True, False, False], node_mask.tolist())
+        self.assertEqual([True, False], edge_mask.tolist())
+
+        weights = np.array([10, 1, 1], dtype=np.float64)
+        expected = get_disparity_alphas(get_network_with_parent_orphan(),
+                                        weights)
+        res = get_disparity_alphas(network, weights)
+        self.assertEqual(expected[0].tolist(), res[0].tolist())
+        self.assertTrue(np.allclose(expected[1], res[1], equal_nan=True))
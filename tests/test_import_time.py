@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests that startup of `ndexnetworktrimmer` skips heavy imports."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from tests.test_cxstream import get_test_cx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFERRED = ['ndex2', 'networkx', 'pandas', 'requests']
+
+SCRIPT = """
+import contextlib, io, json, sys
+from ndexnetworktrim import ndexnetworktrimmer
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        status = ndexnetworktrimmer.main(['myprog.py'] + sys.argv[1:])
+    except SystemExit as e:
+        status = e.code
+print(json.dumps([status, sorted(set(m.split('.')[0] for m in sys.modules))]))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    """Tests that startup of `ndexnetworktrimmer` skips heavy imports."""
+
+    def _run_main(self, args):
+        """
+        Runs main of trimmer with `args` in a new interpreter
+        :return: (exit code, names of imported top level packages)
+        """
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT] +
+                                         args, env=env,
+                                         universal_newlines=True)
+        status, modules = json.loads(output.splitlines()[-1])
+        return status, modules
+
+    def test_help_and_version_skip_deferred_imports(self):
+        for args, expected in [(['--help'], 0), (['--version'], 0),
+                               (['--bogus'], 2)]:
+            status, modules = self._run_main(args)
+            self.assertEqual(expected, status)
+            self.assertEqual([], sorted(set(modules) & set(DEFERRED)))
+
+    def test_deferred_imports_loaded_when_needed(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            args = ['--input', input_path, '--output',
+                    os.path.join(temp_dir, 'output.cx'), '--edge_attr',
+                    'score', '--value', '0.5']
+            status, modules = self._run_main(args + ['--compact'])
+            self.assertEqual(0, status)
+            self.assertNotIn('ndex2', modules)
+
+            status, modules = self._run_main(args)
+            self.assertEqual(0, status)
+            self.assertIn('ndex2', modules)
+        finally:
+            shutil.rmtree(temp_dir)
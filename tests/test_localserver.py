@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `localserver` module."""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+from ndex2.client import Ndex2
+
+from ndexnetworktrim import localserver
+from tests.test_cxstream import get_test_cx
+
+
+class TestLocalServer(unittest.TestCase):
+    """Tests for `localserver` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self._temp_dir, 'abc.cx'), 'w') as f:
+            json.dump(get_test_cx(), f)
+        self._server = localserver.LocalNDExServer(self._temp_dir)
+        self._server.start()
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        self._server.stop()
+        shutil.rmtree(self._temp_dir)
+
+    def _get_client(self, skip_version_check=True):
+        return Ndex2(self._server.get_url(), 'bob', 'smith',
+                     skip_version_check=skip_version_check)
+
+    def test_status(self):
+        client = self._get_client(skip_version_check=False)
+        self.assertEqual('/v2', client.version_endpoint)
+
+    def test_get_network_and_summary(self):
+        client = self._get_client()
+        resp = client.get_network_as_cx_stream('abc')
+        self.assertEqual(get_test_cx(), json.loads(resp.content))
+
+        summary = client.get_network_summary('abc')
+        self.assertEqual('abc', summary['externalId'])
+        self.assertEqual('parent', summary['name'])
+        self.assertEqual(4, summary['nodeCount'])
+        self.assertEqual(3, summary['edgeCount'])
+        self.assertTrue(summary['modificationTime'] > 0)
+
+    def test_get_unknown_network(self):
+        resp = requests.get(self._server.get_url() + '/v2/network/nope')
+        self.assertEqual(404, resp.status_code)
+        resp = requests.get(self._server.get_url() + '/v2/foo')
+        self.assertEqual(404, resp.status_code)
+
+    def test_save_update_and_delete_network(self):
+        client = self._get_client()
+        cx = [{'nodes': [{'@id': 0, 'n': 'A'}]}]
+        stream = io.BytesIO(json.dumps(cx).encode('utf-8'))
+        url = client.save_cx_stream_as_new_network(stream)
+        network_id = url.split('/')[-1]
+        self.assertTrue(url.startswith(self._server.get_url() +
+                                       '/v2/network/'))
+        with open(os.path.join(self._temp_dir, network_id + '.cx')) as f:
+            self.assertEqual(cx, json.load(f))
+
+        cx = [{'nodes': [{'@id': 1, 'n': 'B'}]}]
+        stream = io.BytesIO(json.dumps(cx).encode('utf-8'))
+        client.update_cx_network(stream, network_id)
+        resp = client.get_network_as_cx_stream(network_id)
+        self.assertEqual(cx, json.loads(resp.content))
+
+        client.delete_network(network_id)
+        self.assertFalse(os.path.isfile(os.path.join(self._temp_dir,
+                                                     network_id + '.cx')))
+
+    def test_store_save_leaves_no_temp_files(self):
+        store = localserver.NetworkStore(self._temp_dir)
+        store.save('xyz', io.BytesIO(b'[]'))
+
+        class FailingStream(object):
+            def read(self, size=-1):
+                raise IOError('dropped')
+        self.assertRaises(IOError, store.save, 'xyz', FailingStream())
+        with open(store.get_path('xyz'), 'rb') as f:
+            self.assertEqual(b'[]', f.read())
+        self.assertEqual([], [name for name in os.listdir(self._temp_dir)
+                              if name.endswith('.tmp')])
+
+    def test_parse_arguments(self):
+        res = localserver._parse_arguments('hi', ['foo'])
+        self.assertEqual('foo', res.datadir)
+        self.assertEqual('127.0.0.1', res.host)
+        self.assertEqual(8765, res.port)
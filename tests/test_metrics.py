@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `metrics` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ndexnetworktrim import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for `metrics` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def test_stage(self):
+        run = metrics.RunMetrics(labels={'network': 'abc'})
+        with run.stage('download') as stage:
+            stage.add_bytes(10)
+            self.assertEqual([b'ab', b'c'],
+                             list(stage.count_chunks([b'ab', b'c'])))
+        try:
+            with run.stage('trim', value='0.5') as stage:
+                stage.set_count('edges_before', 3)
+                raise ValueError('fail')
+        except ValueError:
+            pass
+        run.finish(False)
+
+        res = run.to_dict()
+        self.assertEqual({'network': 'abc'}, res['labels'])
+        self.assertFalse(res['success'])
+        self.assertTrue(res['wall_seconds'] >= 0)
+        self.assertEqual(['download', 'trim'],
+                         [s['stage'] for s in res['stages']])
+        download, trim = res['stages']
+        self.assertEqual(13, download['bytes'])
+        self.assertTrue(download['wall_seconds'] >= 0)
+        self.assertTrue(download['cpu_seconds'] >= 0)
+        self.assertTrue(download['peak_rss_bytes'] > 0)
+        self.assertEqual({'value': '0.5'}, trim['labels'])
+        self.assertEqual({'edges_before': 3}, trim['counts'])
+        self.assertIsNone(trim['bytes'])
+
+    def test_write_json_and_prometheus(self):
+        run = metrics.RunMetrics(labels={'network': 'a"b'})
+        with run.stage('trim') as stage:
+            stage.set_count('edges_after', 2)
+        run.finish(True)
+
+        json_path = os.path.join(self._temp_dir, 'metrics.json')
+        run.write_json(json_path)
+        with open(json_path, 'r') as f:
+            self.assertTrue(json.load(f)['success'])
+
+        prom_path = os.path.join(self._temp_dir, 'metrics.prom')
+        run.write_prometheus(prom_path)
+        with open(prom_path, 'r') as f:
+            lines = f.read().splitlines()
+        self.assertTrue('ndexnetworktrim_run_success{network="a\\"b"} 1' in
+                        lines)
+        self.assertTrue('# TYPE ndexnetworktrim_stage_wall_seconds gauge' in
+                        lines)
+        self.assertTrue('ndexnetworktrim_stage_elements{count="edges_after",'
+                        'network="a\\"b",stage="trim"} 2' in lines)
+        self.assertEqual([], [n for n in os.listdir(self._temp_dir)
+                              if n.endswith('.tmp')])
@@ -3,13 +3,25 @@
 
 """Tests for `ndexnetworktrim` package."""
 
+import contextlib
+import io
 import os
+import json
 import tempfile
 import shutil
 
 import unittest
+from unittest import mock
+import ndex2
 from ndexutil.config import NDExUtilConfig
+from ndexnetworktrim import cxupload
 from ndexnetworktrim import ndexnetworktrimmer
+from ndexnetworktrim import parallel
+from ndexnetworktrim.localserver import LocalNDExServer
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+from tests.test_cxstream import get_test_cx, get_aspect
+from tests.test_cascade import get_dependent_cx
+from tests.test_collapse import get_parallel_cx
 
 
 class TestNdexnetworktrim(unittest.TestCase):
@@ -21,6 +33,15 @@ class TestNdexnetworktrim(unittest.TestCase):
     def tearDown(self):
         """Tear down test fixtures, if any."""
 
+    def _get_trimmer(self, value='0.5', extra_args=None):
+        args = ['--uuid', 'abc', '--edge_attr', 'score', '--value', value]
+        if extra_args is not None:
+            args.extend(extra_args)
+        theargs = ndexnetworktrimmer._parse_arguments('hi', args)
+        trimmer = ndexnetworktrimmer.NDExNetworkTrimmer(theargs)
+        trimmer._server = 'dev.ndexbio.org'
+        return trimmer
+
     def test_parse_arguments(self):
         """Tests parse arguments"""
         res = ndexnetworktrimmer._parse_arguments('hi', [])
@@ -101,9 +122,967 @@ format=%(asctime)s %(name)-12s %(levelname)-8s %(message)s""")
                 {server} = dev.ndexbio.org""".format(user=NDExUtilConfig.USER,
                                                      pw=NDExUtilConfig.PASSWORD,
                                                      server=NDExUtilConfig.SERVER))
+            # no network to trim is an error
             res = ndexnetworktrimmer.main(['myprog.py', '--conf',
                                                      confile, '--profile',
                                                      'hi'])
+            self.assertEqual(res, 2)
+
+            infile = os.path.join(temp_dir, 'input.cx')
+            with open(infile, 'w') as f:
+                json.dump(get_test_cx(), f)
+            outfile = os.path.join(temp_dir, 'output.cx')
+            res = ndexnetworktrimmer.main(['myprog.py', '--conf', confile,
+                                           '--profile', 'hi',
+                                           '--input', infile,
+                                           '--output', outfile,
+                                           '--edge_attr', 'score',
+                                           '--value', '0.5'])
             self.assertEqual(res, 0)
+            self.assertTrue(os.path.isfile(outfile))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_check_if_edge_attribute_complies(self):
+        trimmer = self._get_trimmer()
+        self.assertFalse(trimmer._check_if_edge_attribute_complies(None))
+        self.assertTrue(trimmer._check_if_edge_attribute_complies(
+            [{'n': 'foo', 'v': 0.1}, {'n': 'score', 'v': 0.5}]))
+        self.assertTrue(trimmer._check_if_edge_attribute_complies(
+            [{'n': 'score', 'v': '0.7'}]))
+        self.assertFalse(trimmer._check_if_edge_attribute_complies(
+            [{'n': 'score', 'v': 0.4}, {'n': 'foo', 'v': 0.9}]))
+        self.assertFalse(trimmer._check_if_edge_attribute_complies(
+            [{'n': 'score', 'v': 'high'}]))
+
+        trimmer = self._get_trimmer(value='high')
+        self.assertTrue(trimmer._check_if_edge_attribute_complies(
+            [{'n': 'score', 'v': 'high'}]))
+        self.assertFalse(trimmer._check_if_edge_attribute_complies(
+            [{'n': 'score', 'v': 'low'}]))
+
+    def test_update_network_attribute_elements(self):
+        trimmer = self._get_trimmer()
+        res = trimmer._update_network_attribute_elements(
+            [{'n': 'name', 'v': 'parent'},
+             {'n': 'prov:wasGeneratedBy', 'v': 'x', 'd': 'string'}])
+        by_name = {a['n']: a['v'] for a in res}
+        self.assertEqual('parent', by_name['name'])
+        self.assertEqual(trimmer._get_user_agent(),
+                         by_name['prov:wasGeneratedBy'])
+        self.assertEqual('http://dev.ndexbio.org/#/network/abc',
+                         by_name['prov:wasDerivedFrom'])
+        self.assertTrue('score >= 0.5' in by_name['description'])
+        self.assertEqual(4, len(res))
+
+    def test_trim_cx_stream(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            trimmer = self._get_trimmer(value='0.5')
+            output = io.BytesIO()
+            res = trimmer._trim_cx_stream(input_path, output)
+            self.assertEqual(2, res.get_kept_edge_count())
+            cx = json.loads(output.getvalue().decode('utf-8'))
+            self.assertEqual([10, 12], [e['@id'] for e in
+                                        get_aspect(cx, 'edges')])
+            net_attribs = get_aspect(cx, 'networkAttributes')
+            self.assertTrue(net_attribs[1]['v'].endswith('desc'))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_input_and_output_files(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            for streaming in [[], ['--streaming'], ['--compact']]:
+                output_path = os.path.join(temp_dir, 'output.cx')
+                res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                               input_path, '--output',
+                                               output_path, '--edge_attr',
+                                               'score', '--value', '0.6'] +
+                                              streaming)
+                self.assertEqual(0, res)
+                with open(output_path, 'r') as f:
+                    cx = json.load(f)
+                self.assertEqual([10], [e['@id'] for e in
+                                        get_aspect(cx, 'edges')])
+                self.assertEqual([0, 1], sorted([n['@id'] for n in
+                                                 get_aspect(cx, 'nodes')]))
+                net_attribs = {a['n']: a['v'] for a in
+                               get_aspect(cx, 'networkAttributes')}
+                self.assertEqual('file://' + input_path,
+                                 net_attribs['prov:wasDerivedFrom'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_without_uuid_or_input(self):
+        res = ndexnetworktrimmer.main(['myprog.py', '--edge_attr', 'score',
+                                       '--value', '0.6'])
+        self.assertEqual(2, res)
+
+    def test_main_against_local_server(self):
+        temp_dir = tempfile.mkdtemp()
+        server = None
+        try:
+            datadir = os.path.join(temp_dir, 'data')
+            os.makedirs(datadir)
+            with open(os.path.join(datadir, 'abc.cx'), 'w') as f:
+                json.dump(get_test_cx(), f)
+            server = LocalNDExServer(datadir)
+            server.start()
+            confile = os.path.join(temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+            for streaming in [[], ['--streaming'], ['--stream_upload'],
+                              ['--gzip_upload'],
+                              ['--streaming', '--stream_upload'],
+                              ['--streaming', '--gzip_upload'],
+                              ['--compact']]:
+                res = ndexnetworktrimmer.main(['myprog.py', '--conf', confile,
+                                               '--profile', 'hi', '--uuid',
+                                               'abc', '--edge_attr', 'score',
+                                               '--value', '0.5'] + streaming)
+                self.assertEqual(0, res)
+                uploaded = [n for n in os.listdir(datadir) if n != 'abc.cx']
+                self.assertEqual(1, len(uploaded))
+                with open(os.path.join(datadir, uploaded[0]), 'r') as f:
+                    cx = json.load(f)
+                os.remove(os.path.join(datadir, uploaded[0]))
+                self.assertEqual([10, 12], sorted([e['@id'] for e in
+                                                   get_aspect(cx, 'edges')]))
+                net_attribs = {a['n']: a['v'] for a in
+                               get_aspect(cx, 'networkAttributes')}
+                self.assertEqual(server.get_url() + '/#/network/abc',
+                                 net_attribs['prov:wasDerivedFrom'])
+        finally:
+            if server is not None:
+                server.stop()
+            shutil.rmtree(temp_dir)
+
+    def test_get_uploader(self):
+        for extra_args, uploader_class in [
+                ([], cxupload.NDExClientUploader),
+                (['--stream_upload'], cxupload.StreamingCXUploader),
+                (['--gzip_upload'], cxupload.StreamingCXUploader)]:
+            trimmer = self._get_trimmer(extra_args=extra_args)
+            trimmer._ndex = mock.Mock()
+            self.assertTrue(isinstance(trimmer._get_uploader(),
+                                       uploader_class))
+
+    def test_trim_edges(self):
+        trimmer = self._get_trimmer(value='0.5')
+        trimmer._network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+        trimmer._trim_edges()
+        self.assertEqual([10, 12], sorted(trimmer._network.edges.keys()))
+        self.assertEqual([10, 12],
+                         sorted(trimmer._network.edgeAttributes.keys()))
+
+        trimmer = self._get_trimmer(value='x', extra_args=['--edge_attr',
+                                                           'type'])
+        trimmer._network = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+        trimmer._trim_edges()
+        self.assertEqual([12], list(trimmer._network.edges.keys()))
+        trimmer._remove_orphan_nodes()
+        self.assertEqual([2, 3], sorted(trimmer._network.nodes.keys()))
+        self.assertEqual([3], list(trimmer._network.nodeAttributes.keys()))
+
+    def test_remove_orphan_nodes_keeps_parent_orphans(self):
+        cx = get_test_cx()
+        cx.insert(-1, {'nodes': [{'@id': 4, 'n': 'E'}]})
+        for keep, expected in [([], [2, 3]),
+                               (['--keep_parent_orphans'], [2, 3, 4])]:
+            trimmer = self._get_trimmer(value='x',
+                                        extra_args=['--edge_attr',
+                                                    'type'] + keep)
+            trimmer._network = ndex2.create_nice_cx_from_raw_cx(cx)
+            trimmer._trim_edges()
+            trimmer._remove_orphan_nodes()
+            self.assertEqual(expected, sorted(trimmer._network.nodes.keys()))
+
+            temp_dir = tempfile.mkdtemp()
+            try:
+                input_path = os.path.join(temp_dir, 'input.cx')
+                with open(input_path, 'w') as f:
+                    json.dump(cx, f)
+                output = io.BytesIO()
+                trimmer._trim_cx_stream(input_path, output)
+                res = json.loads(output.getvalue())
+                self.assertEqual(expected, sorted([n['@id'] for n in
+                                                   get_aspect(res, 'nodes')]))
+            finally:
+                shutil.rmtree(temp_dir)
+
+    def test_main_with_several_values(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+            for streaming in [[], ['--streaming'], ['--compact']]:
+                res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                               input_path, '--output',
+                                               output_path, '--edge_attr',
+                                               'score', '--value', '0.6',
+                                               '0.5', '0'] + streaming)
+                self.assertEqual(0, res)
+                for value, edges in [('0.6', [10]), ('0.5', [10, 12]),
+                                     ('0', [10, 11, 12])]:
+                    path = os.path.join(temp_dir, 'output_' + value + '.cx')
+                    with open(path, 'r') as f:
+                        cx = json.load(f)
+                    self.assertEqual(edges, sorted([e['@id'] for e in
+                                                    get_aspect(cx, 'edges')]))
+                    net_attribs = {a['n']: a['v'] for a in
+                                   get_aspect(cx, 'networkAttributes')}
+                    self.assertEqual('parent ( score >= ' + value + ' )',
+                                     net_attribs['name'])
+                    self.assertTrue('score >= ' + value + '.' in
+                                    net_attribs['description'])
+                    self.assertTrue('>parent</a>' in
+                                    net_attribs['description'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_seeds(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            seeds_path = os.path.join(temp_dir, 'seeds.txt')
+            with open(seeds_path, 'w') as f:
+                f.write('# seed genes\nD\n\nnotanode\n')
+            output_path = os.path.join(temp_dir, 'output.cx')
+            args = ['myprog.py', '--input', input_path, '--output',
+                    output_path, '--seeds', seeds_path]
+
+            def get_ids(path, aspect):
+                with open(path, 'r') as f:
+                    return sorted(e['@id'] for e in get_aspect(json.load(f),
+                                                               aspect))
+
+            for compact in [[], ['--compact']]:
+                self.assertEqual(0, ndexnetworktrimmer.main(args + compact))
+                self.assertEqual([12], get_ids(output_path, 'edges'))
+                self.assertEqual([2, 3], get_ids(output_path, 'nodes'))
+                with open(output_path, 'r') as f:
+                    net_attribs = {a['n']: a['v'] for a in get_aspect(
+                        json.load(f), 'networkAttributes')}
+                self.assertTrue('with a 1-hop neighborhood of seeds.txt.' in
+                                net_attribs['description'])
+
+                # edge 11 is filtered out so node 1 is out of reach
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + compact + ['--hops', '3', '--edge_attr', 'score',
+                                      '--value', '0.5']))
+                self.assertEqual([12], get_ids(output_path, 'edges'))
+
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + compact + ['--hops', '2', '--edge_attr', 'score',
+                                      '--value', '0', '0.5']))
+                for value, edges in [('0', [11, 12]), ('0.5', [12])]:
+                    path = os.path.join(temp_dir, 'output_' + value + '.cx')
+                    self.assertEqual(edges, get_ids(path, 'edges'))
+                    with open(path, 'r') as f:
+                        net_attribs = {a['n']: a['v'] for a in get_aspect(
+                            json.load(f), 'networkAttributes')}
+                    self.assertEqual('parent ( score >= ' + value + ' in '
+                                     '2-hop neighborhood of seeds.txt )',
+                                     net_attribs['name'])
+
+            self.assertEqual(2, ndexnetworktrimmer.main(args +
+                                                        ['--streaming']))
+            with open(seeds_path, 'w') as f:
+                f.write('notanode\n')
+            self.assertEqual(2, ndexnetworktrimmer.main(args))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_node_filter(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            cx = get_test_cx()
+            cx[7]['nodeAttributes'].append({'po': 2, 'n': 'type', 'v': 'gene'})
+            cx[7]['nodeAttributes'].append({'po': 1, 'n': 'level', 'v': 3,
+                                            'd': 'integer'})
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(cx, f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+            args = ['myprog.py', '--input', input_path, '--output',
+                    output_path]
+
+            def get_ids(aspect):
+                with open(output_path, 'r') as f:
+                    return sorted(e['@id'] for e in get_aspect(json.load(f),
+                                                               aspect))
+
+            for mode in [[], ['--streaming'], ['--compact']]:
+                # node 1 is not a gene so edges 10 and 11 go with it
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + mode + ['--node_attr', 'type',
+                                   '--node_value', 'gene']))
+                self.assertEqual([12], get_ids('edges'))
+                self.assertEqual([2, 3], get_ids('nodes'))
+                with open(output_path, 'r') as f:
+                    net_attribs = {a['n']: a['v'] for a in get_aspect(
+                        json.load(f), 'networkAttributes')}
+                self.assertTrue('node type = gene' in
+                                net_attribs['description'])
+
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + mode + ['--node_attr', 'type',
+                                   '--node_value', 'gene', '--edge_attr',
+                                   'score', '--value', '0.6']))
+                self.assertEqual([], get_ids('edges'))
+                self.assertEqual([], get_ids('nodes'))
+
+                # only node 1 has level, nodes without it are removed
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + mode + ['--node_attr', 'level',
+                                   '--node_value', '2']))
+                self.assertEqual([], get_ids('edges'))
+
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                args + ['--node_attr', 'type']))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_component_filters(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+
+            def get_ids(aspect):
+                with open(output_path, 'r') as f:
+                    return sorted(e['@id'] for e in get_aspect(json.load(f),
+                                                               aspect))
+
+            # score >= 0.5 leaves components {0, 1} and {2, 3}
+            for mode in [[], ['--streaming'], ['--compact']]:
+                args = ['myprog.py', '--input', input_path, '--output',
+                        output_path, '--edge_attr', 'score'] + mode
+                for extra, edges, nodes in [
+                        (['--largest_component_only'], [10], [0, 1]),
+                        (['--min_component_size', '2'], [10, 12],
+                         [0, 1, 2, 3]),
+                        (['--min_component_size', '3'], [], [])]:
+                    self.assertEqual(0, ndexnetworktrimmer.main(
+                        args + ['--value', '0.5'] + extra))
+                    self.assertEqual(edges, get_ids('edges'))
+                    self.assertEqual(nodes, get_ids('nodes'))
+
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + ['--value', '0', '0.5', '--min_component_size',
+                            '3']))
+                root, ext = os.path.splitext(output_path)
+                for value, edges in [('0', [10, 11, 12]), ('0.5', [])]:
+                    with open(root + '_' + value + ext, 'r') as f:
+                        self.assertEqual(edges, sorted(
+                            e['@id'] for e in get_aspect(json.load(f),
+                                                         'edges')))
+
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                args + ['--value', '0.5', '--min_component_size', '0']))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_backbone(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+            args = ['myprog.py', '--input', input_path, '--output',
+                    output_path, '--edge_attr', 'score', '--backbone']
+
+            # alphas of edges 10, 11 and 12 are 0.1, 0.83 and 0.17
+            for compact in [[], ['--compact']]:
+                for alpha, edges in [('0.15', [10]), ('0.2', [10, 12]),
+                                     ('1', [10, 11, 12])]:
+                    self.assertEqual(0, ndexnetworktrimmer.main(
+                        args + compact + ['--alpha', alpha]))
+                    with open(output_path, 'r') as f:
+                        cx = json.load(f)
+                    self.assertEqual(edges, sorted(e['@id'] for e in
+                                                   get_aspect(cx, 'edges')))
+                net_attribs = {a['n']: a['v'] for a in
+                               get_aspect(cx, 'networkAttributes')}
+                self.assertTrue('disparity backbone of score at alpha 1.' in
+                                net_attribs['description'])
+
+            for extra in [['--streaming'], ['--value', '0.5'],
+                          ['--top_k', '1'], ['--alpha', '0']]:
+                self.assertEqual(2, ndexnetworktrimmer.main(args + extra))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_derive_network_does_not_alter_parent(self):
+        parent = ndex2.create_nice_cx_from_raw_cx(get_test_cx())
+        network = ndexnetworktrimmer.NDExNetworkTrimmer._derive_network(
+            parent, [12])
+        network.set_name('foo')
+        del network.nodes[0]
+        self.assertEqual([12], list(network.edges.keys()))
+        self.assertEqual(3, len(parent.edges))
+        self.assertEqual(4, len(parent.nodes))
+        self.assertEqual('parent', parent.get_name())
+
+    def test_main_with_cache_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        server = None
+        try:
+            datadir = os.path.join(temp_dir, 'data')
+            cache_dir = os.path.join(temp_dir, 'cache')
+            os.makedirs(datadir)
+            with open(os.path.join(datadir, 'abc.cx'), 'w') as f:
+                json.dump(get_test_cx(), f)
+            server = LocalNDExServer(datadir)
+            server.start()
+            confile = os.path.join(temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+            output_path = os.path.join(temp_dir, 'output.cx')
+            args = ['myprog.py', '--conf', confile, '--profile', 'hi',
+                    '--uuid', 'abc', '--edge_attr', 'score', '--value', '0',
+                    '--output', output_path, '--cache_dir', cache_dir]
+
+            def get_edge_ids():
+                with open(output_path, 'r') as f:
+                    return sorted([e['@id'] for e in
+                                   get_aspect(json.load(f), 'edges')])
+
+            self.assertEqual(0, ndexnetworktrimmer.main(args))
+            self.assertEqual([10, 11, 12], get_edge_ids())
+
+            # alter cached copy to show it is used instead of server copy
+            cx = get_test_cx()
+            cx[3]['edges'].pop()
+            with open(os.path.join(cache_dir, 'abc.cx'), 'w') as f:
+                json.dump(cx, f)
+            for streaming in [[], ['--streaming'], ['--compact']]:
+                self.assertEqual(0, ndexnetworktrimmer.main(args + streaming))
+                self.assertEqual([10, 12], get_edge_ids())
+
+            # network changed on server so it is downloaded again
+            os.utime(os.path.join(datadir, 'abc.cx'), (1, 1))
+            self.assertEqual(0, ndexnetworktrimmer.main(args))
+            self.assertEqual([10, 11, 12], get_edge_ids())
+        finally:
+            if server is not None:
+                server.stop()
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_workers(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'wb') as f:
+                SyntheticNetworkGenerator(200, 600, seed=4).write(f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+            args = ['myprog.py', '--input', input_path, '--output',
+                    output_path]
+
+            def get_edge_ids():
+                with open(output_path, 'r') as f:
+                    return sorted(e['@id'] for e in get_aspect(json.load(f),
+                                                               'edges'))
+
+            for trim in [['--edge_attr', 'score', '--value', '0.8'],
+                         ['--edge_attr', 'type', '--value', 'type3'],
+                         ['--filter', "score >= 0.5 and type != 'type1'"],
+                         ['--edge_attr', 'score', '--backbone',
+                          '--alpha', '0.3']]:
+                for compact in [[], ['--compact']]:
+                    self.assertEqual(0, ndexnetworktrimmer.main(
+                        args + trim + compact))
+                    expected = get_edge_ids()
+                    self.assertTrue(0 < len(expected) < 600)
+                    with mock.patch.object(parallel, 'MIN_CHUNK_SIZE', 50):
+                        self.assertEqual(0, ndexnetworktrimmer.main(
+                            args + trim + compact + ['--workers', '3']))
+                    self.assertEqual(expected, get_edge_ids())
+
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                args + ['--edge_attr', 'score', '--value', '0.8',
+                        '--workers', '0']))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_collapse_parallel(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_parallel_cx(), f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+            metrics_path = os.path.join(temp_dir, 'metrics.json')
+            args = ['myprog.py', '--input', input_path, '--output',
+                    output_path, '--edge_attr', 'score', '--value', '0.2',
+                    '--collapse_parallel', '--metrics_json', metrics_path]
+
+            def get_edges(path=output_path):
+                with open(path, 'r') as f:
+                    res = json.load(f)
+                attributes = {}
+                for element in get_aspect(res, 'edgeAttributes'):
+                    attributes.setdefault(element['po'], {})[
+                        element['n']] = element['v']
+                return {e['@id']: attributes.get(e['@id'], {})
+                        for e in get_aspect(res, 'edges')}
+
+            for compact in [[], ['--compact']]:
+                # edge 14 has no numeric score and is trimmed
+                self.assertEqual(0, ndexnetworktrimmer.main(args + compact))
+                self.assertEqual({10: {'score': 2.0, 'type': ['x', 'y'],
+                                       'pmid': [1, 2]},
+                                  12: {'score': 0.5, 'type': 'x'}},
+                                 get_edges())
+                with open(metrics_path, 'r') as f:
+                    stages = {s['stage']: s for s in json.load(f)['stages']}
+                self.assertEqual({'edges_before': 4, 'groups': 1,
+                                  'edges_after': 2},
+                                 stages['collapse']['counts'])
+
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + compact + ['--collapse_by_interaction',
+                                      '--collapse_aggregate', 'mean']))
+                self.assertEqual({10: {'score': 0.6, 'type': ['x', 'y']},
+                                  12: {'score': 0.5, 'type': 'x'},
+                                  15: {'score': 2.0, 'pmid': [1, 2]}},
+                                 get_edges())
+
+                # networks derived in a sweep do not alter parent
+                self.assertEqual(0, ndexnetworktrimmer.main(
+                    args + compact + ['--value', '0.2', '0.5',
+                                      '--collapse_aggregate', 'count']))
+                root = os.path.join(temp_dir, 'output_')
+                self.assertEqual({10: {'score': 3, 'type': ['x', 'y'],
+                                       'pmid': [1, 2]},
+                                  12: {'score': 0.5, 'type': 'x'}},
+                                 get_edges(root + '0.2.cx'))
+                self.assertEqual({10: {'score': 2, 'type': 'x',
+                                       'pmid': [1, 2]},
+                                  12: {'score': 0.5, 'type': 'x'}},
+                                 get_edges(root + '0.5.cx'))
+
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                args + ['--streaming']))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_snapshot(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            snapshot_dir = os.path.join(temp_dir, 'snapshot')
+            output_path = os.path.join(temp_dir, 'output.cx')
+            self.assertEqual(0, ndexnetworktrimmer.main(
+                ['myprog.py', '--input', input_path, '--export_snapshot',
+                 snapshot_dir]))
+            self.assertTrue(os.path.isfile(os.path.join(snapshot_dir,
+                                                        'snapshot.json')))
+
+            trim = ['--output', output_path, '--edge_attr', 'score',
+                    '--value', '0.5']
+            self.assertEqual(0, ndexnetworktrimmer.main(
+                ['myprog.py', '--input', input_path, '--compact'] + trim))
+            with open(output_path, 'r') as f:
+                expected = json.load(f)
+            self.assertEqual(0, ndexnetworktrimmer.main(
+                ['myprog.py', '--snapshot', snapshot_dir] + trim))
+            with open(output_path, 'r') as f:
+                res = json.load(f)
+            self.assertEqual(expected, res)
+            net_attribs = {a['n']: a['v'] for a in get_aspect(
+                res, 'networkAttributes')}
+            self.assertEqual('file://' + os.path.abspath(input_path),
+                             net_attribs['prov:wasDerivedFrom'])
+
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                ['myprog.py', '--snapshot', snapshot_dir, '--streaming'] +
+                trim))
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                ['myprog.py', '--snapshot', temp_dir] + trim))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_profile_attribute(self):
+        temp_dir = tempfile.mkdtemp()
+        server = None
+        try:
+            datadir = os.path.join(temp_dir, 'data')
+            os.makedirs(datadir)
+            with open(os.path.join(datadir, 'abc.cx'), 'w') as f:
+                json.dump(get_test_cx(), f)
+            server = LocalNDExServer(datadir)
+            server.start()
+            confile = os.path.join(temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+            metrics_path = os.path.join(temp_dir, 'metrics.json')
+            args = ['myprog.py', '--conf', confile, '--profile', 'hi',
+                    '--uuid', 'abc', '--profile_attribute', 'score',
+                    '--value', '0.5', '0.95', '--metrics_json', metrics_path]
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(0, ndexnetworktrimmer.main(args))
+            report = json.loads(output.getvalue())
+            self.assertEqual('score', report['attribute'])
+            self.assertEqual({'double': 3}, report['types'])
+            self.assertEqual([('0.5', 2, 4), ('0.95', 0, 0)],
+                             [(c['value'], c['edges'], c['nodes'])
+                              for c in report['cutoffs']])
+            with open(metrics_path, 'r') as f:
+                stages = [s['stage'] for s in json.load(f)['stages']]
+            self.assertEqual(['config_parse', 'download', 'profile'], stages)
+
+            # dry run never uploads
+            self.assertEqual(['abc.cx'], os.listdir(datadir))
+        finally:
+            if server is not None:
+                server.stop()
+            shutil.rmtree(temp_dir)
+
+    def test_state_key_includes_collapse_options(self):
+        keys = set()
+        for extra_args in [[], ['--collapse_parallel'],
+                           ['--collapse_parallel', '--collapse_aggregate',
+                            'mean'],
+                           ['--collapse_parallel',
+                            '--collapse_by_interaction']]:
+            keys.add(self._get_trimmer(
+                extra_args=extra_args)._get_state_key(0.5))
+        self.assertEqual(4, len(keys))
+        # collapse options do nothing without --collapse_parallel
+        self.assertEqual(
+            self._get_trimmer()._get_state_key(0.5),
+            self._get_trimmer(extra_args=['--collapse_aggregate',
+                                          'mean'])._get_state_key(0.5))
+
+    def test_main_with_state_file_and_collapse_parallel(self):
+        temp_dir = tempfile.mkdtemp()
+        server = None
+        try:
+            datadir = os.path.join(temp_dir, 'data')
+            os.makedirs(datadir)
+            parent_path = os.path.join(datadir, 'abc.cx')
+            with open(parent_path, 'w') as f:
+                json.dump(get_parallel_cx(), f)
+            server = LocalNDExServer(datadir)
+            server.start()
+            confile = os.path.join(temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+            state_file = os.path.join(temp_dir, 'state.json')
+            args = ['myprog.py', '--conf', confile, '--profile', 'hi',
+                    '--uuid', 'abc', '--edge_attr', 'score', '--value',
+                    '0.2', '--state_file', state_file]
+            runs = [[], ['--collapse_parallel'],
+                    ['--collapse_parallel', '--collapse_aggregate', 'mean']]
+            for count, extra_args in enumerate(runs, start=1):
+                self.assertEqual(0, ndexnetworktrimmer.main(args +
+                                                            extra_args))
+                with open(state_file, 'r') as f:
+                    networks = json.load(f)['networks']
+                self.assertEqual(count, len(networks))
+                self.assertEqual(count + 1, len(os.listdir(datadir)))
+
+            # each variant is skipped once parent is unchanged
+            for extra_args in runs:
+                self.assertEqual(0, ndexnetworktrimmer.main(args +
+                                                            extra_args))
+            self.assertEqual(len(runs) + 1, len(os.listdir(datadir)))
+        finally:
+            if server is not None:
+                server.stop()
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_state_file(self):
+        temp_dir = tempfile.mkdtemp()
+        server = None
+        try:
+            datadir = os.path.join(temp_dir, 'data')
+            os.makedirs(datadir)
+            parent_path = os.path.join(datadir, 'abc.cx')
+            with open(parent_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            server = LocalNDExServer(datadir)
+            server.start()
+            confile = os.path.join(temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+
+            def get_derived():
+                derived = {}
+                for name in os.listdir(datadir):
+                    if name == 'abc.cx':
+                        continue
+                    with open(os.path.join(datadir, name), 'r') as f:
+                        derived[name] = sorted(e['@id'] for e in get_aspect(
+                            json.load(f), 'edges'))
+                return derived
+
+            for streaming in [[], ['--streaming']]:
+                state_file = os.path.join(temp_dir, 'state.json')
+                args = ['myprog.py', '--conf', confile, '--profile', 'hi',
+                        '--uuid', 'abc', '--edge_attr', 'score', '--value',
+                        '0.5', '0.6', '--state_file', state_file] + streaming
+                os.utime(parent_path, (1, 1))
+                self.assertEqual(0, ndexnetworktrimmer.main(args))
+                derived = get_derived()
+                self.assertEqual([[10], [10, 12]], sorted(derived.values()))
+
+                # parent unchanged so nothing is uploaded
+                for name in derived:
+                    os.utime(os.path.join(datadir, name), (2, 2))
+                self.assertEqual(0, ndexnetworktrimmer.main(args))
+                self.assertEqual(derived, get_derived())
+                for name in derived:
+                    self.assertEqual(2, os.path.getmtime(
+                        os.path.join(datadir, name)))
+
+                # parent changed so derived networks are updated in place
+                cx = get_test_cx()
+                cx[4]['edges'].pop()
+                with open(parent_path, 'w') as f:
+                    json.dump(cx, f)
+                os.utime(parent_path, (3, 3))
+                self.assertEqual(0, ndexnetworktrimmer.main(args))
+                self.assertEqual(sorted(derived), sorted(get_derived()))
+                self.assertEqual([[10], [10]],
+                                 sorted(get_derived().values()))
+
+                # a deleted derived network is created again
+                os.remove(os.path.join(datadir, sorted(derived)[0]))
+                os.utime(parent_path, (4, 4))
+                self.assertEqual(0, ndexnetworktrimmer.main(args))
+                self.assertEqual(2, len(get_derived()))
+                self.assertEqual(0, ndexnetworktrimmer.main(args))
+                self.assertEqual(2, len(get_derived()))
+
+                for name in get_derived():
+                    os.remove(os.path.join(datadir, name))
+                with open(parent_path, 'w') as f:
+                    json.dump(get_test_cx(), f)
+                os.remove(state_file)
+
+            self.assertEqual(2, ndexnetworktrimmer.main(
+                args + ['--output', os.path.join(temp_dir, 'out.cx')]))
+        finally:
+            if server is not None:
+                server.stop()
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_filter(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            for streaming in [[], ['--streaming'], ['--compact']]:
+                output_path = os.path.join(temp_dir, 'output.cx')
+                res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                               input_path, '--output',
+                                               output_path, '--filter',
+                                               "score < 0.2 or type = 'x'"] +
+                                              streaming)
+                self.assertEqual(0, res)
+                with open(output_path, 'r') as f:
+                    cx = json.load(f)
+                self.assertEqual([11, 12], sorted([e['@id'] for e in
+                                                   get_aspect(cx, 'edges')]))
+                self.assertEqual([1, 2, 3], sorted([n['@id'] for n in
+                                                    get_aspect(cx, 'nodes')]))
+                net_attribs = {a['n']: a['v'] for a in
+                               get_aspect(cx, 'networkAttributes')}
+                self.assertTrue("score < 0.2 or type == 'x'" in
+                                net_attribs['description'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_prunes_dependent_aspects(self):
+        cx = get_test_cx()
+        cx[-1:-1] = get_dependent_cx()
+        cx[1]['metaData'].extend({'name': list(f.keys())[0]}
+                                 for f in get_dependent_cx())
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(cx, f)
+            output_path = os.path.join(temp_dir, 'output.cx')
+            for mode in [[], ['--streaming'], ['--compact']]:
+                res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                               input_path, '--output',
+                                               output_path, '--edge_attr',
+                                               'score', '--value',
+                                               '0.6'] + mode)
+                self.assertEqual(0, res)
+                with open(output_path, 'r') as f:
+                    res = json.load(f)
+                self.assertEqual([0], [e['node'] for e in
+                                       get_aspect(res, 'cartesianLayout')])
+                self.assertEqual([10], sorted(
+                    po for e in get_aspect(res, 'edgeCitations')
+                    for po in e['po']))
+                self.assertEqual(['network', 'nodes'],
+                                 [e['properties_of'] for e in
+                                  get_aspect(res, 'cyVisualProperties')])
+                self.assertEqual([0, 1], get_aspect(res, 'cySubNetworks')[0]
+                                 ['nodes'])
+                self.assertEqual([5], [e['@id'] for e in
+                                       get_aspect(res, 'supports')])
+                # unreferenced citations are only removed when not streaming
+                citations = [1, 2, 3] if mode == ['--streaming'] else [1, 3]
+                self.assertEqual(citations, sorted(
+                    e['@id'] for e in get_aspect(res, 'citations')))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_compact_and_streaming(self):
+        res = ndexnetworktrimmer.main(['myprog.py', '--input', 'foo.cx',
+                                       '--output', 'bar.cx',
+                                       '--edge_attr', 'score',
+                                       '--value', '0.5', '--compact',
+                                       '--streaming'])
+        self.assertEqual(2, res)
+
+    def test_main_with_invalid_filter(self):
+        res = ndexnetworktrimmer.main(['myprog.py', '--input', 'foo.cx',
+                                       '--output', 'bar.cx',
+                                       '--filter', 'score >='])
+        self.assertEqual(2, res)
+        res = ndexnetworktrimmer.main(['myprog.py', '--input', 'foo.cx',
+                                       '--output', 'bar.cx',
+                                       '--filter', 'score >= 1',
+                                       '--value', '1'])
+        self.assertEqual(2, res)
+
+    def test_main_with_top_k(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            for top in [['--top_k', '2'], ['--top_fraction', '0.66']]:
+                for streaming in [[], ['--streaming'], ['--compact']]:
+                    output_path = os.path.join(temp_dir, 'output.cx')
+                    res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                                   input_path, '--output',
+                                                   output_path, '--edge_attr',
+                                                   'score'] + top + streaming)
+                    self.assertEqual(0, res)
+                    with open(output_path, 'r') as f:
+                        cx = json.load(f)
+                    self.assertEqual([10, 12],
+                                     sorted([e['@id'] for e in
+                                             get_aspect(cx, 'edges')]))
+                    net_attribs = {a['n']: a['v'] for a in
+                                   get_aspect(cx, 'networkAttributes')}
+                    self.assertTrue('score >= 0.5 (top ' in
+                                    net_attribs['description'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_main_with_invalid_top_k(self):
+        for args in [['--top_k', '2'],
+                     ['--edge_attr', 'score', '--top_k', '2',
+                      '--value', '1'],
+                     ['--edge_attr', 'score', '--top_k', '2',
+                      '--top_fraction', '0.5'],
+                     ['--edge_attr', 'score', '--top_fraction', '2']]:
+            res = ndexnetworktrimmer.main(['myprog.py', '--input', 'foo.cx',
+                                           '--output', 'bar.cx'] + args)
+            self.assertEqual(2, res)
+
+    def test_main_with_metrics(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'input.cx')
+            with open(input_path, 'w') as f:
+                json.dump(get_test_cx(), f)
+            json_path = os.path.join(temp_dir, 'metrics.json')
+            prom_path = os.path.join(temp_dir, 'metrics.prom')
+            for streaming, stages in [([], ['download', 'trim',
+                                            'orphan_removal', 'cascade',
+                                            'attribute_update', 'upload']),
+                                      (['--streaming'], ['download', 'trim'])]:
+                res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                               input_path, '--output',
+                                               os.path.join(temp_dir,
+                                                            'output.cx'),
+                                               '--edge_attr', 'score',
+                                               '--value', '0.6',
+                                               '--metrics_json', json_path,
+                                               '--metrics_prom', prom_path] +
+                                              streaming)
+                self.assertEqual(0, res)
+                with open(json_path, 'r') as f:
+                    metrics = json.load(f)
+                self.assertTrue(metrics['success'])
+                self.assertEqual(stages, [s['stage'] for s in
+                                          metrics['stages']])
+                by_stage = {s['stage']: s for s in metrics['stages']}
+                self.assertEqual(os.path.getsize(input_path),
+                                 by_stage['download']['bytes'])
+                self.assertEqual(3, by_stage['trim']['counts']['edges_before'])
+                self.assertEqual(1, by_stage['trim']['counts']['edges_after'])
+                with open(prom_path, 'r') as f:
+                    self.assertTrue('ndexnetworktrim_run_success{network="' +
+                                    input_path + '"} 1' in f.read())
+
+            # metrics are written for failed runs too
+            res = ndexnetworktrimmer.main(['myprog.py', '--input',
+                                           os.path.join(temp_dir, 'nope.cx'),
+                                           '--output', 'bar.cx',
+                                           '--edge_attr', 'score',
+                                           '--value', '0.6',
+                                           '--metrics_json', json_path])
+            self.assertEqual(2, res)
+            with open(json_path, 'r') as f:
+                self.assertFalse(json.load(f)['success'])
         finally:
             shutil.rmtree(temp_dir)
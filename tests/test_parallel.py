@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `parallel` module."""
+
+import unittest
+
+import ndex2
+import numpy as np
+
+from ndexnetworktrim import parallel
+from ndexnetworktrim.columnar import EdgeAttributeIndex
+from ndexnetworktrim.filterexpr import FilterExpression
+from ndexnetworktrim.graphindex import get_disparity_alphas
+from ndexnetworktrim.graphindex import get_node_strengths
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+
+
+class TestParallel(unittest.TestCase):
+    """Tests for `parallel` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._network = ndex2.create_nice_cx_from_raw_cx(
+            SyntheticNetworkGenerator(300, 1000, seed=2,
+                                      missing_fraction=0.1).get_cx())
+
+    def test_shared_arrays(self):
+        arrays = {'a': np.arange(5, dtype=np.int32),
+                  'b': np.array([True, False]),
+                  'c': np.array([0.5, 1.5])}
+        with parallel.SharedArrays(arrays) as shared:
+            shm, attached = parallel.attach_arrays(shared.get_spec())
+            for name, array in arrays.items():
+                self.assertEqual(array.tolist(), attached[name].tolist())
+                self.assertEqual(array.dtype, attached[name].dtype)
+            attached['c'][0] = 9.0
+            self.assertEqual(9.0, shared.get_array('c')[0])
+            attached = None
+            shm.close()
+
+    def test_get_chunks(self):
+        self.assertEqual([(0, 10)], parallel.get_chunks(10, 4))
+        self.assertEqual([(0, 5), (5, 10)],
+                         parallel.get_chunks(10, 4, min_chunk_size=5))
+        chunks = parallel.get_chunks(1000, 2, min_chunk_size=1)
+        self.assertEqual(8, len(chunks))
+        self.assertEqual(0, chunks[0][0])
+        self.assertEqual(1000, chunks[-1][1])
+        self.assertEqual([(0, 0)], parallel.get_chunks(0, 2))
+
+    def test_evaluate_filter(self):
+        index = EdgeAttributeIndex(self._network)
+        size = len(index.get_edge_ids())
+        for expression in [FilterExpression("score >= 0.5 and type in "
+                                            "('type1', 'type2')"),
+                           FilterExpression("not (type = 'type3') or "
+                                            "score < 0.1"),
+                           parallel.ColumnCutoff('score', 0.7, True),
+                           parallel.ColumnCutoff('type', 'type4', False)]:
+            columns = index.get_columns(expression.get_attribute_names())
+            expected = expression.evaluate_columns(columns)
+            self.assertTrue(0 < np.count_nonzero(expected) < size)
+            mask = parallel.evaluate_filter(expression, columns, size, 2,
+                                            min_chunk_size=100)
+            self.assertEqual(expected.tolist(), mask.tolist())
+
+    def test_evaluate_backbone(self):
+        index = EdgeAttributeIndex(self._network)
+        weights, missing = index.get_column('score').get_numeric_values()
+        with np.errstate(invalid='ignore'):
+            expected = get_disparity_alphas(self._network, weights,
+                                            missing=missing)[1] < 0.3
+        _, sources, targets, weights, strengths, degrees = \
+            get_node_strengths(self._network, weights, missing=missing)
+        for min_chunk_size in [None, 100]:
+            mask = parallel.evaluate_backbone(sources, targets, weights,
+                                              strengths, degrees, 0.3, 3,
+                                              min_chunk_size=min_chunk_size)
+            self.assertEqual(expected.tolist(), mask.tolist())
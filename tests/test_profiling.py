@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `profiling` module."""
+
+import io
+import json
+import unittest
+
+import numpy as np
+
+from ndexnetworktrim.profiling import AttributeProfile
+from ndexnetworktrim.profiling import DistinctCounter
+from ndexnetworktrim.profiling import KLLSketch
+from ndexnetworktrim.profiling import StreamingAttributeProfiler
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+from tests.test_cxstream import get_test_cx
+
+
+class TestProfiling(unittest.TestCase):
+    """Tests for `profiling` module."""
+
+    def _get_stream(self):
+        return io.BytesIO(json.dumps(get_test_cx()).encode('utf-8'))
+
+    def test_kll_sketch_small_stream_is_exact(self):
+        sketch = KLLSketch()
+        self.assertEqual([], sketch.get_quantiles([0.5]))
+        for value in [5, 1, 4, 2, 3]:
+            sketch.update(value)
+        self.assertEqual(5, sketch.get_count())
+        self.assertEqual([1, 3, 5], sketch.get_quantiles([0.0, 0.5, 1.0]))
+
+    def test_kll_sketch_bounded_and_accurate(self):
+        values = np.random.RandomState(3).permutation(100000)
+        sketch = KLLSketch(seed=1)
+        for value in values.tolist():
+            sketch.update(value)
+        self.assertTrue(sum(len(c) for c in sketch._compactors) < 2000)
+        for fraction, quantile in zip([0.1, 0.5, 0.9],
+                                      sketch.get_quantiles([0.1, 0.5, 0.9])):
+            self.assertAlmostEqual(fraction, quantile / 100000.0, delta=0.02)
+
+    def test_distinct_counter(self):
+        counter = DistinctCounter(k=64)
+        for value in ['a', 'b', 'a', 1, 1.0, (1, 2)]:
+            counter.add(value)
+        self.assertTrue(counter.is_exact())
+        self.assertEqual(5, counter.get_count())
+
+        counter = DistinctCounter(k=256)
+        counter.add_ids(np.arange(20000))
+        other = DistinctCounter(k=256)
+        other.add_ids(np.arange(10000, 40000))
+        self.assertFalse(counter.is_exact())
+        self.assertAlmostEqual(20000, counter.get_count(), delta=4000)
+        counter.merge(other)
+        self.assertAlmostEqual(40000, counter.get_count(), delta=8000)
+
+    def test_attribute_profile(self):
+        profile = AttributeProfile('x')
+        for element in [{'po': 1, 'n': 'x', 'v': 2.0, 'd': 'double'},
+                        {'po': [2, 3], 'n': 'x', 'v': 'a'},
+                        {'po': 4, 'n': 'x', 'v': [1, 2],
+                         'd': 'list_of_integer'},
+                        {'po': 5, 'n': 'y', 'v': 1.0}]:
+            profile.update(element)
+        self.assertFalse(profile.is_numeric())
+        report = profile.get_report(6, fractions=[0.5])
+        self.assertEqual({'double': 1, 'string': 1, 'list_of_integer': 1},
+                         report['types'])
+        self.assertEqual(4, report['edges_with_attribute'])
+        self.assertEqual(2, report['missing'])
+        self.assertEqual(3, report['distinct_values'])
+        self.assertEqual(1, report['numeric_values'])
+        self.assertEqual(2, report['non_numeric_values'])
+        self.assertEqual({'0.5': 2.0}, report['quantiles'])
+
+    def test_profile_numeric_cutoffs(self):
+        profiler = StreamingAttributeProfiler('score',
+                                              cutoffs=['0.5', '0.95', '0'])
+        report = profiler.profile(self._get_stream)
+        self.assertEqual(3, report['edges'])
+        self.assertEqual(4, report['nodes'])
+        self.assertEqual(0, report['missing'])
+        self.assertEqual(0.1, report['min'])
+        self.assertEqual(0.9, report['max'])
+        self.assertEqual([('0.5', 2, 4), ('0.95', 0, 0), ('0', 3, 4)],
+                         [(c['value'], c['edges'], c['nodes'])
+                          for c in report['cutoffs']])
+        self.assertTrue(all(c['nodes_exact'] for c in report['cutoffs']))
+
+    def test_profile_default_cutoffs_from_quantiles(self):
+        report = StreamingAttributeProfiler('score').profile(self._get_stream)
+        self.assertEqual([('0.5', 2, 4), ('0.9', 1, 2)],
+                         [(c['value'], c['edges'], c['nodes'])
+                          for c in report['cutoffs']])
+
+    def test_profile_string_attribute(self):
+        report = StreamingAttributeProfiler('type').profile(self._get_stream)
+        self.assertEqual(2, report['missing'])
+        self.assertEqual([], report['cutoffs'])
+
+        profiler = StreamingAttributeProfiler('type', cutoffs=['x', 'y'],
+                                              keep_parent_orphans=True)
+        cx = get_test_cx()
+        cx[6]['nodes'].append({'@id': 4, 'n': 'E'})
+        report = profiler.profile(
+            lambda: io.BytesIO(json.dumps(cx).encode('utf-8')))
+        # node 4 has no edges in parent and is kept
+        self.assertEqual([('x', 1, 3), ('y', 0, 1)],
+                         [(c['value'], c['edges'], c['nodes'])
+                          for c in report['cutoffs']])
+
+    def test_profile_partitions_edges_past_max_edges(self):
+        cx = SyntheticNetworkGenerator(300, 2000, seed=4).get_cx()
+        data = json.dumps(cx).encode('utf-8')
+        edges = {}
+        scores = {}
+        for fragment in cx:
+            for edge in fragment.get('edges', []):
+                edges[edge['@id']] = (edge['s'], edge['t'])
+            for attr in fragment.get('edgeAttributes', []):
+                if attr['n'] == 'score':
+                    scores[attr['po']] = attr['v']
+        expected = []
+        for cutoff in [0.2, 0.5, 0.9]:
+            kept = [edges[e] for e, v in scores.items() if v >= cutoff]
+            expected.append((str(cutoff), len(kept),
+                             len(set(n for edge in kept for n in edge))))
+
+        partitions = []
+        for kwargs in [{}, {'max_edges': 64}]:
+            profiler = StreamingAttributeProfiler(
+                'score', cutoffs=[0.2, 0.5, 0.9], **kwargs)
+            report = profiler.profile(lambda: io.BytesIO(data))
+            partitions.append(report['cutoff_partitions'])
+            self.assertEqual(expected,
+                             [(c['value'], c['edges'], c['nodes'])
+                              for c in report['cutoffs']])
+        self.assertEqual(1, partitions[0])
+        self.assertTrue(partitions[1] > 1)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `service` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request
+from urllib.request import urlopen
+
+from ndexutil.config import NDExUtilConfig
+
+from ndexnetworktrim import ndexnetworktrimmer
+from ndexnetworktrim import service
+from ndexnetworktrim.localserver import LocalNDExServer
+from tests.test_cxstream import get_test_cx, get_aspect
+
+
+def _parse_arguments(args):
+    return ndexnetworktrimmer._parse_arguments('hi', args)
+
+
+class TestService(unittest.TestCase):
+    """Tests for `service` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+        self._input = os.path.join(self._temp_dir, 'input.cx')
+        with open(self._input, 'w') as f:
+            json.dump(get_test_cx(), f)
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def _get_service(self, extra_args=None):
+        args = ['--serve', '0']
+        if extra_args is not None:
+            args.extend(extra_args)
+        return service.TrimService(_parse_arguments(args),
+                                   ndexnetworktrimmer.NDExNetworkTrimmer,
+                                   _parse_arguments)
+
+    def _request(self, url, data=None):
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode('utf-8')
+        try:
+            with urlopen(Request(url, data=body)) as res:
+                return res.status, json.loads(res.read().decode('utf-8'))
+        except HTTPError as e:
+            return e.code, json.loads(e.read().decode('utf-8'))
+
+    def _wait_for_job(self, url, job_id):
+        for _ in range(200):
+            status, job = self._request(url + '/jobs/' + job_id)
+            self.assertEqual(200, status)
+            if job['status'] in [service.SUCCEEDED, service.FAILED]:
+                return job
+            time.sleep(0.05)
+        self.fail('Job ' + job_id + ' did not finish')
+
+    def test_get_job_arguments(self):
+        res = service.get_job_arguments({'uuid': 'abc', 'edge_attr': 'score',
+                                         'value': '0.5 0.7', 'top_k': 3,
+                                         'node_value': ['a', 'b'],
+                                         'compact': True,
+                                         'collapse_parallel': False,
+                                         'output': None})
+        self.assertEqual(['--uuid', 'abc', '--edge_attr', 'score',
+                          '--value', '0.5', '0.7', '--top_k', '3',
+                          '--node_value', 'a', 'b', '--compact'], res)
+
+    def test_get_job_arguments_paths(self):
+        root = os.path.realpath(self._temp_dir)
+        res = service.get_job_arguments({'input': 'a.cx',
+                                         'output': os.path.join(root, 'b.cx'),
+                                         'seeds': 'sub/seeds.txt'},
+                                        path_dir=self._temp_dir)
+        self.assertEqual(['--input', os.path.join(root, 'a.cx'),
+                          '--output', os.path.join(root, 'b.cx'),
+                          '--seeds', os.path.join(root, 'sub', 'seeds.txt')],
+                         res)
+        for options, path_dir, msg in [
+                ({'input': 'a.cx'}, None, 'without --serve_dir'),
+                ({'output': '../b.cx'}, self._temp_dir, 'inside'),
+                ({'seeds': '/etc/passwd'}, self._temp_dir, 'inside')]:
+            try:
+                service.get_job_arguments(options, path_dir=path_dir)
+                self.fail('Expected JobError')
+            except service.JobError as e:
+                self.assertTrue(msg in str(e))
+
+    def test_is_loopback(self):
+        self.assertTrue(service._is_loopback('127.0.0.1'))
+        self.assertTrue(service._is_loopback('::1'))
+        self.assertTrue(service._is_loopback('localhost'))
+        self.assertFalse(service._is_loopback('0.0.0.0'))
+        self.assertFalse(service._is_loopback('example.org'))
+
+    def test_get_job_arguments_invalid(self):
+        for options, msg in [(['uuid'], 'JSON object'),
+                             ({'conf': 'x'}, 'Unknown option conf'),
+                             ({'compact': 'yes'}, 'true or false')]:
+            try:
+                service.get_job_arguments(options)
+                self.fail('Expected JobError')
+            except service.JobError as e:
+                self.assertTrue(msg in str(e))
+
+    def test_get_percentiles(self):
+        self.assertIsNone(service._get_percentiles([]))
+        res = service._get_percentiles(list(range(100, 0, -1)))
+        self.assertEqual({'p50': 50, 'p90': 90, 'p99': 99, 'max': 100}, res)
+        self.assertEqual({'p50': 2, 'p90': 2, 'p99': 2, 'max': 2},
+                         service._get_percentiles([2]))
+
+    def test_submit_rejects_when_queue_is_full(self):
+        # not started, so nothing takes jobs off the queue
+        trim_service = self._get_service(['--queue_size', '1',
+                                          '--serve_dir', self._temp_dir])
+        options = {'input': self._input, 'edge_attr': 'score', 'value': 0.5}
+        trim_service.submit(options)
+        try:
+            trim_service.submit(options)
+            self.fail('Expected queue.Full')
+        except service.queue.Full:
+            pass
+        self.assertRaises(service.JobError, trim_service.submit,
+                          {'edge_attr': 'score', 'value': 0.5})
+        self.assertRaises(service.JobError, trim_service.submit,
+                          {'input': self._input, 'top_k': 'many'})
+        stats = trim_service.get_stats()
+        self.assertEqual(1, stats['submitted'])
+        self.assertEqual(1, stats['rejected'])
+        self.assertEqual(1, stats['queued'])
+
+    def test_jobs_share_parent_from_local_server(self):
+        datadir = os.path.join(self._temp_dir, 'data')
+        os.makedirs(datadir)
+        shutil.copy(self._input, os.path.join(datadir, 'abc.cx'))
+        server = LocalNDExServer(datadir)
+        server.start()
+        trim_service = None
+        try:
+            confile = os.path.join(self._temp_dir, 'some.conf')
+            with open(confile, 'w') as f:
+                f.write("""[hi]
+                {user} = bob
+                {pw} = smith
+                {server} = {url}""".format(user=NDExUtilConfig.USER,
+                                           pw=NDExUtilConfig.PASSWORD,
+                                           server=NDExUtilConfig.SERVER,
+                                           url=server.get_url()))
+            trim_service = self._get_service(['--conf', confile,
+                                              '--profile', 'hi',
+                                              '--serve_dir', self._temp_dir])
+            trim_service.start()
+            url = trim_service.get_url()
+
+            job_ids = []
+            for name, value in [('one', 0.6), ('two', 0.5)]:
+                status, job = self._request(
+                    url + '/jobs', {'uuid': 'abc', 'edge_attr': 'score',
+                                    'value': value,
+                                    'output': name + '.cx'})
+                self.assertEqual(202, status)
+                # worker may have picked job up already
+                self.assertTrue(job['status'] in [service.QUEUED,
+                                                  service.RUNNING,
+                                                  service.SUCCEEDED])
+                job_ids.append(job['id'])
+
+            for job_id in job_ids:
+                job = self._wait_for_job(url, job_id)
+                self.assertEqual(service.SUCCEEDED, job['status'])
+                self.assertEqual(0, job['exit_status'])
+                self.assertTrue(job['run_seconds'] >= 0)
+                self.assertTrue('stages' in job['metrics'])
+
+            with open(os.path.join(self._temp_dir, 'one.cx'), 'r') as f:
+                one = get_aspect(json.load(f), 'edges')
+            with open(os.path.join(self._temp_dir, 'two.cx'), 'r') as f:
+                two = get_aspect(json.load(f), 'edges')
+            self.assertEqual([10, 12], sorted(e['@id'] for e in two))
+            self.assertTrue(len(one) < len(two))
+
+            status, stats = self._request(url + '/stats')
+            self.assertEqual(200, status)
+            self.assertEqual(2, stats['succeeded'])
+            self.assertEqual(1, stats['network_cache']['misses'])
+            self.assertEqual(1, stats['network_cache']['hits'])
+            self.assertTrue(stats['run_seconds']['p50'] >= 0)
+
+            status, jobs = self._request(url + '/jobs')
+            self.assertEqual(200, status)
+            self.assertEqual(job_ids, [j['id'] for j in jobs])
+
+            status, res = self._request(url + '/jobs', {'uuid': 'abc',
+                                                        'bogus': 1})
+            self.assertEqual(400, status)
+            self.assertTrue('bogus' in res['error'])
+
+            status, res = self._request(url + '/jobs', {
+                'uuid': 'abc', 'edge_attr': 'score', 'value': 0.5,
+                'output': '../../escaped.cx'})
+            self.assertEqual(400, status)
+            self.assertTrue('inside --serve_dir' in res['error'])
+
+            status, res = self._request(url + '/jobs/0123')
+            self.assertEqual(404, status)
+        finally:
+            if trim_service is not None:
+                trim_service.stop()
+            server.stop()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `snapshot` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from ndexnetworktrim import snapshot
+from ndexnetworktrim.snapshot import SnapshotError
+from ndexnetworktrim.snapshot import SnapshotReader
+from ndexnetworktrim.snapshot import SnapshotWriter
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests for `snapshot` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def test_encode_objects(self):
+        values = np.empty(7, dtype=object)
+        for pos, value in enumerate(['a', None, 1, 1.0, True, ['x'], 'a']):
+            values[pos] = value
+        codes, dictionary = snapshot.encode_objects(values)
+        self.assertEqual([0, -1, 1, 2, 3, 4, 0], codes.tolist())
+        self.assertEqual(['a', 1, 1.0, True, ['x']], dictionary)
+        res = snapshot.decode_objects(codes, dictionary).tolist()
+        self.assertEqual(values.tolist(), res)
+        self.assertEqual([str, type(None), int, float, bool, list, str],
+                         [type(v) for v in res])
+
+    def test_write_and_read(self):
+        writer = SnapshotWriter(self._temp_dir)
+        numbers = writer.add_array(np.array([1.5, 2.5]))
+        names = writer.add_array(np.array(['a', None, 'a'], dtype=object))
+        writer.write({'numbers': numbers, 'names': names, 'x': [1]})
+
+        reader = SnapshotReader(self._temp_dir)
+        state = reader.get_state()
+        self.assertEqual([1], state['x'])
+        res = reader.get_array(state['numbers'])
+        self.assertTrue(isinstance(res, np.memmap))
+        self.assertEqual([1.5, 2.5], res.tolist())
+        self.assertEqual(['a', None, 'a'],
+                         reader.get_array(state['names']).tolist())
+        self.assertFalse(isinstance(SnapshotReader(
+            self._temp_dir, mmap=False).get_array(state['numbers']),
+            np.memmap))
+        self.assertTrue(snapshot.get_snapshot_size(self._temp_dir) > 0)
+        self.assertEqual([], [n for n in os.listdir(self._temp_dir)
+                              if n.endswith('.tmp')])
+
+    def test_rewrite_replaces_snapshot_only_when_complete(self):
+        path = os.path.join(self._temp_dir, 'snap')
+        writer = SnapshotWriter(path)
+        writer.write({'a': writer.add_array(np.array([1, 2])),
+                      'b': writer.add_array(np.array([3, 4]))})
+        files = os.listdir(path)
+
+        # unfinished write leaves snapshot as it was
+        writer = SnapshotWriter(path)
+        writer.add_array(np.array([9, 9]))
+        reader = SnapshotReader(path)
+        self.assertEqual([1, 2], reader.get_array(
+            reader.get_state()['a']).tolist())
+        writer.abort()
+        self.assertEqual(['snap'], os.listdir(self._temp_dir))
+
+        # smaller snapshot leaves no files of larger one behind
+        writer = SnapshotWriter(path)
+        writer.write({'a': writer.add_array(np.array([5, 6]))})
+        self.assertEqual(2, len(os.listdir(path)))
+        self.assertEqual([snapshot.MANIFEST],
+                         sorted(set(files) & set(os.listdir(path))))
+        self.assertEqual(['snap'], os.listdir(self._temp_dir))
+        self.assertEqual([5, 6], SnapshotReader(path).get_array(
+            SnapshotReader(path).get_state()['a']).tolist())
+
+        # reader of replaced snapshot fails instead of mixing them up
+        self.assertRaises(SnapshotError, reader.get_array,
+                          reader.get_state()['b'])
+
+    def test_writer_does_not_replace_other_directory(self):
+        with open(os.path.join(self._temp_dir, 'notes.txt'), 'w') as f:
+            f.write('x')
+        self.assertRaises(SnapshotError, SnapshotWriter, self._temp_dir)
+
+    def test_unreadable_snapshot(self):
+        self.assertRaises(SnapshotError, SnapshotReader, self._temp_dir)
+        with open(os.path.join(self._temp_dir, snapshot.MANIFEST), 'w') as f:
+            json.dump({'version': 99, 'state': {}}, f)
+        self.assertRaises(SnapshotError, SnapshotReader, self._temp_dir)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `state` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ndexnetworktrim import state
+from ndexnetworktrim.state import TrimState
+
+
+class TestState(unittest.TestCase):
+    """Tests for `state` module."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self._temp_dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._temp_dir, 'state.json')
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        shutil.rmtree(self._temp_dir)
+
+    def test_get_network_id_from_url(self):
+        self.assertEqual('abc', state.get_network_id_from_url(
+            'http://localhost/v2/network/abc'))
+        self.assertEqual('abc', state.get_network_id_from_url(
+            'http://localhost/v2/network/abc/\n'))
+        self.assertEqual('abc', state.get_network_id_from_url('abc'))
+
+    def test_record_and_is_current(self):
+        summary = {'modificationTime': 5, 'cxFileSize': 10, 'name': 'x'}
+        trim_state = TrimState(self._path)
+        self.assertIsNone(trim_state.get_derived_network_id('a'))
+        self.assertFalse(trim_state.is_current('a', summary))
+        self.assertFalse(os.path.isfile(self._path))
+
+        trim_state.record('a', summary, 'derived')
+        self.assertEqual('derived', trim_state.get_derived_network_id('a'))
+        self.assertTrue(trim_state.is_current('a', summary))
+        self.assertFalse(trim_state.is_current('b', summary))
+        self.assertFalse(trim_state.is_current('a', {'modificationTime': 6,
+                                                     'cxFileSize': 10}))
+        self.assertFalse(trim_state.is_current('a', {'name': 'x'}))
+
+        trim_state = TrimState(self._path)
+        self.assertTrue(trim_state.is_current('a', summary))
+        with open(self._path, 'r') as f:
+            entry = json.load(f)['networks']['a']
+        self.assertEqual({'modificationTime': 5, 'cxFileSize': 10},
+                         entry['parentSummary'])
+
+    def test_record_keeps_entries_of_other_runs(self):
+        first = TrimState(self._path)
+        second = TrimState(self._path)
+        first.record('a', {'modificationTime': 1}, 'one')
+        second.record('b', {'modificationTime': 1}, 'two')
+        trim_state = TrimState(self._path)
+        self.assertEqual('one', trim_state.get_derived_network_id('a'))
+        self.assertEqual('two', trim_state.get_derived_network_id('b'))
+
+    def test_unreadable_state_file(self):
+        with open(self._path, 'w') as f:
+            f.write('{')
+        trim_state = TrimState(self._path)
+        self.assertIsNone(trim_state.get_derived_network_id('a'))
+        trim_state.record('a', {'modificationTime': 1}, 'one')
+        self.assertEqual('one',
+                         TrimState(self._path).get_derived_network_id('a'))
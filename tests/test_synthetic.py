@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `synthetic` module."""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import ndex2
+
+from ndexnetworktrim import synthetic
+from ndexnetworktrim.synthetic import SyntheticNetworkGenerator
+from tests.test_cxstream import get_aspect
+
+
+class TestSynthetic(unittest.TestCase):
+    """Tests for `synthetic` module."""
+
+    def test_get_cx(self):
+        cx = SyntheticNetworkGenerator(10, 30, seed=3, num_types=2,
+                                       block_size=7).get_cx()
+        nodes = get_aspect(cx, 'nodes')
+        edges = get_aspect(cx, 'edges')
+        self.assertEqual(list(range(10)), [n['@id'] for n in nodes])
+        self.assertEqual(list(range(30)), [e['@id'] for e in edges])
+        for edge in edges:
+            self.assertTrue(0 <= edge['s'] < 10)
+            self.assertTrue(0 <= edge['t'] < 10)
+        attributes = get_aspect(cx, 'edgeAttributes')
+        scores = [a['v'] for a in attributes if a['n'] == 'score']
+        self.assertEqual(30, len(scores))
+        for score in scores:
+            self.assertTrue(0 <= score < 1)
+        types = set(a['v'] for a in attributes if a['n'] == 'type')
+        self.assertTrue(types <= {'type0', 'type1'})
+
+        network = ndex2.create_nice_cx_from_raw_cx(cx)
+        self.assertEqual(10, len(network.nodes))
+        self.assertEqual(30, len(network.edges))
+        self.assertEqual('synthetic 10 nodes 30 edges seed 3',
+                         network.get_name())
+
+    def test_same_seed_gives_same_network(self):
+        first = SyntheticNetworkGenerator(20, 50, seed=1).get_cx()
+        self.assertEqual(first,
+                         SyntheticNetworkGenerator(20, 50, seed=1).get_cx())
+        self.assertNotEqual(first,
+                            SyntheticNetworkGenerator(20, 50, seed=2).get_cx())
+
+    def test_distributions_and_missing(self):
+        for distribution in synthetic.DISTRIBUTIONS:
+            cx = SyntheticNetworkGenerator(
+                20, 1000, score_distribution=distribution,
+                missing_fraction=0.5).get_cx()
+            scores = [a['v'] for a in get_aspect(cx, 'edgeAttributes')
+                      if a['n'] == 'score']
+            self.assertTrue(300 < len(scores) < 700)
+        self.assertRaises(ValueError, SyntheticNetworkGenerator, 10, 10,
+                          score_distribution='foo')
+        self.assertRaises(ValueError, SyntheticNetworkGenerator, 10, 10,
+                          missing_fraction=2)
+
+    def test_write_and_main(self):
+        output = io.BytesIO()
+        num_bytes = SyntheticNetworkGenerator(5, 5).write(output)
+        self.assertEqual(num_bytes, len(output.getvalue()))
+        self.assertEqual(SyntheticNetworkGenerator(5, 5).get_cx(),
+                         json.loads(output.getvalue()))
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'out.cx')
+            self.assertEqual(0, synthetic.main(['synthetic.py', path,
+                                                '--nodes', '5',
+                                                '--edges', '5']))
+            with open(path, 'r') as f:
+                self.assertEqual(json.loads(output.getvalue()), json.load(f))
+        finally:
+            shutil.rmtree(temp_dir)